@@ -41,8 +41,24 @@ def main():
     print(f"🎮 游戏页面: http://{host}:{port}")
     print("\n按 Ctrl+C 停止服务器")
     
+    # WebSocket permessage-deflate 压缩（客户端支持时在握手阶段协商）
+    from src.core.config import config
+    # uvicorn 默认即协商 permessage-deflate，WS_PER_MESSAGE_DEFLATE=false 仅用于关闭压缩（省CPU）
+    ws_deflate = config.websocket_config.per_message_deflate
+    
+    # 多worker运行需开启分片模式（SHARDING_ENABLED=true），否则各worker之间会话互不可见
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    if workers > 1 and os.getenv("SHARDING_ENABLED", "false").lower() != "true":
+        print("⚠️ UVICORN_WORKERS>1 但未启用 SHARDING_ENABLED，已回退为单worker")
+        workers = 1
+    
     try:
-        uvicorn.run(app, host=host, port=port, log_level="info")
+        if workers > 1:
+            print(f"🧩 分片模式: {workers} 个worker")
+            uvicorn.run("src.core.server:app", host=host, port=port, log_level="info", workers=workers,
+                        ws_per_message_deflate=ws_deflate)
+        else:
+            uvicorn.run(app, host=host, port=port, log_level="info", ws_per_message_deflate=ws_deflate)
     except KeyboardInterrupt:
         print("\n👋 服务器已停止")
 
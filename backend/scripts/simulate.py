@@ -0,0 +1,59 @@
+"""无头模拟与局/秒基准
+
+示例：
+    python scripts/simulate.py --games 100 --concurrency 50 --latency lognormal:-3,0.5
+    python scripts/simulate.py --fixture path/to/script.json --latency fixed:0 --json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+# 将项目根目录添加到Python路径
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.simulation import LatencyModel, load_fixture, run_simulation
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "simulation_script.json")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="无头运行 GameEngine 并统计局/秒、发言/秒与各阶段 CPU 时间")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="剧本夹具 JSON 路径")
+    parser.add_argument("--games", type=int, default=20, help="总局数")
+    parser.add_argument("--concurrency", type=int, default=20, help="同时进行的局数")
+    parser.add_argument("--latency", default="fixed:0", help="LLM 延迟分布: fixed:a | uniform:a,b | lognormal:mu,sigma")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    parser.add_argument("--log-level", default="ERROR", help="日志级别")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+    report = asyncio.run(run_simulation(
+        load_fixture(args.fixture),
+        games=args.games,
+        concurrency=args.concurrency,
+        latency=LatencyModel.parse(args.latency),
+        seed=args.seed,
+    ))
+    data = report.to_dict()
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+    print(f"局数: {data['completed']}/{data['games']} 完成 (并发 {data['concurrency']})")
+    print(f"耗时: {data['wall_seconds']}s 墙钟, {data['cpu_seconds']}s CPU")
+    print(f"吞吐: {data['games_per_second']} 局/秒, {data['turns_per_second']} 发言/秒 "
+          f"({data['turns']} 次发言, {data['llm_calls']} 次 LLM 调用)")
+    print(f"收敛提前结束: 节省 {data['turns_saved']} 轮发言")
+    print("各阶段 CPU 时间:")
+    for stage, seconds in data["stage_cpu_seconds"].items():
+        print(f"  {stage:<22}{seconds:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,10 @@
 """AI代理模块"""
 from typing import Dict
-import os
 import logging
 
 from ..schemas.script import ScriptCharacter as Character
 from ..schemas.game_phase import GamePhaseEnum as GamePhase
-from ..services import LLMService
-from ..services.llm_service import LLMMessage
+from ..services.llm_service import LLMMessage, get_shared_llm_service, llm_call_context, llm_client_registry
 from ..core.config import config
 
 # 配置日志
@@ -20,10 +18,10 @@ class AIAgent:
         
         # 使用新的LLM服务抽象层
         if api_key:
-            # 兼容旧的API，临时更新配置
-            os.environ["OPENAI_API_KEY"] = api_key
-        
-        self.llm_service = LLMService.from_config(config.llm_config)
+            # 兼容旧的API：按传入的密钥获取服务（与其他服务共享连接池）
+            self.llm_service = llm_client_registry.from_config(config.llm_config, api_key=api_key)
+        else:
+            self.llm_service = get_shared_llm_service()
         self.memory: list[dict[str, str]] = []
         
     async def think_and_act(self, game_state: Dict, phase: GamePhase) -> str:
@@ -37,7 +35,8 @@ class AIAgent:
         ]
         
         try:
-            response = await self.llm_service.chat_completion(messages)
+            with llm_call_context(call_site="ai_agent", character=self.character.name):
+                response = await self.llm_service.chat_completion(messages)
             action = response.content if response and response.content else "我需要仔细想想..."
         except Exception as e:
             logger.error(f"[{self.character.name}] LLM调用失败: {e}")
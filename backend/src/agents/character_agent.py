@@ -11,21 +11,38 @@
   - user message  = 记忆上下文 + 阶段任务（PhaseDirector 动态构建）
   - memory        = 分层私有记忆（CharacterMemory）
   - observe()     = 被动接收他人发言，更新工作记忆
+
+respond() 拆分为 prepare() → generate() → commit() 三步：prepare 构建提示词并计算哈希，
+generate 只调用 LLM、不修改任何状态，commit 写入私有记忆。GameEngine 的流水线模式
+据此提前为下一位发言者调用 LLM，并在正式发言时用提示词哈希判断推测结果是否仍然有效。
+generate 传入 on_delta 时改用 chat_completion_stream，边生成边回调增量文本（流式发言）。
 """
 from __future__ import annotations
 
+import hashlib
 import logging
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
 
 from ..schemas.script_character import ScriptCharacter
 from ..schemas.game_phase import GamePhaseEnum as GamePhase
-from ..services.llm_service import BaseLLMService, LLMMessage
+from ..services.llm_service import BaseLLMService, LLMMessage, llm_call_context
 from .character_identity import CharacterIdentity
 from .character_memory import CharacterMemory
 from .phase_director import PhaseDirector
 
 logger = logging.getLogger(__name__)
 
+# 流式发言的增量文本回调
+DeltaCallback = Callable[[str], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class PreparedTurn:
+    """一次发言的 LLM 输入"""
+    messages: list[LLMMessage]
+    prompt_hash: str
+
 
 class CharacterAgent:
     """三层分离的剧本杀角色 Agent。
@@ -46,11 +63,19 @@ class CharacterAgent:
     # 主动接口（GameEngine 调用）
     # ------------------------------------------------------------------
 
-    async def respond(self, phase: GamePhase, game_state: dict[str, Any]) -> str:
+    async def respond(self, phase: GamePhase, game_state: dict[str, Any],
+                      on_delta: DeltaCallback | None = None) -> str:
         """根据当前阶段和游戏状态生成角色发言。
 
         参照 hello-agents NPCAgentManager.chat() 的完整流程。
+        on_delta 不为空时以流式方式生成，每收到一段文本即回调。
         """
+        reply = await self.generate(self.prepare(phase, game_state), on_delta)
+        self.commit(reply)
+        return reply
+
+    def prepare(self, phase: GamePhase, game_state: dict[str, Any]) -> PreparedTurn:
+        """构建本次发言的 LLM 输入（不修改状态）。"""
         # 1. system prompt = 稳定身份（全程不变）
         system_prompt = self.identity.to_system_prompt()
 
@@ -62,25 +87,54 @@ class CharacterAgent:
             game_state=game_state,
         )
 
-        # 3. LLM 调用
-        messages = [
-            LLMMessage(role="system", content=system_prompt),
-            LLMMessage(role="user", content=user_message),
-        ]
+        digest = hashlib.sha1()
+        digest.update(system_prompt.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(user_message.encode("utf-8"))
+        return PreparedTurn(
+            messages=[
+                LLMMessage(role="system", content=system_prompt),
+                LLMMessage(role="user", content=user_message),
+            ],
+            prompt_hash=digest.hexdigest(),
+        )
+
+    async def generate(self, prepared: PreparedTurn, on_delta: DeltaCallback | None = None) -> str:
+        """3. LLM 调用（不修改状态，可提前推测执行）。"""
         try:
-            response = await self._llm.chat_completion(messages)
-            reply = response.content if response and response.content else "我需要仔细想想……"
+            with llm_call_context(call_site="character_turn", character=self.name):
+                if on_delta is None:
+                    response = await self._llm.chat_completion(prepared.messages)
+                    reply = response.content if response and response.content else "我需要仔细想想……"
+                else:
+                    reply = await self._generate_stream(prepared, on_delta) or "我需要仔细想想……"
         except Exception as exc:
             logger.error(f"[{self.name}] LLM 调用失败: {exc}")
             reply = "我现在有点困惑，让我整理一下思路……"
 
         logger.info(f"[{self.name}] 输出: {reply[:80]}{'…' if len(reply) > 80 else ''}")
+        return reply
 
-        # 4. 保存到私有日志（参照 hello-agents _save_conversation_to_memory）
+    async def _generate_stream(self, prepared: PreparedTurn, on_delta: DeltaCallback) -> str:
+        """流式生成：逐段回调增量文本，返回完整发言（回调出错不影响生成）"""
+        parts: list[str] = []
+        forward = True
+        async for chunk in self._llm.chat_completion_stream(prepared.messages):
+            if not chunk:
+                continue
+            parts.append(chunk)
+            if forward:
+                try:
+                    await on_delta(chunk)
+                except Exception as exc:
+                    logger.error(f"[{self.name}] 流式回调失败，后续增量不再推送: {exc}")
+                    forward = False
+        return "".join(parts).strip()
+
+    def commit(self, reply: str) -> None:
+        """4. 保存到私有日志（参照 hello-agents _save_conversation_to_memory）"""
         self.memory.record_personal_event(f"我说：{reply}", importance=0.6)
 
-        return reply
-
     # ------------------------------------------------------------------
     # 被动接口（CharacterAgentManager 广播调用）
     # ------------------------------------------------------------------
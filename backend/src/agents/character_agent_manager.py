@@ -6,21 +6,35 @@
   2. 调用指定角色发言（respond）
   3. 广播发言给其他所有角色（broadcast_speech）
   4. 代理旧 AIAgent 接口，保持与 GameEngine 的兼容性
+  5. 推测执行（speculate）：提前为下一位发言者调用 LLM，正式发言时按提示词哈希校验
 """
 from __future__ import annotations
 
+import asyncio
 import logging
+from dataclasses import dataclass
 from typing import Any
 
 from ..schemas.script_character import ScriptCharacter
 from ..schemas.game_phase import GamePhaseEnum as GamePhase
-from ..services.llm_service import LLMService
-from ..core.config import config
-from .character_agent import CharacterAgent
+from ..services.llm_service import BaseLLMService, get_shared_llm_service
+from .character_agent import CharacterAgent, DeltaCallback, PreparedTurn
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SpeculativeTurn:
+    """提前发起的发言（LLM 调用在后台进行）"""
+    speaker: str
+    prepared: PreparedTurn
+    task: asyncio.Task
+
+    def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+
+
 class CharacterAgentManager:
     """管理所有角色 Agent 的生命周期和通信。
 
@@ -30,10 +44,13 @@ class CharacterAgentManager:
     - broadcast()  : 将外部（系统/搜证结果）消息广播给所有角色
     """
 
-    def __init__(self) -> None:
+    def __init__(self, llm: BaseLLMService | None = None) -> None:
         self._agents: dict[str, CharacterAgent] = {}
-        # 所有角色共享同一个 LLMService 实例（避免每个 Agent 持有独立连接池）
-        self._shared_llm = LLMService.from_config(config.llm_config)
+        # 所有角色（及所有会话）共享同一个 LLMService 实例（避免各自持有独立连接池）；可由调用方注入
+        self._shared_llm = llm if llm is not None else get_shared_llm_service()
+        # 推测执行统计
+        self.speculation_hits = 0
+        self.speculation_misses = 0
 
     # ------------------------------------------------------------------
     # 初始化
@@ -58,24 +75,81 @@ class CharacterAgentManager:
     # ------------------------------------------------------------------
 
     async def respond(
-        self, name: str, phase: GamePhase, game_state: dict[str, Any]
+        self, name: str, phase: GamePhase, game_state: dict[str, Any],
+        on_delta: DeltaCallback | None = None,
     ) -> str:
         """让指定角色根据阶段和游戏状态发言，并将发言广播给其他角色。
 
         参照 hello-agents NPCAgentManager.chat() 的广播机制。
+        on_delta 不为空时流式生成（见 CharacterAgent.generate）。
         """
         agent = self._agents.get(name)
         if agent is None:
             logger.error(f"[CharacterAgentManager] 未找到角色: {name}")
             return f"{name} 暂时无法发言。"
 
-        reply = await agent.respond(phase, game_state)
+        reply = await agent.respond(phase, game_state, on_delta)
 
         # 广播给其他角色，更新其工作记忆
         self.broadcast_speech(speaker=name, content=reply)
 
         return reply
 
+    def speculate(
+        self,
+        name: str,
+        phase: GamePhase,
+        game_state: dict[str, Any],
+        semaphore: asyncio.Semaphore | None = None,
+    ) -> SpeculativeTurn | None:
+        """按当前记录构建提示词并在后台发起 LLM 调用，不修改任何记忆。
+
+        semaphore 用于限制同时进行的 LLM 调用数（批量阶段）。
+        """
+        agent = self._agents.get(name)
+        if agent is None:
+            return None
+        prepared = agent.prepare(phase, game_state)
+
+        async def generate() -> str:
+            if semaphore is None:
+                return await agent.generate(prepared)
+            async with semaphore:
+                return await agent.generate(prepared)
+
+        task = asyncio.create_task(generate(), name=f"speculate-{name}")
+        return SpeculativeTurn(speaker=name, prepared=prepared, task=task)
+
+    def commit_turn(self, name: str, reply: str) -> None:
+        """落定一次发言：写入发言者私有记忆并广播给其他角色。"""
+        agent = self._agents.get(name)
+        if agent is not None:
+            agent.commit(reply)
+        self.broadcast_speech(speaker=name, content=reply)
+
+    async def respond_speculated(
+        self, spec: SpeculativeTurn, phase: GamePhase, game_state: dict[str, Any],
+        on_delta: DeltaCallback | None = None,
+    ) -> str:
+        """正式发言：提示词未变则采用推测结果，否则丢弃并重新生成（重新生成时可流式）。"""
+        agent = self._agents.get(spec.speaker)
+        if agent is None:
+            spec.cancel()
+            return await self.respond(spec.speaker, phase, game_state, on_delta)
+
+        prepared = agent.prepare(phase, game_state)
+        if prepared.prompt_hash == spec.prepared.prompt_hash:
+            self.speculation_hits += 1
+            reply = await spec.task
+        else:
+            self.speculation_misses += 1
+            logger.info(f"[PIPELINE] {spec.speaker} 的对话记录已变化，丢弃推测结果")
+            spec.cancel()
+            reply = await agent.generate(prepared, on_delta)
+
+        self.commit_turn(spec.speaker, reply)
+        return reply
+
     def broadcast_speech(self, speaker: str, content: str) -> None:
         """将一条发言广播给除发言者以外的所有角色。
 
@@ -104,6 +178,17 @@ class CharacterAgentManager:
             if name != finder:
                 agent.memory.observe_public_speech("系统", system_msg)
 
+    def export_memories(self) -> dict[str, dict]:
+        """导出全部角色记忆（会话休眠快照）。"""
+        return {name: agent.memory.export_state() for name, agent in self._agents.items()}
+
+    def restore_memories(self, memories: dict[str, dict]) -> None:
+        """恢复角色记忆，快照中不存在的角色保持空记忆。"""
+        for name, state in memories.items():
+            agent = self._agents.get(name)
+            if agent is not None:
+                agent.memory.load_state(state)
+
     # ------------------------------------------------------------------
     # 兼容性接口（保持 GameEngine 现有调用方式）
     # ------------------------------------------------------------------
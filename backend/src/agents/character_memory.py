@@ -24,7 +24,7 @@ class PublicSpeech(NamedTuple):
     content: str
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonalEvent:
     content: str
     importance: float = 0.5  # 0.0–1.0
@@ -131,3 +131,26 @@ class CharacterMemory:
             parts.append(working)
 
         return "\n\n".join(parts)
+
+    # ------------------------------------------------------------------
+    # 休眠快照（会话回收时持久化，重连时恢复）
+    # ------------------------------------------------------------------
+
+    def export_state(self) -> dict:
+        """导出为可 JSON 序列化的字典。"""
+        return {
+            "working": [[s.speaker, s.content] for s in self._working],
+            "personal_log": [[e.content, e.importance] for e in self._personal_log],
+            "suspicion_map": dict(self.suspicion_map),
+        }
+
+    def load_state(self, state: dict) -> None:
+        """从 export_state() 的结果恢复。"""
+        self._working.clear()
+        for speaker, content in state.get("working", []):
+            self._working.append(PublicSpeech(speaker=speaker, content=content))
+        self._personal_log = [
+            PersonalEvent(content=content, importance=importance)
+            for content, importance in state.get("personal_log", [])
+        ]
+        self.suspicion_map = dict(state.get("suspicion_map", {}))
@@ -16,6 +16,8 @@ from typing import Any, Optional
 
 from ..schemas.game_phase import GamePhaseEnum
 from ..services.llm_service import BaseLLMService, LLMMessage
+from ..services.llm_cache import cached_chat_completion
+from .gm_plan_cache import GMPlanStore, gm_plan_store
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,27 @@ class PhaseStep:
     gm_instructions: str = ""
     round_number: int = 1  # 同类型阶段的第几轮（如第 2 轮搜证）
 
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "phase_type": self.phase_type.value,
+            "name": self.name,
+            "description": self.description,
+            "max_turns": self.max_turns,
+            "gm_instructions": self.gm_instructions,
+            "round_number": self.round_number,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PhaseStep":
+        return cls(
+            phase_type=GamePhaseEnum(data["phase_type"]),
+            name=data["name"],
+            description=data["description"],
+            max_turns=data.get("max_turns"),
+            gm_instructions=data.get("gm_instructions", ""),
+            round_number=data.get("round_number", 1),
+        )
+
 
 # ---------------------------------------------------------------------------
 # 默认阶段模板（规则化构建，不依赖 LLM）
@@ -123,20 +146,38 @@ def _build_default_plan(script_data: dict[str, Any]) -> list[PhaseStep]:
 class GMAgent:
     """游戏 GM Agent：动态规划阶段流程，并在阶段切换时生成旁白。"""
 
-    def __init__(self, llm: BaseLLMService) -> None:
+    def __init__(self, llm: BaseLLMService, plan_store: Optional[GMPlanStore] = None) -> None:
         self._llm = llm
+        self._plan_store = plan_store if plan_store is not None else gm_plan_store
 
     # ------------------------------------------------------------------
     # 主接口：创建游戏计划
     # ------------------------------------------------------------------
 
-    async def create_game_plan(self, script_data: dict[str, Any]) -> list[PhaseStep]:
-        """根据剧本数据生成阶段计划。优先用 LLM，失败时回退到规则计划。"""
+    async def create_game_plan(
+        self,
+        script_data: dict[str, Any],
+        script_id: Optional[int] = None,
+        script_version: Optional[str] = None,
+    ) -> list[PhaseStep]:
+        """根据剧本数据生成阶段计划。优先用缓存，其次 LLM，失败时回退到规则计划。
+
+        提供 script_id 与 script_version 时，按二者查找/写入持久化计划缓存。
+        """
+        cacheable = script_id is not None and bool(script_version)
+        if cacheable:
+            cached = self._plan_store.get(script_id, script_version)
+            if cached:
+                logger.info(f"[GMAgent] 命中计划缓存: 剧本={script_id}（{len(cached)} 个阶段）")
+                return cached
+
         try:
             plan = await self._llm_create_plan(script_data)
             if plan:
                 logger.info(f"[GMAgent] LLM 生成游戏计划（{len(plan)} 个阶段）: "
                             f"{[s.name for s in plan]}")
+                if cacheable:
+                    self._plan_store.put(script_id, script_version, plan)
                 return plan
         except Exception as exc:
             logger.warning(f"[GMAgent] LLM 规划失败，使用默认计划: {exc}")
@@ -244,7 +285,10 @@ class GMAgent:
             LLMMessage(role="user", content=context),
         ]
 
-        response = await self._llm.chat_completion(messages)
+        response = await cached_chat_completion(
+            self._llm, messages, call_site="gm_plan",
+            validate=lambda r: re.search(r'\[.*\]', r.content, re.DOTALL) is not None,
+        )
         if not response or not response.content:
             return None
 
@@ -0,0 +1,136 @@
+"""GM 阶段计划的持久化缓存
+
+GMAgent.create_game_plan 每次开局都会调用一次 LLM 规划阶段流程，而同一剧本
+（同一版本）的输入完全相同。这里把 LLM 生成并通过校验的计划按 (剧本ID, 版本)
+写入本地文件，进程内再加一层 LRU：
+  - 版本与剧本编译缓存一致，取剧本行的 updated_at；剧本被编辑后版本变化，自然
+    不再命中旧计划（旧文件留在磁盘上，不影响正确性）
+  - 只缓存 LLM 生成的计划；规则回退计划生成成本为零，缓存它反而会让一次 LLM
+    故障长期固化为默认流程
+  - 文件为 JSON（<directory>/<script_id>-<版本摘要>.json），写入时先写临时文件再替换
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from .gm_agent import PhaseStep
+
+logger = logging.getLogger(__name__)
+
+PLAN_FORMAT_VERSION = 1
+
+
+class GMPlanStore:
+    """GM 阶段计划的本地文件存储（带进程内 LRU，线程安全）"""
+
+    def __init__(self, directory: str = ".data/gm_plans", enabled: bool = True, max_memory_entries: int = 128):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.max_memory_entries = max(1, max_memory_entries)
+        self._memory: "OrderedDict[tuple[int, str], list[dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _path(self, script_id: int, version: str) -> Path:
+        digest = hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"{int(script_id)}-{digest}.json"
+
+    def _remember(self, key: tuple[int, str], steps: list[dict[str, Any]]):
+        with self._lock:
+            self._memory[key] = steps
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, script_id: int, version: str) -> Optional[list[PhaseStep]]:
+        """读取缓存的计划，未命中返回 None"""
+        from .gm_agent import PhaseStep
+
+        if not self.enabled:
+            return None
+        key = (script_id, version)
+        with self._lock:
+            steps = self._memory.get(key)
+            if steps is not None:
+                self._memory.move_to_end(key)
+        if steps is None:
+            steps = self._read_file(script_id, version)
+            if steps is not None:
+                self._remember(key, steps)
+        if steps is None:
+            self.misses += 1
+            return None
+        try:
+            plan = [PhaseStep.from_dict(step) for step in steps]
+        except (KeyError, ValueError) as exc:
+            logger.warning(f"[GM_PLAN_CACHE] 缓存计划无法解析，忽略: 剧本={script_id}, {exc}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return plan
+
+    def _read_file(self, script_id: int, version: str) -> Optional[list[dict[str, Any]]]:
+        path = self._path(script_id, version)
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning(f"[GM_PLAN_CACHE] 读取缓存文件失败: {path}, {exc}")
+            return None
+        if (data.get("format") != PLAN_FORMAT_VERSION or data.get("script_id") != script_id
+                or data.get("version") != version):
+            return None
+        return data.get("steps")
+
+    def put(self, script_id: int, version: str, plan: list[PhaseStep]):
+        """写入计划（内存与文件）"""
+        if not self.enabled:
+            return
+        steps = [step.to_dict() for step in plan]
+        self._remember((script_id, version), steps)
+        path = self._path(script_id, version)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps({
+                "format": PLAN_FORMAT_VERSION,
+                "script_id": script_id,
+                "version": version,
+                "steps": steps,
+            }, ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(path)
+            self.writes += 1
+        except OSError as exc:
+            logger.warning(f"[GM_PLAN_CACHE] 写入缓存文件失败: {path}, {exc}")
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+        }
+
+
+def _build_store() -> GMPlanStore:
+    from ..core.config import config
+    cfg = config.gm_agent_config
+    return GMPlanStore(directory=cfg.plan_cache_dir, enabled=cfg.plan_cache_enabled)
+
+
+gm_plan_store = _build_store()
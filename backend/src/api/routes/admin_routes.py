@@ -0,0 +1,68 @@
+"""运维管理相关的API路由（需要管理员权限，由认证中间件按 /api/admin/* 校验）"""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+
+from ...core.websocket_server import game_server
+from ...core.memory_accounting import server_footprint, session_footprint
+from ...core.middleware_dependencies import get_current_admin_user_middleware
+from ...services.llm_cache import llm_response_cache
+from ...services.llm_metrics import DIMENSIONS, llm_metrics
+from ...services.llm_service import llm_client_registry, llm_governor
+
+router = APIRouter(prefix="/api/admin", tags=["运维管理"])
+
+def create_response(success: bool, message: str, data=None):
+    """创建统一的响应格式"""
+    return {
+        "success": success,
+        "message": message,
+        "data": data
+    }
+
+@router.get("/memory")
+async def get_memory_footprint(request: Request):
+    """全部会话的内存核算（字节，按组件）"""
+    get_current_admin_user_middleware(request)
+    return create_response(True, "获取会话内存核算成功", server_footprint(game_server))
+
+@router.get("/memory/sessions/{session_id}")
+async def get_session_memory_footprint(session_id: str, request: Request):
+    """单个会话的内存核算"""
+    get_current_admin_user_middleware(request)
+    session = game_server.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="会话不存在或已休眠")
+    return create_response(True, "获取会话内存核算成功", session_footprint(session))
+
+@router.get("/engine-pool")
+async def get_engine_pool_stats(request: Request):
+    """预热引擎池状态"""
+    get_current_admin_user_middleware(request)
+    return create_response(True, "获取预热引擎池状态成功", game_server.engine_pool.stats())
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats(request: Request):
+    """LLM 响应缓存命中统计（按调用点）"""
+    get_current_admin_user_middleware(request)
+    return create_response(True, "获取LLM缓存统计成功", llm_response_cache.stats())
+
+@router.get("/llm-governor")
+async def get_llm_governor_stats(request: Request):
+    """LLM 并发调度状态：各模型的排队深度、在途请求与按优先级的等待时间"""
+    get_current_admin_user_middleware(request)
+    return create_response(True, "获取LLM调度状态成功", llm_governor.stats())
+
+@router.get("/llm-pool")
+async def get_llm_pool_stats(request: Request):
+    """LLM 客户端注册表与连接池状态"""
+    get_current_admin_user_middleware(request)
+    return create_response(True, "获取LLM连接池状态成功", llm_client_registry.stats())
+
+@router.get("/llm-metrics")
+async def get_llm_metrics(request: Request, dimension: Optional[str] = None):
+    """LLM 调用指标：耗时、TTFT、token、重试、错误与费用，按调用点/阶段/模型/会话/角色汇总"""
+    get_current_admin_user_middleware(request)
+    if dimension is not None and dimension not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"未知的维度: {dimension}，可选: {', '.join(DIMENSIONS)}")
+    return create_response(True, "获取LLM调用指标成功", llm_metrics.snapshot(dimension))
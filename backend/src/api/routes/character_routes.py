@@ -6,7 +6,7 @@ from ...schemas.script import ScriptCharacter
 from ...schemas.base import APIResponse, PaginatedResponse
 from ...db.models.character import CharacterDBModel
 from ...schemas.base import BaseDataModel
-from ...services.llm_service import llm_service, LLMMessage
+from ...services.llm_service import llm_service, LLMMessage, LLMPriority, llm_priority
 import logging
 from datetime import datetime
 from ...core.container_integration import get_character_repo_depends
@@ -162,6 +162,7 @@ async def get_character(script_id: int, character_id: int, character_repository_
         raise HTTPException(status_code=500, detail=f"获取失败: {str(e)}")
 
 @router.post("/characters/generate-prompt", summary="生成角色头像提示词")
+@llm_priority(LLMPriority.BATCH, call_site="character_image_prompt")
 async def generate_character_prompt(request: CharacterPromptRequest) -> APIResponse[dict]:
     """使用LLM生成角色头像的提示词"""
     try:
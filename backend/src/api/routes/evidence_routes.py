@@ -4,7 +4,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from ...db.repositories.evidence_repository import EvidenceRepository
 from ...core.storage import storage_manager
-from ...services.llm_service import llm_service
+from ...services.llm_service import llm_service, LLMPriority, llm_priority
 from ...schemas.script import ScriptEvidence
 from ...schemas.script_evidence import EvidenceType
 from ...schemas.evidence_schemas import EvidenceCreateRequest, EvidenceUpdateRequest, EvidencePromptRequest, ScriptResponse
@@ -109,6 +109,7 @@ async def delete_evidence(script_id: int, evidence_id: int, evidence_repository:
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 @router.post("/evidence/generate-prompt", summary="生成证据图片提示词")
+@llm_priority(LLMPriority.BATCH, call_site="evidence_image_prompt")
 async def generate_evidence_prompt(request: EvidencePromptRequest):
     """使用LLM生成证据图片的提示词"""
     try:
@@ -37,7 +37,7 @@ async def get_game_status(session_id: str | None = None):
         return {
             "success": True,
             "message": "获取游戏状态成功",
-            "data": session.game_engine.game_state
+            "data": session.game_engine.export_game_state()
         }
     except Exception as e:
         return {
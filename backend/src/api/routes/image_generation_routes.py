@@ -14,7 +14,8 @@ from src.services.image_generation_service import (
     ImageGenerationServiceFactory, 
     ImageGenerationRequest as UnifiedImageRequest
 )
-from src.services.llm_service import llm_service, LLMMessage
+from src.services.llm_service import llm_service, LLMMessage, LLMPriority, llm_priority
+from src.services.llm_cache import cached_chat_completion
 from src.schemas.image_generation_schemas import (
     ImageGenerationRequest as ImageGenRequest, 
     ImageListRequest, 
@@ -54,6 +55,7 @@ ASPECT_RATIOS = {
     ImageType.EVIDENCE: "1:1"
 }
 
+@llm_priority(LLMPriority.BATCH)
 async def optimize_prompt_with_llm(image_type: ImageType, script_info: dict, user_prompt: str = None) -> str:
     """使用LLM优化图片提示词"""
     import json
@@ -177,7 +179,7 @@ async def optimize_prompt_with_llm(image_type: ImageType, script_info: dict, use
             LLMMessage(role="user", content=llm_prompt)
         ]
         
-        response = await llm_service.chat_completion(messages, max_tokens=250)
+        response = await cached_chat_completion(llm_service, messages, call_site="image_prompt", max_tokens=250)
         
         if not response.content:
             # 如果LLM失败，返回原始提示词
@@ -4,7 +4,7 @@ from typing import Optional, List
 from sqlalchemy.orm import Session
 from ...db.repositories.location_repository import LocationRepository
 from ...db.repositories.script_repository import ScriptRepository
-from ...services.llm_service import llm_service, LLMMessage
+from ...services.llm_service import llm_service, LLMMessage, LLMPriority, llm_priority
 from ...schemas.script import ScriptLocation
 from datetime import datetime
 from ...schemas.location_schemas import LocationCreateRequest, LocationUpdateRequest, ScriptResponse, LocationPromptRequest
@@ -154,6 +154,7 @@ async def get_location_detail(script_id: int, location_id: int,
         raise HTTPException(status_code=500, detail=f"获取失败: {str(e)}")
 
 @router.post("/locations/generate-prompt", summary="生成场景图片提示词")
+@llm_priority(LLMPriority.BATCH, call_site="location_image_prompt")
 async def generate_location_prompt(request: LocationPromptRequest):
     """使用LLM生成场景图片的提示词"""
     try:
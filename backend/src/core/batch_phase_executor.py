@@ -0,0 +1,55 @@
+"""独立阶段的批量发言执行器
+
+角色介绍与最终投票陈述几乎不依赖彼此的发言，却和其他阶段一样逐个等待 LLM。
+批量执行器在阶段开始时用同一份对话记录为所有发言者构建提示词，以有限并发同时发起
+LLM 调用，再按预定的发言顺序依次落定（写入记忆、广播给其他角色）并交给引擎推送。
+阶段墙钟时间从 N 次 LLM 往返降到约一次（并发度不小于角色数时）。
+
+发言者看不到同一批次中排在前面的发言——这正是这两个阶段可以并行的前提。
+"""
+import asyncio
+import logging
+from typing import List
+
+from ..agents.character_agent_manager import CharacterAgentManager, SpeculativeTurn
+from ..schemas.game_phase import GamePhaseEnum
+
+logger = logging.getLogger(__name__)
+
+# 可批量执行的阶段
+BATCH_PHASES = frozenset({GamePhaseEnum.INTRODUCTION, GamePhaseEnum.VOTING})
+
+
+class BatchPhaseExecutor:
+    """以有限并发批量生成一个阶段的全部发言，并按发言顺序释放"""
+
+    def __init__(self, agents: CharacterAgentManager, concurrency: int = 4):
+        self.agents = agents
+        self.concurrency = max(1, concurrency)
+        self._turns: List[SpeculativeTurn] = []
+
+    def start(self, speakers: List[str], phase: GamePhaseEnum, game_state: dict) -> List[str]:
+        """为全部发言者同时发起 LLM 调用，返回实际排队的发言顺序"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        for speaker in speakers:
+            turn = self.agents.speculate(speaker, phase, game_state, semaphore=semaphore)
+            if turn is not None:
+                self._turns.append(turn)
+        logger.info(f"[BATCH] {phase.value}阶段批量生成 {len(self._turns)} 个发言，并发度 {self.concurrency}")
+        return [turn.speaker for turn in self._turns]
+
+    async def release_next(self) -> tuple[str, str]:
+        """等待下一位发言者的结果并落定"""
+        turn = self._turns.pop(0)
+        reply = await turn.task
+        self.agents.commit_turn(turn.speaker, reply)
+        return turn.speaker, reply
+
+    def pending(self) -> int:
+        return len(self._turns)
+
+    def cancel(self):
+        """阶段中止：取消尚未释放的生成"""
+        for turn in self._turns:
+            turn.cancel()
+        self._turns.clear()
@@ -0,0 +1,126 @@
+"""WebSocket客户端出站通道
+
+每个连接持有一个有界出站队列和独立的写协程：
+  - 广播方只负责把编码好的帧放入队列（非阻塞），不会被某个卡住的socket拖慢
+  - 写协程按顺序逐帧发送，单帧发送超时或队列写满时判定为慢消费者并剔除
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class ClientConnection:
+    """单个WebSocket客户端的出站通道"""
+
+    def __init__(
+        self,
+        websocket: Any,
+        on_evict: Callable[[Any], Awaitable[None]],
+        max_queue_size: int = 256,
+        slow_consumer_timeout: float = 10.0,
+    ):
+        self.websocket = websocket
+        self._on_evict = on_evict
+        self._queue: asyncio.Queue[Union[str, bytes]] = asyncio.Queue(maxsize=max(1, max_queue_size))
+        self._slow_consumer_timeout = slow_consumer_timeout
+        self._writer_task: Optional[asyncio.Task] = None
+        self._evict_task: Optional[asyncio.Task] = None
+        self.closed: bool = False
+        self.evicted: bool = False
+        # 状态同步协议（full: 每次推送完整状态；delta: 版本化增量补丁）
+        self.state_protocol: str = "full"
+        self.acked_state_version: int = 0
+        # 帧编码（json: 文本帧；msgpack: 二进制帧），见 src/core/message_codec.py
+        self.encoding: str = "json"
+
+    @property
+    def wants_delta_state(self) -> bool:
+        return self.state_protocol == "delta"
+
+    @property
+    def pending_frames(self) -> int:
+        """队列中尚未发送的帧数"""
+        return self._queue.qsize()
+
+    async def wait_writable(self, high_water: int, poll_interval: float = 0.01) -> bool:
+        """等待队列积压降到 high_water 以下（分块推送时的流控）；返回 False 表示连接已关闭"""
+        while not self.closed and self._queue.qsize() >= high_water:
+            await asyncio.sleep(poll_interval)
+        return not self.closed
+
+    def start(self):
+        """启动写协程"""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    def enqueue(self, frame: Union[str, bytes]) -> bool:
+        """非阻塞入队；返回 False 表示连接已关闭或被判定为慢消费者"""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"[CONNECTION] 出站队列已满({self._queue.maxsize}帧)，剔除慢消费者: "
+                           f"{getattr(self.websocket, 'remote_address', 'unknown')}")
+            self._evict()
+            return False
+
+    async def _send(self, frame: Union[str, bytes]):
+        # 检查是否是FastAPI WebSocket还是websockets库的WebSocket
+        if hasattr(self.websocket, 'send_text'):
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+        else:
+            await self.websocket.send(frame)
+
+    async def _writer_loop(self):
+        """逐帧发送队列中的消息"""
+        try:
+            while not self.closed:
+                frame = await self._queue.get()
+                try:
+                    await asyncio.wait_for(self._send(frame), timeout=self._slow_consumer_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"[CONNECTION] 发送超过{self._slow_consumer_timeout}秒，剔除慢消费者: "
+                                   f"{getattr(self.websocket, 'remote_address', 'unknown')}")
+                    self._evict()
+                    return
+                except Exception as e:
+                    logger.warning(f"[CONNECTION] 发送消息失败，断开连接: {e}")
+                    self._evict()
+                    return
+        except asyncio.CancelledError:
+            pass
+
+    def _evict(self):
+        """标记剔除并异步通知服务器注销该连接（避免在写协程内部取消自身）"""
+        if self.evicted:
+            return
+        self.evicted = True
+        self.closed = True
+        # 持有任务引用，避免注销完成前被垃圾回收
+        self._evict_task = asyncio.create_task(self._on_evict(self.websocket))
+        self._evict_task.add_done_callback(self._on_evict_done)
+
+    def _on_evict_done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error(f"[CONNECTION] 注销被剔除的连接失败: "
+                         f"{getattr(self.websocket, 'remote_address', 'unknown')}, 错误={error}")
+
+    async def close(self):
+        """关闭通道，丢弃未发送的帧"""
+        self.closed = True
+        task = self._writer_task
+        self._writer_task = None
+        if task and task is not asyncio.current_task() and not task.done():
+            task.cancel()
+        while not self._queue.empty():
+            self._queue.get_nowait()
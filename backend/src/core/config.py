@@ -1,6 +1,6 @@
 """配置管理模块"""
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
@@ -49,6 +49,141 @@ class StorageConfig:
     bucket_name: str
     secure: bool = False
 
+@dataclass
+class WebSocketConfig:
+    """WebSocket推送配置"""
+    send_queue_size: int = 256  # 每个连接出站队列的最大帧数，队列写满即视为慢消费者
+    slow_consumer_timeout: float = 10.0  # 单帧发送超过该秒数即剔除连接
+    control_command_timeout: float = 60.0  # 控制类命令（切换阶段/编辑模式等）超时秒数
+    game_setup_command_timeout: float = 300.0  # 开始/重置游戏超时秒数（含剧本加载与GM规划LLM调用）
+    read_command_timeout: float = 15.0  # 读取类命令（状态/历史查询）超时秒数
+    heavy_command_timeout: float = 300.0  # 重型LLM命令（编辑指令/AI建议）超时秒数
+    per_message_deflate: bool = True  # 握手时协商 permessage-deflate 压缩（uvicorn 默认开启，设为 False 可关闭）
+    spectator_queue_size: int = 64  # 观战连接待发送帧上限（不含可合并的状态/聊天更新），超出时改发最新快照
+    spectator_tail_size: int = 50  # 观战快照附带的最近消息条数
+
+@dataclass
+class ShardingConfig:
+    """多worker分片配置"""
+    enabled: bool = False  # 是否启用分片模式（会话所有权通过 game_sessions 表租约分配）
+    worker_id: Optional[str] = None  # worker标识，为空时按 主机名:进程号 自动生成
+    bus: str = "local"  # 跨worker转发总线：memory（单进程/测试）或 local（本机TCP中转）
+    bus_host: str = "127.0.0.1"
+    bus_port: int = 8790
+    lease_ttl: float = 30.0  # 会话租约有效期（秒），持有者每 1/3 周期续期一次
+
+@dataclass
+class PacingConfig:
+    """游戏节奏配置"""
+    profile: str = "standard"  # standard: 跟随语音播放节奏；turbo: 零等待（模拟/压测）
+    turn_gap: Optional[float] = None  # 覆盖档位的发言最小间隔（秒）
+    playback_grace: Optional[float] = None  # 覆盖档位的播放完成确认宽限（秒）
+    phase_minimums: Optional[Dict[str, float]] = None  # 覆盖档位的阶段最短时长，如 {"BACKGROUND": 10}
+
+@dataclass
+class SessionReaperConfig:
+    """空闲会话回收配置"""
+    enabled: bool = True
+    interval: float = 60.0  # 巡检间隔（秒）
+    idle_ttl: float = 600.0  # 无客户端且未在运行游戏的会话存活时间（秒）
+    background_ttl: float = 3600.0  # 后台运行中的会话无客户端时的存活时间（秒）
+    memory_budget_mb: float = 512.0  # 全部会话的内存预算（估算值，MB），超出时提前休眠最久未活跃的空闲会话
+    hibernation_dir: str = ".data/hibernation"  # 休眠快照目录
+    event_tail: int = 500  # 快照中保留的最近事件/聊天条数
+
+@dataclass
+class PipelineConfig:
+    """发言流水线配置：规则选人时提前为下一位发言者调用 LLM"""
+    enabled: bool = False
+    depth: int = 1  # 同时进行推测的后续发言数（0 关闭；大于 1 按 1 处理，更深的推测提示词必然失效）
+
+@dataclass
+class BatchPhaseConfig:
+    """独立阶段（角色介绍、投票）批量并发生成与并发搜证配置"""
+    enabled: bool = True
+    concurrency: int = 4  # 同时进行的 LLM 调用数
+    concurrent_search: bool = True  # 搜证阶段按轮并发选择地点
+    search_collision_policy: str = "reprompt"  # 地点冲突：reprompt（重新选择一次，仍冲突再改派）/ redirect（直接改派）
+
+@dataclass
+class ScriptCacheConfig:
+    """剧本编译缓存配置"""
+    enabled: bool = True
+    max_entries: int = 64  # 进程内缓存的剧本数（LRU）
+    revalidate_after: float = 60.0  # 命中超过该时长（秒）后查询一次 updated_at 校验版本
+
+@dataclass
+class GMAgentConfig:
+    """GM Agent 配置：阶段计划缓存"""
+    plan_cache_enabled: bool = True
+    plan_cache_dir: str = ".data/gm_plans"  # 计划缓存文件目录
+
+@dataclass
+class EnginePoolConfig:
+    """热门剧本预热引擎池配置"""
+    enabled: bool = False
+    max_per_script: int = 4  # 单个剧本最多预热的引擎数
+    max_scripts: int = 8  # 同时维护预热池的剧本数（按近期开局速率取前 N 个）
+    rate_window: float = 600.0  # 统计开局速率的时间窗口（秒）
+    lead_time: float = 60.0  # 预热覆盖的时长：目标池大小 ≈ 开局速率 × lead_time
+    max_age: float = 900.0  # 预热引擎的最长保留时间（秒），超时丢弃重建
+    interval: float = 30.0  # 后台巡检/补充间隔（秒）
+    sizes: Optional[Dict[int, int]] = None  # 按剧本配置的最小池大小，如 {1: 2}
+
+@dataclass
+class ConvergenceConfig:
+    """讨论/调查阶段收敛检测（提前结束）配置"""
+    enabled: bool = True
+    min_turns: int = 0  # 最少进行的轮数（此外每位参与者至少发言一次）
+    consensus_ratio: float = 0.75  # 持相同立场的参与者占比
+    stable_turns: int = 3  # 领先对象连续保持不变的轮数
+    repetition_threshold: float = 0.6  # 最近发言与此前发言的平均相似度（字符二元组 Jaccard）
+    repetition_turns: int = 3  # 计算重复度的最近发言条数
+    suspicion_margin: float = 0.1  # 未明确指认时，怀疑度高出中性值多少才计为立场
+
+@dataclass
+class LLMCacheConfig:
+    """LLM 响应缓存配置（调用点按名称显式接入）"""
+    enabled: bool = False
+    path: str = ".data/llm_cache.sqlite3"  # SQLite 缓存文件
+    memory_entries: int = 512  # 进程内 LRU 条数
+    default_ttl: float = 86400.0  # 调用点未单独配置时的有效期（秒）
+    ttls: Optional[Dict[str, float]] = None  # 按调用点覆盖有效期，如 {"gm_plan": 604800}；0 表示该调用点不缓存
+
+@dataclass
+class StreamingConfig:
+    """流式发言配置（逐 token 推送 ai_action_delta，整句完成即送 TTS）"""
+    enabled: bool = False
+    min_sentence_chars: int = 8  # 短于此长度的句子与下一句合并后再合成语音
+
+@dataclass
+class LLMGovernorConfig:
+    """进程内 LLM 并发调度配置（按上游模型限速，按优先级与会话公平排队）"""
+    enabled: bool = True
+    rpm: int = 0  # 每个模型每分钟请求数上限（0 表示不限）
+    tpm: int = 0  # 每个模型每分钟 token 数上限（0 表示不限）
+    max_concurrency: int = 32  # 每个模型同时进行的请求数上限（0 表示不限）
+    batch_share: float = 0.5  # 批量生成最多占用的并发比例
+    rate_limit_penalty: float = 5.0  # 上游返回 429 且未给出 Retry-After 时暂停放行的秒数
+    limits: Optional[Dict[str, Tuple[int, int, int]]] = None  # 按模型名或 "主机/模型" 覆盖 (rpm, tpm, 并发)
+
+@dataclass
+class LLMPoolConfig:
+    """LLM 客户端连接池配置（同一上游的服务实例共享 keep-alive 连接）"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0  # 空闲连接保留秒数
+    prewarm_connections: int = 0  # 启动时为默认上游预先建立的连接数（0 表示不预热）
+
+@dataclass
+class LLMMetricsConfig:
+    """LLM 调用埋点配置（耗时、TTFT、token、重试与费用，按调用点/会话/阶段/角色汇总）"""
+    enabled: bool = True
+    trace_path: Optional[str] = None  # 逐条追加调用记录的 JSONL 文件（为空不写）
+    max_keys: int = 500  # 会话、角色维度保留的最近取值数
+    samples: int = 256  # 每个取值用于计算分位数的最近样本数
+    prices: Optional[Dict[str, Tuple[float, float]]] = None  # 模型 -> (提示词, 补全) 每百万 token 单价
+
 class ConfigManager:
     """配置管理器"""
     
@@ -57,6 +192,21 @@ class ConfigManager:
         self._tts_config = None
         self._db_config = None
         self._storage_config = None
+        self._websocket_config = None
+        self._sharding_config = None
+        self._pacing_config = None
+        self._session_reaper_config = None
+        self._script_cache_config = None
+        self._gm_agent_config = None
+        self._engine_pool_config = None
+        self._pipeline_config = None
+        self._batch_phase_config = None
+        self._convergence_config = None
+        self._llm_cache_config = None
+        self._streaming_config = None
+        self._llm_governor_config = None
+        self._llm_pool_config = None
+        self._llm_metrics_config = None
     @property
     def llm_config(self) -> LLMConfig:
         """获取LLM配置"""
@@ -123,6 +273,255 @@ class ConfigManager:
             )
         return self._storage_config
     
+    @property
+    def websocket_config(self) -> WebSocketConfig:
+        """获取WebSocket推送配置"""
+        if self._websocket_config is None:
+            self._websocket_config = WebSocketConfig(
+                send_queue_size=int(os.getenv("WS_SEND_QUEUE_SIZE", "256")),
+                slow_consumer_timeout=float(os.getenv("WS_SLOW_CONSUMER_TIMEOUT", "10")),
+                control_command_timeout=float(os.getenv("WS_CONTROL_COMMAND_TIMEOUT", "60")),
+                game_setup_command_timeout=float(os.getenv("WS_GAME_SETUP_COMMAND_TIMEOUT", "300")),
+                read_command_timeout=float(os.getenv("WS_READ_COMMAND_TIMEOUT", "15")),
+                heavy_command_timeout=float(os.getenv("WS_HEAVY_COMMAND_TIMEOUT", "300")),
+                per_message_deflate=os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true",
+                spectator_queue_size=int(os.getenv("WS_SPECTATOR_QUEUE_SIZE", "64")),
+                spectator_tail_size=int(os.getenv("WS_SPECTATOR_TAIL_SIZE", "50"))
+            )
+        return self._websocket_config
+
+    @property
+    def sharding_config(self) -> ShardingConfig:
+        """获取多worker分片配置"""
+        if self._sharding_config is None:
+            self._sharding_config = ShardingConfig(
+                enabled=os.getenv("SHARDING_ENABLED", "false").lower() == "true",
+                worker_id=os.getenv("SHARDING_WORKER_ID") or None,
+                bus=os.getenv("SHARDING_BUS", "local"),
+                bus_host=os.getenv("SHARDING_BUS_HOST", "127.0.0.1"),
+                bus_port=int(os.getenv("SHARDING_BUS_PORT", "8790")),
+                lease_ttl=float(os.getenv("SHARDING_LEASE_TTL", "30"))
+            )
+        return self._sharding_config
+
+    @property
+    def pacing_config(self) -> PacingConfig:
+        """获取游戏节奏配置"""
+        if self._pacing_config is None:
+            turn_gap = os.getenv("PACING_TURN_GAP")
+            playback_grace = os.getenv("PACING_PLAYBACK_GRACE")
+            # 格式：BACKGROUND:10,VOTING:5
+            phase_minimums = None
+            raw_minimums = os.getenv("PACING_PHASE_MINIMUMS")
+            if raw_minimums:
+                phase_minimums = {}
+                for item in raw_minimums.split(","):
+                    if ":" in item:
+                        phase, seconds = item.split(":", 1)
+                        phase_minimums[phase.strip().upper()] = float(seconds)
+            self._pacing_config = PacingConfig(
+                profile=os.getenv("GAME_PACING_PROFILE", "standard"),
+                turn_gap=float(turn_gap) if turn_gap else None,
+                playback_grace=float(playback_grace) if playback_grace else None,
+                phase_minimums=phase_minimums
+            )
+        return self._pacing_config
+
+    @property
+    def session_reaper_config(self) -> SessionReaperConfig:
+        """获取空闲会话回收配置"""
+        if self._session_reaper_config is None:
+            self._session_reaper_config = SessionReaperConfig(
+                enabled=os.getenv("SESSION_REAPER_ENABLED", "true").lower() == "true",
+                interval=float(os.getenv("SESSION_REAPER_INTERVAL", "60")),
+                idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "600")),
+                background_ttl=float(os.getenv("SESSION_BACKGROUND_TTL", "3600")),
+                memory_budget_mb=float(os.getenv("SESSION_MEMORY_BUDGET_MB", "512")),
+                hibernation_dir=os.getenv("SESSION_HIBERNATION_DIR", ".data/hibernation"),
+                event_tail=int(os.getenv("SESSION_HIBERNATION_EVENT_TAIL", "500"))
+            )
+        return self._session_reaper_config
+
+    @property
+    def pipeline_config(self) -> PipelineConfig:
+        """获取发言流水线配置"""
+        if self._pipeline_config is None:
+            self._pipeline_config = PipelineConfig(
+                enabled=os.getenv("GAME_PIPELINE_ENABLED", "false").lower() == "true",
+                depth=int(os.getenv("GAME_PIPELINE_DEPTH", "1"))
+            )
+        return self._pipeline_config
+
+    @property
+    def batch_phase_config(self) -> BatchPhaseConfig:
+        """获取独立阶段批量生成配置"""
+        if self._batch_phase_config is None:
+            self._batch_phase_config = BatchPhaseConfig(
+                enabled=os.getenv("GAME_BATCH_PHASES_ENABLED", "true").lower() == "true",
+                concurrency=int(os.getenv("GAME_BATCH_CONCURRENCY", "4")),
+                concurrent_search=os.getenv("GAME_CONCURRENT_SEARCH_ENABLED", "true").lower() == "true",
+                search_collision_policy=os.getenv("GAME_SEARCH_COLLISION_POLICY", "reprompt").lower()
+            )
+        return self._batch_phase_config
+
+    @property
+    def convergence_config(self) -> ConvergenceConfig:
+        """获取收敛检测配置"""
+        if self._convergence_config is None:
+            self._convergence_config = ConvergenceConfig(
+                enabled=os.getenv("GAME_CONVERGENCE_ENABLED", "true").lower() == "true",
+                min_turns=int(os.getenv("GAME_CONVERGENCE_MIN_TURNS", "0")),
+                consensus_ratio=float(os.getenv("GAME_CONVERGENCE_CONSENSUS_RATIO", "0.75")),
+                stable_turns=int(os.getenv("GAME_CONVERGENCE_STABLE_TURNS", "3")),
+                repetition_threshold=float(os.getenv("GAME_CONVERGENCE_REPETITION_THRESHOLD", "0.6")),
+                repetition_turns=int(os.getenv("GAME_CONVERGENCE_REPETITION_TURNS", "3")),
+                suspicion_margin=float(os.getenv("GAME_CONVERGENCE_SUSPICION_MARGIN", "0.1"))
+            )
+        return self._convergence_config
+
+    @property
+    def llm_cache_config(self) -> LLMCacheConfig:
+        """获取 LLM 响应缓存配置"""
+        if self._llm_cache_config is None:
+            # 格式：调用点:秒数，如 categorize_instruction:604800,script_generation:0
+            ttls = None
+            raw_ttls = os.getenv("LLM_CACHE_TTLS")
+            if raw_ttls:
+                ttls = {}
+                for item in raw_ttls.split(","):
+                    if ":" in item:
+                        call_site, ttl = item.split(":", 1)
+                        ttls[call_site.strip()] = float(ttl)
+            self._llm_cache_config = LLMCacheConfig(
+                enabled=os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true",
+                path=os.getenv("LLM_CACHE_PATH", ".data/llm_cache.sqlite3"),
+                memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512")),
+                default_ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+                ttls=ttls
+            )
+        return self._llm_cache_config
+
+    @property
+    def streaming_config(self) -> StreamingConfig:
+        """获取流式发言配置"""
+        if self._streaming_config is None:
+            self._streaming_config = StreamingConfig(
+                enabled=os.getenv("GAME_STREAMING_ENABLED", "false").lower() == "true",
+                min_sentence_chars=int(os.getenv("GAME_STREAMING_MIN_SENTENCE_CHARS", "8"))
+            )
+        return self._streaming_config
+
+    @property
+    def llm_governor_config(self) -> LLMGovernorConfig:
+        """获取 LLM 并发调度配置"""
+        if self._llm_governor_config is None:
+            rpm = int(os.getenv("LLM_GOVERNOR_RPM", "0"))
+            tpm = int(os.getenv("LLM_GOVERNOR_TPM", "0"))
+            max_concurrency = int(os.getenv("LLM_GOVERNOR_MAX_CONCURRENCY", "32"))
+            # 格式：模型=rpm:tpm[:并发]，如 gpt-4o=500:300000:16,api.deepseek.com/deepseek-chat=60:0
+            limits = None
+            raw_limits = os.getenv("LLM_GOVERNOR_LIMITS")
+            if raw_limits:
+                limits = {}
+                for item in raw_limits.split(","):
+                    if "=" not in item:
+                        continue
+                    key, values = item.split("=", 1)
+                    parts = [int(v) for v in values.split(":")]
+                    parts += [rpm, tpm, max_concurrency][len(parts):]
+                    limits[key.strip()] = (parts[0], parts[1], parts[2])
+            self._llm_governor_config = LLMGovernorConfig(
+                enabled=os.getenv("LLM_GOVERNOR_ENABLED", "true").lower() == "true",
+                rpm=rpm,
+                tpm=tpm,
+                max_concurrency=max_concurrency,
+                batch_share=float(os.getenv("LLM_GOVERNOR_BATCH_SHARE", "0.5")),
+                rate_limit_penalty=float(os.getenv("LLM_GOVERNOR_RATE_LIMIT_PENALTY", "5")),
+                limits=limits
+            )
+        return self._llm_governor_config
+
+    @property
+    def llm_pool_config(self) -> LLMPoolConfig:
+        """获取 LLM 客户端连接池配置"""
+        if self._llm_pool_config is None:
+            self._llm_pool_config = LLMPoolConfig(
+                max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20")),
+                keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60")),
+                prewarm_connections=int(os.getenv("LLM_POOL_PREWARM_CONNECTIONS", "0"))
+            )
+        return self._llm_pool_config
+
+    @property
+    def llm_metrics_config(self) -> LLMMetricsConfig:
+        """获取 LLM 调用埋点配置"""
+        if self._llm_metrics_config is None:
+            # 格式：模型=提示词单价:补全单价（每百万 token），如 gpt-4o=2.5:10,deepseek-chat=0.27:1.1
+            prices = None
+            raw_prices = os.getenv("LLM_METRICS_PRICES")
+            if raw_prices:
+                prices = {}
+                for item in raw_prices.split(","):
+                    if "=" in item and ":" in item:
+                        model, values = item.split("=", 1)
+                        prompt_price, completion_price = values.split(":", 1)
+                        prices[model.strip()] = (float(prompt_price), float(completion_price))
+            self._llm_metrics_config = LLMMetricsConfig(
+                enabled=os.getenv("LLM_METRICS_ENABLED", "true").lower() == "true",
+                trace_path=os.getenv("LLM_METRICS_TRACE_PATH") or None,
+                max_keys=int(os.getenv("LLM_METRICS_MAX_KEYS", "500")),
+                samples=int(os.getenv("LLM_METRICS_SAMPLES", "256")),
+                prices=prices
+            )
+        return self._llm_metrics_config
+
+    @property
+    def script_cache_config(self) -> ScriptCacheConfig:
+        """获取剧本编译缓存配置"""
+        if self._script_cache_config is None:
+            self._script_cache_config = ScriptCacheConfig(
+                enabled=os.getenv("SCRIPT_CACHE_ENABLED", "true").lower() == "true",
+                max_entries=int(os.getenv("SCRIPT_CACHE_SIZE", "64")),
+                revalidate_after=float(os.getenv("SCRIPT_CACHE_REVALIDATE_SECONDS", "60"))
+            )
+        return self._script_cache_config
+
+    @property
+    def gm_agent_config(self) -> GMAgentConfig:
+        """获取 GM Agent 配置"""
+        if self._gm_agent_config is None:
+            self._gm_agent_config = GMAgentConfig(
+                plan_cache_enabled=os.getenv("GM_PLAN_CACHE_ENABLED", "true").lower() == "true",
+                plan_cache_dir=os.getenv("GM_PLAN_CACHE_DIR", ".data/gm_plans")
+            )
+        return self._gm_agent_config
+
+    @property
+    def engine_pool_config(self) -> EnginePoolConfig:
+        """获取预热引擎池配置"""
+        if self._engine_pool_config is None:
+            # 格式：剧本ID:池大小，如 1:2,7:1
+            sizes = None
+            raw_sizes = os.getenv("ENGINE_POOL_SIZES")
+            if raw_sizes:
+                sizes = {}
+                for item in raw_sizes.split(","):
+                    if ":" in item:
+                        script_id, size = item.split(":", 1)
+                        sizes[int(script_id)] = int(size)
+            self._engine_pool_config = EnginePoolConfig(
+                enabled=os.getenv("ENGINE_POOL_ENABLED", "false").lower() == "true",
+                max_per_script=int(os.getenv("ENGINE_POOL_MAX_PER_SCRIPT", "4")),
+                max_scripts=int(os.getenv("ENGINE_POOL_MAX_SCRIPTS", "8")),
+                rate_window=float(os.getenv("ENGINE_POOL_RATE_WINDOW", "600")),
+                lead_time=float(os.getenv("ENGINE_POOL_LEAD_TIME", "60")),
+                max_age=float(os.getenv("ENGINE_POOL_MAX_AGE", "900")),
+                interval=float(os.getenv("ENGINE_POOL_INTERVAL", "30")),
+                sizes=sizes
+            )
+        return self._engine_pool_config
+    
     def get_server_config(self) -> Dict[str, Any]:
         """获取服务器配置"""
         return {
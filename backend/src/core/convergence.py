@@ -0,0 +1,181 @@
+"""讨论收敛检测
+
+圆桌讨论与线索调查阶段原本只按发言次数和 max_turns（讨论阶段最多 角色数×5 轮）结束，
+场上意见已经稳定后仍会继续消耗 LLM 与 TTS 调用。这里用纯本地、低成本的信号判断收敛：
+  - 立场：每位角色最近一次在发言中指认的对象（"我怀疑张三"、"凶手是李四"、
+    "我觉得王五是凶手"等）；尚未明确指认时取其 CharacterMemory.suspicion_map 中
+    明显高于中性值的最高项
+  - 共识：持相同立场的角色占比达到 consensus_ratio，且领先对象连续 stable_turns 轮不变
+  - 重复：最近 repetition_turns 条发言与此前发言的字符二元组 Jaccard 相似度均值
+    达到 repetition_threshold（车轱辘话）
+每位参与者都至少发言一次且达到 min_turns 后，满足共识或重复任一条件即提前结束，
+并记录节省的轮数。
+"""
+import logging
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Optional
+
+from ..schemas.game_phase import GamePhaseEnum
+
+logger = logging.getLogger(__name__)
+
+# 适用收敛检测的阶段
+CONVERGENCE_PHASES = (GamePhaseEnum.DISCUSSION, GamePhaseEnum.INVESTIGATION)
+
+# 指认关键词，其后紧跟的角色名视为指认对象（"觉得/认为"不算：同意他人观点时同样会用，
+# "我觉得王五是凶手"由下方的角色名后置谓语识别）
+_ACCUSE_BEFORE = re.compile(r"怀疑|凶手是|凶手就是|投票给|投给|指认|嫌疑最大的是")
+# 角色名之后出现这些词时，该角色也视为指认对象（"张三是凶手"、"李四嫌疑最大"）
+_ACCUSE_AFTER = re.compile(r"^(?:就)?(?:是凶手|嫌疑最大|最可疑|很可疑|有问题|在撒谎|说谎)")
+# 关键词与角色名之间允许的最大间隔（字符）
+_ACCUSE_WINDOW = 6
+# 否定词：与指认位于同一分句、出现在角色名之前时不算指认（"我不怀疑李四"、"怀疑的不是李四"、
+# "我不认为李四是凶手"）；"不过/非常/别人"等不是否定
+_NEGATION = re.compile(r"不(?!过|仅|但|管|论|久)|没|非(?!常)|别(?!人)")
+# 分句边界：关键词只作用于本分句内的角色名
+_CLAUSE_END = re.compile(r"[，。！？、,.!?；;：:]")
+# 计算重复度时忽略的空白与标点
+_NOISE = re.compile(r"[\s，。！？、,.!?；;：:“”\"'（）()]+")
+# suspicion_map 的初始中性值（与 CharacterMemory.update_suspicion 一致）
+_NEUTRAL_SUSPICION = 0.3
+
+
+@dataclass
+class ConvergenceState:
+    """一次判定的结果（用于日志与测试）"""
+    leader: Optional[str] = None
+    share: float = 0.0
+    stable_turns: int = 0
+    repetition: float = 0.0
+    reason: Optional[str] = None
+
+
+def _bigrams(text: str) -> FrozenSet[str]:
+    chars = _NOISE.sub("", text)
+    return frozenset(map(str.__add__, chars, chars[1:]))
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+class ConvergenceDetector:
+    """单个阶段的收敛检测器：逐条 observe 发言，should_stop 判定是否提前结束"""
+
+    def __init__(self, participants: Iterable[str], candidates: Iterable[str],
+                 agents: Any = None, settings: Any = None):
+        self.participants: List[str] = list(participants)
+        self.candidates: List[str] = sorted(set(candidates), key=len, reverse=True)
+        self.agents = agents
+        self.min_turns: int = getattr(settings, "min_turns", 0)
+        self.consensus_ratio: float = getattr(settings, "consensus_ratio", 0.75)
+        self.required_stable_turns: int = max(1, getattr(settings, "stable_turns", 3))
+        self.repetition_threshold: float = getattr(settings, "repetition_threshold", 0.6)
+        self.repetition_turns: int = max(1, getattr(settings, "repetition_turns", 3))
+        self.suspicion_margin: float = getattr(settings, "suspicion_margin", 0.1)
+
+        self.accusations: Dict[str, str] = {}
+        self.spoken: Dict[str, int] = {}
+        self._history: Deque[FrozenSet[str]] = deque(maxlen=max(8, len(self.participants) * 2))
+        self._repetition: Deque[float] = deque(maxlen=self.repetition_turns)
+        self._leader: Optional[str] = None
+        self._stable = 0
+        self.state = ConvergenceState()
+
+    # ------------------------------------------------------------------
+    # 信号
+    # ------------------------------------------------------------------
+
+    def extract_accusation(self, speaker: str, statement: str) -> Optional[str]:
+        """从发言中解析指认对象（以最后一次指认为准），不指认自己"""
+        names = [name for name in self.candidates if name != speaker]
+        if not statement or not names:
+            return None
+        target: Optional[str] = None
+        target_pos = -1
+        for match in _ACCUSE_BEFORE.finditer(statement):
+            if _NEGATION.search(self._clause_before(statement, match.start())):
+                continue
+            window = statement[match.end():match.end() + _ACCUSE_WINDOW + len(names[0])]
+            window = _CLAUSE_END.split(window, 1)[0]
+            found = [(window.find(name), name) for name in names
+                     if 0 <= window.find(name) <= _ACCUSE_WINDOW
+                     and not _NEGATION.search(window[:window.find(name)])]
+            if found:
+                offset, name = min(found, key=lambda p: (p[0], -len(p[1])))
+                if match.end() + offset > target_pos:
+                    target, target_pos = name, match.end() + offset
+        for name in names:
+            start = statement.find(name)
+            while start >= 0:
+                if (_ACCUSE_AFTER.match(statement[start + len(name):]) and start > target_pos
+                        and not _NEGATION.search(self._clause_before(statement, start))):
+                    target, target_pos = name, start
+                start = statement.find(name, start + len(name))
+        return target
+
+    @staticmethod
+    def _clause_before(statement: str, pos: int) -> str:
+        """pos 所在分句中位于 pos 之前的文本"""
+        return _CLAUSE_END.split(statement[:pos])[-1]
+
+    def _stance(self, name: str) -> Optional[str]:
+        """角色当前立场：最近的明确指认，否则取怀疑度明显高于中性值的最高项"""
+        if name in self.accusations:
+            return self.accusations[name]
+        agent = self.agents.get(name) if self.agents is not None else None
+        suspicion = agent.memory.suspicion_map if agent is not None else {}
+        ranked = [(v, k) for k, v in suspicion.items() if k != name and k in self.candidates]
+        if ranked:
+            value, target = max(ranked)
+            if value >= _NEUTRAL_SUSPICION + self.suspicion_margin:
+                return target
+        return None
+
+    def observe(self, speaker: str, statement: str):
+        """记录一条发言：更新指认、重复度与领先对象的稳定轮数"""
+        self.spoken[speaker] = self.spoken.get(speaker, 0) + 1
+        target = self.extract_accusation(speaker, statement)
+        if target:
+            self.accusations[speaker] = target
+
+        grams = _bigrams(statement or "")
+        self._repetition.append(max((_jaccard(grams, prev) for prev in self._history), default=0.0))
+        self._history.append(grams)
+
+        stances = Counter(s for s in (self._stance(p) for p in self.participants) if s)
+        leader, count = stances.most_common(1)[0] if stances else (None, 0)
+        share = count / len(self.participants) if self.participants else 0.0
+        if leader is not None and leader == self._leader and share >= self.consensus_ratio:
+            self._stable += 1
+        elif leader is not None and share >= self.consensus_ratio:
+            self._stable = 1
+        else:
+            self._stable = 0
+        self._leader = leader
+        self.state = ConvergenceState(
+            leader=leader,
+            share=share,
+            stable_turns=self._stable,
+            repetition=sum(self._repetition) / len(self._repetition),
+        )
+
+    # ------------------------------------------------------------------
+    # 判定
+    # ------------------------------------------------------------------
+
+    def should_stop(self, turn: int) -> bool:
+        """第 turn 轮（从 1 开始）结束后是否已收敛"""
+        if turn < self.min_turns or any(self.spoken.get(p, 0) == 0 for p in self.participants):
+            return False
+        if self.state.stable_turns >= self.required_stable_turns:
+            self.state.reason = "consensus"
+        elif (len(self._repetition) >= self.repetition_turns
+              and self.state.repetition >= self.repetition_threshold):
+            self.state.reason = "repetition"
+        return self.state.reason is not None
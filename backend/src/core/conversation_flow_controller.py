@@ -6,16 +6,15 @@ import logging
 from datetime import datetime
 
 from src.schemas.game_phase import GamePhaseEnum as GamePhase
-from src.services.llm_service import LLMService, LLMMessage
-from src.core.config import config
+from src.services.llm_service import BaseLLMService, LLMMessage, get_shared_llm_service, llm_call_context
 
 logger = logging.getLogger(__name__)
 
 class ConversationFlowController:
     """对话流控制器 - 智能安排下一个说话的角色，模拟现实中的自然接话场景"""
     
-    def __init__(self, characters=None):
-        self.llm_service = LLMService.from_config(config.llm_config)
+    def __init__(self, characters=None, llm_service: Optional[BaseLLMService] = None):
+        self.llm_service = llm_service if llm_service is not None else get_shared_llm_service()
         self.last_speaker = None
         self.conversation_history = []
         self.speaking_frequency = {}  # 记录每个角色的发言频率
@@ -119,7 +118,8 @@ class ConversationFlowController:
                 LLMMessage(role="user", content=context)
             ]
             
-            response = await self.llm_service.chat_completion(messages)
+            with llm_call_context(call_site="select_speaker"):
+                response = await self.llm_service.chat_completion(messages)
             selected_character = response.content.strip() if response and response.content else None
             
             if selected_character and selected_character in available_characters:
@@ -199,6 +199,25 @@ class ConversationFlowController:
             return random.choice(unvoted)
         return random.choice(available_characters)
         
+    def predict_rule_based_speakers(self,
+                                    available_characters: List[str],
+                                    phase: GamePhase,
+                                    exclude: List[str],
+                                    limit: int) -> List[str]:
+        """预测接下来由规则决定的发言者（供流水线模式提前调用 LLM）
+
+        只覆盖与对话内容无关的"未发言优先"规则：角色介绍、投票阶段（随机顺序）与讨论阶段
+        首轮（按角色顺序）。需要分析对话或调用 LLM 才能决定时返回空列表。
+        exclude 为已确定但尚未计入发言频率的角色（当前发言者与已排队的推测）。
+        """
+        if limit <= 0 or phase not in (GamePhase.INTRODUCTION, GamePhase.VOTING, GamePhase.DISCUSSION):
+            return []
+        unspoken = [char for char in available_characters
+                    if self.speaking_frequency.get(char, 0) == 0 and char not in exclude]
+        if phase != GamePhase.DISCUSSION:
+            random.shuffle(unspoken)
+        return unspoken[:limit]
+
     def _select_randomly_with_balance(self, available_characters: List[str]) -> str:
         """随机选择，但平衡发言频率"""
         # 计算权重：发言次数越少，权重越高
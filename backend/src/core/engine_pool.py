@@ -0,0 +1,251 @@
+"""热门剧本预热引擎池
+
+点击"开始游戏"后，GameModeHandler.start_game 依次加载剧本、构建 CharacterAgentManager
+与 LLM 客户端、由 GMAgent 生成阶段计划，并初始化证据/投票管理器和对话流控制器，
+这些都排在第一句发言之前。这里为热门剧本提前准备好 K 个已执行完
+load_script_data + initialize_agents 的引擎，开局时直接取用：
+  - 目标池大小 = max(按剧本配置的最小值, ceil(近期开局速率 × lead_time))，
+    不超过 max_per_script；只为速率最高的 max_scripts 个剧本（及配置了大小的剧本）维护
+  - 取用后立即在后台补充；后台巡检定期按速率收缩/补充，并丢弃超过 max_age 的引擎
+  - 剧本被编辑后编译缓存失效，取用时发现版本不一致会丢弃该剧本的全部预热引擎
+预热引擎不绑定会话，取用时才设置 session_id。
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .game_engine import GameEngine
+from .script_cache import compiled_script_cache
+
+logger = logging.getLogger(__name__)
+
+EngineFactory = Callable[[int], Awaitable[GameEngine]]
+
+
+async def build_warm_engine(script_id: int) -> GameEngine:
+    """构建一个已完成剧本加载与 Agent 初始化的引擎"""
+    engine = GameEngine()
+    await engine.load_script_data(script_id)
+    await engine.initialize_agents()
+    return engine
+
+
+def discard_engine(engine: GameEngine):
+    """丢弃未使用的预热引擎（取消其后台任务）"""
+    engine.pacer.cancel()
+
+
+def is_pristine(engine: GameEngine) -> bool:
+    """引擎是否尚未开始过游戏（可被预热引擎替换）"""
+    return not engine.game_plan and len(engine.log) == 0
+
+
+@dataclass
+class _WarmEngine:
+    engine: GameEngine
+    version: Optional[str]
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class EnginePool:
+    """按剧本维护的预热引擎池"""
+
+    def __init__(self, pool_config: Any, engine_factory: Optional[EngineFactory] = None):
+        self.config = pool_config
+        self._factory: EngineFactory = engine_factory or build_warm_engine
+        self._ready: Dict[int, Deque[_WarmEngine]] = {}
+        self._starts: Dict[int, Deque[float]] = {}
+        self._refilling: Dict[int, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.built = 0
+        self.discarded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    # ------------------------------------------------------------------
+    # 后台任务
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._run(), name="engine-pool")
+            logger.info(f"[ENGINE_POOL] 预热引擎池已启动: 单剧本上限={self.config.max_per_script}, "
+                        f"剧本数上限={self.config.max_scripts}")
+
+    async def stop(self):
+        tasks = list(self._refilling.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refilling.clear()
+        for pool in self._ready.values():
+            for warm in pool:
+                discard_engine(warm.engine)
+        self._ready.clear()
+
+    async def _run(self):
+        self.maintain()
+        while True:
+            await asyncio.sleep(self.config.interval)
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"[ENGINE_POOL] 预热池巡检失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 速率与目标大小
+    # ------------------------------------------------------------------
+
+    def _prune_starts(self, now: float):
+        horizon = now - self.config.rate_window
+        for script_id in list(self._starts):
+            starts = self._starts[script_id]
+            while starts and starts[0] < horizon:
+                starts.popleft()
+            if not starts:
+                del self._starts[script_id]
+
+    def start_rate(self, script_id: int) -> float:
+        """近期开局速率（局/秒）"""
+        starts = self._starts.get(script_id)
+        return len(starts) / self.config.rate_window if starts else 0.0
+
+    def targets(self, now: Optional[float] = None) -> Dict[int, int]:
+        """各剧本的目标池大小（只包含需要维护的剧本）"""
+        now = time.monotonic() if now is None else now
+        self._prune_starts(now)
+        configured = self.config.sizes or {}
+        hot = sorted(self._starts, key=self.start_rate, reverse=True)[:max(0, self.config.max_scripts)]
+        targets: Dict[int, int] = {}
+        for script_id in set(hot) | set(configured):
+            demand = math.ceil(self.start_rate(script_id) * self.config.lead_time)
+            size = min(self.config.max_per_script, max(configured.get(script_id, 0), demand))
+            if size > 0:
+                targets[script_id] = size
+        return targets
+
+    # ------------------------------------------------------------------
+    # 取用与补充
+    # ------------------------------------------------------------------
+
+    def acquire(self, script_id: int, session_id: Optional[str] = None) -> Optional[GameEngine]:
+        """记录一次开局并取出一个预热引擎；没有可用引擎时返回 None（调用方按原流程初始化）"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        self._starts.setdefault(script_id, deque()).append(now)
+
+        engine = None
+        pool = self._ready.get(script_id)
+        while pool:
+            warm = pool.popleft()
+            if self._is_usable(script_id, warm, now):
+                engine = warm.engine
+                break
+            self._discard(warm)
+        if not self._ready.get(script_id):
+            self._ready.pop(script_id, None)
+
+        if engine is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            engine.session_id = session_id
+            logger.info(f"[ENGINE_POOL] 命中预热引擎: 剧本={script_id}, 会话={session_id}, "
+                        f"剩余={len(self._ready.get(script_id, ()))}")
+        self._schedule_refill(script_id)
+        return engine
+
+    def _is_usable(self, script_id: int, warm: _WarmEngine, now: float) -> bool:
+        if now - warm.created_at > self.config.max_age:
+            return False
+        if compiled_script_cache.enabled and compiled_script_cache.peek_version(script_id) != warm.version:
+            # 剧本已被编辑（编译缓存已失效或版本变化）
+            return False
+        return True
+
+    def _discard(self, warm: _WarmEngine):
+        discard_engine(warm.engine)
+        self.discarded += 1
+
+    def maintain(self):
+        """按当前目标收缩/补充各剧本的预热池"""
+        now = time.monotonic()
+        targets = self.targets(now)
+        for script_id in list(self._ready):
+            pool = self._ready[script_id]
+            for warm in [w for w in pool if not self._is_usable(script_id, w, now)]:
+                pool.remove(warm)
+                self._discard(warm)
+            target = targets.get(script_id, 0)
+            while len(pool) > target:
+                self._discard(pool.pop())
+            if not pool:
+                del self._ready[script_id]
+        for script_id in targets:
+            self._schedule_refill(script_id)
+
+    def _schedule_refill(self, script_id: int):
+        task = self._refilling.get(script_id)
+        if task is not None and not task.done():
+            return
+        if len(self._ready.get(script_id, ())) >= self.targets().get(script_id, 0):
+            return
+        self._refilling[script_id] = asyncio.create_task(
+            self._refill(script_id), name=f"engine-pool-refill-{script_id}"
+        )
+
+    async def _refill(self, script_id: int):
+        try:
+            while len(self._ready.get(script_id, ())) < self.targets().get(script_id, 0):
+                started = time.perf_counter()
+                engine = await self._factory(script_id)
+                self._ready.setdefault(script_id, deque()).append(
+                    _WarmEngine(engine, engine.script_version)
+                )
+                self.built += 1
+                logger.info(f"[ENGINE_POOL] 预热引擎就绪: 剧本={script_id}, "
+                            f"池={len(self._ready[script_id])}, 耗时={time.perf_counter() - started:.2f}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[ENGINE_POOL] 预热剧本 {script_id} 失败: {e}")
+        finally:
+            self._refilling.pop(script_id, None)
+
+    async def wait_refills(self):
+        """等待进行中的补充任务完成（测试与启动预热使用）"""
+        tasks = list(self._refilling.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        targets = self.targets()
+        scripts: List[Dict[str, Any]] = [
+            {
+                "script_id": script_id,
+                "ready": len(self._ready.get(script_id, ())),
+                "target": targets.get(script_id, 0),
+                "starts_per_minute": round(self.start_rate(script_id) * 60, 3),
+            }
+            for script_id in sorted(set(targets) | set(self._ready))
+        ]
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "built": self.built,
+            "discarded": self.discarded,
+            "scripts": scripts,
+        }
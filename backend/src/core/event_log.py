@@ -0,0 +1,284 @@
+"""游戏事件日志（环形缓冲）
+
+事件与公开聊天共用一份存储：每条记录都是一个事件，聊天记录额外带 message_type。
+  - 事件ID单调连续递增，第 i 个保留记录的ID为 first_id + i，按ID定位为 O(1)
+  - 追加为 O(1)；槽位随记录增长到容量为止（空闲会话不预占 capacity 个槽位），
+    之后覆盖最旧的槽位，不再整体切片复制
+  - 按时间戳查找为 O(log n)（二分）
+  - events / chat 为共享存储上的只读视图，按需生成与旧格式一致的字典：
+      事件: {id, type: "action", character, content, timestamp}
+      聊天: {character, message, type, timestamp, event_id}
+
+视图不是 list：序列化时经 message_codec.json_default 转为列表。
+"""
+import bisect
+import time
+from abc import abstractmethod
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+
+class LogRecord:
+    """单条日志记录"""
+    __slots__ = ("id", "timestamp", "character", "content", "message_type")
+
+    def __init__(self, id: int, timestamp: float, character: str, content: str,
+                 message_type: Optional[str] = None):
+        self.id = id
+        self.timestamp = timestamp
+        self.character = character
+        self.content = content
+        self.message_type = message_type  # None 表示普通事件，否则为公开聊天
+
+    @property
+    def is_chat(self) -> bool:
+        return self.message_type is not None
+
+    def as_event(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": "action",
+            "character": self.character,
+            "content": self.content,
+            "timestamp": self.timestamp,
+        }
+
+    def as_chat(self) -> Dict[str, Any]:
+        return {
+            "character": self.character,
+            "message": self.content,
+            "type": self.message_type,
+            "timestamp": self.timestamp,
+            "event_id": self.id,
+        }
+
+
+class _LogView(Sequence):
+    """共享存储上的只读视图"""
+
+    def __init__(self, log: 'EventLog'):
+        self._log = log
+
+    @abstractmethod
+    def _record(self, index: int) -> LogRecord:
+        """视图中第 index 条记录"""
+
+    @staticmethod
+    @abstractmethod
+    def _render(record: LogRecord) -> Dict[str, Any]:
+        """把记录转为该视图的字典格式"""
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self._render(self._record(i)) for i in range(*index.indices(len(self)))]
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("日志视图下标越界")
+        return self._render(self._record(index))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self._render(self._record(i))
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return self[:]
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} len={len(self)}>"
+
+
+class EventView(_LogView):
+    """全部事件（含聊天产生的事件）"""
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def _record(self, index: int) -> LogRecord:
+        return self._log.record_at(index)
+
+    _render = staticmethod(LogRecord.as_event)
+
+
+class ChatView(_LogView):
+    """公开聊天"""
+
+    def __len__(self) -> int:
+        return self._log.chat_count
+
+    def _record(self, index: int) -> LogRecord:
+        return self._log.chat_record_at(index)
+
+    _render = staticmethod(LogRecord.as_chat)
+
+
+class EventLog:
+    """定长环形事件日志"""
+
+    def __init__(self, capacity: int = 5000):
+        self._reset(capacity)
+        self.last_id = 0
+        # 视图对象在日志生命周期内保持不变，可直接放入 game_state
+        self.events = EventView(self)
+        self.chat = ChatView(self)
+
+    def _reset(self, capacity: int):
+        self._capacity = max(1, capacity)
+        self._slots: List[Optional[LogRecord]] = []  # 未满时 _start 恒为 0，按需增长
+        self._start = 0  # 最旧记录所在槽位
+        self._size = 0
+        # 聊天记录ID索引：_chat_ids[_chat_head:] 为仍保留的聊天ID（递增）
+        self._chat_ids: List[int] = []
+        self._chat_head = 0
+
+    # ------------------------------------------------------------------
+    # 基本属性
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def first_id(self) -> int:
+        """仍保留的最早记录ID（为空时为 last_id + 1）"""
+        return self.last_id - self._size + 1
+
+    @property
+    def chat_count(self) -> int:
+        return len(self._chat_ids) - self._chat_head
+
+    def record_at(self, index: int) -> LogRecord:
+        """按逻辑下标（0 为最旧）取记录"""
+        return self._slots[(self._start + index) % self._capacity]
+
+    def chat_record_at(self, index: int) -> LogRecord:
+        return self.record_at(self._chat_ids[self._chat_head + index] - self.first_id)
+
+    def get(self, event_id: int) -> Optional[LogRecord]:
+        """按ID取记录，已被淘汰或不存在时返回 None"""
+        index = event_id - self.first_id
+        if 0 <= index < self._size:
+            return self.record_at(index)
+        return None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(self, character: str, content: str, message_type: Optional[str] = None,
+               timestamp: Optional[float] = None) -> LogRecord:
+        """追加记录（O(1)），满时淘汰最旧记录"""
+        self.last_id += 1
+        record = LogRecord(self.last_id, time.time() if timestamp is None else timestamp,
+                           character, content, message_type)
+        if self._size == self._capacity:
+            self._evict_oldest()
+        if len(self._slots) < self._capacity:
+            self._slots.append(record)
+        else:
+            self._slots[(self._start + self._size) % self._capacity] = record
+        self._size += 1
+        if record.is_chat:
+            self._chat_ids.append(record.id)
+        return record
+
+    def _evict_oldest(self):
+        oldest = self._slots[self._start]
+        self._slots[self._start] = None
+        self._start = (self._start + 1) % self._capacity
+        self._size -= 1
+        if oldest is not None and oldest.is_chat:
+            self._chat_head += 1
+            # 均摊 O(1) 压缩聊天索引
+            if self._chat_head > 1024 and self._chat_head * 2 > len(self._chat_ids):
+                del self._chat_ids[:self._chat_head]
+                self._chat_head = 0
+
+    def resize(self, capacity: int):
+        """调整容量，保留最新的记录"""
+        records = [self.record_at(i) for i in range(self._size)][-max(1, capacity):]
+        self._reset(capacity)
+        self._load_records(records)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def index_after(self, event_id: int) -> int:
+        """第一条ID大于 event_id 的记录的逻辑下标（O(1)）"""
+        return min(max(event_id + 1 - self.first_id, 0), self._size)
+
+    def index_before(self, event_id: int) -> int:
+        """ID小于 event_id 的记录数（O(1)）"""
+        return min(max(event_id - self.first_id, 0), self._size)
+
+    def events_since(self, event_id: int) -> List[Dict[str, Any]]:
+        return self.events[self.index_after(event_id):]
+
+    def chat_since(self, event_id: int) -> List[Dict[str, Any]]:
+        """事件ID大于 event_id 的聊天（O(log n) 定位）"""
+        head = self._chat_head
+        return self.chat[bisect.bisect_right(self._chat_ids, event_id, lo=head) - head:]
+
+    def events_since_timestamp(self, since_ts: float) -> List[Dict[str, Any]]:
+        return self.events[self._bisect_time(since_ts, self._size, self.record_at):]
+
+    def chat_since_timestamp(self, since_ts: float) -> List[Dict[str, Any]]:
+        return self.chat[self._bisect_time(since_ts, self.chat_count, self.chat_record_at):]
+
+    def chat_between(self, first_event_id: int, last_event_id: int) -> List[Dict[str, Any]]:
+        """事件ID在 [first_event_id, last_event_id] 内的聊天（O(log n) 定位）"""
+        head = self._chat_head
+        start = bisect.bisect_left(self._chat_ids, first_event_id, lo=head)
+        end = bisect.bisect_right(self._chat_ids, last_event_id, lo=head)
+        return self.chat[start - head:end - head]
+
+    @staticmethod
+    def _bisect_time(since_ts: float, size: int, record_at) -> int:
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if record_at(mid).timestamp > since_ts:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    # ------------------------------------------------------------------
+    # 快照
+    # ------------------------------------------------------------------
+
+    def export(self, tail: Optional[int] = None) -> Dict[str, Any]:
+        """导出最近 tail 条记录（紧凑行格式）"""
+        start = 0 if tail is None else max(0, self._size - tail)
+        rows = []
+        for i in range(start, self._size):
+            r = self.record_at(i)
+            rows.append([r.id, r.timestamp, r.character, r.content, r.message_type])
+        return {"last_id": self.last_id, "rows": rows}
+
+    def load(self, data: Dict[str, Any]):
+        """从 export() 的结果恢复（覆盖当前内容）"""
+        records = [LogRecord(*row) for row in data.get("rows", [])][-self._capacity:]
+        self._reset(self._capacity)
+        self.last_id = data.get("last_id", 0)
+        self._load_records(records)
+
+    def _load_records(self, records: List[LogRecord]):
+        # 要求记录ID连续，缺口之前的部分被丢弃
+        for i in range(len(records) - 1, 0, -1):
+            if records[i].id != records[i - 1].id + 1:
+                records = records[i:]
+                break
+        for record in records:
+            self._slots.append(record)
+            self._size += 1
+            if record.is_chat:
+                self._chat_ids.append(record.id)
+        if records:
+            self.last_id = records[-1].id
@@ -37,19 +37,21 @@ class EvidenceManager:
     # ------------------------------------------------------------------
 
     def process_evidence_search(
-        self, action: str, character: str
+        self, action: str, character: str, location: Optional[str] = None
     ) -> Tuple[List[Dict], Optional[str]]:
         """处理一次搜证行动。
 
+        location 不为空时直接搜查该地点（并发搜证中冲突后被改派的情况），否则从行动文本解析。
+
         Returns:
             (found_evidence_list, searched_location_name)
             - found_evidence_list: 本次新发现的证据列表（可为空）
             - searched_location_name: 解析出的地点名称（None 表示无法识别地点）
         """
-        if not action:
+        if not action and not location:
             return [], None
 
-        location = self._extract_location(action)
+        location = location or self.extract_location(action)
         if not location:
             return [], None
 
@@ -89,6 +91,9 @@ class EvidenceManager:
         """返回尚未搜查的地点列表。"""
         return [loc for loc in self._known_locations if loc not in self.searched_locations]
 
+    def get_known_locations(self) -> List[str]:
+        return list(self._known_locations)
+
     def get_location_search_status(self) -> Dict[str, str]:
         """返回 {location_name: searcher_name} 的搜查状态字典。"""
         return dict(self.searched_locations)
@@ -99,11 +104,7 @@ class EvidenceManager:
             return []
         return [e for e in self.evidence if self._location_matches(e.get("location", ""), location)]
 
-    # ------------------------------------------------------------------
-    # 内部辅助
-    # ------------------------------------------------------------------
-
-    def _extract_location(self, action: str) -> Optional[str]:
+    def extract_location(self, action: str) -> Optional[str]:
         """从行动文本中提取地点名称（最长优先匹配）。"""
         action_lower = action.lower()
         best: Optional[str] = None
@@ -115,6 +116,10 @@ class EvidenceManager:
                 best_len = len(loc_lower)
         return best
 
+    # ------------------------------------------------------------------
+    # 内部辅助
+    # ------------------------------------------------------------------
+
     @staticmethod
     def _location_matches(evidence_location: str, searched_location: str) -> bool:
         """判断证据的地点与搜查地点是否匹配（双向包含）。"""
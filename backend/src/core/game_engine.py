@@ -1,9 +1,10 @@
 """游戏引擎核心模块"""
 import asyncio
+import functools
 import json
 import logging
-import time
-from typing import Dict, List, Optional, Any, Union
+from collections import deque
+from typing import Dict, List, Optional, Any, Tuple
 
 from ..schemas.script import (
     ScriptCharacter
@@ -11,10 +12,19 @@ from ..schemas.script import (
 from ..schemas.game_phase import GamePhaseEnum
 from ..schemas.base import BaseDataModel
 from ..agents import CharacterAgentManager
+from ..agents.character_agent_manager import SpeculativeTurn
 from ..agents.gm_agent import GMAgent, PhaseStep
+from ..services.llm_service import BaseLLMService, LLMPriority, llm_call_context
 from .evidence_manager import EvidenceManager
 from .voting_manager import VotingManager
 from .conversation_flow_controller import ConversationFlowController
+from .pacing import PacingScheduler
+from .batch_phase_executor import BATCH_PHASES, BatchPhaseExecutor
+from .search_round import ConcurrentSearchRound, SearchAssignment, search_order
+from .convergence import CONVERGENCE_PHASES, ConvergenceDetector
+from .event_log import ChatView, EventLog, EventView
+from .config import config
+from .script_cache import CompiledScript, compile_script, compiled_script_cache
 from src.db.repositories.script_repository import ScriptRepository
 # 不能在模块顶层直接导入 TTS 服务，Alembic 迁移时会导致循环引用：
 # tts_event_service -> db.session -> core.config -> (可能) 引擎/服务
@@ -22,18 +32,32 @@ from src.db.repositories.script_repository import ScriptRepository
 
 logger = logging.getLogger(__name__)
 
+
+def _live_llm_calls(method):
+    """引擎方法（及其中创建的任务）发起的 LLM 调用按实时对局优先级调度、按会话公平排队，并标注会话与阶段"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        with llm_call_context(LLMPriority.LIVE, session_id=self.session_id, phase=self.current_phase.value):
+            return await method(self, *args, **kwargs)
+    return wrapper
+
+
 class GameEngine:
     """剧本杀游戏引擎"""
 
-    def __init__(self, script_id: Optional[int] = None, session_id: Optional[str] = None):
+    def __init__(self, script_id: Optional[int] = None, session_id: Optional[str] = None,
+                 pacer: Optional[PacingScheduler] = None, llm: Optional[BaseLLMService] = None):
         # 基础标识
         self.script_id: Optional[int] = script_id
         self.session_id: Optional[str] = session_id  # 用于TTS会话
+        self.script_version: Optional[str] = None  # 剧本版本（updated_at），用于 GM 计划缓存
 
         # 核心数据结构
         self.script_data: Optional[Dict[str, Any]] = None
         self.characters: List[ScriptCharacter] = []
-        self.agents: CharacterAgentManager = CharacterAgentManager()
+        # 注入的 LLM（为 None 时各组件按配置自行创建；无头模拟时注入桩服务）
+        self.llm: Optional[BaseLLMService] = llm
+        self.agents: CharacterAgentManager = CharacterAgentManager(llm=llm)
 
         # 动态阶段计划（由 GMAgent 生成）
         self._current_phase: GamePhaseEnum = GamePhaseEnum.BACKGROUND
@@ -41,12 +65,30 @@ class GameEngine:
         self.current_step_index: int = 0
         self._gm_agent: Optional[GMAgent] = None
 
-        # 历史事件 & 聊天
-        self.events: List[Dict[str, Any]] = []
-        self.event_sequence: int = 0  # 自增事件ID
-        self.max_events: int = 5000
-        self.max_public_chat: int = 5000
-        self.public_chat: List[Dict[str, Any]] = []
+        # 历史事件 & 聊天：共用一个环形日志，events / public_chat 为其只读视图
+        self.log: EventLog = EventLog(capacity=5000)
+        self.events: EventView = self.log.events
+        self.public_chat: ChatView = self.log.chat
+
+        # 节奏调度（发言/段落/阶段之间的等待）
+        self.pacer: PacingScheduler = pacer or PacingScheduler.from_config(config.pacing_config)
+
+        # 发言流水线：规则选人时提前为后续发言者调用 LLM 的深度（0 表示关闭）。
+        # 最多为 1：推测的提示词包含此前全部发言，第 2 位及以后的推测发起时前一位尚未发言，
+        # 提示词必然变化而被丢弃，只会多耗一次 LLM 调用
+        pipeline_config = config.pipeline_config
+        self.pipeline_depth: int = min(1, max(0, pipeline_config.depth)) if pipeline_config.enabled else 0
+        # 角色介绍/投票阶段批量并发生成的并发度（0 表示逐个发言）
+        batch_config = config.batch_phase_config
+        self.batch_concurrency: int = max(0, batch_config.concurrency) if batch_config.enabled else 0
+        # 并发搜证的地点冲突策略（reprompt / redirect，None 表示逐个搜证）
+        self.search_collision_policy: Optional[str] = (
+            batch_config.search_collision_policy if batch_config.concurrent_search else None
+        )
+        # 讨论/调查阶段的收敛检测阈值（None 表示关闭），以及因提前收敛节省的发言轮数
+        convergence_config = config.convergence_config
+        self.convergence = convergence_config if convergence_config.enabled else None
+        self.turns_saved: int = 0
 
         # 管理器（延后初始化）
         self.evidence_manager: Optional[EvidenceManager] = None
@@ -81,6 +123,28 @@ class GameEngine:
             return self.game_plan[self.current_step_index].phase_type
         return self._current_phase
 
+    @property
+    def event_sequence(self) -> int:
+        """最新事件ID（自增）"""
+        return self.log.last_id
+
+    @property
+    def max_events(self) -> int:
+        """事件日志容量（聊天与事件共用）"""
+        return self.log.capacity
+
+    @max_events.setter
+    def max_events(self, capacity: int):
+        self.log.resize(capacity)
+
+    def export_game_state(self) -> Dict[str, Any]:
+        """game_state 的纯 dict/list 副本（事件与聊天视图展开为列表），供非 WebSocket 的序列化使用"""
+        return {
+            **self.game_state,
+            "events": self.events.to_list(),
+            "public_chat": self.public_chat.to_list(),
+        }
+
     @property
     def current_step(self) -> Optional[PhaseStep]:
         """当前阶段步骤（PhaseStep），无计划时返回 None。"""
@@ -97,38 +161,144 @@ class GameEngine:
         返回:
             dict: {
                 events: [...],           # 满足条件的事件（已按时间顺序）
-                public_chat: [...],      # 当前保留的全部公开聊天（可在前端自行去重）
+                public_chat: [...],      # 与返回事件范围对应的公开聊天
                 truncated: bool,         # 是否因为 limit 被截断
                 newest_event_id: int,    # 当前最新事件ID（供前端记录）
                 earliest_event_id: int   # 当前仍保留的最早事件ID（用于判断是否发生裁剪）
             }
         """
-        if from_event_id <= 0:
-            events_slice = self.events
-        else:
-            events_slice = [e for e in self.events if e.get("id", 0) > from_event_id]
+        start = self.log.index_after(from_event_id) if from_event_id > 0 else 0
         truncated = False
-        if limit is not None and limit > 0 and len(events_slice) > limit:
+        if limit is not None and limit > 0 and len(self.log) - start > limit:
             truncated = True
-            events_slice = events_slice[-limit:]
-        earliest_id = self.events[0]["id"] if self.events else 0
+            start = len(self.log) - limit
+        earliest_id = self.log.first_id if len(self.log) else 0
+        # 公开聊天只返回与事件范围对应的部分
+        if start == 0:
+            events_slice, public_chat = self.events, self.public_chat
+        else:
+            events_slice = self.events[start:]
+            public_chat = self.get_public_chat_between(events_slice[0]["id"], self.event_sequence) if events_slice else []
         return {
             "events": events_slice,
-            "public_chat": self.public_chat,
+            "public_chat": public_chat,
             "truncated": truncated,
             "newest_event_id": self.event_sequence,
             "earliest_event_id": earliest_id
         }
     
+    def get_history_page(self, before_id: Optional[int] = None, after_id: Optional[int] = None,
+                         limit: int = 200) -> Dict[str, Any]:
+        """游标分页获取历史事件（用于回看）
+
+        参数:
+            before_id: 返回该事件ID之前的最多 limit 条（向旧翻页）
+            after_id: 返回该事件ID之后的最多 limit 条（向新翻页）；两者都不传时返回最新一页
+        返回:
+            dict: {
+                events: [...],           # 按时间顺序
+                public_chat: [...],      # 与本页事件范围对应的公开聊天
+                has_more: bool,          # 翻页方向上是否还有更多事件
+                next_cursor: dict,       # {"before": id} 或 {"after": id}，继续翻页时原样带回
+                newest_event_id: int,
+                earliest_event_id: int
+            }
+        """
+        limit = max(1, limit)
+        if after_id is not None:
+            start = self.log.index_after(after_id)
+            page = self.events[start:start + limit]
+            has_more = start + limit < len(self.log)
+            next_cursor = {"after": page[-1]["id"] if page else after_id}
+        else:
+            end = len(self.log) if before_id is None else self.log.index_before(before_id)
+            start = max(0, end - limit)
+            page = self.events[start:end]
+            has_more = start > 0
+            next_cursor = {"before": page[0]["id"] if page else (before_id or 0)}
+        public_chat = self.get_public_chat_between(page[0]["id"], page[-1]["id"]) if page else []
+        return {
+            "events": page,
+            "public_chat": public_chat,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+            "newest_event_id": self.event_sequence,
+            "earliest_event_id": self.log.first_id if len(self.log) else 0,
+        }
+
+    def get_public_chat_between(self, first_event_id: int, last_event_id: int) -> List[Dict[str, Any]]:
+        """获取事件ID在 [first_event_id, last_event_id] 范围内的公开聊天"""
+        return self.log.chat_between(first_event_id, last_event_id)
+
+    def get_resume_delta(self, last_event_id: int = 0, last_chat_event_id: Optional[int] = None,
+                         max_events: int = 1000) -> Dict[str, Any]:
+        """断线重连增量同步：只返回客户端缺失的事件与聊天
+
+        参数:
+            last_event_id: 客户端已收到的最后一个事件ID
+            last_chat_event_id: 客户端最后一条公开聊天的 event_id（聊天水位），为空时与 last_event_id 相同；
+                聊天与事件共用单调递增的事件ID，同一时间戳的多条聊天也不会漏发
+            max_events: 缺失事件超过该数量时不再逐条补发，改为返回截断标记
+        返回:
+            dict: {
+                events: [...],           # last_event_id 之后的事件
+                public_chat: [...],      # last_chat_event_id 之后的公开聊天
+                truncated: bool,         # 缺失部分已被裁剪（或过多），客户端需回看历史/全量同步
+                newest_event_id: int,
+                earliest_event_id: int
+            }
+        """
+        earliest_id = self.log.first_id
+        # 客户端水位落在裁剪区间内，或大于当前序号（游戏已重置），增量无法衔接
+        truncated = (
+            last_event_id > self.event_sequence
+            or (last_event_id + 1 < earliest_id and last_event_id < self.event_sequence)
+        )
+        events: List[Dict[str, Any]] = []
+        public_chat: List[Dict[str, Any]] = []
+        if not truncated:
+            events = self.log.events_since(last_event_id)
+            if len(events) > max_events:
+                truncated, events = True, []
+            else:
+                chat_cursor = last_event_id if last_chat_event_id is None else last_chat_event_id
+                public_chat = self.log.chat_since(chat_cursor)
+        return {
+            "events": events,
+            "public_chat": public_chat,
+            "truncated": truncated,
+            "newest_event_id": self.event_sequence,
+            "earliest_event_id": earliest_id if len(self.log) else 0,
+        }
+    
     async def load_script_data(self, script_id: int):
-        """从数据库加载剧本数据"""
+        """加载剧本数据：优先使用进程级编译缓存，未命中时从数据库加载并编译"""
         self.script_id = script_id
-        
+
+        compiled = compiled_script_cache.get(script_id, version_loader=self._load_script_version)
+        if compiled is not None:
+            logger.info(f"[SCRIPT_CACHE] 命中剧本缓存: 剧本={script_id}, 版本={compiled.version}")
+            self.script_data = compiled.materialize()
+            self.script_version = compiled.version
+        else:
+            compiled = self._compile_script_from_db(script_id)
+            self.script_data = compiled.materialize()
+            self.script_version = compiled.version
+            # 验证剧本数据完整性（只在编译时执行一次）
+            if not self.validate_script_data():
+                raise ValueError(f"剧本数据验证失败，剧本ID: {script_id}")
+            compiled_script_cache.put(compiled)
+
+        self._init_components()
+
+    @staticmethod
+    def _compile_script_from_db(script_id: int) -> CompiledScript:
+        """从数据库读取完整剧本并编译"""
         # 手动创建数据库会话和仓库实例
         from src.db.session import get_db_session
         db_session = next(get_db_session())
         script_repository = ScriptRepository(db_session)
-        
+
         try:
             # 获取完整的剧本数据
             full_script = script_repository.get_script_by_id(script_id)
@@ -138,163 +308,21 @@ class GameEngine:
         finally:
             # 确保数据库会话被正确关闭
             db_session.close()
-        
-        # 从完整剧本对象中提取数据，确保类型安全
-        characters = []
-        for char in full_script.characters:
-            try:
-                char_dict = {
-                    'id': char.id,
-                    'script_id': char.script_id,
-                    'name': char.name or "",
-                    'background': char.background or "",
-                    'gender': char.gender or "中性",
-                    'age': char.age,
-                    'profession': char.profession or "",
-                    'secret': char.secret or "",
-                    'objective': char.objective or "",
-                    'is_victim': bool(char.is_victim),
-                    'is_murderer': bool(char.is_murderer),
-                    'personality_traits': char.personality_traits or [],
-                    'avatar_url': char.avatar_url,
-                    'voice_preference': char.voice_preference,
-                    'voice_id': char.voice_id
-                }
-                characters.append(char_dict)
-            except Exception as e:
-                logger.error(f"处理角色数据失败 {getattr(char, 'name', 'Unknown')}: {e}")
-                continue
-        
-        evidence = []
-        for ev in full_script.evidence:
-            try:
-                ev_dict = {
-                    'id': ev.id,
-                    'script_id': ev.script_id,
-                    'name': ev.name or "",
-                    'description': ev.description or "",
-                    'location': ev.location or "",
-                    'related_to': ev.related_to or "",
-                    'significance': ev.significance or "",
-                    'evidence_type': ev.evidence_type.value if hasattr(ev.evidence_type, 'value') else str(ev.evidence_type),
-                    'importance': ev.importance or "重要证据",
-                    'image_url': ev.image_url,
-                    'is_hidden': bool(ev.is_hidden)
-                }
-                evidence.append(ev_dict)
-            except Exception as e:
-                logger.error(f"处理证据数据失败 {getattr(ev, 'name', 'Unknown')}: {e}")
-                continue
-        
-        locations = []
-        for loc in full_script.locations:
-            try:
-                loc_dict = {
-                    'id': loc.id,
-                    'script_id': loc.script_id,
-                    'name': loc.name or "",
-                    'description': loc.description or "",
-                    'searchable_items': loc.searchable_items or [],
-                    'background_image_url': loc.background_image_url,
-                    'is_crime_scene': bool(loc.is_crime_scene)
-                }
-                locations.append(loc_dict)
-            except Exception as e:
-                logger.error(f"处理场景数据失败 {getattr(loc, 'name', 'Unknown')}: {e}")
-                continue
-        
-        # 转换背景故事对象为字典，确保类型安全
-        background_story: Dict[str, Union[str, Dict[str, Any]]] = {}
-        if full_script.background_story:
-            try:
-                bg = full_script.background_story
-                background_story = {
-                    "title": bg.title or "",
-                    "setting_description": bg.setting_description or "",
-                    "incident_description": bg.incident_description or "",
-                    "victim_background": bg.victim_background or "",
-                    "investigation_scope": bg.investigation_scope or "",
-                    "rules_reminder": bg.rules_reminder or "",
-                    "murder_method": bg.murder_method or "",
-                    "murder_location": bg.murder_location or "",
-                    "discovery_time": bg.discovery_time or "",
-                    "victory_conditions": bg.victory_conditions or {}
-                }
-            except Exception as e:
-                logger.error(f"处理背景故事数据失败: {e}")
-                background_story = {
-                    "title": "案件背景",
-                    "setting_description": "暂无相关信息",
-                    "incident_description": "暂无相关信息",
-                    "victim_background": "暂无相关信息",
-                    "investigation_scope": "暂无相关信息",
-                    "rules_reminder": "暂无相关信息",
-                    "murder_method": "暂无相关信息",
-                    "murder_location": "暂无相关信息",
-                    "discovery_time": "暂无相关信息",
-                    "victory_conditions": {}
-                }
-        
-        # 转换游戏阶段数据
-        game_phases = []
-        for phase in full_script.game_phases:
-            try:
-                phase_dict = {
-                    "id": phase.id,
-                    "script_id": phase.script_id,
-                    "phase": phase.phase.value if hasattr(phase.phase, 'value') else str(phase.phase),
-                    "name": phase.name or "",
-                    "description": phase.description or "",
-                    "order_index": phase.order_index or 0
-                }
-                game_phases.append(phase_dict)
-            except Exception as e:
-                logger.error(f"处理游戏阶段数据失败: {e}")
-                continue
-        
-        # 组装剧本数据，确保类型安全
-        try:
-            script_info = {
-                "title": full_script.info.title or "",
-                "description": full_script.info.description or "",
-                "player_count": full_script.info.player_count or 4,
-                "difficulty": full_script.info.difficulty_level or "medium",
-                "estimated_time": full_script.info.estimated_duration or 180,
-                "tags": full_script.info.tags or [],
-                "author": getattr(full_script.info, 'author', None),
-                "status": full_script.info.status.value if hasattr(full_script.info.status, 'value') else str(full_script.info.status),
-                "cover_image_url": getattr(full_script.info, 'cover_image_url', None),
-                "is_public": getattr(full_script.info, 'is_public', False),
-                "price": getattr(full_script.info, 'price', 0.0)
-            }
-        except Exception as e:
-            logger.error(f"处理剧本信息失败: {e}")
-            script_info = {
-                "title": "未知剧本",
-                "description": "暂无描述",
-                "player_count": 4,
-                "difficulty": "medium",
-                "estimated_time": 180,
-                "tags": []
-            }
-        
-        # 使用类型注解确保数据结构的正确性
-        script_data_dict: Dict[str, Any] = {
-            "script_info": script_info,
-            "characters": characters,
-            "evidence": evidence,
-            "locations": locations,
-            "background_story": background_story if background_story is not None else {},
-            "game_phases": game_phases
-        }
 
-        self.script_data = script_data_dict
+        return compile_script(full_script, script_id)
 
-        # 验证剧本数据完整性
-        if not self.validate_script_data():
-            raise ValueError(f"剧本数据验证失败，剧本ID: {script_id}")
-        
-        # 初始化游戏组件
+    @staticmethod
+    def _load_script_version(script_id: int) -> Optional[str]:
+        """查询剧本当前版本（仅 updated_at 一列），用于缓存续期校验"""
+        from src.db.session import get_db_session
+        db_session = next(get_db_session())
+        try:
+            return ScriptRepository(db_session).get_script_version(script_id)
+        finally:
+            db_session.close()
+
+    def _init_components(self):
+        """根据 script_data 初始化角色、证据/投票管理器与对话流控制器"""
         try:
             self.characters = self._init_characters()
             # 初始化证据管理器（传入 locations 数据以支持精确地点匹配）
@@ -303,7 +331,7 @@ class GameEngine:
                 self.script_data.get("locations", []),
             )
             self.voting_manager = VotingManager(self.characters)
-            self.conversation_flow_controller = ConversationFlowController(self.characters)
+            self.conversation_flow_controller = ConversationFlowController(self.characters, llm_service=self.llm)
 
             # 提取所有地点名称
             all_location_names = [
@@ -329,6 +357,62 @@ class GameEngine:
             logger.error(f"初始化游戏组件失败: {e}")
             raise ValueError(f"游戏引擎初始化失败: {e}")
     
+    def export_snapshot(self, event_tail: int = 500) -> Dict[str, Any]:
+        """导出会话休眠快照（可 JSON 序列化）
+
+        包含剧本数据、游戏计划与步骤索引、管理器状态、角色记忆以及最近的事件/聊天，
+        不包含 LLM 客户端等可重建对象。
+        """
+        state_keys = (
+            "phase", "votes", "discovered_evidence", "evidence_search_status",
+            "game_plan", "total_phases", "current_phase_index", "current_step_name",
+        )
+        return {
+            "script_id": self.script_id,
+            "script_version": self.script_version,
+            "script_data": self.script_data,
+            "current_phase": self._current_phase.value,
+            "game_plan": [step.to_dict() for step in self.game_plan],
+            "current_step_index": self.current_step_index,
+            "has_gm_agent": self._gm_agent is not None,
+            "log": self.log.export(event_tail),
+            "game_state": {key: self.game_state.get(key) for key in state_keys},
+            "discovered_evidence": self.evidence_manager.discovered_evidence if self.evidence_manager else [],
+            "searched_locations": self.evidence_manager.searched_locations if self.evidence_manager else {},
+            "votes": self.voting_manager.votes if self.voting_manager else {},
+            "agent_memories": self.agents.export_memories(),
+        }
+
+    def restore_snapshot(self, snapshot: Dict[str, Any]):
+        """从 export_snapshot() 的结果恢复引擎（不访问数据库）"""
+        self.script_id = snapshot.get("script_id")
+        self.script_version = snapshot.get("script_version")
+        self.script_data = snapshot.get("script_data")
+        self._current_phase = GamePhaseEnum(snapshot.get("current_phase", GamePhaseEnum.BACKGROUND.value))
+        self.game_plan = [PhaseStep.from_dict(step) for step in snapshot.get("game_plan", [])]
+        self.current_step_index = snapshot.get("current_step_index", 0)
+        self.log.load(snapshot.get("log", {}))
+
+        if self.script_data:
+            self._init_components()
+            self.agents = CharacterAgentManager(llm=self.llm)
+            self.agents.create_agents(self.characters)
+            self.agents.restore_memories(snapshot.get("agent_memories", {}))
+        if self.evidence_manager:
+            self.evidence_manager.discovered_evidence = list(snapshot.get("discovered_evidence", []))
+            self.evidence_manager.searched_locations = dict(snapshot.get("searched_locations", {}))
+        if self.voting_manager:
+            self.voting_manager.votes = dict(snapshot.get("votes", {}))
+
+        if snapshot.get("has_gm_agent") and self.game_plan:
+            try:
+                self._gm_agent = GMAgent(self._gm_llm())
+            except Exception as exc:
+                logger.warning(f"恢复 GMAgent 失败，阶段公告将被跳过: {exc}")
+                self._gm_agent = None
+
+        self.game_state.update(snapshot.get("game_state", {}))
+
     def _init_characters(self) -> List[ScriptCharacter]:
         """初始化角色"""
         characters: List[ScriptCharacter] = []
@@ -431,6 +515,14 @@ class GameEngine:
         logger.info(f"剧本数据验证通过，包含 {len(active_characters)} 个可参与角色")
         return True
 
+    def _gm_llm(self) -> BaseLLMService:
+        """GMAgent 使用的 LLM：优先使用注入的实例"""
+        if self.llm is not None:
+            return self.llm
+        from ..services.llm_service import get_shared_llm_service
+        return get_shared_llm_service()
+
+    @_live_llm_calls
     async def initialize_agents(self):
         """初始化 AI 代理，并由 GMAgent 生成动态阶段计划。"""
         if not self.characters:
@@ -438,17 +530,16 @@ class GameEngine:
             return
 
         # 1. 创建角色 Agent
-        self.agents = CharacterAgentManager()
+        self.agents = CharacterAgentManager(llm=self.llm)
         self.agents.create_agents(self.characters)
         logger.info(f"成功初始化 {len(self.agents)} 个角色 Agent")
 
         # 2. 创建 GMAgent 并生成动态游戏计划
         try:
-            from ..services.llm_service import LLMService
-            from ..core.config import config as app_config
-            gm_llm = LLMService.from_config(app_config.llm_config)
-            self._gm_agent = GMAgent(gm_llm)
-            self.game_plan = await self._gm_agent.create_game_plan(self.script_data or {})
+            self._gm_agent = GMAgent(self._gm_llm())
+            self.game_plan = await self._gm_agent.create_game_plan(
+                self.script_data or {}, script_id=self.script_id, script_version=self.script_version
+            )
             self.current_step_index = 0
 
             # 同步游戏状态中的阶段信息
@@ -476,8 +567,10 @@ class GameEngine:
             self.game_plan = []
 
 
+    @_live_llm_calls
     async def next_phase(self):
         """进入下一个游戏阶段（优先使用 game_plan，回退到枚举顺序）。"""
+        self.pacer.start_phase()
         if self.game_plan:
             # --- 动态计划模式 ---
             if self.current_step_index < len(self.game_plan) - 1:
@@ -546,23 +639,10 @@ class GameEngine:
 
     def add_event(self, character: str, content: str):
         """添加游戏事件"""
-        # 递增事件序号（保持单线程上下文内安全；如需并发扩展需加锁）
-        self.event_sequence += 1
-        event = {
-            "id": self.event_sequence,
-            "type": "action",
-            "character": character,
-            "content": content,
-            "timestamp": time.time()
-        }
-        self.events.append(event)
-        # 超出容量时裁剪（保留最新）
-        if len(self.events) > self.max_events:
-            overflow = len(self.events) - self.max_events
-            if overflow > 0:
-                self.events = self.events[overflow:]
-        # 注意：裁剪后事件ID不会重置，前端若请求不存在的旧ID，需提示已被裁剪
-        self.game_state["events"] = self.events
+        # 追加为 O(1)：主通道命令、重型通道命令与游戏循环可能并发调用，但本方法内无await，
+        # 在事件循环内原子执行，不会交错
+        # 注意：超出容量淘汰旧事件后ID不会重置，前端若请求不存在的旧ID，需提示已被裁剪
+        self.log.append(character, content)
 
     def get_events_since(self, last_event_id: int) -> List[Dict[str, Any]]:
         """获取指定事件ID之后的增量事件列表
@@ -574,27 +654,14 @@ class GameEngine:
         """
         if last_event_id <= 0:
             return self.events
-        # events按追加顺序存储，可直接过滤
-        return [e for e in self.events if e.get("id", 0) > last_event_id]
+        return self.log.events_since(last_event_id)
     
     def add_public_chat(self, character: str, message: str, message_type: str = "chat", 
                        session_id: Optional[str] = None, voice_id: Optional[str] = None):
         """添加公开聊天信息"""
-        chat_entry = {
-            "character": character,
-            "message": message,
-            "type": message_type,  # chat, question, answer, accusation, defense
-            "timestamp": time.time()
-        }
-        self.public_chat.append(chat_entry)
-        if len(self.public_chat) > self.max_public_chat:
-            overflow = len(self.public_chat) - self.max_public_chat
-            if overflow > 0:
-                self.public_chat = self.public_chat[overflow:]
-        self.game_state["public_chat"] = self.public_chat
-        
-        # 同时添加到events中保持兼容性
-        self.add_event(character, message)
+        # 聊天与事件共用一条日志记录：同时出现在 public_chat 与 events 视图中
+        # message_type: chat, question, answer, accusation, defense, system
+        self.log.append(character, message, message_type=message_type or "chat")
         
         # 处理TTS事件（异步，不阻塞游戏流程）
         if session_id and message.strip():
@@ -630,14 +697,18 @@ class GameEngine:
         """
         if since_ts <= 0:
             return self.public_chat
-        return [c for c in self.public_chat if c.get("timestamp", 0) > since_ts]
+        return self.log.chat_since_timestamp(since_ts)
     
-    async def run_phase(self, max_turns: Optional[int] = None, action_callback=None) -> List[Dict[str, Any]]:
+    @_live_llm_calls
+    async def run_phase(self, max_turns: Optional[int] = None, action_callback=None,
+                        delta_callback=None) -> List[Dict[str, Any]]:
         """运行当前阶段，返回所有AI的行动
         
         Args:
             max_turns: 最大发言轮数，如果为None则使用默认值
             action_callback: 可选的回调函数，每个角色发言完成后立即调用
+            delta_callback: 可选的流式回调 (character, delta)，动态发言阶段逐段推送生成中的文本，
+                发言完成后仍调用 action_callback（批量发言与并发搜证阶段不流式）
         """
         actions: List[Dict[str, Any]] = []
         
@@ -698,7 +769,8 @@ class GameEngine:
                         except Exception as e:
                             logger.error(f"背景介绍回调函数执行失败: {e}")
                     
-                    await asyncio.sleep(2)  # 每部分之间的延迟
+                    if not await self.pacer.wait_section():  # 每部分之间的延迟
+                        break
                     
                 except Exception as e:
                     logger.error(f"处理背景故事部分 {key} 失败: {e}")
@@ -723,7 +795,8 @@ class GameEngine:
                         except Exception as callback_error:
                             logger.error(f"错误消息回调函数执行失败: {callback_error}")
                     
-                    await asyncio.sleep(2)
+                    if not await self.pacer.wait_section():
+                        break
             
             return actions
         
@@ -751,18 +824,53 @@ class GameEngine:
         
         logger.info(f"开始{self.current_phase.value}阶段，最大轮数: {max_turns}")
         
+        # 彼此独立的阶段：全部发言并发生成，按顺序推送
+        if self.batch_concurrency > 0 and self.current_phase in BATCH_PHASES:
+            return await self._run_batch_phase(max_turns, available_characters, action_callback)
+        # 搜证阶段：每轮所有搜证者同时选择地点，按顺序结算冲突
+        if (self.search_collision_policy and self.batch_concurrency > 0
+                and self.current_phase == GamePhaseEnum.EVIDENCE_COLLECTION and self.evidence_manager):
+            return await self._run_search_rounds(max_turns, available_characters, action_callback)
+        
         # 动态发言循环
+        # 流水线模式下已提前发起 LLM 调用的后续发言（按发言顺序）
+        speculations: deque[SpeculativeTurn] = deque()
+        
+        try:
+            actions = await self._run_turns(max_turns, available_characters, speculations,
+                                            action_callback, delta_callback)
+        finally:
+            for spec in speculations:
+                spec.cancel()
+        return actions
+
+    async def _run_turns(self, max_turns: int, available_characters: List[str],
+                         speculations: 'deque[SpeculativeTurn]', action_callback=None,
+                         delta_callback=None) -> List[Dict[str, Any]]:
+        """动态发言循环（run_phase 的发言阶段部分）"""
+        actions: List[Dict[str, Any]] = []
         turn_count = 0
         consecutive_same_speaker = 0
         last_speaker = None
-        
-        while turn_count < max_turns and available_characters:
+        detector = None
+        if self.convergence is not None and self.current_phase in CONVERGENCE_PHASES:
+            detector = ConvergenceDetector(
+                available_characters, [char.name for char in self.characters],
+                agents=self.agents, settings=self.convergence,
+            )
+
+        while turn_count < max_turns and available_characters and not self.pacer.cancelled:
             # 获取最近的聊天记录用于智能选择
             recent_chat = self.get_recent_public_chat(limit=10)
             
             # 统一委托给 ConversationFlowController 选人（CFC 内部已处理"优先未发言"逻辑）
             next_speaker = None
-            if self.conversation_flow_controller:
+            spec = speculations.popleft() if speculations else None
+            if spec is not None:
+                # 规则选人已提前确定本轮发言者
+                next_speaker = spec.speaker
+                consecutive_same_speaker = 0
+            elif self.conversation_flow_controller:
                 try:
                     next_speaker = await self.conversation_flow_controller.select_next_speaker(
                         available_characters,
@@ -793,94 +901,30 @@ class GameEngine:
                 continue
             
             try:
-                # AI思考并行动
-                action = await self.agents.respond(next_speaker, self.current_phase, self.game_state)
-                
-                # 根据阶段确定消息类型
-                message_type = "chat"
-                if self.current_phase == GamePhaseEnum.INVESTIGATION:
-                    message_type = "question" if "?" in action or "吗" in action or "呢" in action else "answer"
-                elif self.current_phase == GamePhaseEnum.DISCUSSION:
-                    message_type = "accusation" if "觉得" in action and "是" in action else "discussion"
-                elif self.current_phase == GamePhaseEnum.VOTING:
-                    message_type = "vote"
-                
-                # 获取角色的完整信息
-                character_voice_id = None
-                character_info = None
-                for character in self.characters:
-                    if character.name == next_speaker:
-                        character_voice_id = character.voice_id
-                        # 构造角色信息字典，用于TTS声音映射
-                        character_info = {
-                            "gender": character.gender,
-                            "age": character.age,
-                            "age_group": "elder" if character.age and character.age >= 50 else "young",
-                            "profession": character.profession,
-                            "voice_preference": character.voice_preference,
-                            "voice_id": character.voice_id
-                        }
-                        break
-                
-                # 使用公开聊天系统记录，传递session_id和voice_id用于TTS
-                self.add_public_chat(
-                    character=next_speaker, 
-                    message=action, 
-                    message_type=message_type,
-                    session_id=self.session_id,
-                    voice_id=character_voice_id
-                )
+                # AI思考并行动（采用推测结果时整段已生成，不再推送增量）
+                on_delta = None
+                if delta_callback is not None:
+                    on_delta = functools.partial(delta_callback, next_speaker)
+                if spec is not None:
+                    action = await self.agents.respond_speculated(spec, self.current_phase, self.game_state,
+                                                                  on_delta)
+                else:
+                    action = await self.agents.respond(next_speaker, self.current_phase, self.game_state,
+                                                       on_delta)
                 
-                # 更新对话流控制器的发言频率
-                if self.conversation_flow_controller:
-                    if next_speaker not in self.conversation_flow_controller.speaking_frequency:
-                        self.conversation_flow_controller.speaking_frequency[next_speaker] = 0
-                    self.conversation_flow_controller.speaking_frequency[next_speaker] += 1
-                
-                # 搜证阶段：处理证据发现
-                if self.current_phase == GamePhaseEnum.EVIDENCE_COLLECTION and self.evidence_manager:
-                    found_list, searched_location = self.evidence_manager.process_evidence_search(
-                        action, next_speaker
-                    )
-                    if searched_location:
-                        if found_list:
-                            for item in found_list:
-                                ev_name = item['name']
-                                ev_desc = item.get('description', '')
-                                msg = (
-                                    f"{next_speaker}在「{searched_location}」发现了证据："
-                                    f"《{ev_name}》——{ev_desc}"
-                                )
-                                self.add_public_chat(
-                                    character="系统",
-                                    message=msg,
-                                    message_type="evidence",
-                                    session_id=self.session_id,
-                                )
-                                self.agents.notify_evidence_found(
-                                    next_speaker, ev_name, ev_desc
-                                )
-                        else:
-                            self.add_public_chat(
-                                character="系统",
-                                message=f"{next_speaker}搜查了「{searched_location}」，未发现新的线索。",
-                                message_type="system",
-                                session_id=self.session_id,
-                            )
-                        # 同步搜证状态到 game_state
-                        self.game_state["discovered_evidence"] = self.evidence_manager.get_discovered_evidence()
-                        self.game_state["evidence_search_status"] = self.evidence_manager.get_location_search_status()
+                action_data = self._record_turn(next_speaker, action, turn_count + 1)
+                actions.append(action_data)
                 
-                action_data = {
-                    "character": next_speaker,
-                    "action": action,
-                    "type": message_type,
-                    "voice_id": character_voice_id,
-                    "character_info": character_info,
-                    "turn": str(turn_count + 1)
-                }
+                # 场上意见已稳定（共识或重复）时本轮后提前结束，不再预取后续发言
+                converged = False
+                if detector is not None:
+                    detector.observe(next_speaker, action)
+                    converged = detector.should_stop(turn_count + 1)
                 
-                actions.append(action_data)
+                # 本轮记录已落定：在 TTS 与广播进行期间提前发起后续发言者的 LLM 调用
+                if not converged:
+                    self._schedule_speculations(speculations, available_characters, next_speaker,
+                                                max_turns - turn_count - 1)
                 
                 # 如果提供了回调函数，立即调用以实现流式返回
                 if action_callback:
@@ -896,12 +940,24 @@ class GameEngine:
                     logger.info(f"{self.current_phase.value}阶段提前结束，满足结束条件")
                     break
                 
-                # 在行动之间添加短暂延迟，模拟真实对话
-                await asyncio.sleep(1)
+                if converged:
+                    saved = max_turns - turn_count - 1
+                    self.turns_saved += saved
+                    state = detector.state
+                    logger.info(
+                        f"[CONVERGENCE] {self.current_phase.value}阶段已收敛({state.reason}): "
+                        f"领先={state.leader}, 占比={state.share:.2f}, 重复度={state.repetition:.2f}, "
+                        f"节省 {saved} 轮（累计 {self.turns_saved}）"
+                    )
+                    break
                 
                 last_speaker = next_speaker
                 turn_count += 1
                 
+                # 在行动之间等待（语音播放完成 / 最小间隔），游戏停止时立即返回
+                if not await self.pacer.wait_turn():
+                    break
+                
             except Exception as e:
                 logger.error(f"Agent {next_speaker} 执行错误: {e}", exc_info=True)
                 self.add_public_chat(
@@ -914,6 +970,219 @@ class GameEngine:
         
         logger.info(f"{self.current_phase.value}阶段结束，共进行了 {turn_count} 轮发言")
         return actions
+
+    async def _run_batch_phase(self, max_turns: int, available_characters: List[str],
+                               action_callback=None) -> List[Dict[str, Any]]:
+        """批量阶段：每位角色发言一次，LLM 调用并发进行，结果按发言顺序落定并推送"""
+        count = min(max_turns, len(available_characters))
+        if self.conversation_flow_controller:
+            order = self.conversation_flow_controller.predict_rule_based_speakers(
+                available_characters, self.current_phase, [], count
+            )
+        else:
+            order = available_characters[:count]
+
+        actions: List[Dict[str, Any]] = []
+        executor = BatchPhaseExecutor(self.agents, self.batch_concurrency)
+        executor.start(order, self.current_phase, self.game_state)
+        try:
+            while executor.pending() and not self.pacer.cancelled:
+                speaker, action = await executor.release_next()
+                action_data = self._record_turn(speaker, action, len(actions) + 1)
+                actions.append(action_data)
+
+                if action_callback:
+                    try:
+                        await action_callback(action_data)
+                    except Exception as e:
+                        logger.error(f"回调函数执行失败: {e}")
+
+                logger.info(f"轮次 {len(actions)}/{len(order)}: {speaker} 发言完成")
+                if executor.pending() and not await self.pacer.wait_turn():
+                    break
+        finally:
+            executor.cancel()
+
+        logger.info(f"{self.current_phase.value}阶段结束，共进行了 {len(actions)} 轮发言")
+        return actions
+
+    async def _run_search_rounds(self, max_turns: int, available_characters: List[str],
+                                 action_callback=None) -> List[Dict[str, Any]]:
+        """并发搜证：按轮次让搜证者同时选择地点，结算后按顺序落定发言并公布结果"""
+        actions: List[Dict[str, Any]] = []
+        flow = self.conversation_flow_controller
+        while (len(actions) < max_turns and not self.pacer.cancelled
+               and self.evidence_manager.get_available_locations()):
+            frequency = flow.speaking_frequency if flow else {}
+            searchers = search_order(available_characters, frequency)[:max_turns - len(actions)]
+            if not searchers:
+                break
+            search_round = ConcurrentSearchRound(
+                self.agents, self.evidence_manager, self.batch_concurrency, self.search_collision_policy
+            )
+            assignments = await search_round.run(searchers, self.game_state)
+            logger.info(f"[SEARCH] 本轮 {len(searchers)} 人搜证，LLM 往返 {search_round.llm_rounds} 次")
+            if not assignments:
+                break
+
+            for index, assignment in enumerate(assignments):
+                if self.pacer.cancelled:
+                    break
+                self.agents.commit_turn(assignment.speaker, assignment.reply)
+                action_data = self._record_turn(
+                    assignment.speaker, assignment.reply, len(actions) + 1, search=assignment
+                )
+                actions.append(action_data)
+
+                if action_callback:
+                    try:
+                        await action_callback(action_data)
+                    except Exception as e:
+                        logger.error(f"回调函数执行失败: {e}")
+
+                if index < len(assignments) - 1 and not await self.pacer.wait_turn():
+                    break
+
+        logger.info(f"{self.current_phase.value}阶段结束，共进行了 {len(actions)} 轮发言")
+        return actions
+
+    def character_tts_info(self, name: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """角色的 voice_id 与用于TTS声音映射的角色信息；角色不存在时均为 None"""
+        for character in self.characters:
+            if character.name == name:
+                return character.voice_id, {
+                    "gender": character.gender,
+                    "age": character.age,
+                    "age_group": "elder" if character.age and character.age >= 50 else "young",
+                    "profession": character.profession,
+                    "voice_preference": character.voice_preference,
+                    "voice_id": character.voice_id
+                }
+        return None, None
+
+    def _record_turn(self, speaker: str, action: str, turn: int,
+                     search: Optional[SearchAssignment] = None) -> Dict[str, Any]:
+        """记录一次发言：写入公开聊天、更新发言频率、处理搜证/投票，返回广播用的行动数据
+
+        search 为并发搜证轮已结算的结果：按其地点搜查（可能已被改派），不再从发言中解析。
+        """
+        # 根据阶段确定消息类型
+        message_type = "chat"
+        if self.current_phase == GamePhaseEnum.INVESTIGATION:
+            message_type = "question" if "?" in action or "吗" in action or "呢" in action else "answer"
+        elif self.current_phase == GamePhaseEnum.DISCUSSION:
+            message_type = "accusation" if "觉得" in action and "是" in action else "discussion"
+        elif self.current_phase == GamePhaseEnum.VOTING:
+            message_type = "vote"
+        
+        # 获取角色的完整信息
+        character_voice_id, character_info = self.character_tts_info(speaker)
+        
+        # 使用公开聊天系统记录，传递session_id和voice_id用于TTS
+        self.add_public_chat(
+            character=speaker, 
+            message=action, 
+            message_type=message_type,
+            session_id=self.session_id,
+            voice_id=character_voice_id
+        )
+        
+        # 更新对话流控制器的发言频率
+        if self.conversation_flow_controller:
+            if speaker not in self.conversation_flow_controller.speaking_frequency:
+                self.conversation_flow_controller.speaking_frequency[speaker] = 0
+            self.conversation_flow_controller.speaking_frequency[speaker] += 1
+        
+        # 投票阶段：解析投票陈述并计票
+        if self.current_phase == GamePhaseEnum.VOTING and self.voting_manager:
+            suspect = self.voting_manager.parse_vote(speaker, action)
+            if suspect:
+                self.voting_manager.add_vote(speaker, suspect)
+                self.game_state["votes"] = self.voting_manager.votes
+                logger.info(f"[VOTE] {speaker} 投票给 {suspect}")
+            else:
+                logger.info(f"[VOTE] 未能从 {speaker} 的陈述中解析出投票对象")
+        
+        # 搜证阶段：处理证据发现
+        if self.current_phase == GamePhaseEnum.EVIDENCE_COLLECTION and self.evidence_manager:
+            if search is None:
+                found_list, searched_location = self.evidence_manager.process_evidence_search(
+                    action, speaker
+                )
+            elif search.location:
+                if search.redirected:
+                    if search.claimed:
+                        note = f"「{search.claimed}」已有人搜查，{speaker}改为搜查「{search.location}」。"
+                    else:
+                        note = f"{speaker}未指明搜查地点，安排搜查「{search.location}」。"
+                    self.add_public_chat(
+                        character="系统",
+                        message=note,
+                        message_type="system",
+                        session_id=self.session_id,
+                    )
+                found_list, searched_location = self.evidence_manager.process_evidence_search(
+                    action, speaker, location=search.location
+                )
+            else:
+                found_list, searched_location = [], None
+            if searched_location:
+                if found_list:
+                    for item in found_list:
+                        ev_name = item['name']
+                        ev_desc = item.get('description', '')
+                        msg = (
+                            f"{speaker}在「{searched_location}」发现了证据："
+                            f"《{ev_name}》——{ev_desc}"
+                        )
+                        self.add_public_chat(
+                            character="系统",
+                            message=msg,
+                            message_type="evidence",
+                            session_id=self.session_id,
+                        )
+                        self.agents.notify_evidence_found(
+                            speaker, ev_name, ev_desc
+                        )
+                else:
+                    self.add_public_chat(
+                        character="系统",
+                        message=f"{speaker}搜查了「{searched_location}」，未发现新的线索。",
+                        message_type="system",
+                        session_id=self.session_id,
+                    )
+                # 同步搜证状态到 game_state
+                self.game_state["discovered_evidence"] = self.evidence_manager.get_discovered_evidence()
+                self.game_state["evidence_search_status"] = self.evidence_manager.get_location_search_status()
+        
+        action_data = {
+            "character": speaker,
+            "action": action,
+            "type": message_type,
+            "voice_id": character_voice_id,
+            "character_info": character_info,
+            "turn": str(turn)
+        }
+        return action_data
+
+    def _schedule_speculations(self, speculations: 'deque[SpeculativeTurn]', available_characters: List[str],
+                               current_speaker: str, remaining_turns: int):
+        """流水线模式：为规则可确定的下一位发言者发起推测（最多 pipeline_depth 个）"""
+        if self.pipeline_depth <= 0 or not self.conversation_flow_controller:
+            return
+        wanted = min(self.pipeline_depth, remaining_turns) - len(speculations)
+        if wanted <= 0:
+            return
+        exclude = [current_speaker] + [spec.speaker for spec in speculations]
+        upcoming = self.conversation_flow_controller.predict_rule_based_speakers(
+            available_characters, self.current_phase, exclude, wanted
+        )
+        for speaker in upcoming:
+            spec = self.agents.speculate(speaker, self.current_phase, self.game_state)
+            if spec is None:
+                break
+            speculations.append(spec)
+            logger.debug(f"[PIPELINE] 提前发起 {speaker} 的发言")
     
     def _should_end_phase(self, current_turn: int, max_turns: int) -> bool:
         """根据标准剧本杀流程判断当前阶段是否应该提前结束"""
@@ -967,7 +1236,7 @@ class GameEngine:
         return False
     
     async def process_voting(self):
-        """处理投票阶段"""
+        """处理投票阶段：投票已在发言时从陈述中解析，未能解析的角色按其最怀疑的对象补票"""
         if self.current_phase != GamePhaseEnum.VOTING:
             return
             
@@ -975,14 +1244,19 @@ class GameEngine:
             logger.error("投票管理器未初始化")
             return
             
-        # 简单的投票逻辑，实际应该解析AI的投票内容
-        import random
         for agent_name in self.agents.keys():
-            # 这里应该解析AI的投票，暂时随机
-            suspects = [name for name in self.agents.keys() if name != agent_name]
-            if suspects:  # 确保有可投票的对象
-                vote = random.choice(suspects)
-                self.voting_manager.add_vote(agent_name, vote)
+            if agent_name in self.voting_manager.votes:
+                continue
+            suspicions = {
+                name: score for name, score in self.agents[agent_name].memory.suspicion_map.items()
+                if name != agent_name and name in self.agents
+            }
+            if suspicions:
+                suspect = max(suspicions, key=suspicions.get)
+                self.voting_manager.add_vote(agent_name, suspect)
+                logger.info(f"[VOTE] {agent_name} 未明确投票，按怀疑度补票给 {suspect}")
+            else:
+                logger.info(f"[VOTE] {agent_name} 未明确投票，视为弃票")
         
         self.game_state["votes"] = self.voting_manager.votes
     
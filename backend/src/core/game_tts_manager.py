@@ -2,18 +2,24 @@
 import asyncio
 import base64
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, NamedTuple
 from datetime import datetime
 
 from src.services.tts_service import TTSService
 from src.services.base_tts import TTSRequest, BaseTTSService
-from src.core.storage import StorageManager
+from src.core.storage import storage_manager
 from src.db.models.game_event import GameEventDBModel, TTSGeneratedStatus
 from src.db.repositories.game_session_repository import GameEventRepository
 from src.db.session import db_manager
 from src.core.config import config
 logger = logging.getLogger(__name__)
 
+class CharacterTTSResult(NamedTuple):
+    """角色发言TTS生成结果"""
+    url: str
+    duration: float  # 估算的音频时长（秒）
+    voice_id: str
+
 class GameTTSManager:
     """游戏TTS管理器 - 处理角色发言的TTS生成"""
     
@@ -40,7 +46,8 @@ class GameTTSManager:
         self.group_id = group_id
         self.model = model
         self.provider = provider
-        self.storage_manager = StorageManager()
+        # 进程内共享的存储客户端（避免每个会话重新连接 MinIO 并检查存储桶）
+        self.storage_manager = storage_manager
         self._tts_service: Optional[BaseTTSService] = None
         
     def _get_tts_service(self) -> BaseTTSService:
@@ -117,6 +124,20 @@ class GameTTSManager:
         Returns:
             音频文件的公网访问URL，失败时返回None
         """
+        result = await self.synthesize_character_tts(
+            session_id, character_name, content, character_info, event_metadata
+        )
+        return result.url if result else None
+
+    async def synthesize_character_tts(
+        self, 
+        session_id: str, 
+        character_name: str, 
+        content: str,
+        character_info: Optional[Dict[str, Any]] = None,
+        event_metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[CharacterTTSResult]:
+        """为角色发言生成TTS音频并存储，返回URL、音频时长与所用声音（供节奏调度使用）"""
         try:
             logger.info(f"[TTS] 开始生成TTS: 会话={session_id}, 角色={character_name}, 内容长度={len(content)}字符")
             
@@ -205,7 +226,7 @@ class GameTTSManager:
                 logger.error(f"[TTS] 数据库保存失败: {e}, 会话={session_id}, 角色={character_name}")
                 # 即使数据库保存失败，也返回URL
             
-            return minio_url
+            return CharacterTTSResult(url=minio_url, duration=estimated_duration, voice_id=voice_id)
             
         except Exception as e:
             logger.error(f"[TTS] 生成TTS失败: {e}, 会话={session_id}, 角色={character_name}", exc_info=True)
@@ -308,3 +329,26 @@ class GameTTSManager:
         if self._tts_service:
             await self._tts_service.close()
             self._tts_service = None
+
+
+# 进程内共享的TTS管理器：管理器本身不保存会话状态，按 (提供商, 模型, 凭据) 复用
+_shared_tts_managers: Dict[tuple, GameTTSManager] = {}
+
+
+def get_shared_tts_manager(api_key: str, group_id: str, model: str = "speech-02-turbo",
+                           provider: str = "minimax") -> GameTTSManager:
+    """获取共享的TTS管理器（首次调用时创建）"""
+    key = (provider, model, api_key, group_id)
+    manager = _shared_tts_managers.get(key)
+    if manager is None:
+        manager = GameTTSManager(api_key=api_key, group_id=group_id, model=model, provider=provider)
+        _shared_tts_managers[key] = manager
+    return manager
+
+
+async def close_shared_tts_managers():
+    """关闭所有共享的TTS管理器（应用关闭时调用）"""
+    managers = list(_shared_tts_managers.values())
+    _shared_tts_managers.clear()
+    for manager in managers:
+        await manager.close()
@@ -0,0 +1,131 @@
+"""会话内存核算
+
+SessionReaper 的内存预算使用 session_hibernation.estimate_session_bytes 的粗略估算（常数开销 +
+文本长度），足够快但看不出一个房间的内存具体花在哪里。这里按对象图实际遍历
+（sys.getsizeof 累加，同一对象只计一次），给出单个会话按组件划分的字节数：
+  event_log / agents / managers / game_state / game_plan / script_data / state_sync / actor /
+  editor / engine_other / session_other
+进程内共享的对象（LLM 客户端、TTS 管理器、存储客户端、配置、协程/任务等）不计入会话；
+连接对象（WebSocket）属于连接而非房间，也不计入。遍历开销与会话大小成正比，仅供管理端点按需调用。
+"""
+import asyncio
+import enum
+import logging
+import sys
+import types
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set
+
+if TYPE_CHECKING:
+    from src.core.websocket_server import GameSession, GameWebSocketServer
+
+logger = logging.getLogger(__name__)
+
+# 不展开也不计数的对象类型
+_OPAQUE_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    types.CoroutineType, types.GeneratorType, types.AsyncGeneratorType,
+    asyncio.Future, asyncio.AbstractEventLoop, logging.Logger, enum.Enum,
+)
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None), range)
+
+
+def _shared_types() -> tuple:
+    """进程内共享的客户端类型（延迟导入，避免循环依赖）"""
+    from src.core.config import ConfigManager
+    from src.core.game_tts_manager import GameTTSManager
+    from src.core.storage import StorageManager
+    from src.services.llm_service import BaseLLMService
+    return (BaseLLMService, GameTTSManager, StorageManager, ConfigManager)
+
+
+def _slot_values(obj: Any) -> List[Any]:
+    values = []
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if name in ("__dict__", "__weakref__"):
+                continue
+            try:
+                values.append(getattr(obj, name))
+            except AttributeError:
+                pass
+    return values
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None, exclude: tuple = ()) -> int:
+    """对象图的近似内存占用（字节）；seen 中已计数的对象跳过，用于跨组件去重"""
+    seen = set() if seen is None else seen
+    opaque = _OPAQUE_TYPES + exclude
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, opaque):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current, 0)
+        if isinstance(current, _ATOMIC_TYPES):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+            continue
+        if isinstance(current, (list, tuple, set, frozenset)) or type(current).__name__ == "deque":
+            stack.extend(current)
+            continue
+        if hasattr(current, "__dict__"):
+            stack.append(vars(current))
+        if hasattr(type(current), "__slots__"):
+            stack.extend(_slot_values(current))
+    return total
+
+
+def session_footprint(session: 'GameSession') -> Dict[str, Any]:
+    """单个会话的内存核算（字节，按组件）"""
+    engine = session.game_engine
+    exclude = _shared_types()
+    # 连接对象与共享客户端预先标记为已计数
+    seen: Set[int] = {id(session.clients), id(session.tts_manager), id(session.db_session)}
+    seen.update(id(client) for client in session.clients)
+
+    components: Dict[str, Iterable[Any]] = {
+        "event_log": [engine.log],
+        "agents": [engine.agents],
+        "managers": [engine.evidence_manager, engine.voting_manager, engine.conversation_flow_controller],
+        "game_state": [engine.game_state],
+        "game_plan": [engine.game_plan],
+        "script_data": [engine.script_data],
+        "state_sync": [session.state_tracker],
+        "actor": [session.actor],
+        "editor": [session.editor_service, session.editing_context],
+        "engine_other": [engine],
+        "session_other": [session],
+    }
+    sizes = {name: sum(deep_sizeof(obj, seen, exclude) for obj in objs if obj is not None)
+             for name, objs in components.items()}
+    return {
+        "session_id": session.session_id,
+        "script_id": session.script_id,
+        "phase": engine.current_phase.value,
+        "running": session.is_game_running,
+        "clients": len(session.clients),
+        "events": len(engine.log),
+        "agents": len(engine.agents),
+        "total_bytes": sum(sizes.values()),
+        "components": sizes,
+    }
+
+
+def server_footprint(server: 'GameWebSocketServer') -> Dict[str, Any]:
+    """全部会话的内存核算汇总（按会话字节数降序）"""
+    sessions = sorted((session_footprint(s) for s in list(server.sessions.values())),
+                      key=lambda item: item["total_bytes"], reverse=True)
+    total = sum(item["total_bytes"] for item in sessions)
+    idle = [item for item in sessions if not item["running"] and item["clients"] == 0]
+    return {
+        "session_count": len(sessions),
+        "total_bytes": total,
+        "average_bytes": total // len(sessions) if sessions else 0,
+        "idle_session_count": len(idle),
+        "idle_average_bytes": sum(item["total_bytes"] for item in idle) // len(idle) if idle else 0,
+        "sessions": sessions,
+    }
@@ -0,0 +1,61 @@
+"""WebSocket帧编解码
+
+默认使用UTF-8 JSON文本帧；客户端可在连接 /api/ws 时通过 encoding=msgpack
+选择MessagePack二进制帧，消息结构与JSON完全一致。msgpack为可选依赖，
+未安装时自动回退为JSON，并在 session_connected 中告知实际使用的编码。
+"""
+import json
+import logging
+from typing import Any, Dict, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+JSON_ENCODING = "json"
+MSGPACK_ENCODING = "msgpack"
+
+Frame = Union[str, bytes]
+
+
+class FrameDecodeError(ValueError):
+    """客户端帧无法解析"""
+
+
+def json_default(obj: Any) -> Any:
+    """序列化兜底：事件日志视图（见 src/core/event_log.py）展开为列表，其余对象（如datetime）转为字符串"""
+    to_list = getattr(obj, "to_list", None)
+    if callable(to_list):
+        return to_list()
+    return str(obj)
+
+
+def negotiate_encoding(requested: str | None) -> str:
+    """确定连接实际使用的编码"""
+    if requested == MSGPACK_ENCODING:
+        if msgpack is not None:
+            return MSGPACK_ENCODING
+        logger.warning("[CODEC] 客户端请求MessagePack编码，但未安装msgpack，回退为JSON")
+    return JSON_ENCODING
+
+
+def encode_frame(message: Dict[str, Any], encoding: str = JSON_ENCODING) -> Frame:
+    """按编码序列化消息；无法直接序列化的对象经 json_default 处理"""
+    if encoding == MSGPACK_ENCODING and msgpack is not None:
+        return msgpack.packb(message, default=json_default, use_bin_type=True)
+    return json.dumps(message, ensure_ascii=False, default=json_default)
+
+
+def decode_frame(raw: Frame) -> Dict[str, Any]:
+    """解析客户端帧：文本帧按JSON解析，二进制帧按MessagePack解析"""
+    try:
+        if isinstance(raw, (bytes, bytearray)):
+            if msgpack is None:
+                return json.loads(raw)
+            return msgpack.unpackb(raw, raw=False)
+        return json.loads(raw)
+    except Exception as e:
+        raise FrameDecodeError(str(e)) from e
@@ -0,0 +1,181 @@
+"""游戏节奏调度
+
+取代游戏循环中写死的 sleep：发言之间、背景叙述段落之间以及阶段切换前的等待
+都由真实信号驱动——
+  - TTS音频时长：广播带语音的发言后登记一次"待播放"，下一次等待至少覆盖音频时长
+  - 客户端播放完成确认（playback_finished）：所有在线客户端确认后立即放行，
+    不必等满音频时长 + 宽限
+  - 阶段最短时长：按阶段配置，从阶段开始计时
+游戏停止时 cancel() 会让所有进行中的等待立即返回。
+
+turbo 档位所有等待均为零，用于模拟与压测。
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional, Set
+
+from ..schemas.game_phase import GamePhaseEnum
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PacingProfile:
+    """节奏档位"""
+    name: str
+    turn_gap: float = 1.0  # 两次发言之间的最小间隔（秒）
+    section_gap: float = 2.0  # 背景叙述段落之间的最小间隔（秒）
+    playback_grace: float = 1.0  # 音频时长之外等待客户端播放完成确认的宽限（秒）
+    wait_for_playback: bool = True  # 是否等待语音播放
+    phase_minimums: Mapping[GamePhaseEnum, float] = field(default_factory=dict)  # 阶段最短时长（秒）
+
+
+STANDARD_PROFILE = PacingProfile(
+    name="standard",
+    phase_minimums={
+        GamePhaseEnum.BACKGROUND: 10,
+        GamePhaseEnum.INTRODUCTION: 5,
+        GamePhaseEnum.EVIDENCE_COLLECTION: 5,
+        GamePhaseEnum.INVESTIGATION: 5,
+        GamePhaseEnum.DISCUSSION: 5,
+        GamePhaseEnum.VOTING: 5,
+    },
+)
+
+TURBO_PROFILE = PacingProfile(
+    name="turbo",
+    turn_gap=0.0,
+    section_gap=0.0,
+    playback_grace=0.0,
+    wait_for_playback=False,
+)
+
+PACING_PROFILES: Dict[str, PacingProfile] = {
+    STANDARD_PROFILE.name: STANDARD_PROFILE,
+    TURBO_PROFILE.name: TURBO_PROFILE,
+}
+
+
+@dataclass
+class _PendingPlayback:
+    utterance_id: str
+    deadline: float
+    expected: int
+    acked: Set[int] = field(default_factory=set)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class PacingScheduler:
+    """单局游戏的节奏调度器"""
+
+    def __init__(self, profile: PacingProfile = STANDARD_PROFILE):
+        self.profile = profile
+        self._stop = asyncio.Event()
+        self._pending: Optional[_PendingPlayback] = None
+        self._phase_started_at = time.monotonic()
+        self.total_wait_seconds: float = 0.0
+
+    @classmethod
+    def from_config(cls, pacing_config: Any) -> "PacingScheduler":
+        """按 PacingConfig 构造（未知档位回退为 standard）"""
+        base = PACING_PROFILES.get(pacing_config.profile)
+        if base is None:
+            logger.warning(f"[PACING] 未知节奏档位 {pacing_config.profile}，使用 standard")
+            base = STANDARD_PROFILE
+        overrides: Dict[str, Any] = {}
+        if pacing_config.turn_gap is not None:
+            overrides["turn_gap"] = pacing_config.turn_gap
+        if pacing_config.playback_grace is not None:
+            overrides["playback_grace"] = pacing_config.playback_grace
+        if pacing_config.phase_minimums:
+            minimums = dict(base.phase_minimums)
+            for phase_name, seconds in pacing_config.phase_minimums.items():
+                try:
+                    minimums[GamePhaseEnum[phase_name]] = seconds
+                except KeyError:
+                    logger.warning(f"[PACING] 忽略未知阶段的最短时长配置: {phase_name}")
+            overrides["phase_minimums"] = minimums
+        profile = PacingProfile(**{**base.__dict__, **overrides}) if overrides else base
+        return cls(profile)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._stop.is_set()
+
+    def cancel(self):
+        """停止游戏：所有进行中与之后的等待立即返回 False"""
+        self._stop.set()
+        if self._pending:
+            self._pending.done.set()
+
+    def resume(self):
+        """重新开始游戏时清除停止标记"""
+        self._stop.clear()
+        self._pending = None
+
+    def start_phase(self):
+        """阶段开始，重置阶段计时"""
+        self._phase_started_at = time.monotonic()
+
+    def expect_playback(self, utterance_id: str, duration: Optional[float], listeners: int):
+        """登记一段刚广播的语音；无时长或无人收听时不等待"""
+        if not self.profile.wait_for_playback or not duration or listeners <= 0:
+            return
+        self._pending = _PendingPlayback(
+            utterance_id=utterance_id,
+            deadline=time.monotonic() + duration + self.profile.playback_grace,
+            expected=listeners,
+        )
+
+    def notify_playback_finished(self, utterance_id: str, listener: Any) -> bool:
+        """客户端确认语音播放完成；全部在线客户端确认后放行等待，返回是否已放行"""
+        pending = self._pending
+        if not pending or pending.utterance_id != utterance_id:
+            return False
+        pending.acked.add(id(listener))
+        if len(pending.acked) >= pending.expected:
+            pending.done.set()
+        return pending.done.is_set()
+
+    async def wait_turn(self) -> bool:
+        """发言之间的等待；返回 False 表示游戏已停止"""
+        return await self._wait(self.profile.turn_gap)
+
+    async def wait_section(self) -> bool:
+        """背景叙述段落之间的等待"""
+        return await self._wait(self.profile.section_gap)
+
+    async def wait_phase_end(self, phase: GamePhaseEnum) -> bool:
+        """阶段切换前的等待：补足阶段最短时长，并等待最后一段语音"""
+        minimum = self.profile.phase_minimums.get(phase, 0.0)
+        remaining = minimum - (time.monotonic() - self._phase_started_at)
+        return await self._wait(max(0.0, remaining))
+
+    async def _wait(self, min_delay: float) -> bool:
+        if self._stop.is_set():
+            return False
+        started = time.monotonic()
+        pending = self._pending
+        if pending and not pending.done.is_set():
+            timeout = pending.deadline - time.monotonic()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(pending.done.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        # 等待期间可能已登记新的语音，只清除本次等待的那一段
+        if self._pending is pending:
+            self._pending = None
+        remaining = min_delay - (time.monotonic() - started)
+        if remaining > 0 and not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+        elif remaining <= 0 and min_delay <= 0 and not pending:
+            # 零等待时仍让出事件循环，避免长时间独占
+            await asyncio.sleep(0)
+        self.total_wait_seconds += time.monotonic() - started
+        return not self._stop.is_set()
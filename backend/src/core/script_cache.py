@@ -0,0 +1,378 @@
+"""进程级剧本编译缓存
+
+GameEngine.load_script_data 原本每次开局都要执行 ScriptRepository.get_script_by_id
+（5 个 selectinload + 逐行 pydantic 校验），再手工拼装角色/证据/场景/背景/阶段字典
+并重新校验。热门剧本一天开局上百次，数据完全相同。
+
+这里把拼装好的 script_data 编译为不可变的 CompiledScript，按 (script_id, 版本)
+放入进程级 LRU：
+  - 版本取剧本行的 updated_at；写入剧本任何部分（包括角色、证据等子表）都会在
+    flush 前刷新剧本行的 updated_at，并在事务提交后让本进程的缓存条目失效
+    （覆盖 ScriptRepository 与 ScriptEditorService 的全部写路径）
+  - 命中且未超过 revalidate_after 时不访问数据库；超过后只查询一次 updated_at，
+    版本未变即续期，用于感知其他 worker 的写入
+  - 引擎拿到的是 materialize() 生成的独立副本（EvidenceManager 等会修改证据字典），
+    缓存内容本身从不外借
+"""
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set, Union
+
+if TYPE_CHECKING:
+    from ..schemas.script import Script
+
+logger = logging.getLogger(__name__)
+
+
+def script_version(updated_at: Any) -> str:
+    """剧本版本标识（updated_at 的字符串形式）"""
+    if updated_at is None:
+        return ""
+    return updated_at.isoformat() if hasattr(updated_at, "isoformat") else str(updated_at)
+
+
+@dataclass(frozen=True)
+class CompiledScript:
+    """编译后的剧本（不可变，进程内共享）"""
+    script_id: int
+    version: str
+    script_data: Dict[str, Any] = field(repr=False)
+    compiled_at: float = field(default_factory=time.monotonic, compare=False)
+
+    @property
+    def title(self) -> str:
+        return self.script_data.get("script_info", {}).get("title", "")
+
+    def materialize(self) -> Dict[str, Any]:
+        """生成供单个引擎使用的可变副本"""
+        return copy.deepcopy(self.script_data)
+
+
+def _enum_value(value: Any) -> Any:
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def compile_script(full_script: 'Script', script_id: Optional[int] = None) -> CompiledScript:
+    """把仓库返回的完整剧本拼装为引擎使用的 script_data"""
+    characters = []
+    for char in full_script.characters:
+        try:
+            characters.append({
+                'id': char.id,
+                'script_id': char.script_id,
+                'name': char.name or "",
+                'background': char.background or "",
+                'gender': char.gender or "中性",
+                'age': char.age,
+                'profession': char.profession or "",
+                'secret': char.secret or "",
+                'objective': char.objective or "",
+                'is_victim': bool(char.is_victim),
+                'is_murderer': bool(char.is_murderer),
+                'personality_traits': char.personality_traits or [],
+                'avatar_url': char.avatar_url,
+                'voice_preference': char.voice_preference,
+                'voice_id': char.voice_id
+            })
+        except Exception as e:
+            logger.error(f"处理角色数据失败 {getattr(char, 'name', 'Unknown')}: {e}")
+
+    evidence = []
+    for ev in full_script.evidence:
+        try:
+            evidence.append({
+                'id': ev.id,
+                'script_id': ev.script_id,
+                'name': ev.name or "",
+                'description': ev.description or "",
+                'location': ev.location or "",
+                'related_to': ev.related_to or "",
+                'significance': ev.significance or "",
+                'evidence_type': _enum_value(ev.evidence_type),
+                'importance': ev.importance or "重要证据",
+                'image_url': ev.image_url,
+                'is_hidden': bool(ev.is_hidden)
+            })
+        except Exception as e:
+            logger.error(f"处理证据数据失败 {getattr(ev, 'name', 'Unknown')}: {e}")
+
+    locations = []
+    for loc in full_script.locations:
+        try:
+            locations.append({
+                'id': loc.id,
+                'script_id': loc.script_id,
+                'name': loc.name or "",
+                'description': loc.description or "",
+                'searchable_items': loc.searchable_items or [],
+                'background_image_url': loc.background_image_url,
+                'is_crime_scene': bool(loc.is_crime_scene)
+            })
+        except Exception as e:
+            logger.error(f"处理场景数据失败 {getattr(loc, 'name', 'Unknown')}: {e}")
+
+    background_story: Dict[str, Union[str, Dict[str, Any]]] = {}
+    if full_script.background_story:
+        try:
+            bg = full_script.background_story
+            background_story = {
+                "title": bg.title or "",
+                "setting_description": bg.setting_description or "",
+                "incident_description": bg.incident_description or "",
+                "victim_background": bg.victim_background or "",
+                "investigation_scope": bg.investigation_scope or "",
+                "rules_reminder": bg.rules_reminder or "",
+                "murder_method": bg.murder_method or "",
+                "murder_location": bg.murder_location or "",
+                "discovery_time": bg.discovery_time or "",
+                "victory_conditions": bg.victory_conditions or {}
+            }
+        except Exception as e:
+            logger.error(f"处理背景故事数据失败: {e}")
+            background_story = {
+                "title": "案件背景",
+                "setting_description": "暂无相关信息",
+                "incident_description": "暂无相关信息",
+                "victim_background": "暂无相关信息",
+                "investigation_scope": "暂无相关信息",
+                "rules_reminder": "暂无相关信息",
+                "murder_method": "暂无相关信息",
+                "murder_location": "暂无相关信息",
+                "discovery_time": "暂无相关信息",
+                "victory_conditions": {}
+            }
+
+    game_phases = []
+    for phase in full_script.game_phases:
+        try:
+            game_phases.append({
+                "id": phase.id,
+                "script_id": phase.script_id,
+                "phase": _enum_value(phase.phase),
+                "name": phase.name or "",
+                "description": phase.description or "",
+                "order_index": phase.order_index or 0
+            })
+        except Exception as e:
+            logger.error(f"处理游戏阶段数据失败: {e}")
+
+    info = full_script.info
+    try:
+        script_info = {
+            "title": info.title or "",
+            "description": info.description or "",
+            "player_count": info.player_count or 4,
+            "difficulty": info.difficulty_level or "medium",
+            "estimated_time": info.estimated_duration or 180,
+            "tags": info.tags or [],
+            "author": getattr(info, 'author', None),
+            "status": _enum_value(info.status),
+            "cover_image_url": getattr(info, 'cover_image_url', None),
+            "is_public": getattr(info, 'is_public', False),
+            "price": getattr(info, 'price', 0.0)
+        }
+    except Exception as e:
+        logger.error(f"处理剧本信息失败: {e}")
+        script_info = {
+            "title": "未知剧本",
+            "description": "暂无描述",
+            "player_count": 4,
+            "difficulty": "medium",
+            "estimated_time": 180,
+            "tags": []
+        }
+
+    return CompiledScript(
+        script_id=script_id if script_id is not None else info.id,
+        version=script_version(getattr(info, "updated_at", None)),
+        script_data={
+            "script_info": script_info,
+            "characters": characters,
+            "evidence": evidence,
+            "locations": locations,
+            "background_story": background_story,
+            "game_phases": game_phases
+        },
+    )
+
+
+class CompiledScriptCache:
+    """CompiledScript 的进程级 LRU 缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 64, revalidate_after: float = 60.0, enabled: bool = True):
+        self.max_entries = max(1, max_entries)
+        self.revalidate_after = revalidate_after
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, CompiledScript]" = OrderedDict()
+        self._checked_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, script_id: int) -> bool:
+        return script_id in self._entries
+
+    def get(self, script_id: int,
+            version_loader: Optional[Callable[[int], Optional[str]]] = None) -> Optional[CompiledScript]:
+        """取缓存条目；超过 revalidate_after 时用 version_loader 校验版本（None 表示剧本已不存在）"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(script_id)
+            checked_at = self._checked_at.get(script_id, 0.0)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        if version_loader is not None and now - checked_at >= self.revalidate_after:
+            self.revalidations += 1
+            current = version_loader(script_id)
+            if current != entry.version:
+                logger.info(f"[SCRIPT_CACHE] 剧本版本已变化，重新编译: 剧本={script_id}, "
+                            f"{entry.version} -> {current}")
+                self.invalidate(script_id)
+                self.misses += 1
+                return None
+
+        with self._lock:
+            if self._entries.get(script_id) is not entry:
+                # 校验期间被并发失效
+                self.misses += 1
+                return None
+            self._entries.move_to_end(script_id)
+            if version_loader is not None and now - checked_at >= self.revalidate_after:
+                self._checked_at[script_id] = now
+        self.hits += 1
+        return entry
+
+    def peek_version(self, script_id: int) -> Optional[str]:
+        """当前缓存条目的版本（不计入命中统计、不校验数据库），无条目时返回 None"""
+        entry = self._entries.get(script_id)
+        return entry.version if entry is not None else None
+
+    def put(self, compiled: CompiledScript):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[compiled.script_id] = compiled
+            self._entries.move_to_end(compiled.script_id)
+            self._checked_at[compiled.script_id] = time.monotonic()
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._checked_at.pop(evicted, None)
+
+    def invalidate(self, script_id: int) -> bool:
+        with self._lock:
+            removed = self._entries.pop(script_id, None) is not None
+            self._checked_at.pop(script_id, None)
+        if removed:
+            self.invalidations += 1
+            logger.debug(f"[SCRIPT_CACHE] 缓存条目已失效: 剧本={script_id}")
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._checked_at.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "invalidations": self.invalidations,
+        }
+
+
+def _build_cache() -> CompiledScriptCache:
+    from .config import config
+    cfg = config.script_cache_config
+    return CompiledScriptCache(max_entries=cfg.max_entries, revalidate_after=cfg.revalidate_after,
+                               enabled=cfg.enabled)
+
+
+compiled_script_cache = _build_cache()
+
+
+# ----------------------------------------------------------------------
+# 写入失效：挂在 SQLAlchemy Session 事件上，覆盖所有经由 ORM 的剧本写入
+# ----------------------------------------------------------------------
+
+_PENDING_KEY = "compiled_script_invalidations"
+_hooks_installed = False
+
+
+def _affected_script_ids(session) -> Set[int]:
+    from ..db.models.script_model import ScriptDBModel
+    from ..db.models.character import CharacterDBModel
+    from ..db.models.evidence import EvidenceDBModel
+    from ..db.models.location import LocationDBModel
+    from ..db.models.background_story import BackgroundStoryDBModel
+    from ..db.models.game_phase import GamePhaseDBModel
+
+    child_models = (CharacterDBModel, EvidenceDBModel, LocationDBModel,
+                    BackgroundStoryDBModel, GamePhaseDBModel)
+    script_ids: Set[int] = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, ScriptDBModel):
+            if obj.id is not None:
+                script_ids.add(obj.id)
+        elif isinstance(obj, child_models):
+            if getattr(obj, "script_id", None) is not None:
+                script_ids.add(obj.script_id)
+    return script_ids
+
+
+def _before_flush(session, flush_context, instances):
+    try:
+        script_ids = _affected_script_ids(session)
+    except Exception as e:
+        logger.warning(f"[SCRIPT_CACHE] 收集剧本写入失败: {e}")
+        return
+    if not script_ids:
+        return
+    pending: Set[int] = session.info.setdefault(_PENDING_KEY, set())
+    # 只改子表时剧本行的 updated_at 不会变化，这里顺带刷新，其他 worker 才能按版本感知
+    new_ids = script_ids - pending
+    if new_ids:
+        from sqlalchemy import func, update
+        from ..db.models.script_model import ScriptDBModel
+        session.execute(
+            update(ScriptDBModel).where(ScriptDBModel.id.in_(new_ids)).values(updated_at=func.now())
+        )
+    pending.update(script_ids)
+
+
+def _after_commit(session):
+    for script_id in session.info.pop(_PENDING_KEY, set()):
+        compiled_script_cache.invalidate(script_id)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def install_invalidation_hooks():
+    """注册剧本写入的缓存失效钩子（幂等）"""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    event.listen(Session, "before_flush", _before_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_soft_rollback", lambda session, previous: _after_rollback(session))
+    _hooks_installed = True
+
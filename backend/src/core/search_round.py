@@ -0,0 +1,122 @@
+"""并发搜证轮
+
+搜证阶段原本每位角色依次完成一次完整的 LLM 发言来选择地点，再由
+EvidenceManager.process_evidence_search 结算。各角色的选择基本互不依赖，
+因此一轮搜证改为：
+  1. 所有搜证者基于同一份状态同时选择地点（一次并发 LLM 往返）
+  2. 按发言顺序结算冲突：先到先得，与已搜查地点或本轮前序选择重复的为冲突方
+  3. 冲突方（reprompt 策略）带着更新后的搜查状态同时重新选择一次（第二次并发往返），
+     仍冲突或无法识别地点时按地点顺序改派到第一个空闲地点
+  4. 引擎按发言顺序依次落定发言并公布搜证结果
+一轮的墙钟时间从 N 次串行 LLM 往返降到约两次。本模块只负责选择与结算，不修改
+角色记忆和证据状态。
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..agents.character_agent_manager import CharacterAgentManager, SpeculativeTurn
+from ..schemas.game_phase import GamePhaseEnum
+from .evidence_manager import EvidenceManager
+
+logger = logging.getLogger(__name__)
+
+COLLISION_POLICIES = ("reprompt", "redirect")
+
+
+@dataclass
+class SearchAssignment:
+    """一位搜证者的结算结果"""
+    speaker: str
+    reply: str
+    location: Optional[str]  # 实际搜查的地点（None 表示没有可搜查的地点）
+    claimed: Optional[str] = None  # 未能搜查的所选地点（冲突或无法识别时）
+    reprompted: bool = False
+    redirected: bool = False  # 地点由结算改派（而非角色自己选择）
+
+
+class ConcurrentSearchRound:
+    """一轮并发搜证：同时选择、按顺序结算冲突"""
+
+    def __init__(self, agents: CharacterAgentManager, evidence_manager: EvidenceManager,
+                 concurrency: int = 4, collision_policy: str = "reprompt"):
+        if collision_policy not in COLLISION_POLICIES:
+            logger.warning(f"[SEARCH] 未知的冲突策略 {collision_policy}，使用 reprompt")
+            collision_policy = "reprompt"
+        self.agents = agents
+        self.evidence_manager = evidence_manager
+        self.concurrency = max(1, concurrency)
+        self.collision_policy = collision_policy
+        self.llm_rounds = 0
+
+    async def _choose(self, speakers: List[str], game_state: Dict[str, Any]) -> Dict[str, str]:
+        """所有搜证者同时选择地点，返回 {角色: 发言}"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        turns: List[SpeculativeTurn] = []
+        for speaker in speakers:
+            turn = self.agents.speculate(speaker, GamePhaseEnum.EVIDENCE_COLLECTION, game_state, semaphore=semaphore)
+            if turn is not None:
+                turns.append(turn)
+        self.llm_rounds += 1
+        try:
+            replies = await asyncio.gather(*(turn.task for turn in turns))
+        finally:
+            for turn in turns:
+                turn.cancel()
+        return {turn.speaker: reply for turn, reply in zip(turns, replies)}
+
+    def _claim(self, speakers: List[str], replies: Dict[str, str], taken: Dict[str, str],
+               assignments: Dict[str, SearchAssignment]) -> List[str]:
+        """按发言顺序结算选择，返回冲突方（保持顺序）"""
+        losers = []
+        for speaker in speakers:
+            if speaker not in replies:
+                continue
+            reply = replies[speaker]
+            location = self.evidence_manager.extract_location(reply)
+            previous = assignments.get(speaker)
+            if location and location not in taken:
+                taken[location] = speaker
+                assignments[speaker] = SearchAssignment(speaker, reply, location, reprompted=previous is not None)
+            else:
+                assignments[speaker] = SearchAssignment(
+                    speaker, reply, None,
+                    claimed=location or (previous.claimed if previous else None),
+                    reprompted=previous is not None,
+                )
+                losers.append(speaker)
+        return losers
+
+    async def run(self, speakers: List[str], game_state: Dict[str, Any]) -> List[SearchAssignment]:
+        """执行一轮并发搜证，按 speakers 的顺序返回结算结果"""
+        taken: Dict[str, str] = self.evidence_manager.get_location_search_status()
+        assignments: Dict[str, SearchAssignment] = {}
+
+        replies = await self._choose(speakers, game_state)
+        losers = self._claim(speakers, replies, taken, assignments)
+
+        free = [loc for loc in self.evidence_manager.get_known_locations() if loc not in taken]
+        if losers and free and self.collision_policy == "reprompt":
+            logger.info(f"[SEARCH] 地点冲突，重新选择: {losers}")
+            retry_state = dict(game_state, evidence_search_status=dict(taken))
+            replies = await self._choose(losers, retry_state)
+            losers = self._claim(losers, replies, taken, assignments)
+
+        # 仍冲突：按地点顺序改派到空闲地点
+        for speaker in losers:
+            free = [loc for loc in self.evidence_manager.get_known_locations() if loc not in taken]
+            if not free:
+                break
+            assignment = assignments[speaker]
+            assignment.location = free[0]
+            assignment.redirected = True
+            taken[free[0]] = speaker
+            logger.info(f"[SEARCH] {speaker} 改派到「{free[0]}」（原选择: {assignment.claimed}）")
+
+        return [assignments[speaker] for speaker in speakers if speaker in assignments]
+
+
+def search_order(available_characters: List[str], speaking_frequency: Dict[str, int]) -> List[str]:
+    """搜证顺序：搜证次数少的优先，相同时按角色顺序（确定性）"""
+    return sorted(available_characters, key=lambda c: speaking_frequency.get(c, 0))
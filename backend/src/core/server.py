@@ -3,6 +3,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+import asyncio
 import os
 import logging
 from dotenv import load_dotenv
@@ -28,6 +29,8 @@ from src.api.routes.file_routes import router as file_router
 from src.api.routes.tts_routes import router as tts_router
 # 导入用户认证路由
 from src.api.routes.auth_routes import router as auth_router
+# 导入运维管理路由
+from src.api.routes.admin_routes import router as admin_router
 
 from src.db.session import init_database, get_db_session
 
@@ -107,9 +110,20 @@ app.include_router(tts_router)
 app.include_router(asset_router)
 # 注册用户认证路由
 app.include_router(auth_router)
+# 注册运维管理路由
+app.include_router(admin_router)
 @app.websocket("/api/ws")
-async def websocket_endpoint(websocket: WebSocket, script_id: int = 1, token: str = None):
-    """WebSocket端点 - 支持token认证，基于用户身份自动管理会话"""
+async def websocket_endpoint(websocket: WebSocket, script_id: int = 1, token: str = None, state_protocol: str = "full",
+                             encoding: str = "json", mode: str = "play", session_id: str = None):
+    """WebSocket端点 - 支持token认证，基于用户身份自动管理会话
+
+    mode=spectate&session_id=<会话ID> 时以只读观战者身份加入（见 src/core/spectator_hub.py），
+    观战连接发送的消息被忽略，也不影响会话生命周期
+
+    state_protocol=delta 时，游戏状态以版本化增量补丁推送（见 src/core/state_sync.py）
+    encoding=msgpack 时，服务器以MessagePack二进制帧推送，客户端也可发送二进制帧（见 src/core/message_codec.py）
+    permessage-deflate 压缩由uvicorn在握手时与客户端协商（默认开启，WS_PER_MESSAGE_DEFLATE=false 关闭）
+    """
     from src.services.auth_service import AuthService
     import logging
     
@@ -147,13 +161,30 @@ async def websocket_endpoint(websocket: WebSocket, script_id: int = 1, token: st
         await websocket.close(code=1008, reason="Authentication required")
         return
     
+    if mode == "spectate":
+        if not await game_server.register_spectator(websocket, session_id, encoding):
+            return
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        finally:
+            await game_server.unregister_spectator(websocket)
+        return
+
     # 使用验证后的用户ID注册客户端
     user_id = getattr(current_user, 'id', None)
-    await game_server.register_client(websocket, script_id, user_id)
+    await game_server.register_client(websocket, script_id, user_id, state_protocol=state_protocol, encoding=encoding)
     
     try:
         while True:
-            data = await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes") or b""
             await game_server.handle_client_message(websocket, data)
     except WebSocketDisconnect:
         await game_server.unregister_client(websocket)
@@ -184,12 +215,46 @@ async def startup_event():
                 print(f"访客账户已就绪: {config.guest_username}")
             finally:
                 db.close()
+
+        # 多worker分片模式（SHARDING_ENABLED=true）
+        if config.sharding_config.enabled:
+            await game_server.start_sharding()
+            print(f"分片模式已启动: worker={game_server.shard_router.worker_id}")
+
+        # 空闲会话回收（SESSION_REAPER_ENABLED=false 可关闭）
+        game_server.start_background_tasks()
+
+        # 预热默认上游的LLM连接（LLM_POOL_PREWARM_CONNECTIONS>0 时，不阻塞启动）
+        from src.services.llm_service import get_shared_llm_service, llm_client_registry
+        if llm_client_registry.prewarm_connections > 0:
+            get_shared_llm_service()
+            asyncio.create_task(llm_client_registry.prewarm())
     except Exception as e:
         print(f"应用初始化失败: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时的清理"""
+    try:
+        await game_server.stop_background_tasks()
+        # 释放本worker持有的会话租约
+        await game_server.stop_sharding()
+    except Exception as e:
+        print(f"分片模式停止失败: {e}")
+    try:
+        # 关闭进程内共享的TTS管理器
+        from src.core.game_tts_manager import close_shared_tts_managers
+        await close_shared_tts_managers()
+    except Exception as e:
+        print(f"TTS管理器关闭失败: {e}")
+    try:
+        # 关闭进程内共享的LLM连接池
+        from src.services.llm_service import llm_client_registry
+        from src.services.llm_metrics import llm_metrics
+        await llm_client_registry.aclose()
+        llm_metrics.close()
+    except Exception as e:
+        print(f"LLM连接池关闭失败: {e}")
     try:
         # 关闭数据库连接池
         from src.db.session import db_manager
@@ -0,0 +1,213 @@
+"""会话Actor：按优先级通道串行调度单个会话的客户端命令
+
+WebSocket接收循环只负责把命令投递到所属会话的Actor，不再内联等待处理结果：
+  - CONTROL（阶段切换、编辑开关等）与 READ（状态/历史查询）
+    共用主工作协程，按 CONTROL > READ 的优先级、同优先级先进先出串行执行，
+    会话的 GameEngine 状态只在该协程内被命令修改
+  - HEAVY（开始/重置游戏、编辑指令、AI建议等LLM重活）在独立工作协程中逐个执行，
+    不会占用主通道，慢LLM调用期间查询与控制命令照常响应
+每条命令都有独立超时，可按 request_id / 命令名 / 发送方取消。
+"""
+import asyncio
+import itertools
+import logging
+import uuid
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class CommandLane(IntEnum):
+    """命令通道（数值越小优先级越高）"""
+    CONTROL = 0
+    READ = 1
+    HEAVY = 2
+
+
+@dataclass(eq=False)
+class SessionCommand:
+    """投递给会话Actor的一条命令"""
+    name: str
+    lane: CommandLane
+    run: Callable[[], Awaitable[Any]]
+    timeout: Optional[float] = None
+    owner: Any = None
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    future: Optional[asyncio.Future] = None
+    cancelled: bool = False
+    task: Optional[asyncio.Task] = None
+
+
+class SessionActor:
+    """单个会话的命令调度器"""
+
+    def __init__(
+        self,
+        session_id: str,
+        lane_timeouts: Optional[Dict[CommandLane, float]] = None,
+        on_failure: Optional[Callable[[SessionCommand, BaseException], Awaitable[None]]] = None,
+    ):
+        self.session_id = session_id
+        self.lane_timeouts: Dict[CommandLane, float] = dict(lane_timeouts or {})
+        self.on_failure = on_failure
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._heavy_queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._background: Set[asyncio.Task] = set()
+        self._pending: Set[SessionCommand] = set()
+        self._sequence = itertools.count()
+        self.stopped: bool = False
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._heavy_queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._main_worker(), name=f"session-actor-{self.session_id}"),
+            asyncio.create_task(self._heavy_worker(), name=f"session-actor-heavy-{self.session_id}"),
+        ]
+
+    @property
+    def pending_count(self) -> int:
+        """排队中与执行中的命令数"""
+        return len(self._pending)
+
+    def submit(
+        self,
+        name: str,
+        run: Callable[[], Awaitable[Any]],
+        lane: CommandLane = CommandLane.READ,
+        timeout: Optional[float] = None,
+        owner: Any = None,
+        request_id: Optional[str] = None,
+    ) -> asyncio.Future:
+        """投递命令并立即返回；返回的 Future 在命令完成、失败、超时或取消后结束"""
+        future = asyncio.get_running_loop().create_future()
+        if self.stopped:
+            future.set_exception(RuntimeError(f"会话 {self.session_id} 已停止"))
+            return future
+        self._ensure_started()
+        command = SessionCommand(
+            name=name,
+            lane=lane,
+            run=run,
+            timeout=timeout if timeout is not None else self.lane_timeouts.get(lane),
+            owner=owner,
+            future=future,
+        )
+        if request_id:
+            command.request_id = str(request_id)
+        self._pending.add(command)
+        if lane == CommandLane.HEAVY:
+            self._heavy_queue.put_nowait(command)
+        else:
+            self._queue.put_nowait((int(lane), next(self._sequence), command))
+        logger.debug(f"[ACTOR] 命令入队: 会话={self.session_id}, 命令={name}, 通道={lane.name}")
+        return future
+
+    def spawn(self, coro: Awaitable[Any], name: Optional[str] = None) -> asyncio.Task:
+        """启动由Actor持有的长期任务（如游戏主循环），停止Actor时一并取消"""
+        task = asyncio.ensure_future(coro)
+        if name:
+            task.set_name(f"{name}-{self.session_id}")
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def cancel(self, request_id: Optional[str] = None, name: Optional[str] = None, owner: Any = None) -> int:
+        """取消匹配的排队中/执行中命令，返回取消数量；不带条件时取消全部"""
+        count = 0
+        for command in list(self._pending):
+            if request_id is not None and command.request_id != str(request_id):
+                continue
+            if name is not None and command.name != name:
+                continue
+            if owner is not None and command.owner is not owner:
+                continue
+            # 命令内部发起的取消（如发送失败时注销自身客户端）不取消当前命令
+            if command.task is asyncio.current_task():
+                continue
+            command.cancelled = True
+            if command.task and not command.task.done():
+                command.task.cancel()
+            elif command.future and not command.future.done():
+                command.future.cancel()
+                self._pending.discard(command)
+            count += 1
+        if count:
+            logger.info(f"[ACTOR] 已取消命令: 会话={self.session_id}, 数量={count}")
+        return count
+
+    async def stop(self):
+        """停止Actor：取消全部命令、工作协程与后台任务"""
+        if self.stopped:
+            return
+        self.stopped = True
+        self.cancel()
+        tasks = [*self._workers, *self._background]
+        for task in tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        await asyncio.gather(*(t for t in tasks if t is not asyncio.current_task()), return_exceptions=True)
+        self._workers = []
+        logger.info(f"[ACTOR] 会话Actor已停止: {self.session_id}")
+
+    async def _main_worker(self):
+        while True:
+            _, _, command = await self._queue.get()
+            await self._execute(command)
+
+    async def _heavy_worker(self):
+        while True:
+            command = await self._heavy_queue.get()
+            await self._execute(command)
+
+    async def _execute(self, command: SessionCommand):
+        if command.cancelled:
+            return
+        command.task = asyncio.create_task(command.run())
+        try:
+            if command.timeout:
+                result = await asyncio.wait_for(command.task, timeout=command.timeout)
+            else:
+                result = await command.task
+            if not command.future.done():
+                command.future.set_result(result)
+        except asyncio.CancelledError as e:
+            # 工作协程自身被取消（Actor停止）时继续向上抛出
+            current = asyncio.current_task()
+            if current is not None and current.cancelling():
+                command.task.cancel()
+                if not command.future.done():
+                    command.future.cancel()
+                raise
+            logger.info(f"[ACTOR] 命令已取消: 会话={self.session_id}, 命令={command.name}")
+            if not command.future.done():
+                command.future.cancel()
+            await self._report(command, e)
+        except asyncio.TimeoutError as e:
+            logger.warning(f"[ACTOR] 命令执行超时({command.timeout}秒): 会话={self.session_id}, 命令={command.name}")
+            if not command.future.done():
+                command.future.set_exception(e)
+            await self._report(command, e)
+        except Exception as e:
+            logger.error(f"[ACTOR] 命令执行失败: 会话={self.session_id}, 命令={command.name}, 错误={e}")
+            if not command.future.done():
+                command.future.set_exception(e)
+            await self._report(command, e)
+        finally:
+            self._pending.discard(command)
+            # 避免无人等待的 Future 产生 "exception was never retrieved" 警告
+            if command.future.done() and not command.future.cancelled():
+                command.future.exception()
+
+    async def _report(self, command: SessionCommand, error: BaseException):
+        if self.on_failure is None:
+            return
+        try:
+            await self.on_failure(command, error)
+        except Exception as e:
+            logger.error(f"[ACTOR] 命令失败通知发送失败: 会话={self.session_id}, 错误={e}")
@@ -0,0 +1,238 @@
+"""跨worker会话消息总线
+
+分片模式下，客户端连接可能落在不持有会话的worker上，需要通过总线把
+客户端消息转发给会话所有者、再把所有者推送的帧送回连接所在的worker。
+
+提供两种实现：
+  - InMemorySessionBus：进程内总线，用于测试以及在同一进程内模拟多个worker
+  - LocalBrokerSessionBus：本机TCP中转，供同一台机器上的多个uvicorn worker进程使用；
+    第一个启动的worker在端口上监听充当中转站，其余worker作为客户端连接，
+    中转站所在worker退出后，其余worker会重连并自动接管监听
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+BusHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class SessionBus(ABC):
+    """会话消息总线抽象基类（按频道发布/订阅JSON消息）"""
+
+    async def start(self):
+        """建立连接（如需要）"""
+
+    async def close(self):
+        """关闭连接并清空订阅"""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        """向频道发布消息"""
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: BusHandler):
+        """订阅频道"""
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str):
+        """取消订阅频道"""
+
+    @staticmethod
+    async def _dispatch(handler: BusHandler, channel: str, message: Dict[str, Any]):
+        try:
+            await handler(message)
+        except Exception as e:
+            logger.error(f"[BUS] 处理总线消息失败: 频道={channel}, 错误={e}")
+
+
+class InMemorySessionBus(SessionBus):
+    """进程内总线；多个 GameWebSocketServer 共享同一实例即可模拟多worker"""
+
+    def __init__(self):
+        self._handlers: Dict[str, list[BusHandler]] = {}
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        # 经JSON往返复制，保证与跨进程总线相同的序列化语义
+        payload = json.loads(json.dumps(message, ensure_ascii=False, default=str))
+        for handler in list(self._handlers.get(channel, [])):
+            await self._dispatch(handler, channel, payload)
+
+    async def subscribe(self, channel: str, handler: BusHandler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def unsubscribe(self, channel: str):
+        self._handlers.pop(channel, None)
+
+    async def close(self):
+        self._handlers.clear()
+
+
+class LocalBrokerSessionBus(SessionBus):
+    """本机TCP中转总线（按行分隔的JSON）
+
+    客户端 → 中转站: {"op": "sub"|"unsub"|"pub", "channel": ..., "message": ...}
+    中转站 → 客户端: {"channel": ..., "message": ...}
+    """
+
+    RECONNECT_DELAY = 0.5
+    SUBSCRIBER_DRAIN_TIMEOUT = 5.0  # 中转站等待订阅者发送缓冲排空的上限，超时即断开该订阅者
+    STREAM_LIMIT = 16 * 1024 * 1024  # 单行上限（完整游戏状态帧可能较大）
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8790):
+        self.host = host
+        self.port = port
+        self._handlers: Dict[str, BusHandler] = {}
+        self._broker: Optional[asyncio.AbstractServer] = None
+        self._broker_subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self._closed = False
+
+    @property
+    def is_broker(self) -> bool:
+        """当前进程是否充当中转站"""
+        return self._broker is not None
+
+    async def start(self):
+        self._closed = False
+        await self._connect()
+
+    async def close(self):
+        self._closed = True
+        if self._reader_task:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        if self._broker:
+            self._broker.close()
+            for writers in self._broker_subscribers.values():
+                for writer in writers:
+                    writer.close()
+            self._broker_subscribers.clear()
+            self._broker = None
+        self._handlers.clear()
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        await self._send({"op": "pub", "channel": channel, "message": message})
+
+    async def subscribe(self, channel: str, handler: BusHandler):
+        self._handlers[channel] = handler
+        await self._send({"op": "sub", "channel": channel})
+
+    async def unsubscribe(self, channel: str):
+        self._handlers.pop(channel, None)
+        await self._send({"op": "unsub", "channel": channel})
+
+    async def _connect(self):
+        """连接中转站；端口无人监听时由本进程启动中转站"""
+        if self._broker is None:
+            try:
+                self._broker = await asyncio.start_server(
+                    self._serve_client, self.host, self.port, limit=self.STREAM_LIMIT
+                )
+                self.port = self._broker.sockets[0].getsockname()[1]
+                logger.info(f"[BUS] 本进程启动会话总线中转站: {self.host}:{self.port}")
+            except OSError:
+                logger.debug(f"[BUS] 中转站已存在，作为客户端连接: {self.host}:{self.port}")
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port, limit=self.STREAM_LIMIT
+        )
+        for channel in self._handlers:
+            await self._write_line({"op": "sub", "channel": channel})
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _send(self, frame: Dict[str, Any]):
+        if self._writer is None:
+            raise ConnectionError("会话总线未连接")
+        await self._write_line(frame)
+
+    async def _write_line(self, frame: Dict[str, Any]):
+        data = (json.dumps(frame, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        async with self._write_lock:
+            self._writer.write(data)
+            await self._writer.drain()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                handler = self._handlers.get(frame.get("channel"))
+                if handler:
+                    await self._dispatch(handler, frame["channel"], frame.get("message") or {})
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.error(f"[BUS] 读取总线消息失败: {e}")
+        if not self._closed:
+            logger.warning("[BUS] 与中转站的连接断开，尝试重连")
+            asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        self._writer = None
+        while not self._closed:
+            try:
+                await self._connect()
+                return
+            except OSError as e:
+                logger.warning(f"[BUS] 重连中转站失败: {e}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """中转站：按频道把发布的消息转发给订阅者"""
+        subscribed: Set[str] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                op, channel = frame.get("op"), frame.get("channel")
+                if op == "sub":
+                    self._broker_subscribers.setdefault(channel, set()).add(writer)
+                    subscribed.add(channel)
+                elif op == "unsub":
+                    self._broker_subscribers.get(channel, set()).discard(writer)
+                    subscribed.discard(channel)
+                elif op == "pub":
+                    data = (json.dumps({"channel": channel, "message": frame.get("message")},
+                                       ensure_ascii=False) + "\n").encode("utf-8")
+                    subscribers = list(self._broker_subscribers.get(channel, ()))
+                    for subscriber in subscribers:
+                        subscriber.write(data)
+                    await asyncio.gather(*(self._drain_subscriber(subscriber) for subscriber in subscribers))
+        except Exception as e:
+            logger.warning(f"[BUS] 中转站客户端连接异常: {e}")
+        finally:
+            for channel in subscribed:
+                self._broker_subscribers.get(channel, set()).discard(writer)
+            writer.close()
+
+    async def _drain_subscriber(self, subscriber: asyncio.StreamWriter):
+        """等待订阅者的发送缓冲排空；超时或出错的订阅者断开连接（其客户端会自动重连）"""
+        try:
+            await asyncio.wait_for(subscriber.drain(), self.SUBSCRIBER_DRAIN_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError, OSError) as e:
+            logger.warning(f"[BUS] 订阅者消费过慢或连接异常，断开: {type(e).__name__}")
+            for writers in self._broker_subscribers.values():
+                writers.discard(subscriber)
+            subscriber.close()
+
+
+def create_session_bus(bus_type: str, host: str = "127.0.0.1", port: int = 8790) -> SessionBus:
+    """按配置创建会话总线"""
+    if bus_type == "memory":
+        return InMemorySessionBus()
+    if bus_type == "local":
+        return LocalBrokerSessionBus(host, port)
+    raise ValueError(f"不支持的会话总线类型: {bus_type}")
@@ -0,0 +1,152 @@
+"""空闲会话休眠
+
+后台模式下的会话在客户端全部离开后仍会保留完整的 GameEngine、全部 CharacterAgent
+及其记忆和 GameTTSManager。回收器按两类条件把冷会话休眠为磁盘快照：
+  - TTL：无客户端的会话超过存活时间（后台运行中的游戏使用更长的 background_ttl）
+  - 内存预算：全部会话的估算内存超出预算时，按最久未活跃顺序提前休眠空闲会话；
+    后台运行中的游戏不参与预算回收，只在超过 background_ttl 后休眠
+有客户端连接或处于剧本编辑模式的会话不会被回收。
+
+快照为 gzip 压缩的 JSON（<hibernation_dir>/<session_id>.json.gz），包含引擎状态、
+游戏计划与步骤索引、角色记忆以及最近的事件/聊天。会话所有者重连时由
+GameWebSocketServer.attach_client 透明恢复。
+"""
+import asyncio
+import gzip
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from src.core.websocket_server import GameSession, GameWebSocketServer
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# 内存估算的固定开销（字节，粗略值，仅用于预算比较）
+_SESSION_OVERHEAD = 256 * 1024  # 引擎、管理器、TTS管理器、Actor
+_AGENT_OVERHEAD = 64 * 1024  # 单个角色Agent（身份、导演、提示词）
+_ENTRY_OVERHEAD = 120  # 单条事件日志记录（slots对象）
+
+
+def estimate_session_bytes(session: 'GameSession') -> int:
+    """估算会话占用的内存（字节）"""
+    engine = session.game_engine
+    total = _SESSION_OVERHEAD + _AGENT_OVERHEAD * len(engine.agents)
+    log = engine.log
+    for i in range(len(log)):
+        total += _ENTRY_OVERHEAD + sys.getsizeof(log.record_at(i).content)
+    for memory in engine.agents.export_memories().values():
+        for _, content in memory.get("working", []):
+            total += sys.getsizeof(content)
+        for content, _ in memory.get("personal_log", []):
+            total += sys.getsizeof(content)
+    return total
+
+
+class HibernationStore:
+    """会话快照的本地文件存储"""
+
+    def __init__(self, directory: str = ".data/hibernation"):
+        self.directory = Path(directory)
+
+    def _path(self, session_id: str) -> Path:
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)
+        return self.directory / f"{safe_id}.json.gz"
+
+    def exists(self, session_id: str) -> bool:
+        return self._path(session_id).exists()
+
+    def save(self, session_id: str, snapshot: Dict[str, Any]) -> int:
+        """写入快照，返回压缩后的字节数"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(session_id)
+        data = gzip.compress(json.dumps(snapshot, ensure_ascii=False, default=str).encode("utf-8"))
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        return len(data)
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(session_id)
+        if not path.exists():
+            return None
+        return json.loads(gzip.decompress(path.read_bytes()).decode("utf-8"))
+
+    def delete(self, session_id: str):
+        self._path(session_id).unlink(missing_ok=True)
+
+
+class SessionReaper:
+    """空闲会话回收器：按TTL与内存预算选出冷会话并交由服务器休眠"""
+
+    def __init__(self, server: 'GameWebSocketServer', reaper_config: Any):
+        self.server = server
+        self.config = reaper_config
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and self.config.enabled:
+            self._task = asyncio.create_task(self._run(), name="session-reaper")
+            logger.info(f"[REAPER] 空闲会话回收已启动: 间隔={self.config.interval}s, "
+                        f"预算={self.config.memory_budget_mb}MB")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.config.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"[REAPER] 回收巡检失败: {e}")
+
+    def _is_idle(self, session: 'GameSession') -> bool:
+        return not session.clients and not session.is_editing_mode
+
+    def select(self, now: Optional[float] = None) -> List[str]:
+        """选出需要休眠的会话：先取超过TTL的，再按预算补充最久未活跃、且游戏未在运行的空闲会话"""
+        now = time.monotonic() if now is None else now
+        last_active = self.server.session_last_active
+        idle = sorted(
+            (sid for sid, session in self.server.sessions.items() if self._is_idle(session)),
+            key=lambda sid: last_active.get(sid, 0.0),
+        )
+        selected: List[str] = []
+        for session_id in idle:
+            session = self.server.sessions[session_id]
+            ttl = self.config.background_ttl if session.is_game_running else self.config.idle_ttl
+            if now - last_active.get(session_id, 0.0) >= ttl:
+                selected.append(session_id)
+
+        budget = self.config.memory_budget_mb * 1024 * 1024
+        sizes = {sid: estimate_session_bytes(s) for sid, s in self.server.sessions.items()}
+        total = sum(size for sid, size in sizes.items() if sid not in selected)
+        for session_id in idle:
+            if total <= budget:
+                break
+            if session_id not in selected and not self.server.sessions[session_id].is_game_running:
+                selected.append(session_id)
+                total -= sizes[session_id]
+        if total > budget:
+            logger.warning(f"[REAPER] 活跃会话估算内存仍超出预算: {total / 1024 / 1024:.1f}MB")
+        return selected
+
+    async def sweep(self) -> List[str]:
+        """执行一次回收，返回已休眠的会话ID"""
+        hibernated = []
+        for session_id in self.select():
+            if await self.server.hibernate_session(session_id):
+                hibernated.append(session_id)
+        if hibernated:
+            logger.info(f"[REAPER] 本轮休眠会话 {len(hibernated)} 个，剩余内存会话 {len(self.server.sessions)} 个")
+        return hibernated
@@ -0,0 +1,317 @@
+"""多worker会话分片
+
+会话所有权通过 game_sessions 表上的租约（owner_worker_id + lease_expires_at）分配，
+同一时刻只有持有租约的worker运行该会话的 GameEngine。
+
+连接落在非所有者worker上时：
+  - 连接所在worker（origin）只保留真实socket，把客户端消息经总线转发给所有者
+  - 所有者为该连接创建 RemoteClientProxy 加入会话，后续广播照常走出站队列，
+    代理把编码好的帧经总线送回 origin，由 origin 写入真实socket
+  - 观战连接同样转发，所有者把代理作为观战者加入会话的 SpectatorHub（观战不会获取租约）
+
+总线频道按worker划分：worker:<worker_id>，消息类型 kind 为
+attach / message / detach（origin → 所有者）与 deliver / close（所有者 → origin）。
+
+所有者worker崩溃或失去租约时不会再发 close，origin 在续期周期里核对被转发会话的
+租约持有者，持有者已变更或租约过期时以 1012 关闭连接，由客户端重连后重新路由。
+"""
+import asyncio
+import base64
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+from src.core.session_bus import SessionBus
+from src.db.repositories.game_session_repository import GameSessionRepository
+from src.db.session import db_manager
+
+if TYPE_CHECKING:
+    from src.core.websocket_server import GameWebSocketServer
+
+logger = logging.getLogger(__name__)
+
+
+def generate_worker_id() -> str:
+    """生成worker标识：主机名:进程号:随机后缀"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def worker_channel(worker_id: str) -> str:
+    return f"worker:{worker_id}"
+
+
+class SessionLeaseManager:
+    """基于 game_sessions 表的会话租约管理"""
+
+    def __init__(self, worker_id: str, ttl_seconds: float = 30.0):
+        self.worker_id = worker_id
+        self.ttl_seconds = ttl_seconds
+
+    def acquire(self, session_id: str) -> bool:
+        with db_manager.session_scope() as db:
+            return GameSessionRepository(db).acquire_lease(session_id, self.worker_id, self.ttl_seconds)
+
+    def owner(self, session_id: str) -> Optional[str]:
+        with db_manager.session_scope() as db:
+            return GameSessionRepository(db).get_lease_owner(session_id)
+
+    def renew(self, session_ids: List[str]) -> List[str]:
+        with db_manager.session_scope() as db:
+            return GameSessionRepository(db).renew_leases(session_ids, self.worker_id, self.ttl_seconds)
+
+    def release(self, session_id: str) -> bool:
+        with db_manager.session_scope() as db:
+            return GameSessionRepository(db).release_lease(session_id, self.worker_id)
+
+
+class RemoteClientProxy:
+    """所有者worker上代表远端连接的伪socket，发送的帧经总线送回连接所在worker"""
+
+    def __init__(self, bus: SessionBus, origin_worker: str, client_id: str):
+        self.bus = bus
+        self.origin_worker = origin_worker
+        self.client_id = client_id
+        self.remote_address = f"{origin_worker}/{client_id}"
+
+    async def send_text(self, data: str):
+        await self.bus.publish(worker_channel(self.origin_worker), {
+            "kind": "deliver", "client_id": self.client_id, "frame": data
+        })
+
+    async def send_bytes(self, data: bytes):
+        # 总线消息为JSON，二进制帧（MessagePack）以base64传输
+        await self.bus.publish(worker_channel(self.origin_worker), {
+            "kind": "deliver", "client_id": self.client_id,
+            "frame": base64.b64encode(data).decode("ascii"), "binary": True
+        })
+
+    async def close(self, code: int = 1000):
+        await self.bus.publish(worker_channel(self.origin_worker), {
+            "kind": "close", "client_id": self.client_id, "code": code
+        })
+
+
+@dataclass
+class ForwardedClient:
+    """连接所在worker上记录的被转发连接"""
+    client_id: str
+    session_id: str
+    owner_worker: str
+
+
+class ShardRouter:
+    """分片路由：租约获取/续期与跨worker连接转发"""
+
+    def __init__(self, server: 'GameWebSocketServer', bus: SessionBus, lease_manager: Any,
+                 worker_id: str, lease_ttl: float = 30.0):
+        self.server = server
+        self.bus = bus
+        self.lease_manager = lease_manager
+        self.worker_id = worker_id
+        self.lease_ttl = lease_ttl
+        # 本worker持有租约的会话
+        self.leased_sessions: set[str] = set()
+        # origin侧：真实socket <-> 转发记录
+        self.forwarded: Dict[Any, ForwardedClient] = {}
+        self._forwarded_by_id: Dict[str, Any] = {}
+        # 所有者侧：(origin, client_id) -> 代理
+        self.proxies: Dict[Tuple[str, str], RemoteClientProxy] = {}
+        self._renew_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.bus.start()
+        await self.bus.subscribe(worker_channel(self.worker_id), self._on_bus_message)
+        self._renew_task = asyncio.create_task(self._renew_loop())
+        logger.info(f"[SHARD] 分片模式已启动: worker={self.worker_id}")
+
+    async def stop(self):
+        if self._renew_task:
+            self._renew_task.cancel()
+            self._renew_task = None
+        for session_id in list(self.leased_sessions):
+            await self.release(session_id)
+        await self.bus.close()
+        logger.info(f"[SHARD] 分片模式已停止: worker={self.worker_id}")
+
+    async def claim(self, session_id: str) -> Optional[str]:
+        """尝试持有会话；返回 None 表示由本worker运行，否则返回所有者worker标识"""
+        if session_id in self.leased_sessions and session_id in self.server.sessions:
+            return None
+        if await asyncio.to_thread(self.lease_manager.acquire, session_id):
+            self.leased_sessions.add(session_id)
+            logger.info(f"[SHARD] 获取会话租约: 会话={session_id}, worker={self.worker_id}")
+            return None
+        owner = await asyncio.to_thread(self.lease_manager.owner, session_id)
+        if owner is None or owner == self.worker_id:
+            # 租约恰好在两次查询之间过期，重试一次
+            if await asyncio.to_thread(self.lease_manager.acquire, session_id):
+                self.leased_sessions.add(session_id)
+                return None
+            owner = await asyncio.to_thread(self.lease_manager.owner, session_id)
+        return owner
+
+    async def release(self, session_id: str):
+        if session_id not in self.leased_sessions:
+            return
+        self.leased_sessions.discard(session_id)
+        try:
+            await asyncio.to_thread(self.lease_manager.release, session_id)
+            logger.info(f"[SHARD] 释放会话租约: 会话={session_id}")
+        except Exception as e:
+            logger.error(f"[SHARD] 释放会话租约失败: 会话={session_id}, 错误={e}")
+
+    def is_forwarded(self, websocket: Any) -> bool:
+        return websocket in self.forwarded
+
+    async def owner_of(self, session_id: str) -> Optional[str]:
+        """查询会话当前的所有者worker（无人持有时为 None）"""
+        return await asyncio.to_thread(self.lease_manager.owner, session_id)
+
+    async def forward_attach(self, websocket: Any, session_id: str, owner_worker: str, script_id: Optional[int],
+                             user_id: Optional[int], state_protocol: str, encoding: str = "json",
+                             spectator: bool = False):
+        """把连接挂到所有者worker上的会话（spectator 为 True 时以观战者身份加入）"""
+        client_id = uuid.uuid4().hex
+        self.forwarded[websocket] = ForwardedClient(client_id, session_id, owner_worker)
+        self._forwarded_by_id[client_id] = websocket
+        self.server._open_connection(websocket)
+        logger.info(f"[SHARD] 转发连接到会话所有者: 会话={session_id}, 所有者={owner_worker}")
+        await self.bus.publish(worker_channel(owner_worker), {
+            "kind": "attach",
+            "origin": self.worker_id,
+            "client_id": client_id,
+            "session_id": session_id,
+            "script_id": script_id,
+            "user_id": user_id,
+            "state_protocol": state_protocol,
+            "encoding": encoding,
+            "spectator": spectator,
+        })
+
+    async def forward_message(self, websocket: Any, message: Union[str, bytes]):
+        forwarded = self.forwarded[websocket]
+        payload: Dict[str, Any] = {"kind": "message", "origin": self.worker_id, "client_id": forwarded.client_id}
+        if isinstance(message, (bytes, bytearray)):
+            payload.update(data=base64.b64encode(message).decode("ascii"), binary=True)
+        else:
+            payload["data"] = message
+        await self.bus.publish(worker_channel(forwarded.owner_worker), payload)
+
+    async def forward_detach(self, websocket: Any):
+        forwarded = self.forwarded.pop(websocket, None)
+        if not forwarded:
+            return
+        self._forwarded_by_id.pop(forwarded.client_id, None)
+        await self.server._close_connection(websocket)
+        try:
+            await self.bus.publish(worker_channel(forwarded.owner_worker), {
+                "kind": "detach", "origin": self.worker_id, "client_id": forwarded.client_id
+            })
+        except Exception as e:
+            logger.warning(f"[SHARD] 通知所有者断开连接失败: {e}")
+
+    async def _on_bus_message(self, message: Dict[str, Any]):
+        kind = message.get("kind")
+        if kind == "deliver":
+            websocket = self._forwarded_by_id.get(message.get("client_id"))
+            if websocket is not None:
+                connection = self.server.connections.get(websocket)
+                if connection:
+                    connection.enqueue(self._frame_of(message.get("frame", ""), message))
+        elif kind == "close":
+            websocket = self._forwarded_by_id.get(message.get("client_id"))
+            if websocket is not None:
+                await self.forward_detach(websocket)
+                try:
+                    await websocket.close(code=message.get("code", 1000))
+                except Exception:
+                    pass
+        elif kind == "attach":
+            await self._attach_remote(message)
+        elif kind == "message":
+            proxy = self.proxies.get((message.get("origin"), message.get("client_id")))
+            if proxy is not None:
+                await self.server.handle_client_message(proxy, self._frame_of(message.get("data", ""), message))
+        elif kind == "detach":
+            proxy = self.proxies.pop((message.get("origin"), message.get("client_id")), None)
+            if proxy is not None and proxy in self.server.spectator_sessions:
+                await self.server.unregister_spectator(proxy)
+            elif proxy is not None:
+                await self.server.unregister_client(proxy)
+
+    async def _attach_remote(self, message: Dict[str, Any]):
+        origin, client_id = message["origin"], message["client_id"]
+        session_id = message["session_id"]
+        proxy = RemoteClientProxy(self.bus, origin, client_id)
+        if message.get("spectator"):
+            if session_id not in self.server.sessions:
+                # 会话已不在本worker运行（已结束、休眠或租约转移），由客户端重新连接
+                logger.warning(f"[SHARD] 观战的会话不在本worker运行，拒绝: 会话={session_id}")
+                await proxy.close(code=4404)
+                return
+            self.proxies[(origin, client_id)] = proxy
+            await self.server.register_spectator(proxy, session_id, message.get("encoding") or "json")
+            return
+        if await self.claim(session_id) is not None:
+            # 租约已转移（例如本worker刚失去租约），让 origin 断开后由客户端重连重新路由
+            logger.warning(f"[SHARD] 收到非本worker持有会话的连接，拒绝: 会话={session_id}")
+            await proxy.close(code=1012)
+            return
+        self.proxies[(origin, client_id)] = proxy
+        await self.server.attach_client(
+            proxy,
+            session_id,
+            script_id=message.get("script_id") or 1,
+            user_id=message.get("user_id"),
+            state_protocol=message.get("state_protocol") or "full",
+            encoding=message.get("encoding") or "json",
+        )
+
+    @staticmethod
+    def _frame_of(data: str, message: Dict[str, Any]) -> Union[str, bytes]:
+        return base64.b64decode(data) if message.get("binary") else data
+
+    async def _renew_loop(self):
+        interval = max(1.0, self.lease_ttl / 3)
+        while True:
+            await asyncio.sleep(interval)
+            await self._renew_leases()
+            await self.check_forwarded_owners()
+
+    async def _renew_leases(self):
+        session_ids = [sid for sid in self.leased_sessions if sid in self.server.sessions]
+        if not session_ids:
+            return
+        try:
+            kept = set(await asyncio.to_thread(self.lease_manager.renew, session_ids))
+        except Exception as e:
+            logger.error(f"[SHARD] 续期会话租约失败: {e}")
+            return
+        for session_id in set(session_ids) - kept:
+            logger.warning(f"[SHARD] 会话租约已被其他worker接管，停止本地会话: {session_id}")
+            self.leased_sessions.discard(session_id)
+            await self.server.drop_session(session_id)
+
+    async def check_forwarded_owners(self):
+        """origin侧核对被转发连接的所有者是否仍持有租约，失效的连接以 1012 关闭"""
+        owners: Dict[str, Optional[str]] = {}
+        for websocket, forwarded in list(self.forwarded.items()):
+            session_id = forwarded.session_id
+            if session_id not in owners:
+                try:
+                    owners[session_id] = await self.owner_of(session_id)
+                except Exception as e:
+                    logger.error(f"[SHARD] 查询会话所有者失败: 会话={session_id}, 错误={e}")
+                    owners[session_id] = forwarded.owner_worker
+            if owners[session_id] == forwarded.owner_worker:
+                continue
+            logger.warning(f"[SHARD] 会话所有者已失效，关闭转发连接: 会话={session_id}, "
+                           f"原所有者={forwarded.owner_worker}, 当前所有者={owners[session_id]}")
+            await self.forward_detach(websocket)
+            try:
+                await websocket.close(code=1012)
+            except Exception:
+                pass
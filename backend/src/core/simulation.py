@@ -0,0 +1,377 @@
+"""无头模拟：脱离 WebSocket / 真实 LLM / TTS 驱动 GameEngine 跑完整局游戏
+
+用于测量引擎自身开销（局/秒、发言/秒、各阶段 CPU 时间），并在扩容前发现性能回归。
+同一事件循环内并发运行多局游戏；LLM 由确定性的桩服务替代，延迟分布可配置。
+
+Python 接口::
+
+    report = await run_simulation(load_fixture("scripts/fixtures/simulation_script.json"),
+                                  games=50, concurrency=50,
+                                  latency=LatencyModel.parse("lognormal:-3,0.5"))
+    print(report.to_dict())
+
+命令行入口见 ``backend/scripts/simulate.py``。
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from ..schemas.game_phase import GamePhaseEnum
+from ..services.llm_service import BaseLLMService, LLMMessage, LLMResponse
+from .game_engine import GameEngine
+from .pacing import PacingScheduler, TURBO_PROFILE
+
+logger = logging.getLogger(__name__)
+
+# 单局游戏最多推进的阶段数（防止计划异常时死循环）
+MAX_PHASE_STEPS = 64
+
+_SPEAKER_PATTERN = re.compile(r"你是剧本杀游戏中的角色：(\S+)")
+
+
+# ---------------------------------------------------------------------------
+# 延迟分布
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """LLM 调用延迟分布（秒）
+
+    - fixed:a          固定 a 秒
+    - uniform:a,b      [a, b] 均匀分布
+    - lognormal:mu,sigma  对数正态分布（mu/sigma 为 ln 秒）
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    KINDS = ("fixed", "uniform", "lognormal")
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """解析形如 ``uniform:0.05,0.2`` 的描述"""
+        kind, _, params = spec.partition(":")
+        kind = kind.strip().lower()
+        if kind not in cls.KINDS:
+            raise ValueError(f"未知的延迟分布: {kind}（可选 {', '.join(cls.KINDS)}）")
+        values = [float(v) for v in params.split(",") if v.strip()] if params else []
+        if kind == "fixed":
+            return cls(kind, values[0] if values else 0.0)
+        if len(values) != 2:
+            raise ValueError(f"{kind} 延迟分布需要两个参数: {spec}")
+        return cls(kind, values[0], values[1])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(self.a, self.b)
+        return self.a
+
+
+# ---------------------------------------------------------------------------
+# 确定性 LLM 桩服务
+# ---------------------------------------------------------------------------
+
+class StubLLMService(BaseLLMService):
+    """确定性 LLM 桩：同一 seed 下相同的输入总是得到相同的回复与延迟
+
+    回复内容由发言者与剧本中的角色/地点拼成，保证搜证能解析出地点、投票能解析出目标；
+    GM 规划请求不返回 JSON，GMAgent 会回退到规则计划。
+    """
+
+    def __init__(self, seed: int = 0, latency: Optional[LatencyModel] = None,
+                 characters: Optional[List[str]] = None, locations: Optional[List[str]] = None):
+        self.seed = seed
+        self.latency = latency or LatencyModel()
+        self.characters = list(characters or [])
+        self.locations = list(locations or [])
+        self.calls = 0
+        self.completion_tokens = 0
+
+    @classmethod
+    def for_script(cls, script_data: Dict[str, Any], seed: int = 0,
+                   latency: Optional[LatencyModel] = None) -> "StubLLMService":
+        """按剧本中的角色与地点构造桩服务"""
+        characters = [c["name"] for c in script_data.get("characters", []) if not c.get("is_victim")]
+        locations = [loc["name"] for loc in script_data.get("locations", []) if loc.get("name")]
+        for ev in script_data.get("evidence", []):
+            if ev.get("location") and ev["location"] not in locations:
+                locations.append(ev["location"])
+        return cls(seed=seed, latency=latency, characters=characters, locations=locations)
+
+    def _rng(self, messages: List[LLMMessage]) -> random.Random:
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(str(self.seed).encode())
+        for msg in messages:
+            digest.update(msg.role.encode())
+            digest.update(msg.content.encode())
+        return random.Random(digest.digest())
+
+    def _reply(self, messages: List[LLMMessage], rng: random.Random) -> str:
+        system = messages[0].content if messages and messages[0].role == "system" else ""
+        # 对话流控制器选人：只返回一个角色名
+        if "只返回一个角色名字" in system and self.characters:
+            return rng.choice(self.characters)
+        match = _SPEAKER_PATTERN.search(system)
+        speaker = match.group(1) if match else ""
+        others = [name for name in self.characters if name != speaker] or ["大家"]
+        target = rng.choice(others)
+        parts = [f"我是{speaker or '玩家'}。"]
+        if self.locations:
+            parts.append(f"我去{rng.choice(self.locations)}看看。")
+        parts.append(f"我觉得{target}的说法有问题，我投票给{target}。")
+        return "".join(parts)
+
+    async def chat_completion(self, messages: List[LLMMessage], **kwargs) -> LLMResponse:
+        rng = self._rng(messages)
+        delay = self.latency.sample(rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        content = self._reply(messages, rng)
+        self.calls += 1
+        self.completion_tokens += len(content)
+        return LLMResponse(content=content, usage={"completion_tokens": len(content)}, model="stub")
+
+    async def chat_completion_stream(self, messages: List[LLMMessage], **kwargs) -> AsyncGenerator[str, None]:
+        yield (await self.chat_completion(messages, **kwargs)).content
+
+
+# ---------------------------------------------------------------------------
+# 分阶段 CPU 计量
+# ---------------------------------------------------------------------------
+
+class _StageProbe:
+    """一局游戏的阶段计时器；通过 contextvar 传给该局派生出的所有任务
+
+    单线程事件循环中同一局的任务不会交错执行，因此切换阶段时可以把当前步
+    已消耗的 CPU 时间直接结算给旧阶段。
+    """
+    __slots__ = ("stage", "totals", "mark")
+
+    def __init__(self, stage: str, totals: Dict[str, float]):
+        self.stage = stage
+        self.totals = totals
+        self.mark = time.thread_time()
+
+    def charge(self):
+        now = time.thread_time()
+        self.totals[self.stage] = self.totals.get(self.stage, 0.0) + (now - self.mark)
+        self.mark = now
+
+    def switch(self, stage: str):
+        self.charge()
+        self.stage = stage
+
+
+_stage_probe: contextvars.ContextVar[Optional[_StageProbe]] = contextvars.ContextVar(
+    "simulation_stage_probe", default=None
+)
+
+
+class _CpuMeteredCoroutine:
+    """逐步驱动协程，并把每一步的线程 CPU 时间计入所属局的当前阶段"""
+    __slots__ = ("_coro", "_totals")
+
+    def __init__(self, coro, totals: Dict[str, float]):
+        self._coro = coro
+        self._totals = totals
+
+    def _finish_step(self, started: float):
+        probe = _stage_probe.get()
+        if probe is not None:
+            probe.charge()
+        else:
+            self._totals["other"] = self._totals.get("other", 0.0) + (time.thread_time() - started)
+
+    def __await__(self):
+        coro = self._coro
+        send_value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            started = time.thread_time()
+            probe = _stage_probe.get()
+            if probe is not None:
+                probe.mark = started
+            try:
+                if error is not None:
+                    yielded = coro.throw(error)
+                else:
+                    yielded = coro.send(send_value)
+            except StopIteration as stop:
+                self._finish_step(started)
+                return stop.value
+            except BaseException:
+                self._finish_step(started)
+                raise
+            self._finish_step(started)
+            try:
+                send_value, error = (yield yielded), None
+            except BaseException as exc:
+                send_value, error = None, exc
+
+
+async def _metered(coro, totals: Dict[str, float]):
+    return await _CpuMeteredCoroutine(coro, totals)
+
+
+# ---------------------------------------------------------------------------
+# 运行
+# ---------------------------------------------------------------------------
+
+@dataclass
+class GameResult:
+    """单局模拟结果"""
+    turns: int = 0
+    turns_saved: int = 0
+    phases: int = 0
+    wall_seconds: float = 0.0
+    ended: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class SimulationReport:
+    """一次模拟的汇总报告"""
+    games: int
+    completed: int
+    failed: int
+    concurrency: int
+    wall_seconds: float
+    cpu_seconds: float
+    turns: int
+    llm_calls: int
+    turns_saved: int = 0
+    stage_cpu_seconds: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def games_per_second(self) -> float:
+        return self.completed / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "games": self.games,
+            "completed": self.completed,
+            "failed": self.failed,
+            "concurrency": self.concurrency,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "games_per_second": round(self.games_per_second, 3),
+            "turns_per_second": round(self.turns_per_second, 3),
+            "turns": self.turns,
+            "turns_saved": self.turns_saved,
+            "llm_calls": self.llm_calls,
+            "stage_cpu_seconds": {
+                stage: round(seconds, 4)
+                for stage, seconds in sorted(self.stage_cpu_seconds.items(), key=lambda kv: -kv[1])
+            },
+        }
+
+
+def load_fixture(path: str) -> Dict[str, Any]:
+    """读取剧本夹具（与 GameEngine.script_data 结构相同的 JSON）"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def run_game(script_data: Dict[str, Any], llm: BaseLLMService,
+                   stage_cpu: Optional[Dict[str, float]] = None) -> GameResult:
+    """无头跑完一局：initialize_agents → run_phase/next_phase 直到 ENDED（与 game_loop 的推进顺序一致）
+
+    stage_cpu 不为空且运行在 run_simulation 的任务工厂下时，各阶段 CPU 时间累加到其中。
+    """
+    probe = _StageProbe("initialize", stage_cpu if stage_cpu is not None else {})
+    _stage_probe.set(probe)
+    result = GameResult()
+    started = time.perf_counter()
+
+    engine = GameEngine(pacer=PacingScheduler(TURBO_PROFILE), llm=llm)
+    engine.script_data = script_data
+    engine._init_components()
+    await engine.initialize_agents()
+
+    while engine.current_phase != GamePhaseEnum.ENDED and result.phases < MAX_PHASE_STEPS:
+        phase = engine.current_phase
+        probe.switch(phase.value.lower())
+        actions = await engine.run_phase()
+        result.turns += sum(1 for a in actions if a.get("type") != "background")
+        if phase == GamePhaseEnum.VOTING:
+            await engine.process_voting()
+        if phase == GamePhaseEnum.REVELATION:
+            engine.get_game_result()
+        result.phases += 1
+        probe.switch("transition")
+        await engine.next_phase()
+
+    result.ended = engine.current_phase == GamePhaseEnum.ENDED
+    result.turns_saved = engine.turns_saved
+    result.wall_seconds = time.perf_counter() - started
+    return result
+
+
+async def run_simulation(script_data: Dict[str, Any], games: int = 10, concurrency: int = 10,
+                         latency: Optional[LatencyModel] = None, seed: int = 0) -> SimulationReport:
+    """在当前事件循环中并发运行多局游戏并汇总吞吐与分阶段 CPU 时间
+
+    所有局共享一个 StubLLMService；分阶段 CPU 时间通过任务工厂逐步计量，
+    包括引擎内部派生的任务（推测执行、批量生成等），未归属任何局的开销计为 ``other``。
+    """
+    llm = StubLLMService.for_script(script_data, seed=seed, latency=latency)
+    random.seed(seed)
+    stage_cpu: Dict[str, float] = {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    loop = asyncio.get_running_loop()
+    previous_factory = loop.get_task_factory()
+
+    def task_factory(loop, coro, **kwargs):
+        wrapped = _metered(coro, stage_cpu)
+        if previous_factory is not None:
+            return previous_factory(loop, wrapped, **kwargs)
+        return asyncio.Task(wrapped, loop=loop, **kwargs)
+
+    async def one_game(index: int) -> GameResult:
+        async with semaphore:
+            try:
+                return await run_game(script_data, llm, stage_cpu)
+            except Exception as exc:
+                logger.error(f"[SIM] 第 {index} 局模拟失败: {exc}")
+                return GameResult(error=str(exc))
+
+    loop.set_task_factory(task_factory)
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        results = await asyncio.gather(*(one_game(i) for i in range(games)))
+    finally:
+        loop.set_task_factory(previous_factory)
+    wall_seconds = time.perf_counter() - wall_started
+    cpu_seconds = time.process_time() - cpu_started
+
+    completed = sum(1 for r in results if r.ended)
+    report = SimulationReport(
+        games=games,
+        completed=completed,
+        failed=games - completed,
+        concurrency=concurrency,
+        wall_seconds=wall_seconds,
+        cpu_seconds=cpu_seconds,
+        turns=sum(r.turns for r in results),
+        llm_calls=llm.calls,
+        turns_saved=sum(r.turns_saved for r in results),
+        stage_cpu_seconds=stage_cpu,
+    )
+    logger.info(f"[SIM] {completed}/{games} 局完成, {report.games_per_second:.2f} 局/秒, "
+                f"{report.turns_per_second:.1f} 发言/秒")
+    return report
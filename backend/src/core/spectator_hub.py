@@ -0,0 +1,210 @@
+"""观战广播中心
+
+观战者不是会话客户端：不进入 GameSession.clients，不参与命令调度，
+断开、剔除或全部离开都不会影响会话生命周期（清理、后台运行、休眠回收）。
+
+每个被观战的会话有一个 SpectatorHub：
+  - 保存最近消息尾部（tail），与按需生成、按编码缓存的快照一起组成 spectator_snapshot，
+    新观战者加入（或落后过多被重置）时先收到快照
+  - 每条广播每种编码只序列化一次，再分发给各观战连接
+  - 高频的 game_state_update / public_chat_update 可合并：观战者尚未发出的旧帧
+    被新帧替代，落后的观战者只会收到最新状态
+  - 其余消息（ai_action、phase_changed 等）逐条保留；积压超过上限时清空队列，
+    改为补发一次最新快照，而不是剔除观战者
+  - 流式发言的增量文本/分句语音帧不发给观战者：发言结束时的 ai_action 已带完整文本与语音分段
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from src.core.message_codec import JSON_ENCODING, Frame, encode_frame
+
+logger = logging.getLogger(__name__)
+
+CONFLATED_TYPES = frozenset({"game_state_update", "public_chat_update"})
+# 携带完整游戏状态的消息，快照已包含其内容，不进入 tail
+STATE_TYPES = frozenset({"phase_changed", "game_started"})
+# 流式发言的逐段帧，观战者只接收最终的 ai_action
+STREAM_TYPES = frozenset({"ai_action_delta", "ai_action_audio"})
+
+
+class _Entry:
+    __slots__ = ("message_type", "frame", "alive")
+
+    def __init__(self, message_type: str, frame: Frame):
+        self.message_type = message_type
+        self.frame = frame
+        self.alive = True
+
+
+class SpectatorConnection:
+    """单个观战者的出站通道（带合并的有界队列）"""
+
+    def __init__(self, websocket: Any, hub: 'SpectatorHub', encoding: str = JSON_ENCODING,
+                 max_pending: int = 64, send_timeout: float = 10.0):
+        self.websocket = websocket
+        self.hub = hub
+        self.encoding = encoding
+        self.max_pending = max(1, max_pending)
+        self.send_timeout = send_timeout
+        self.closed = False
+        self.needs_snapshot = True
+        self.conflated_count = 0
+        self.resync_count = 0
+        self._entries: Deque[_Entry] = deque()
+        self._latest: Dict[str, _Entry] = {}
+        self._pending = 0  # 队列中不可合并的帧数
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._writer_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    def offer(self, message_type: str, frame: Frame):
+        """放入一帧；可合并类型会替换尚未发送的同类型旧帧"""
+        if self.closed:
+            return
+        if message_type in CONFLATED_TYPES:
+            previous = self._latest.get(message_type)
+            if previous is not None:
+                previous.alive = False
+                self.conflated_count += 1
+            entry = _Entry(message_type, frame)
+            self._latest[message_type] = entry
+            self._entries.append(entry)
+        elif self._pending >= self.max_pending:
+            self._resync()
+            return
+        else:
+            self._entries.append(_Entry(message_type, frame))
+            self._pending += 1
+        self._wakeup.set()
+
+    def _resync(self):
+        """积压过多：丢弃队列，下一帧改发最新快照"""
+        self._entries.clear()
+        self._latest.clear()
+        self._pending = 0
+        self.needs_snapshot = True
+        self.resync_count += 1
+        self._wakeup.set()
+
+    def _next_frame(self) -> Optional[Frame]:
+        if self.needs_snapshot:
+            self.needs_snapshot = False
+            return self.hub.snapshot_frame(self.encoding)
+        while self._entries:
+            entry = self._entries.popleft()
+            if entry.message_type in CONFLATED_TYPES:
+                if self._latest.get(entry.message_type) is entry:
+                    del self._latest[entry.message_type]
+            else:
+                self._pending -= 1
+            if entry.alive:
+                return entry.frame
+        return None
+
+    async def _send(self, frame: Frame):
+        if hasattr(self.websocket, 'send_text'):
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+        else:
+            await self.websocket.send(frame)
+
+    async def _writer_loop(self):
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while not self.closed:
+                    frame = self._next_frame()
+                    if frame is None:
+                        break
+                    try:
+                        await asyncio.wait_for(self._send(frame), timeout=self.send_timeout)
+                    except Exception as e:
+                        logger.info(f"[SPECTATOR] 观战连接发送失败，移除: 会话={self.hub.session_id}, 错误={e!r}")
+                        self.closed = True
+                        asyncio.create_task(self.hub.remove(self.websocket, close_code=1013))
+                        return
+        except asyncio.CancelledError:
+            pass
+
+    async def close(self):
+        self.closed = True
+        task, self._writer_task = self._writer_task, None
+        if task and task is not asyncio.current_task() and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+class SpectatorHub:
+    """单个会话的观战广播中心"""
+
+    def __init__(self, session_id: str, snapshot_source: Callable[[], Dict[str, Any]],
+                 tail_size: int = 50, max_pending: int = 64, send_timeout: float = 10.0):
+        self.session_id = session_id
+        self.snapshot_source = snapshot_source
+        self.max_pending = max_pending
+        self.send_timeout = send_timeout
+        self.viewers: Dict[Any, SpectatorConnection] = {}
+        self.tail: Deque[Dict[str, Any]] = deque(maxlen=max(0, tail_size))
+        self._snapshot_frames: Dict[str, Frame] = {}
+
+    def __len__(self) -> int:
+        return len(self.viewers)
+
+    def add(self, websocket: Any, encoding: str = JSON_ENCODING) -> SpectatorConnection:
+        viewer = SpectatorConnection(websocket, self, encoding, self.max_pending, self.send_timeout)
+        self.viewers[websocket] = viewer
+        viewer.start()
+        return viewer
+
+    async def remove(self, websocket: Any, close_code: Optional[int] = None):
+        viewer = self.viewers.pop(websocket, None)
+        if viewer is None:
+            return
+        await viewer.close()
+        if close_code is not None:
+            try:
+                await websocket.close(code=close_code)
+            except Exception:
+                pass
+
+    async def close(self, close_code: int = 1001):
+        """会话结束/休眠：断开全部观战者"""
+        for websocket in list(self.viewers):
+            await self.remove(websocket, close_code=close_code)
+
+    def publish(self, message: Dict[str, Any]):
+        """分发一条广播：每种编码只序列化一次"""
+        message_type = message.get("type", "")
+        if message_type in STREAM_TYPES:
+            return
+        if message_type not in CONFLATED_TYPES and message_type not in STATE_TYPES:
+            self.tail.append(message)
+        self._snapshot_frames.clear()
+        if not self.viewers:
+            return
+        frames: Dict[str, Frame] = {}
+        for viewer in list(self.viewers.values()):
+            frame = frames.get(viewer.encoding)
+            if frame is None:
+                frame = frames[viewer.encoding] = encode_frame(message, viewer.encoding)
+            viewer.offer(message_type, frame)
+
+    def snapshot_frame(self, encoding: str = JSON_ENCODING) -> Frame:
+        """最新快照帧（两次广播之间按编码缓存，供同时加入的观战者共享）"""
+        frame = self._snapshot_frames.get(encoding)
+        if frame is None:
+            frame = self._snapshot_frames[encoding] = encode_frame({
+                "type": "spectator_snapshot",
+                "data": {"game_state": self.snapshot_source(), "tail": list(self.tail)},
+                "session_id": self.session_id
+            }, encoding)
+        return frame
@@ -0,0 +1,145 @@
+"""游戏状态版本化增量同步
+
+增量协议（客户端在 /api/ws 连接时通过 state_protocol=delta 开启）：
+  - 服务器每次广播状态时提交一个新版本号
+  - 对每个客户端，计算"其最后确认版本 → 当前版本"的 JSON-Patch 风格补丁，
+    以 game_state_delta 发送；客户端用 state_ack 确认已应用的版本
+  - 客户端请求 state_resync、或其确认版本已不在服务器保留的历史中时，
+    回退为 game_state_snapshot 完整快照
+
+客户端需保留尚未确认的已接收版本，以便把补丁应用到 base_version 对应的状态上。
+"""
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.core.message_codec import json_default
+
+logger = logging.getLogger(__name__)
+
+PatchOp = Dict[str, Any]
+
+
+def _escape(token: str) -> str:
+    """JSON Pointer 路径段转义"""
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff_state(old: Any, new: Any, path: str = "") -> List[PatchOp]:
+    """计算从 old 到 new 的补丁操作列表（add / remove / replace）
+
+    列表只针对剧本杀状态中常见的变化做优化：尾部追加、头部裁剪后追加、等长逐项比较；
+    其余情况整体替换。
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[PatchOp] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(str(key))}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(str(key))}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff_state(old[key], value, child))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        return _diff_list(old, new, path)
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _diff_list(old: List[Any], new: List[Any], path: str) -> List[PatchOp]:
+    # 头部裁剪：old[k:] 是 new 的前缀（事件/聊天超出容量时的典型变化）
+    head_trim = 0
+    if old and new and old[0] != new[0]:
+        try:
+            head_trim = old.index(new[0])
+        except ValueError:
+            head_trim = -1
+    if head_trim >= 0:
+        kept = old[head_trim:]
+        if new[:len(kept)] == kept:
+            ops: List[PatchOp] = [{"op": "remove", "path": f"{path}/0"} for _ in range(head_trim)]
+            ops.extend({"op": "add", "path": f"{path}/-", "value": item} for item in new[len(kept):])
+            return ops
+    if len(old) == len(new):
+        ops = []
+        for index, (before, after) in enumerate(zip(old, new)):
+            ops.extend(diff_state(before, after, f"{path}/{index}"))
+        return ops
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply_patch(document: Any, ops: List[PatchOp]) -> Any:
+    """将补丁应用到文档上（原地修改并返回），供测试和Python客户端使用"""
+    for op in ops:
+        tokens = [_unescape(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            document = op.get("value")
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            if op["op"] == "add":
+                if last == "-":
+                    parent.append(op["value"])
+                else:
+                    parent.insert(int(last), op["value"])
+            elif op["op"] == "remove":
+                parent.pop(int(last))
+            else:
+                parent[int(last)] = op["value"]
+        else:
+            if op["op"] == "remove":
+                parent.pop(last, None)
+            else:
+                parent[last] = op["value"]
+    return document
+
+
+class StateVersionTracker:
+    """记录会话状态的历史版本，并按基准版本生成（并缓存）增量补丁"""
+
+    def __init__(self, history_size: int = 8):
+        self.history_size = max(1, history_size)
+        self.version: int = 0
+        self._snapshots: "OrderedDict[int, Any]" = OrderedDict()
+        self._patch_cache: Dict[int, List[PatchOp]] = {}
+
+    def commit(self, state: Dict[str, Any]) -> int:
+        """提交当前状态；与最新版本相同时不产生新版本"""
+        snapshot = json.loads(json.dumps(state, ensure_ascii=False, default=json_default))
+        if self._snapshots and self._snapshots[self.version] == snapshot:
+            return self.version
+        self.version += 1
+        self._snapshots[self.version] = snapshot
+        while len(self._snapshots) > self.history_size:
+            self._snapshots.popitem(last=False)
+        self._patch_cache = {}
+        return self.version
+
+    def has_version(self, version: int) -> bool:
+        return version in self._snapshots
+
+    def snapshot(self) -> Any:
+        """当前版本的完整状态"""
+        return self._snapshots.get(self.version, {})
+
+    def delta_since(self, base_version: int) -> Optional[List[PatchOp]]:
+        """生成 base_version → 当前版本的补丁；基准版本不在历史中时返回 None（需完整快照）"""
+        if base_version not in self._snapshots:
+            return None
+        if base_version not in self._patch_cache:
+            self._patch_cache[base_version] = diff_state(
+                self._snapshots[base_version], self._snapshots[self.version]
+            )
+        return self._patch_cache[base_version]
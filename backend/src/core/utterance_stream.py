@@ -0,0 +1,161 @@
+"""流式发言
+
+非流式时一次发言要等 LLM 生成完整段文本、再整段合成语音后才广播，玩家首先看到/听到
+内容的延迟是两者之和。开启流式后：
+  1. LLM 每生成一段文本即广播 ai_action_delta（utterance_id、角色、增量文本、序号）
+  2. SentenceSplitter 在句末标点处切出完整句子，立即提交 TTS，此时后续句子仍在生成
+  3. 各句语音按句子顺序广播 ai_action_audio（并发合成，按序发送），客户端可逐句播放
+  4. 发言完成后仍广播常规的 ai_action，携带全部语音分段 tts_segments
+本模块只负责切句、合成调度与帧的组织，发送与合成由调用方注入。
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .game_tts_manager import CharacterTTSResult
+
+logger = logging.getLogger(__name__)
+
+# 句末标点，以及可以紧跟其后的收尾引号/括号
+_SENTENCE_ENDS = frozenset("。！？!?；;…\n")
+_CLOSERS = frozenset("”’」』）)\"'》")
+
+SendFrame = Callable[[str, Dict[str, Any]], Awaitable[None]]
+Synthesize = Callable[[str], Awaitable[Optional[CharacterTTSResult]]]
+
+
+class SentenceSplitter:
+    """增量切句：在句末标点（含其后的收尾引号）处切分，过短的句子与下一句合并"""
+
+    def __init__(self, min_chars: int = 8):
+        self.min_chars = max(1, min_chars)
+        self._buffer = ""
+        self._scanned = 0  # 已确认不含句末的前缀长度
+
+    def push(self, text: str) -> List[str]:
+        """追加增量文本，返回新完成的句子"""
+        self._buffer += text
+        sentences: List[str] = []
+        start = 0
+        i = self._scanned
+        size = len(self._buffer)
+        while i < size:
+            if self._buffer[i] not in _SENTENCE_ENDS:
+                i += 1
+                continue
+            end = i + 1
+            while end < size and (self._buffer[end] in _SENTENCE_ENDS or self._buffer[end] in _CLOSERS):
+                end += 1
+            if end == size:
+                break  # 句末在缓冲区末尾：等下一段确认是否还有收尾引号
+            sentence = self._buffer[start:end].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = end
+            i = end
+        self._buffer = self._buffer[start:]
+        self._scanned = i - start
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """取出剩余文本（发言结束时调用）"""
+        rest = self._buffer.strip()
+        self._buffer = ""
+        self._scanned = 0
+        return rest or None
+
+
+class StreamingUtterance:
+    """一次流式发言：广播增量文本，整句完成即合成语音并按序广播"""
+
+    def __init__(self, character: str, send: SendFrame, synthesize: Optional[Synthesize] = None,
+                 min_sentence_chars: int = 8):
+        self.character = character
+        self.utterance_id = uuid.uuid4().hex[:12]
+        self._send = send
+        self._synthesize = synthesize
+        self._splitter = SentenceSplitter(min_sentence_chars)
+        self._streamed: List[str] = []
+        self._seq = 0
+        self._segments: List[asyncio.Task] = []
+        self._playback_end = 0.0  # 已广播语音在客户端顺序播放完的预计时刻（monotonic）
+
+    @property
+    def text(self) -> str:
+        return "".join(self._streamed)
+
+    async def feed(self, delta: str):
+        """收到一段增量文本"""
+        if not delta:
+            return
+        self._streamed.append(delta)
+        self._seq += 1
+        await self._send("ai_action_delta", {
+            "utterance_id": self.utterance_id,
+            "character": self.character,
+            "delta": delta,
+            "seq": self._seq,
+        })
+        for sentence in self._splitter.push(delta):
+            self._start_segment(sentence)
+
+    def _start_segment(self, text: str):
+        if self._synthesize is None:
+            return
+        previous = self._segments[-1] if self._segments else None
+        self._segments.append(asyncio.create_task(self._segment(len(self._segments), text, previous)))
+
+    async def _segment(self, index: int, text: str, previous: Optional[asyncio.Task]) -> Dict[str, Any]:
+        """合成一句语音（与其他句并发），待前一句广播后再广播本句"""
+        try:
+            result = await self._synthesize(text)
+        except Exception as e:
+            logger.error(f"[TTS] 流式分句合成失败: {e}, 角色={self.character}, 分句={index}")
+            result = None
+        segment = {
+            "index": index,
+            "text": text,
+            "tts_url": result.url if result else None,
+            "tts_duration": result.duration if result else None,
+            "tts_voice": result.voice_id if result else None,
+        }
+        if previous is not None:
+            await asyncio.wait([previous])
+        if result is not None:
+            now = time.monotonic()
+            self._playback_end = max(self._playback_end, now) + (result.duration or 0.0)
+            try:
+                await self._send("ai_action_audio", {"utterance_id": self.utterance_id,
+                                                     "character": self.character, **segment})
+            except Exception as e:
+                logger.error(f"[TTS] 广播流式语音失败: {e}, 角色={self.character}, 分句={index}")
+        return segment
+
+    async def finish(self, final_text: str) -> List[Dict[str, Any]]:
+        """发言完成：合成剩余文本，等待全部分句广播完毕，按顺序返回分句结果"""
+        streamed = self.text.strip()
+        if streamed and not final_text.startswith(streamed):
+            # 生成中途失败改用了兜底发言：已推送的增量作废，按最终文本重新切句
+            logger.warning(f"[STREAM] {self.character} 的最终发言与已推送的增量不一致，按最终文本合成语音")
+            self.cancel()
+            self._segments = []
+            self._splitter = SentenceSplitter(self._splitter.min_chars)
+            streamed = ""
+        for sentence in self._splitter.push(final_text[len(streamed):]):
+            self._start_segment(sentence)
+        rest = self._splitter.flush()
+        if rest:
+            self._start_segment(rest)
+        if not self._segments:
+            return []
+        return list(await asyncio.gather(*self._segments))
+
+    def remaining_playback(self) -> float:
+        """已广播的语音在客户端播放完还需的秒数（客户端收到即开始顺序播放）"""
+        return max(0.0, self._playback_end - time.monotonic())
+
+    def cancel(self):
+        for task in self._segments:
+            task.cancel()
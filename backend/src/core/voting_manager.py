@@ -1,7 +1,13 @@
 """投票管理器"""
+import re
 from typing import Dict, List, Optional, Any
 from ..schemas.script import ScriptCharacter as Character
 
+# 投票表态关键词，其后紧跟的角色名视为投票对象
+_VOTE_KEYWORDS = re.compile(r"投票给|票投给|投给|我投|投票|指认|凶手是")
+# 关键词与角色名之间允许的最大间隔（字符）
+_VOTE_WINDOW = 8
+
 class VotingManager:
     """投票管理器"""
     
@@ -12,6 +18,29 @@ class VotingManager:
     def add_vote(self, voter: str, suspect: str):
         """添加投票"""
         self.votes[voter] = suspect
+
+    def parse_vote(self, voter: str, statement: str) -> Optional[str]:
+        """从投票陈述中解析投票对象，无法确定时返回 None
+
+        以最后一次表态（"我投票给张三"、"凶手是李四"等）为准；没有表态关键词时，
+        陈述中只提到一名候选人则视为投给该候选人。
+        """
+        candidates = [char.name for char in self.characters
+                      if char.name and char.name != voter and not char.is_victim]
+        if not statement or not candidates:
+            return None
+
+        choice: Optional[str] = None
+        for match in _VOTE_KEYWORDS.finditer(statement):
+            window = statement[match.end():match.end() + _VOTE_WINDOW + max(map(len, candidates))]
+            positions = [(window.find(name), name) for name in candidates if 0 <= window.find(name) <= _VOTE_WINDOW]
+            if positions:
+                choice = min(positions, key=lambda p: (p[0], -len(p[1])))[1]
+        if choice is not None:
+            return choice
+
+        mentioned = [name for name in candidates if name in statement]
+        return mentioned[0] if len(mentioned) == 1 else None
     
     def get_vote_counts(self) -> Dict[str, int]:
         """获取投票统计"""
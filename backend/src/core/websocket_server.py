@@ -5,6 +5,7 @@ from typing import Set, Union, Any, Dict, Optional
 from datetime import datetime
 from abc import ABC, abstractmethod
 import os
+import time
 
 from sqlalchemy.orm import Session
 # 显式导入以避免依赖包级 __init__ 导出（已精简以规避循环导入）
@@ -15,7 +16,19 @@ from src.db.repositories import ScriptRepository
 from src.db.repositories.game_session_repository import GameSessionRepository
 from src.db.session import get_db_session, db_manager
 from src.db.models.game_session import GameSession as DBGameSession, GameSessionStatus
-from src.core.game_tts_manager import GameTTSManager
+from src.core.game_tts_manager import GameTTSManager, get_shared_tts_manager
+from src.core.client_connection import ClientConnection
+from src.core.message_codec import JSON_ENCODING, Frame, FrameDecodeError, decode_frame, encode_frame, negotiate_encoding
+from src.core.state_sync import StateVersionTracker
+from src.core.session_actor import CommandLane, SessionActor, SessionCommand
+from src.core.session_bus import SessionBus, create_session_bus
+from src.core.session_sharding import SessionLeaseManager, ShardRouter, generate_worker_id
+from src.core.session_hibernation import SNAPSHOT_VERSION, HibernationStore, SessionReaper
+from src.core.engine_pool import EnginePool, is_pristine
+from src.core.spectator_hub import SpectatorHub
+from src.core.utterance_stream import StreamingUtterance
+from src.services.llm_service import LLMPriority, llm_call_context
+from src.core.config import config
 from dotenv import load_dotenv
 import uuid
 
@@ -70,7 +83,11 @@ class GameSession:
         self.clients: set[Any] = set()
         self.script_id = script_id
         self.game_engine = GameEngine(session_id=session_id)
-        self.is_game_running = False
+        # 增量状态同步的版本记录（仅在有 delta 协议客户端时提交）
+        self.state_tracker = StateVersionTracker()
+        # 会话Actor：客户端命令按优先级通道串行调度（由 GameWebSocketServer 创建会话时配置）
+        self.actor = SessionActor(session_id)
+        self._is_game_running = False
         self.game_initialized = False  # 修改：将保护属性改为公共属性
         # 剧本编辑相关
         self.is_editing_mode:bool = False
@@ -85,6 +102,20 @@ class GameSession:
         self.tts_manager: GameTTSManager|None = None
         self._initialize_tts_manager()
     
+    @property
+    def is_game_running(self) -> bool:
+        return self._is_game_running
+
+    @is_game_running.setter
+    def is_game_running(self, value: bool):
+        # 停止游戏时立即打断节奏调度中的等待；开始时重置阶段计时
+        if value and not self._is_game_running:
+            self.game_engine.pacer.resume()
+            self.game_engine.pacer.start_phase()
+        elif not value:
+            self.game_engine.pacer.cancel()
+        self._is_game_running = value
+
     def _initialize_tts_manager(self):
         """初始化TTS管理器"""
         try:
@@ -94,7 +125,7 @@ class GameSession:
             provider = os.getenv("TTS_PROVIDER", "minimax")  # 默认使用minimax
             
             if api_key and group_id:
-                self.tts_manager = GameTTSManager(
+                self.tts_manager = get_shared_tts_manager(
                     api_key=api_key,
                     group_id=group_id,
                     model="speech-02-turbo",
@@ -110,19 +141,10 @@ class GameSession:
     def cleanup(self):
         """清理会话资源，包括数据库连接"""
         try:
-            # 清理TTS管理器
+            # 释放TTS管理器引用（进程内共享，由应用关闭时统一关闭）
             if self.tts_manager:
-                try:
-                    # 创建异步任务来关闭TTS管理器
-                    import asyncio
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        loop.create_task(self.tts_manager.close())
-                    logger.info(f"[CLEANUP] TTS管理器已清理: 会话={self.session_id}")
-                except Exception as e:
-                    logger.error(f"[ERROR] 清理TTS管理器失败: 会话={self.session_id}, 错误={e}")
-                finally:
-                    self.tts_manager = None
+                self.tts_manager = None
+                logger.info(f"[CLEANUP] TTS管理器已释放: 会话={self.session_id}")
             
             # 关闭数据库会话
             if self.db_session:
@@ -155,15 +177,34 @@ class GameSession:
 
 # 定义消息处理器接口
 class MessageHandler(ABC):
-    """消息处理器抽象基类"""
+    """消息处理器抽象基类
+
+    lane 决定命令在会话Actor中的通道；timeout 为空时使用通道默认超时；
+    inline 为 True 的处理器不经过Actor，直接在接收循环中执行（仅限无等待的纯内存操作）。
+    """
+    lane: CommandLane = CommandLane.READ
+    timeout: Optional[float] = None
+    inline: bool = False
     
     @abstractmethod
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         """处理消息"""
         pass
 
+class GameSetupHandler(MessageHandler):
+    """开始/重置游戏处理器基类
+
+    剧本加载与GM规划LLM调用可能持续数分钟，放在重型通道执行，
+    期间主通道的阶段切换与状态查询照常响应；开始/重置之间仍按提交顺序串行。
+    """
+    lane = CommandLane.HEAVY
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return config.websocket_config.game_setup_command_timeout
+
 # 具体的消息处理器
-class StartGameHandler(MessageHandler):
+class StartGameHandler(GameSetupHandler):
     """处理开始游戏消息"""
     
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
@@ -174,6 +215,7 @@ class StartGameHandler(MessageHandler):
 
 class NextPhaseHandler(MessageHandler):
     """处理进入下一阶段消息"""
+    lane = CommandLane.CONTROL
     
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         session_id = data.get("session_id") or server.client_sessions.get(websocket)
@@ -208,7 +250,7 @@ class GetPublicChatHandler(MessageHandler):
                 "session_id": session_id
             })
 
-class ResetGameHandler(MessageHandler):
+class ResetGameHandler(GameSetupHandler):
     """处理重置游戏消息"""
     
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
@@ -218,6 +260,7 @@ class ResetGameHandler(MessageHandler):
 
 class StartScriptEditingHandler(MessageHandler):
     """处理开始剧本编辑消息"""
+    lane = CommandLane.CONTROL
     
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         session_id = data.get("session_id") or server.client_sessions.get(websocket)
@@ -227,6 +270,7 @@ class StartScriptEditingHandler(MessageHandler):
 
 class StopScriptEditingHandler(MessageHandler):
     """处理停止剧本编辑消息"""
+    lane = CommandLane.CONTROL
     
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         session_id = data.get("session_id") or server.client_sessions.get(websocket)
@@ -235,6 +279,7 @@ class StopScriptEditingHandler(MessageHandler):
 
 class EditInstructionHandler(MessageHandler):
     """处理编辑指令消息"""
+    lane = CommandLane.HEAVY
     
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         session_id = data.get("session_id") or server.client_sessions.get(websocket)
@@ -252,6 +297,7 @@ class GetScriptDataHandler(MessageHandler):
 
 class GenerateAISuggestionHandler(MessageHandler):
     """处理生成AI建议消息"""
+    lane = CommandLane.HEAVY
     
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         session_id = data.get("session_id") or server.client_sessions.get(websocket)
@@ -305,29 +351,203 @@ class GetTTSHistoryHandler(MessageHandler):
             })
 
 class FetchHistoryHandler(MessageHandler):
-    """处理历史回看消息"""
+    """处理历史回看消息
+
+    带 before/after 游标（或 stream=true）时按游标分页，并拆成多个有界大小的
+    history_chunk 帧流式推送，最后以 history_end 结束；否则保持旧的单帧 history 回复。
+    """
+    max_page_size = 1000  # 单次请求的事件条数上限
+    default_page_size = 200
+    chunk_bytes = 32 * 1024  # 单个 history_chunk 的估算大小上限
+    high_water = 8  # 出站队列积压超过该帧数时暂停推送，等待客户端消费
 
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         session_id = data.get("session_id") or server.client_sessions.get(websocket)
+        session = server.sessions.get(session_id)
+        if not session:
+            await server.send_to_client(websocket, {"type": "error", "message": "会话不存在", "session_id": session_id})
+            return
+        if any(data.get(key) is not None for key in ("before", "after")) or data.get("stream"):
+            await self._stream_page(server, websocket, session, data)
+            return
+
         from_event_id = int(data.get("from_event_id") or 0)
         limit = data.get("limit")
         try:
             limit_val = int(limit) if limit is not None else None
         except Exception:
             limit_val = None
+        history = session.game_engine.get_history(from_event_id=from_event_id, limit=limit_val)
+        await server.send_to_client(websocket, {
+            "type": "history",
+            "data": history,
+            "session_id": session_id
+        })
+
+    async def _stream_page(self, server: 'GameWebSocketServer', websocket: Any, session: 'GameSession', data: dict):
+        session_id = session.session_id
+        try:
+            before = int(data["before"]) if data.get("before") is not None else None
+            after = int(data["after"]) if data.get("after") is not None else None
+            limit = min(int(data.get("limit") or self.default_page_size), self.max_page_size)
+        except (TypeError, ValueError):
+            await server.send_to_client(websocket, {"type": "error", "message": "历史游标参数无效", "session_id": session_id})
+            return
+        request_id = data.get("request_id")
+        page = session.game_engine.get_history_page(before_id=before, after_id=after, limit=limit)
+        engine = session.game_engine
+        messages = [
+            {
+                "type": "history_chunk",
+                "data": {
+                    "request_id": request_id,
+                    "seq": seq,
+                    "events": events,
+                    "public_chat": engine.get_public_chat_between(events[0]["id"], events[-1]["id"]),
+                },
+                "session_id": session_id
+            }
+            for seq, events in enumerate(self._split_events(page["events"]))
+        ]
+        messages.append({
+            "type": "history_end",
+            "data": {
+                "request_id": request_id,
+                "chunks": len(messages),
+                "has_more": page["has_more"],
+                "next_cursor": page["next_cursor"],
+                "newest_event_id": page["newest_event_id"],
+                "earliest_event_id": page["earliest_event_id"],
+            },
+            "session_id": session_id
+        })
+        # 页面在命令内取好快照；等待客户端消费的推送放到独立任务中，慢读者不占用会话Actor的工作协程
+        session.actor.spawn(self._push(server, websocket, messages), name="history_stream")
+
+    async def _push(self, server: 'GameWebSocketServer', websocket: Any, messages: list):
+        """按出站队列积压流控，逐帧推送；连接关闭时停止"""
+        connection = server.connections.get(websocket)
+        for message in messages:
+            if connection and not await connection.wait_writable(self.high_water):
+                return
+            await server.send_to_client(websocket, message)
+
+    def _split_events(self, events: list) -> list:
+        """按估算大小把事件拆成若干块（中文按每字3字节估算）"""
+        chunks, current, size = [], [], 0
+        for event in events:
+            event_size = 96 + 3 * len(str(event.get("content", "")))
+            if current and size + event_size > self.chunk_bytes:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(event)
+            size += event_size
+        if current:
+            chunks.append(current)
+        return chunks
+
+class ResumeHandler(MessageHandler):
+    """处理断线重连握手：按客户端水位补发缺失的事件与聊天"""
+    lane = CommandLane.CONTROL
+    max_events = 1000  # 缺失事件超过该数量时返回截断标记，由客户端改用 fetch_history
+
+    async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
+        session_id = data.get("session_id") or server.client_sessions.get(websocket)
         session = server.sessions.get(session_id)
         if not session:
             await server.send_to_client(websocket, {"type": "error", "message": "会话不存在", "session_id": session_id})
             return
-        history = session.game_engine.get_history(from_event_id=from_event_id, limit=limit_val)
+        try:
+            last_event_id = int(data.get("last_event_id") or 0)
+            last_chat_event_id = data.get("last_chat_event_id")
+            last_chat_event_id = None if last_chat_event_id is None else int(last_chat_event_id)
+        except (TypeError, ValueError):
+            last_event_id, last_chat_event_id = 0, None
+        delta = session.game_engine.get_resume_delta(last_event_id, last_chat_event_id, self.max_events)
+        logger.info(f"[RESUME] 重连增量同步: 会话={session_id}, 客户端水位={last_event_id}, "
+                    f"补发事件={len(delta['events'])}, 截断={delta['truncated']}")
         await server.send_to_client(websocket, {
-            "type": "history",
-            "data": history,
+            "type": "resume_sync",
+            "data": {**delta, "last_event_id": last_event_id},
+            "session_id": session_id
+        })
+
+class StateAckHandler(MessageHandler):
+    """处理增量状态确认消息"""
+    lane = CommandLane.CONTROL
+    inline = True
+
+    async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
+        connection = server.connections.get(websocket)
+        session = server.sessions.get(data.get("session_id") or server.client_sessions.get(websocket))
+        if not connection or not session:
+            return
+        try:
+            version = int(data.get("version") or 0)
+        except (TypeError, ValueError):
+            return
+        # 只接受服务器仍保留的、且不回退的版本
+        if version > connection.acked_state_version and session.state_tracker.has_version(version):
+            connection.acked_state_version = version
+
+class StateResyncHandler(MessageHandler):
+    """处理增量状态重同步请求（返回完整快照）"""
+    lane = CommandLane.CONTROL
+
+    async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
+        session_id = data.get("session_id") or server.client_sessions.get(websocket)
+        session = server.sessions.get(session_id)
+        if not session:
+            return
+        logger.info(f"[STATE] 客户端请求状态重同步: 会话={session_id}")
+        version = session.state_tracker.commit(session.game_engine.game_state)
+        await server.send_to_client(websocket, {
+            "type": "game_state_snapshot",
+            "data": {"version": version, "state": session.state_tracker.snapshot()},
             "session_id": session_id
         })
 
+class CancelCommandHandler(MessageHandler):
+    """取消排队中或执行中的命令（按 request_id 或命令类型）"""
+    lane = CommandLane.CONTROL
+    inline = True
+
+    async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
+        session_id = data.get("session_id") or server.client_sessions.get(websocket)
+        session = server.sessions.get(session_id)
+        if not session:
+            return
+        request_id = data.get("request_id")
+        command = data.get("command")
+        if not request_id and not command:
+            await server.send_to_client(websocket, {
+                "type": "error",
+                "message": "缺少request_id或command参数",
+                "session_id": session_id
+            })
+            return
+        cancelled = session.actor.cancel(request_id=request_id, name=command)
+        logger.info(f"[ACTOR] 取消命令请求: 会话={session_id}, request_id={request_id}, 命令={command}, 取消数={cancelled}")
+        await server.send_to_client(websocket, {
+            "type": "command_cancelled",
+            "data": {"request_id": request_id, "command": command, "cancelled": cancelled},
+            "session_id": session_id
+        })
+
+class PlaybackFinishedHandler(MessageHandler):
+    """处理客户端语音播放完成确认，用于推进发言节奏"""
+    lane = CommandLane.CONTROL
+    inline = True
+
+    async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
+        session = server.sessions.get(data.get("session_id") or server.client_sessions.get(websocket))
+        utterance_id = data.get("utterance_id")
+        if session and utterance_id:
+            session.game_engine.pacer.notify_playback_finished(str(utterance_id), websocket)
+
 class SetBackgroundModeHandler(MessageHandler):
     """设置后台执行模式处理器"""
+    lane = CommandLane.CONTROL
     async def handle(self, server: 'GameWebSocketServer', websocket: Any, data: dict):
         session_id = data.get("session_id")
         background_mode = data.get("background_mode", False)
@@ -387,15 +607,25 @@ class GameModeHandler:
             session.game_engine = GameEngine()
             session.game_initialized = False  # 修改：使用公共属性game_initialized
         
-        if not session.game_initialized:  # 修改：使用公共属性game_initialized
+        # 热门剧本直接取用预热引擎（已完成剧本加载与AI代理初始化）
+        warm_engine = None
+        if is_pristine(session.game_engine):
+            warm_engine = server.engine_pool.acquire(session.script_id, session_id)
+        if warm_engine is not None:
+            session.game_engine = warm_engine
+            session.game_initialized = True
+        elif not session.game_initialized:  # 修改：使用公共属性game_initialized
             await GameModeHandler.initialize_game(session)
-        session.is_game_running = True
-        logger.info(f"[GAME] 游戏状态设置为运行中: 会话={session_id}")
         
         try:
-            # 使用新的配置系统初始化AI代理
-            logger.info(f"[GAME] 初始化AI代理: 会话={session_id}")
-            await session.game_engine.initialize_agents()
+            if warm_engine is None:
+                # 使用新的配置系统初始化AI代理
+                logger.info(f"[GAME] 初始化AI代理: 会话={session_id}")
+                await session.game_engine.initialize_agents()
+            
+            # AI代理就绪后才标记运行中，初始化失败/超时/被取消都不会留下无游戏循环的"运行中"会话
+            session.is_game_running = True
+            logger.info(f"[GAME] 游戏状态设置为运行中: 会话={session_id}")
             
             # 发送游戏开始消息
             logger.info(f"[GAME] 广播游戏开始消息: 会话={session_id}")
@@ -410,21 +640,18 @@ class GameModeHandler:
             # 发送初始阶段消息
             current_phase = session.game_engine.current_phase.value
             logger.info(f"[GAME] 广播初始阶段: 会话={session_id}, 阶段={current_phase}")
-            await server.broadcast({
-                "type": "phase_changed",
-                "data": {
-                    "phase": current_phase,
-                    "game_state": session.game_engine.game_state
-                },
-                "session_id": session_id
-            }, session_id)
+            await server.broadcast_game_state(session_id, "phase_changed")
             
             print(f"Broadcasting initial phase: {current_phase}")
             
             # 开始游戏循环
             logger.info(f"[GAME] 启动游戏循环任务: 会话={session_id}")
-            asyncio.create_task(GameModeHandler.game_loop(server, session_id))
+            session.actor.spawn(GameModeHandler.game_loop(server, session_id), name="game_loop")
             
+        except asyncio.CancelledError:
+            logger.warning(f"[GAME] 游戏启动被取消: 会话={session_id}")
+            session.is_game_running = False
+            raise
         except Exception as e:
             logger.error(f"[ERROR] 游戏启动失败: 会话={session_id}, 错误={e}")
             print(f"Error starting game for session {session_id}: {e}")
@@ -450,12 +677,7 @@ class GameModeHandler:
                 from ..services.script_editor_service import ScriptEditorService
                 session.editor_service = scope.resolve(ScriptEditorService)
                 
-                # 加载剧本
-                script = session.editor_service.script_repository.get_script_by_id(session.script_id)
-                if not script:
-                    raise ValueError(f"无法加载剧本 ID: {session.script_id}")
-                
-                # 初始化游戏引擎
+                # 加载剧本并初始化游戏引擎（热门剧本命中进程级编译缓存，不访问数据库）
                 await session.game_engine.load_script_data(session.script_id)
                 
                 # 标记游戏已初始化
@@ -482,14 +704,7 @@ class GameModeHandler:
             new_phase = session.game_engine.current_phase.value
             
             logger.info(f"[GAME] 阶段切换成功: 会话={session_id}, {old_phase} -> {new_phase}")
-            await server.broadcast({
-                "type": "phase_changed",
-                "data": {
-                    "phase": new_phase,
-                    "game_state": session.game_engine.game_state
-                },
-                "session_id": session_id
-            }, session_id)
+            await server.broadcast_game_state(session_id, "phase_changed")
             
         except Exception as e:
             logger.error(f"[ERROR] 进入下一阶段失败: 会话={session_id}, 错误={e}")
@@ -560,6 +775,28 @@ class GameModeHandler:
         logger.info(f"[GAME_LOOP] 开始游戏循环: 会话={session_id}")
         print(f"Starting game loop for session {session_id}")
         
+        # 流式发言：进行中的发言（角色 -> StreamingUtterance），由 action_callback 收尾
+        streaming_config = config.streaming_config
+        utterances: Dict[str, StreamingUtterance] = {}
+
+        def character_synthesizer(character: str, character_info: Optional[Dict[str, Any]]):
+            async def synthesize(content: str):
+                return await session.tts_manager.synthesize_character_tts(
+                    session_id=session_id,
+                    character_name=character,
+                    content=content,
+                    character_info=character_info,
+                    event_metadata={
+                        "game_phase": session.game_engine.current_phase.value,
+                        "action_type": "ai_dialogue",
+                        "timestamp": datetime.utcnow().isoformat()
+                    }
+                )
+            return synthesize
+
+        async def send_frame(message_type: str, data: Dict[str, Any]):
+            await server.broadcast({"type": message_type, "data": data, "session_id": session_id}, session_id)
+
         try:
             loop_count = 0
             while session.is_game_running and session.game_engine.current_phase != GamePhase.ENDED:
@@ -574,6 +811,21 @@ class GameModeHandler:
                 print(f"Running phase: {current_phase}")
                 
                 # 定义流式回调函数
+                async def delta_callback(character: str, delta: str):
+                    """角色发言生成中：推送增量文本，整句完成即提交TTS"""
+                    if not session.is_game_running:
+                        return
+                    utterance = utterances.get(character)
+                    if utterance is None:
+                        synthesize = None
+                        if session.tts_manager:
+                            _, character_info = session.game_engine.character_tts_info(character)
+                            synthesize = character_synthesizer(character, character_info)
+                        utterance = StreamingUtterance(character, send_frame, synthesize,
+                                                       streaming_config.min_sentence_chars)
+                        utterances[character] = utterance
+                    await utterance.feed(delta)
+
                 async def action_callback(action):
                     """每个角色发言完成后立即广播，并生成TTS"""
                     try:
@@ -600,11 +852,30 @@ class GameModeHandler:
                         
                         # 合并AI动作与TTS：如果有TTS管理器则先生成TTS再一次性广播
                         ai_action_payload = dict(action)  # 复制，避免外部引用被改
-                        if session.tts_manager and action_text and len(action_text.strip()) > 0:
-                            voice_id_candidate = None
+                        ai_action_payload["utterance_id"] = uuid.uuid4().hex[:12]
+                        tts_duration = None
+                        utterance = utterances.pop(character, None)
+                        if utterance is not None:
+                            # 流式发言：分句语音已在生成过程中逐句合成并广播，这里补齐剩余部分
+                            ai_action_payload["utterance_id"] = utterance.utterance_id
+                            segments = await utterance.finish(action_text)
+                            voiced = [seg for seg in segments if seg["tts_url"]]
+                            if not session.tts_manager or not segments:
+                                ai_action_payload["tts_status"] = "skipped"
+                            elif not voiced:
+                                ai_action_payload["tts_status"] = "failed"
+                            else:
+                                ai_action_payload["tts_segments"] = voiced
+                                ai_action_payload["tts_voice"] = voiced[0]["tts_voice"]
+                                ai_action_payload["tts_duration"] = sum(seg["tts_duration"] or 0.0 for seg in voiced)
+                                ai_action_payload["tts_status"] = "completed" if len(voiced) == len(segments) else "partial"
+                                if len(voiced) == 1:
+                                    ai_action_payload["tts_url"] = voiced[0]["tts_url"]
+                                # 前面的分句已在播放：只等待剩余的播放时长
+                                tts_duration = utterance.remaining_playback()
+                        elif session.tts_manager and action_text and len(action_text.strip()) > 0:
                             try:
-                                voice_id_candidate = session.tts_manager._get_character_voice(character, action.get('character_info'))
-                                tts_url = await session.tts_manager.generate_character_tts(
+                                tts_result = await session.tts_manager.synthesize_character_tts(
                                     session_id=session_id,
                                     character_name=character,
                                     content=action_text,
@@ -615,10 +886,12 @@ class GameModeHandler:
                                         "timestamp": datetime.utcnow().isoformat()
                                     }
                                 )
-                                if tts_url:
-                                    ai_action_payload["tts_url"] = tts_url
-                                    ai_action_payload["tts_voice"] = voice_id_candidate
+                                if tts_result:
+                                    ai_action_payload["tts_url"] = tts_result.url
+                                    ai_action_payload["tts_voice"] = tts_result.voice_id
+                                    ai_action_payload["tts_duration"] = tts_result.duration
                                     ai_action_payload["tts_status"] = "completed"
+                                    tts_duration = tts_result.duration
                                 else:
                                     ai_action_payload["tts_status"] = "failed"
                             except Exception as e:
@@ -634,7 +907,10 @@ class GameModeHandler:
                             "session_id": session_id
                         }, session_id)
                         
-                        await asyncio.sleep(1)  # 减少延迟，提高响应速度
+                        # 登记语音播放，由引擎在下一次发言前等待播放完成（客户端回 playback_finished 可提前放行）
+                        session.game_engine.pacer.expect_playback(
+                            ai_action_payload["utterance_id"], tts_duration, len(session.clients)
+                        )
                         
                     except Exception as e:
                         logger.error(f"[ERROR] AI行动回调错误: {e}, 会话={session_id}")
@@ -643,7 +919,10 @@ class GameModeHandler:
                 # 运行当前阶段（使用流式回调）
                 try:
                     logger.info(f"[GAME_LOOP] 开始运行阶段: {current_phase}, 会话={session_id}")
-                    actions = await session.game_engine.run_phase(action_callback=action_callback)
+                    actions = await session.game_engine.run_phase(
+                        action_callback=action_callback,
+                        delta_callback=delta_callback if streaming_config.enabled else None
+                    )
                     
                     # 在阶段运行完成后检查游戏是否应该停止
                     if not session.is_game_running:
@@ -657,15 +936,16 @@ class GameModeHandler:
                     print(f"Error in run_phase: {e}")
                     # 即使run_phase出错，也继续游戏循环
                     actions = []
+                finally:
+                    # 未收尾的流式发言（阶段中断或发言失败）丢弃其分句合成
+                    for utterance in utterances.values():
+                        utterance.cancel()
+                    utterances.clear()
                 
                 # 广播更新的游戏状态和公开聊天
                 try:
                     print("Broadcasting game_state_update")
-                    await server.broadcast({
-                        "type": "game_state_update",
-                        "data": session.game_engine.game_state,
-                        "session_id": session_id
-                    }, session_id)
+                    await server.broadcast_game_state(session_id, "game_state_update")
                 except Exception as e:
                     print(f"Error broadcasting game_state_update: {e}")
                 
@@ -693,28 +973,10 @@ class GameModeHandler:
                     except Exception as e:
                         print(f"Error in voting phase: {e}")
                 
-                # 根据阶段设置不同的等待时间
-                phase_durations = {
-                    GamePhase.BACKGROUND: 10,  
-                    GamePhase.INTRODUCTION: 5, 
-                    GamePhase.EVIDENCE_COLLECTION: 5,  
-                    GamePhase.INVESTIGATION: 5,  
-                    GamePhase.DISCUSSION: 5, 
-                    GamePhase.VOTING: 5, 
-                }
-                
                 # 自动进入下一阶段（除了最后阶段）
                 if session.game_engine.current_phase != GamePhase.REVELATION:
-                    wait_time = phase_durations.get(session.game_engine.current_phase, 30)
-                    print(f"Waiting {wait_time} seconds before next phase...")
-                    
-                    # 分解长时间等待为多个短等待，以便更快响应游戏停止
-                    elapsed_time = 0
-                    check_interval = 1  # 每1秒检查一次
-                    while elapsed_time < wait_time and session.is_game_running:
-                        sleep_time = min(check_interval, wait_time - elapsed_time)
-                        await asyncio.sleep(sleep_time)
-                        elapsed_time += sleep_time
+                    # 等待最后一段语音播放完成并补足阶段最短时长；游戏停止时立即返回
+                    await session.game_engine.pacer.wait_phase_end(session.game_engine.current_phase)
                     
                     # 在等待后检查游戏是否应该停止
                     if not session.is_game_running:
@@ -725,14 +987,7 @@ class GameModeHandler:
                         await session.game_engine.next_phase()
                         print(f"Advanced to next phase: {session.game_engine.current_phase.value}")
                         
-                        await server.broadcast({
-                            "type": "phase_changed",
-                            "data": {
-                                "phase": session.game_engine.current_phase.value,
-                                "game_state": session.game_engine.game_state
-                            },
-                            "session_id": session_id
-                        }, session_id)
+                        await server.broadcast_game_state(session_id, "phase_changed")
                     except Exception as e:
                         print(f"Error advancing to next phase: {e}")
                 else:
@@ -910,18 +1165,20 @@ class EditModeHandler:
             
             # 解析用户指令
             logger.debug(f"[EDITOR] 解析用户指令: 会话={session_id}")
-            edit_instructions = await session.editor_service.parse_user_instruction(
-                instruction, session.script_id
-            )
+            with llm_call_context(LLMPriority.INTERACTIVE, session_id=session_id):
+                edit_instructions = await session.editor_service.parse_user_instruction(
+                    instruction, session.script_id
+                )
             logger.info(f"[EDITOR] 指令解析完成: 会话={session_id}, 生成{len(edit_instructions)}个编辑操作")
             
             # 执行编辑指令
             results = []
             for i, edit_instruction in enumerate(edit_instructions, 1):
                 logger.debug(f"[EDITOR] 执行编辑操作 {i}/{len(edit_instructions)}: 会话={session_id}")
-                result = await session.editor_service.execute_instruction(
-                    edit_instruction, session.script_id
-                )
+                with llm_call_context(LLMPriority.INTERACTIVE, session_id=session_id):
+                    result = await session.editor_service.execute_instruction(
+                        edit_instruction, session.script_id
+                    )
                 results.append(result)
                 
                 # 实时发送每个操作的结果
@@ -1040,9 +1297,10 @@ class EditModeHandler:
             
             # 生成AI建议
             logger.debug(f"[AI] 调用AI建议生成服务: 会话={session_id}")
-            suggestion = await session.editor_service.generate_ai_suggestion(
-                session.script_id, context
-            )
+            with llm_call_context(LLMPriority.INTERACTIVE, session_id=session_id):
+                suggestion = await session.editor_service.generate_ai_suggestion(
+                    session.script_id, context
+                )
             
             logger.info(f"[AI] AI建议生成成功: 会话={session_id}, 建议长度={len(str(suggestion))}字符")
             await server.broadcast({
@@ -1067,6 +1325,11 @@ class GameWebSocketServer:
     def __init__(self):
         self.sessions: Dict[str, GameSession] = {}
         self.client_sessions: Dict[Any, str] = {}  # 客户端到会话的映射
+        self.connections: Dict[Any, ClientConnection] = {}  # 客户端出站通道
+        self.shard_router: Optional[ShardRouter] = None  # 多worker分片路由（未启用时为None）
+        # 观战：会话ID -> 观战广播中心，观战连接 -> 会话ID（观战者不计入会话客户端）
+        self.spectator_hubs: Dict[str, SpectatorHub] = {}
+        self.spectator_sessions: Dict[Any, str] = {}
         # 注册消息处理器
         # 普通指令处理器（断线重连/增量同步单独处理）
         self.message_handlers: Dict[str, MessageHandler] = {
@@ -1082,9 +1345,20 @@ class GameWebSocketServer:
             "generate_ai_suggestion": GenerateAISuggestionHandler(),
             "get_tts_history": GetTTSHistoryHandler(),
             "fetch_history": FetchHistoryHandler(),
+            "resume": ResumeHandler(),
             "set_background_mode": SetBackgroundModeHandler(),
+            "state_ack": StateAckHandler(),
+            "state_resync": StateResyncHandler(),
+            "cancel_command": CancelCommandHandler(),
+            "playback_finished": PlaybackFinishedHandler(),
         }
-        # 不再需要会话保留和后台清理相关属性
+        # 空闲会话回收：最近活跃时间（monotonic）、休眠快照存储与回收器
+        reaper_config = config.session_reaper_config
+        self.session_last_active: Dict[str, float] = {}
+        self.hibernation_store = HibernationStore(reaper_config.hibernation_dir)
+        self.reaper = SessionReaper(self, reaper_config)
+        # 热门剧本预热引擎池
+        self.engine_pool = EnginePool(config.engine_pool_config)
 
     def get_or_create_session(self, session_id: Optional[str] = None, script_id: int = 1) -> GameSession:
         """获取或创建游戏会话"""
@@ -1092,17 +1366,102 @@ class GameWebSocketServer:
             session_id = str(uuid.uuid4())
         
         if session_id not in self.sessions:
-            self.sessions[session_id] = GameSession(session_id, script_id)
+            session = GameSession(session_id, script_id)
+            self._configure_actor(session)
+            self.sessions[session_id] = session
+            self.touch_session(session_id)
             logger.info(f"[SESSION] 创建新游戏会话: {session_id}, 剧本ID: {script_id}")
             print(f"Created new game session: {session_id}")
         else:
             logger.debug(f"[SESSION] 获取已存在会话: {session_id}")
         
         return self.sessions[session_id]
+
+    def touch_session(self, session_id: str):
+        """记录会话最近活跃时间（客户端连接、断开与发送消息时更新）"""
+        self.session_last_active[session_id] = time.monotonic()
     
-    async def register_client(self, websocket: Any, script_id: int = 1, user_id: Optional[int] = None):
-        """注册新的WebSocket客户端到指定会话"""
-        # 基于用户ID和剧本ID自动管理会话，不需要前端传递session_id
+    def _configure_actor(self, session: GameSession):
+        """按配置设置会话Actor的通道超时与失败通知"""
+        ws_config = config.websocket_config
+        session.actor.lane_timeouts = {
+            CommandLane.CONTROL: ws_config.control_command_timeout,
+            CommandLane.READ: ws_config.read_command_timeout,
+            CommandLane.HEAVY: ws_config.heavy_command_timeout,
+        }
+        session.actor.on_failure = self._report_command_failure
+
+    async def _report_command_failure(self, command: SessionCommand, error: BaseException):
+        """把命令的超时/取消/异常结果通知给发起命令的客户端"""
+        if command.owner is None:
+            return
+        session_id = self.client_sessions.get(command.owner)
+        if isinstance(error, asyncio.CancelledError):
+            message = {
+                "type": "command_cancelled",
+                "data": {"request_id": command.request_id, "command": command.name, "cancelled": 1},
+                "session_id": session_id
+            }
+        elif isinstance(error, asyncio.TimeoutError):
+            message = {
+                "type": "error",
+                "message": f"命令执行超时: {command.name}",
+                "request_id": command.request_id,
+                "session_id": session_id
+            }
+        else:
+            message = {
+                "type": "error",
+                "message": str(error),
+                "request_id": command.request_id,
+                "session_id": session_id
+            }
+        await self.send_to_client(command.owner, message)
+
+    def enable_sharding(self, bus: SessionBus, lease_manager: Any, worker_id: str, lease_ttl: float = 30.0):
+        """启用多worker分片模式（需随后 await shard_router.start()）"""
+        self.shard_router = ShardRouter(self, bus, lease_manager, worker_id, lease_ttl)
+
+    async def start_sharding(self):
+        """按配置启动分片模式；未启用时不做任何事"""
+        sharding_config = config.sharding_config
+        if not sharding_config.enabled or self.shard_router is not None:
+            return
+        worker_id = sharding_config.worker_id or generate_worker_id()
+        bus = create_session_bus(sharding_config.bus, sharding_config.bus_host, sharding_config.bus_port)
+        self.enable_sharding(bus, SessionLeaseManager(worker_id, sharding_config.lease_ttl),
+                             worker_id, sharding_config.lease_ttl)
+        await self.shard_router.start()
+
+    async def stop_sharding(self):
+        """停止分片模式并释放本worker持有的全部租约"""
+        if self.shard_router is not None:
+            await self.shard_router.stop()
+            self.shard_router = None
+
+    async def register_client(self, websocket: Any, script_id: int = 1, user_id: Optional[int] = None,
+                              state_protocol: str = "full", encoding: str = JSON_ENCODING):
+        """注册新的WebSocket客户端到指定会话
+
+        Args:
+            state_protocol: 状态同步协议，"full" 为完整状态（默认，兼容旧客户端），"delta" 为版本化增量
+            encoding: 帧编码，"json"（默认）或 "msgpack"（二进制帧，需安装msgpack）
+        """
+        actual_session_id = self._resolve_session_id(script_id, user_id)
+
+        # 分片模式下，持久化会话需先获取租约；会话由其他worker持有时转发连接
+        if self.shard_router is not None and user_id is not None:
+            owner = await self.shard_router.claim(actual_session_id)
+            if owner is not None:
+                await self.shard_router.forward_attach(
+                    websocket, actual_session_id, owner, script_id, user_id, state_protocol, encoding
+                )
+                return
+
+        await self.attach_client(websocket, actual_session_id, script_id, user_id, state_protocol, encoding)
+
+    def _resolve_session_id(self, script_id: int, user_id: Optional[int]) -> str:
+        """基于用户ID和剧本ID确定会话ID，不需要前端传递session_id"""
         actual_session_id = None
         
         # 如果提供了用户ID，使用GameSessionRepository处理会话
@@ -1119,15 +1478,28 @@ class GameWebSocketServer:
             # 如果没有用户ID，创建临时会话
             actual_session_id = str(uuid.uuid4())
             logger.info(f"[SESSION] 创建临时会话: {actual_session_id}")
-        
+        return actual_session_id
+
+    async def attach_client(self, websocket: Any, actual_session_id: str, script_id: int = 1,
+                            user_id: Optional[int] = None, state_protocol: str = "full",
+                            encoding: str = JSON_ENCODING):
+        """把客户端加入本worker上的会话并发送 session_connected"""
+        # 会话已被休眠时先从快照恢复
+        if actual_session_id not in self.sessions:
+            await self.rehydrate_session(actual_session_id)
+
         # 获取或创建内存中的游戏会话
         session = self.get_or_create_session(actual_session_id, script_id)
+        self.touch_session(session.session_id)
         
         # 检查是否是重新连接到后台运行的会话
         is_background_reconnect = session.background_mode and len(session.clients) == 0
         
         session.clients.add(websocket)
         self.client_sessions[websocket] = session.session_id
+        connection = self._open_connection(websocket)
+        connection.state_protocol = "delta" if state_protocol == "delta" else "full"
+        connection.encoding = negotiate_encoding(encoding)
         
         if is_background_reconnect:
             logger.info(f"[BACKGROUND] 重新连接到后台运行的会话: {session.session_id}")
@@ -1148,8 +1520,10 @@ class GameWebSocketServer:
             try:
                 active_game_info = {
                     "current_phase": getattr(session.game_engine.current_phase, "value", None),
-                    "game_state": session.game_engine.game_state,
                 }
+                # 增量协议客户端随后会收到完整快照，这里不重复附带
+                if not connection.wants_delta_state:
+                    active_game_info["game_state"] = session.game_engine.game_state
             except Exception as e:
                 logger.error(f"[SESSION] 收集进行中游戏信息失败: 会话={session.session_id}, 错误={e}")
                 active_game_info = {"error": "获取进行中游戏信息失败"}
@@ -1165,6 +1539,10 @@ class GameWebSocketServer:
                 "game_initialized": session.game_initialized,
                 "background_reconnect": is_background_reconnect,
                 "game_running": session.is_game_running,
+                "state_protocol": connection.state_protocol,
+                "encoding": connection.encoding,
+                # 重连客户端可据此判断是否需要发送 resume 握手补齐缺失事件
+                "newest_event_id": session.game_engine.event_sequence,
             },
             "session_id": session.session_id
         }
@@ -1172,14 +1550,24 @@ class GameWebSocketServer:
             payload["data"]["active_game"] = active_game_info
 
         await self.send_to_client(websocket, payload)
+        if connection.wants_delta_state and session.is_game_running:
+            session.state_tracker.commit(session.game_engine.game_state)
+            await self.send_to_client(websocket, self._state_frame(session, 0))
     
     async def unregister_client(self, websocket: Any):
         """注销WebSocket客户端"""
+        if self.shard_router is not None and self.shard_router.is_forwarded(websocket):
+            await self.shard_router.forward_detach(websocket)
+            return
         if websocket in self.client_sessions:
             session_id = self.client_sessions[websocket]
             session = self.sessions.get(session_id)
+            cleanup = False
             if session:
                 session.clients.discard(websocket)
+                # 断开的客户端不再需要其排队中/执行中命令的结果
+                session.actor.cancel(owner=websocket)
+                self.touch_session(session_id)
                 client_info = f"客户端地址: {getattr(websocket, 'remote_address', 'unknown')}"
                 logger.info(f"[CONNECTION] 客户端断开连接, 会话: {session_id}, {client_info}, 剩余客户端数: {len(session.clients)}")
                 print(f"Client disconnected from session {session_id}. Session clients: {len(session.clients)}")
@@ -1191,24 +1579,82 @@ class GameWebSocketServer:
                         print(f"Session {session_id} is in background mode, keeping game process running")
                     else:
                         logger.info(f"[CLEANUP] 会话 {session_id} 非后台模式，清理游戏进程")
-                        await self._cleanup_session(session_id, session)
+                        cleanup = True
             
             del self.client_sessions[websocket]
+            await self._close_connection(websocket)
+            if cleanup:
+                # 发送失败时本方法可能在该会话Actor的命令内被调用，而清理会停止Actor并取消该命令；
+                # 清理放在独立任务中执行，调用方被取消时清理仍会完成
+                await asyncio.shield(asyncio.create_task(self._cleanup_session(session_id, session)))
         else:
             logger.warning(f"[CONNECTION] 尝试注销未注册的客户端: {getattr(websocket, 'remote_address', 'unknown')}")
     
+    def _open_connection(self, websocket: Any) -> ClientConnection:
+        """为客户端创建出站通道并启动写协程"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            ws_config = config.websocket_config
+            connection = ClientConnection(
+                websocket,
+                on_evict=self._evict_client,
+                max_queue_size=ws_config.send_queue_size,
+                slow_consumer_timeout=ws_config.slow_consumer_timeout,
+            )
+            self.connections[websocket] = connection
+            connection.start()
+        return connection
+
+    async def _close_connection(self, websocket: Any):
+        """关闭客户端出站通道"""
+        connection = self.connections.pop(websocket, None)
+        if connection:
+            await connection.close()
+
+    async def _evict_client(self, websocket: Any):
+        """剔除慢消费者或发送失败的客户端"""
+        await self.unregister_client(websocket)
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    @staticmethod
+    def encode_message(message: Dict[str, Any], encoding: str = JSON_ENCODING) -> Frame:
+        """将消息编码为帧（广播时每条消息每种编码只编码一次）"""
+        return encode_frame(message, encoding)
+
+    def _frame_cache(self, message: Dict[str, Any]):
+        """返回按编码缓存的编码函数，同一消息对同一编码只序列化一次"""
+        frames: Dict[str, Frame] = {}
+
+        def encode(encoding: str) -> Frame:
+            frame = frames.get(encoding)
+            if frame is None:
+                frame = frames[encoding] = self.encode_message(message, encoding)
+            return frame
+        return encode
+
     async def send_to_client(self, websocket, message: Dict[str, Any]):
         """发送消息给特定客户端"""
+        connection = self.connections.get(websocket)
+        try:
+            json_message = self.encode_message(message, connection.encoding if connection else JSON_ENCODING)
+        except (TypeError, ValueError) as e:
+            # 消息含无法序列化的内容：属于服务端问题，不断开客户端
+            logger.error(f"[ERROR] 消息序列化失败: {e}, 消息类型: {message.get('type', 'unknown')}")
+            return
         try:
-            # 尝试序列化消息以检查是否有序列化问题
-            json_message = json.dumps(message, ensure_ascii=False, default=str)
             message_type = message.get('type', 'unknown')
             session_id = message.get('session_id', 'unknown')
             
             logger.debug(f"[MESSAGE] 发送消息到客户端: 类型={message_type}, 会话={session_id}, 大小={len(json_message)}字节")
             
+            if connection:
+                # 已注册客户端：经由出站队列发送，保证与广播消息的顺序一致
+                connection.enqueue(json_message)
             # 检查是否是FastAPI WebSocket还是websockets库的WebSocket
-            if hasattr(websocket, 'send_text'):
+            elif hasattr(websocket, 'send_text'):
                 # FastAPI WebSocket
                 await websocket.send_text(json_message)
             else:
@@ -1217,21 +1663,6 @@ class GameWebSocketServer:
                 
             logger.debug(f"[MESSAGE] 消息发送成功: 类型={message_type}")
             
-        except json.JSONDecodeError as e:
-            logger.error(f"[ERROR] JSON序列化错误: {e}, 消息内容: {message}")
-            print(f"JSON序列化错误: {e}, 消息内容: {message}")
-            # 发送错误消息给客户端
-            try:
-                error_message = json.dumps({
-                    "type": "error",
-                    "message": "服务器消息序列化失败"
-                }, ensure_ascii=False)
-                if hasattr(websocket, 'send_text'):
-                    await websocket.send_text(error_message)
-                else:
-                    await websocket.send(error_message)
-            except:
-                pass
         except Exception as e:
             logger.error(f"[ERROR] WebSocket发送消息失败: {e}, 消息类型: {message.get('type', 'unknown')}")
             print(f"WebSocket发送消息失败: {e}")
@@ -1239,33 +1670,108 @@ class GameWebSocketServer:
             await self.unregister_client(websocket)
     
     async def broadcast_to_session(self, session_id: str, message: Dict[str, Any]):
-        """向指定会话广播消息"""
+        """向指定会话广播消息
+
+        消息按编码只序列化一次，随后放入各客户端的出站队列，由各自的写协程并发发送；
+        某个客户端卡住不会延迟其他客户端，持续跟不上的客户端会被剔除。
+        """
+        hub = self.spectator_hubs.get(session_id)
+        if hub is not None:
+            hub.publish(message)
         session = self.sessions.get(session_id)
         if not session or not session.clients:
             logger.debug(f"[BROADCAST] 会话无客户端或不存在: 会话={session_id}")
             return
             
         logger.debug(f"[BROADCAST] 向会话广播消息: 会话={session_id}, 客户端数量={len(session.clients)}, 消息类型={message.get('type', 'unknown')}")
+        encode = self._frame_cache(message)
         disconnected = set()
-        for client in session.clients:
-            try:
-                # 检查是否是FastAPI WebSocket还是websockets库的WebSocket
-                if hasattr(client, 'send_text'):
-                    # FastAPI WebSocket
-                    await client.send_text(json.dumps(message, ensure_ascii=False))
-                else:
-                    # websockets库的WebSocket
-                    await client.send(json.dumps(message, ensure_ascii=False))
-            except Exception as e:
-                logger.warning(f"[BROADCAST] 发送消息失败: 会话={session_id}, 错误={e}")
+        for client in list(session.clients):
+            connection = self.connections.get(client) or self._open_connection(client)
+            if not connection.enqueue(encode(connection.encoding)):
                 disconnected.add(client)
         
-        # 清理断开的连接
+        # 清理断开的连接（被剔除的连接会由出站通道异步注销，这里只处理已关闭的残留）
         if disconnected:
             logger.info(f"[BROADCAST] 移除断开连接的客户端: 会话={session_id}, 数量={len(disconnected)}")
             for client in disconnected:
-                await self.unregister_client(client)
+                connection = self.connections.get(client)
+                if connection is None or not connection.evicted:
+                    await self.unregister_client(client)
     
+    def _state_frame(self, session: GameSession, base_version: int) -> Dict[str, Any]:
+        """构造增量协议的状态帧：基准版本仍在历史中时发补丁，否则发完整快照"""
+        tracker = session.state_tracker
+        ops = tracker.delta_since(base_version) if base_version else None
+        if ops is None:
+            return {
+                "type": "game_state_snapshot",
+                "data": {"version": tracker.version, "state": tracker.snapshot()},
+                "session_id": session.session_id
+            }
+        return {
+            "type": "game_state_delta",
+            "data": {"base_version": base_version, "version": tracker.version, "ops": ops},
+            "session_id": session.session_id
+        }
+
+    async def broadcast_game_state(self, session_id: str, message_type: str = "game_state_update"):
+        """广播游戏状态（game_state_update / phase_changed）
+
+        旧客户端照常收到内嵌完整 game_state 的消息；增量协议客户端收到相对其
+        最后确认版本的补丁（同一基准版本的客户端共享同一编码帧），
+        phase_changed 只携带阶段与状态版本号。
+        """
+        session = self.sessions.get(session_id)
+        if not session:
+            return
+        engine = session.game_engine
+        phase = engine.current_phase.value
+        hub = self.spectator_hubs.get(session_id)
+        if hub is not None:
+            # 观战者始终使用完整状态；game_state_update 对落后的观战者会被合并
+            spectator_data = {"phase": phase, "game_state": engine.game_state} if message_type == "phase_changed" else engine.game_state
+            hub.publish({"type": message_type, "data": spectator_data, "session_id": session_id})
+        if not session.clients:
+            return
+        full_clients = []
+        delta_connections: list[ClientConnection] = []
+        for client in list(session.clients):
+            connection = self.connections.get(client) or self._open_connection(client)
+            if connection.wants_delta_state:
+                delta_connections.append(connection)
+            else:
+                full_clients.append(connection)
+
+        if full_clients:
+            if message_type == "phase_changed":
+                data: Dict[str, Any] = {"phase": phase, "game_state": engine.game_state}
+            else:
+                data = engine.game_state
+            encode = self._frame_cache({"type": message_type, "data": data, "session_id": session_id})
+            for connection in full_clients:
+                connection.enqueue(encode(connection.encoding))
+
+        if delta_connections:
+            version = session.state_tracker.commit(engine.game_state)
+            frames_by_base: Dict[int, Any] = {}
+            encode_phase = self._frame_cache({
+                "type": "phase_changed",
+                "data": {"phase": phase, "state_version": version},
+                "session_id": session_id
+            }) if message_type == "phase_changed" else None
+            for connection in delta_connections:
+                base = connection.acked_state_version
+                if base != version:
+                    encode = frames_by_base.get(base)
+                    if encode is None:
+                        encode = frames_by_base[base] = self._frame_cache(self._state_frame(session, base))
+                    connection.enqueue(encode(connection.encoding))
+                if encode_phase is not None:
+                    connection.enqueue(encode_phase(connection.encoding))
+            logger.debug(f"[STATE] 增量状态广播: 会话={session_id}, 版本={version}, "
+                         f"客户端={len(delta_connections)}, 基准版本组={len(frames_by_base)}")
+
     async def broadcast(self, message: Dict[str, Any], session_id: Optional[str] = None):
         """广播消息给所有客户端或指定会话的客户端"""
         if session_id:
@@ -1277,10 +1783,13 @@ class GameWebSocketServer:
             for session_id in self.sessions:
                 await self.broadcast_to_session(session_id, message)
     
-    async def handle_client_message(self, websocket: Any, message: str):
-        """处理客户端消息"""
+    async def handle_client_message(self, websocket: Any, message: Frame):
+        """处理客户端消息（JSON文本帧或MessagePack二进制帧）"""
+        if self.shard_router is not None and self.shard_router.is_forwarded(websocket):
+            await self.shard_router.forward_message(websocket, message)
+            return
         try:
-            data = json.loads(message)
+            data = decode_frame(message)
             message_type = data.get("type")
             session_id = data.get("session_id") or self.client_sessions.get(websocket)
             
@@ -1303,18 +1812,27 @@ class GameWebSocketServer:
                 })
                 return
             
+            self.touch_session(session_id)
             logger.debug(f"[HANDLER] 处理消息类型: {message_type}, 会话: {session_id}")
             
-            # 断线重连/增量同步特殊消息类型
-            # 使用消息处理器处理消息
+            # 使用消息处理器处理消息：投递到会话Actor后立即返回，不阻塞接收循环
             handler = self.message_handlers.get(message_type)
-            if handler:
+            if handler and handler.inline:
                 await handler.handle(self, websocket, data)
+            elif handler:
+                session.actor.submit(
+                    message_type,
+                    lambda: handler.handle(self, websocket, data),
+                    lane=handler.lane,
+                    timeout=handler.timeout,
+                    owner=websocket,
+                    request_id=data.get("request_id"),
+                )
             else:
                 logger.warning(f"[ERROR] 未知消息类型: {message_type}, 会话={session_id}")
                 
-        except json.JSONDecodeError as e:
-            logger.error(f"[ERROR] JSON解析错误: {e}, 原始消息: {message[:200]}...")
+        except FrameDecodeError as e:
+            logger.error(f"[ERROR] 消息解析错误: {e}, 原始消息: {message[:200]!r}...")
             await self.send_to_client(websocket, {
                 "type": "error",
                 "message": "Invalid JSON format"
@@ -1369,16 +1887,192 @@ class GameWebSocketServer:
                 if 'db_session' in locals():
                     db_session.close()
             
+            await session.actor.stop()
             session.cleanup()
             del self.sessions[session_id]
+            await self._close_spectator_hub(session_id)
+            if self.shard_router is not None:
+                await self.shard_router.release(session_id)
             self.session_last_active.pop(session_id, None)
             logger.info(f"[SESSION] 清理会话: {session_id}")
         except Exception as e:
             logger.error(f"[SESSION] 清理会话失败 {session_id}: {e}")
 
+    async def drop_session(self, session_id: str):
+        """丢弃本地会话（租约被其他worker接管时），不改动数据库中的会话状态
+
+        会话内连接以 1012 关闭，客户端重连后会被路由到新的所有者。
+        """
+        session = self.sessions.pop(session_id, None)
+        if not session:
+            return
+        self.session_last_active.pop(session_id, None)
+        await self._close_spectator_hub(session_id)
+        session.is_game_running = False
+        await session.actor.stop()
+        for client in list(session.clients):
+            self.client_sessions.pop(client, None)
+            await self._close_connection(client)
+            try:
+                await client.close(code=1012)
+            except Exception:
+                pass
+        session.clients.clear()
+        session.cleanup()
+
+    async def hibernate_session(self, session_id: str) -> bool:
+        """休眠会话：停止游戏循环，写入快照并释放内存中的引擎、Agent与TTS管理器
+
+        未初始化游戏的会话没有需要保留的状态，直接释放。快照写入失败时会话保留在内存中（游戏暂停）。
+        """
+        session = self.sessions.get(session_id)
+        if not session or session.clients:
+            return False
+        was_running = session.is_game_running
+        session.is_game_running = False
+        await session.actor.stop()
+
+        if session.game_initialized:
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "session_id": session_id,
+                "script_id": session.script_id,
+                "was_running": was_running,
+                "background_mode": session.background_mode,
+                "hibernated_at": time.time(),
+                "engine": session.game_engine.export_snapshot(config.session_reaper_config.event_tail),
+            }
+            try:
+                size = await asyncio.to_thread(self.hibernation_store.save, session_id, snapshot)
+            except Exception as e:
+                logger.error(f"[REAPER] 写入休眠快照失败，会话保留在内存中: 会话={session_id}, 错误={e}")
+                session.actor = SessionActor(session_id)
+                self._configure_actor(session)
+                return False
+            logger.info(f"[REAPER] 会话已休眠: {session_id}, 快照={size}字节, 游戏运行中={was_running}")
+        else:
+            logger.info(f"[REAPER] 释放未开始游戏的空闲会话: {session_id}")
+
+        self.sessions.pop(session_id, None)
+        self.session_last_active.pop(session_id, None)
+        await self._close_spectator_hub(session_id)
+        session.cleanup()
+        if self.shard_router is not None:
+            await self.shard_router.release(session_id)
+        return True
+
+    async def rehydrate_session(self, session_id: str) -> Optional[GameSession]:
+        """从休眠快照恢复会话；没有快照时返回 None。休眠前在运行的游戏会继续运行当前阶段"""
+        try:
+            snapshot = await asyncio.to_thread(self.hibernation_store.load, session_id)
+        except Exception as e:
+            logger.error(f"[REAPER] 读取休眠快照失败: 会话={session_id}, 错误={e}")
+            return None
+        if snapshot is None or session_id in self.sessions:
+            return self.sessions.get(session_id)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.warning(f"[REAPER] 休眠快照版本不兼容，丢弃: 会话={session_id}")
+            await asyncio.to_thread(self.hibernation_store.delete, session_id)
+            return None
+
+        session = self.get_or_create_session(session_id, snapshot.get("script_id") or 1)
+        try:
+            session.game_engine.restore_snapshot(snapshot["engine"])
+        except Exception as e:
+            logger.error(f"[REAPER] 恢复休眠会话失败，使用新会话: 会话={session_id}, 错误={e}")
+            return session
+        session.game_initialized = True
+        session.background_mode = bool(snapshot.get("background_mode"))
+        await asyncio.to_thread(self.hibernation_store.delete, session_id)
+        logger.info(f"[REAPER] 会话已从快照恢复: {session_id}, 阶段={session.game_engine.current_phase.value}")
+
+        if snapshot.get("was_running") and session.game_engine.current_phase != GamePhase.ENDED:
+            session.is_game_running = True
+            session.actor.spawn(GameModeHandler.game_loop(self, session_id), name="game_loop")
+        return session
+
+    async def register_spectator(self, websocket: Any, session_id: Optional[str], encoding: str = JSON_ENCODING) -> bool:
+        """以只读观战者身份加入会话；会话由其他worker运行时转发过去，无人运行时拒绝（观战不会创建或恢复会话）"""
+        encoding = negotiate_encoding(encoding)
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None and session_id and self.shard_router is not None:
+            owner = await self.shard_router.owner_of(session_id)
+            if owner is not None and owner != self.shard_router.worker_id:
+                await self.shard_router.forward_attach(
+                    websocket, session_id, owner, script_id=None, user_id=None,
+                    state_protocol="full", encoding=encoding, spectator=True,
+                )
+                return True
+        if session is None:
+            try:
+                await websocket.send_text(encode_frame({
+                    "type": "error", "message": f"会话 {session_id} 不存在或未在运行", "session_id": session_id
+                }))
+                await websocket.close(code=4404)
+            except Exception:
+                pass
+            return False
+        hub = self.spectator_hubs.get(session_id)
+        if hub is None:
+            ws_config = config.websocket_config
+            hub = self.spectator_hubs[session_id] = SpectatorHub(
+                session_id,
+                lambda: self._spectator_snapshot(session_id),
+                tail_size=ws_config.spectator_tail_size,
+                max_pending=ws_config.spectator_queue_size,
+                send_timeout=ws_config.slow_consumer_timeout,
+            )
+        hub.add(websocket, encoding)
+        self.spectator_sessions[websocket] = session_id
+        logger.info(f"[SPECTATOR] 观战者加入: 会话={session_id}, 观战人数={len(hub)}")
+        return True
+
+    async def unregister_spectator(self, websocket: Any):
+        if self.shard_router is not None and self.shard_router.is_forwarded(websocket):
+            await self.shard_router.forward_detach(websocket)
+            return
+        session_id = self.spectator_sessions.pop(websocket, None)
+        hub = self.spectator_hubs.get(session_id) if session_id else None
+        if hub is None:
+            return
+        await hub.remove(websocket)
+        if not hub.viewers:
+            self.spectator_hubs.pop(session_id, None)
+        logger.info(f"[SPECTATOR] 观战者离开: 会话={session_id}, 观战人数={len(hub)}")
+
+    async def _close_spectator_hub(self, session_id: str):
+        """会话结束或休眠时断开全部观战者"""
+        hub = self.spectator_hubs.pop(session_id, None)
+        if hub is None:
+            return
+        for websocket in list(hub.viewers):
+            self.spectator_sessions.pop(websocket, None)
+        await hub.close()
+
+    def _spectator_snapshot(self, session_id: str) -> Dict[str, Any]:
+        """观战快照：当前游戏状态，事件与聊天只保留最近部分"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return {}
+        engine = session.game_engine
+        tail_size = config.websocket_config.spectator_tail_size
+        state = {k: v for k, v in engine.game_state.items() if k not in ("events", "public_chat")}
+        state["events"] = engine.events[-tail_size:]
+        state["public_chat"] = engine.public_chat[-tail_size:]
+        return state
+
+    def start_background_tasks(self):
+        """启动后台任务（空闲会话回收、预热引擎池）"""
+        self.reaper.start()
+        self.engine_pool.start()
+
+    async def stop_background_tasks(self):
+        await self.reaper.stop()
+        await self.engine_pool.stop()
+
     async def cleanup_inactive_sessions(self):
-        """保留此方法以兼容现有代码，但不再执行周期性清理"""
-        pass
+        """立即执行一次空闲会话回收"""
+        await self.reaper.sweep()
 
 # 全局服务器实例
 game_server = GameWebSocketServer()
@@ -1389,7 +2083,8 @@ async def start_websocket_server(host="localhost", port=8765):
         raise ImportError("websockets library is not installed. Use 'pip install websockets' to install it.")
     
     print(f"WebSocket server starting on ws://{host}:{port}")
-    server = await websockets.serve(game_server.handle_connection, host, port)
+    compression = "deflate" if config.websocket_config.per_message_deflate else None
+    server = await websockets.serve(game_server.handle_connection, host, port, compression=compression)
     # 启动后台任务
     game_server.start_background_tasks()
     return server
@@ -0,0 +1,28 @@
+"""add game session lease columns
+
+Revision ID: d7e2f41a9b35
+Revises: cc0436694e36
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e2f41a9b35'
+down_revision = 'cc0436694e36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('game_sessions', sa.Column('owner_worker_id', sa.String(length=100), nullable=True, comment='持有会话的worker标识'))
+    op.add_column('game_sessions', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True, comment='会话租约过期时间'))
+    op.create_index('idx_game_sessions_owner_worker_id', 'game_sessions', ['owner_worker_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_game_sessions_owner_worker_id', table_name='game_sessions')
+    op.drop_column('game_sessions', 'lease_expires_at')
+    op.drop_column('game_sessions', 'owner_worker_id')
@@ -27,6 +27,9 @@ class GameSession(BaseSQLAlchemyModel):
     finished_at = Column(DateTime(timezone=True), nullable=True, comment="游戏结束时间")
     # TTS相关
     total_tts_duration:Column[float] = Column(Float, nullable=True, default=0.0, comment="累计TTS音频时长（秒）")
+    # 多worker分片：会话所有权租约
+    owner_worker_id = Column(String(100), nullable=True, comment="持有会话的worker标识")
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True, comment="会话租约过期时间")
     
     # 关联关系
     host_user = relationship("User", back_populates="hosted_sessions")
@@ -37,6 +40,7 @@ class GameSession(BaseSQLAlchemyModel):
         Index('idx_game_sessions_host_user_id', 'host_user_id'),
         Index('idx_game_sessions_status', 'status'),
         Index('idx_game_sessions_script_id', 'script_id'),
+        Index('idx_game_sessions_owner_worker_id', 'owner_worker_id'),
     )
 
     def __repr__(self):
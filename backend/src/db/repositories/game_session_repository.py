@@ -1,7 +1,8 @@
 """游戏会话数据仓库"""
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, or_
 from sqlalchemy.exc import SQLAlchemyError
 
 from .base import BaseRepository
@@ -173,6 +174,71 @@ class GameSessionRepository(BaseRepository[GameSession]):
         result = self.delete_sessions([session_id], user_id)
         return len(result["success"]) > 0
 
+    def acquire_lease(self, session_id: str, worker_id: str, ttl_seconds: float) -> bool:
+        """尝试获取（或续期）会话所有权租约
+
+        以单条条件UPDATE实现原子抢占：仅当租约无人持有、已过期或本就属于该worker时成功。
+        """
+        now = datetime.now(timezone.utc)
+        updated = self.session.query(GameSession).filter(
+            GameSession.session_id == session_id,
+            or_(
+                GameSession.owner_worker_id.is_(None),
+                GameSession.owner_worker_id == worker_id,
+                GameSession.lease_expires_at.is_(None),
+                GameSession.lease_expires_at < now,
+            )
+        ).update({
+            GameSession.owner_worker_id: worker_id,
+            GameSession.lease_expires_at: now + timedelta(seconds=ttl_seconds),
+        }, synchronize_session=False)
+        self.session.flush()
+        return updated == 1
+
+    def renew_leases(self, session_ids: List[str], worker_id: str, ttl_seconds: float) -> List[str]:
+        """批量续期本worker持有的租约，返回仍持有的会话ID"""
+        if not session_ids:
+            return []
+        now = datetime.now(timezone.utc)
+        self.session.query(GameSession).filter(
+            GameSession.session_id.in_(session_ids),
+            GameSession.owner_worker_id == worker_id,
+        ).update({
+            GameSession.lease_expires_at: now + timedelta(seconds=ttl_seconds),
+        }, synchronize_session=False)
+        self.session.flush()
+        rows = self.session.query(GameSession.session_id).filter(
+            GameSession.session_id.in_(session_ids),
+            GameSession.owner_worker_id == worker_id,
+        ).all()
+        return [row.session_id for row in rows]
+
+    def release_lease(self, session_id: str, worker_id: str) -> bool:
+        """释放本worker持有的会话租约"""
+        updated = self.session.query(GameSession).filter(
+            GameSession.session_id == session_id,
+            GameSession.owner_worker_id == worker_id,
+        ).update({
+            GameSession.owner_worker_id: None,
+            GameSession.lease_expires_at: None,
+        }, synchronize_session=False)
+        self.session.flush()
+        return updated == 1
+
+    def get_lease_owner(self, session_id: str) -> Optional[str]:
+        """获取会话当前有效租约的持有者（租约过期视为无人持有）"""
+        row = self.session.query(GameSession.owner_worker_id, GameSession.lease_expires_at).filter(
+            GameSession.session_id == session_id
+        ).first()
+        if not row or not row.owner_worker_id or not row.lease_expires_at:
+            return None
+        expires_at = row.lease_expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at < datetime.now(timezone.utc):
+            return None
+        return row.owner_worker_id
+
 class GameEventRepository(BaseRepository[GameEventDBModel]):
     """游戏事件仓库"""
     
@@ -17,6 +17,10 @@ from ..models.location import LocationDBModel
 from ..models.background_story import BackgroundStoryDBModel
 from ..models.game_phase import GamePhaseDBModel
 from .base import BaseRepository
+from ...core.script_cache import install_invalidation_hooks, script_version
+
+# 剧本（含子表）写入提交后使进程级剧本编译缓存失效
+install_invalidation_hooks()
 
 
 class ScriptRepository(BaseRepository[ScriptDBModel]):
@@ -141,6 +145,13 @@ class ScriptRepository(BaseRepository[ScriptDBModel]):
             game_phases=game_phases
         )
     
+    def get_script_version(self, script_id: int) -> Optional[str]:
+        """获取剧本版本（updated_at），剧本不存在时返回None"""
+        row = self.db.query(ScriptDBModel.updated_at).filter(ScriptDBModel.id == script_id).first()
+        if row is None:
+            return None
+        return script_version(row[0])
+    
     def get_script_info_by_id(self, script_id: int) -> Optional[ScriptInfo]:
         """根据ID获取剧本基本信息"""
         db_script = self.db.query(ScriptDBModel).filter(ScriptDBModel.id == script_id).first()
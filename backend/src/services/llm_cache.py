@@ -0,0 +1,271 @@
+"""LLM 响应缓存
+
+不少 LLM 调用对相同输入的结果基本确定，且在会话和用户之间重复出现：指令分类
+（temperature 0.1）、GM 阶段规划、图片提示词优化、剧本生成的解析失败重试等。
+这里在 BaseLLMService.chat_completion 外加一层缓存，由调用点按名称显式接入：
+  - 键：调用点、模型（含 base_url 与默认参数）、消息与调用参数规范化后的 SHA-256
+  - 进程内 LRU + 本地 SQLite（跨进程、跨重启共享），条目按调用点的 TTL 过期
+  - 单飞：相同请求并发到达时只发起一次上游调用，其余等待同一结果
+  - validate 返回 False 的响应（如无法解析的 JSON）不写入缓存，避免把一次失败固化
+  - 按调用点统计内存命中 / 磁盘命中 / 未命中 / 合并请求数
+全局开关 LLM_CACHE_ENABLED 默认关闭；调用点 TTL 为 0 时直接透传。
+"""
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .llm_service import BaseLLMService, LLMMessage, LLMResponse, llm_call_context
+
+logger = logging.getLogger(__name__)
+
+# 各调用点的默认有效期（秒），可由 LLM_CACHE_TTLS 覆盖
+DEFAULT_TTLS: Dict[str, float] = {
+    "categorize_instruction": 7 * 86400,
+    "gm_plan": 7 * 86400,
+    "image_prompt": 86400,
+    "script_generation": 3600,
+}
+
+_COUNTERS = ("memory_hits", "disk_hits", "misses", "coalesced", "stored", "rejected")
+
+# (过期时间戳, content, usage, model)
+_Entry = Tuple[float, str, Optional[Dict[str, Any]], Optional[str]]
+
+
+def _to_response(entry: _Entry) -> LLMResponse:
+    _, content, usage, model = entry
+    return LLMResponse(content=content, usage=dict(usage) if usage else None, model=model)
+
+
+class LLMResponseCache:
+    """LLM 响应缓存：进程内 LRU + SQLite，带单飞合并与按调用点的命中统计"""
+
+    def __init__(self, path: str = ".data/llm_cache.sqlite3", enabled: bool = True,
+                 memory_entries: int = 512, default_ttl: float = 86400.0,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.memory_entries = max(1, memory_entries)
+        self.default_ttl = default_ttl
+        self.ttls: Dict[str, float] = {**DEFAULT_TTLS, **(ttls or {})}
+        self._memory: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+
+    # ------------------------------------------------------------------
+    # 键与有效期
+    # ------------------------------------------------------------------
+
+    def ttl_for(self, call_site: str, ttl: Optional[float] = None) -> float:
+        """调用点的有效期：配置优先，其次调用方给出的值，最后为默认值"""
+        if call_site in self.ttls:
+            return self.ttls[call_site]
+        return self.default_ttl if ttl is None else ttl
+
+    @staticmethod
+    def make_key(llm: BaseLLMService, messages: List[LLMMessage], params: Dict[str, Any],
+                 call_site: str = "") -> str:
+        """调用点、模型、消息与参数的规范化哈希（不同调用点的校验与有效期不同，互不共享）"""
+        payload = {
+            "call_site": call_site,
+            "service": type(llm).__name__,
+            "model": getattr(llm, "model", None),
+            "base_url": getattr(llm, "base_url", None),
+            "defaults": getattr(llm, "extra_params", None) or {},
+            "messages": [[m.role, m.content] for m in messages],
+            "params": params,
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def _count(self, call_site: str, counter: str):
+        site = self._metrics.setdefault(call_site, dict.fromkeys(_COUNTERS, 0))
+        site[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        totals = dict.fromkeys(_COUNTERS, 0)
+        for site in self._metrics.values():
+            for counter, value in site.items():
+                totals[counter] += value
+        hits = totals["memory_hits"] + totals["disk_hits"] + totals["coalesced"]
+        lookups = hits + totals["misses"]
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            **totals,
+            "call_sites": {site: dict(counters) for site, counters in sorted(self._metrics.items())},
+        }
+
+    # ------------------------------------------------------------------
+    # 存储
+    # ------------------------------------------------------------------
+
+    def _memory_get(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, entry: _Entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, call_site TEXT, expires_at REAL, "
+                "content TEXT, usage TEXT, model TEXT)"
+            )
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key: str, now: float) -> Optional[_Entry]:
+        with self._db_lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT expires_at, content, usage, model FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] <= now:
+                db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                db.commit()
+                return None
+        return row[0], row[1], json.loads(row[2]) if row[2] else None, row[3]
+
+    def _disk_put(self, key: str, call_site: str, entry: _Entry):
+        expires_at, content, usage, model = entry
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, call_site, expires_at, content, usage, model) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, call_site, expires_at, content, json.dumps(usage) if usage else None, model),
+            )
+            db.commit()
+
+    def purge_expired(self) -> int:
+        """删除磁盘上已过期的条目，返回删除数"""
+        with self._db_lock:
+            db = self._connect()
+            deleted = db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            db.commit()
+        return deleted
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    async def get_or_call(self, key: str, call_site: str, ttl: float,
+                          call: Callable[[], Awaitable[LLMResponse]],
+                          validate: Optional[Callable[[LLMResponse], bool]] = None) -> LLMResponse:
+        """命中则返回缓存结果；否则调用上游（相同键并发时只调用一次）并按需写入缓存"""
+        entry = self._memory_get(key, time.time())
+        if entry is not None:
+            self._count(call_site, "memory_hits")
+            return _to_response(entry)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._count(call_site, "coalesced")
+            await asyncio.wait([pending])  # 本任务被取消时不影响进行中的上游调用
+            if pending.cancelled():
+                # 发起方被取消：由当前请求重新发起
+                return await self.get_or_call(key, call_site, ttl, call, validate)
+            return dataclasses.replace(pending.result())
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key, time.time())
+            except sqlite3.Error as e:
+                logger.warning(f"[LLM_CACHE] 读取缓存失败: {e}")
+                entry = None
+            if entry is not None:
+                self._count(call_site, "disk_hits")
+                self._remember(key, entry)
+                response = _to_response(entry)
+            else:
+                self._count(call_site, "misses")
+                response = await call()
+                if response is not None and response.content and (validate is None or validate(response)):
+                    entry = (time.time() + ttl, response.content, response.usage, response.model)
+                    self._remember(key, entry)
+                    try:
+                        await asyncio.to_thread(self._disk_put, key, call_site, entry)
+                    except sqlite3.Error as e:
+                        logger.warning(f"[LLM_CACHE] 写入缓存失败: {e}")
+                    self._count(call_site, "stored")
+                else:
+                    self._count(call_site, "rejected")
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 没有等待者时避免 "exception was never retrieved"
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+def _build_cache() -> LLMResponseCache:
+    from ..core.config import config
+    cfg = config.llm_cache_config
+    return LLMResponseCache(path=cfg.path, enabled=cfg.enabled, memory_entries=cfg.memory_entries,
+                            default_ttl=cfg.default_ttl, ttls=cfg.ttls)
+
+
+llm_response_cache = _build_cache()
+
+
+async def cached_chat_completion(llm: BaseLLMService, messages: List[LLMMessage], *, call_site: str,
+                                 ttl: Optional[float] = None,
+                                 validate: Optional[Callable[[LLMResponse], bool]] = None,
+                                 cache: Optional[LLMResponseCache] = None, **kwargs) -> LLMResponse:
+    """带缓存的 chat_completion；缓存关闭或调用点 TTL 为 0 时直接调用 llm（调用点同时作为埋点标签）"""
+    cache = cache or llm_response_cache
+    ttl = cache.ttl_for(call_site, ttl)
+    with llm_call_context(call_site=call_site):
+        if not cache.enabled or ttl <= 0:
+            return await llm.chat_completion(messages, **kwargs)
+        key = cache.make_key(llm, messages, kwargs, call_site)
+        return await cache.get_or_call(key, call_site, ttl, lambda: llm.chat_completion(messages, **kwargs), validate)
@@ -0,0 +1,281 @@
+"""LLM 调用埋点
+
+OpenAILLMService / LangChainLLMService 的每次上游调用都经 llm_metrics.track 记录一条
+LLMCallRecord：
+  - 排队等待（LLMGovernor 放行前）、总耗时、流式首 token 耗时（TTFT）
+  - 提示词 / 补全 token（上游返回 usage 时）与按模型单价估算的费用
+  - HTTP 重试次数（SDK 内部重试，由共享连接池的请求钩子计数）、错误类型
+记录带有调用点、会话、阶段、角色、优先级标签（来自 llm_call_context），在内存中按
+call_site / phase / call_site_phase / model / session / character 分维度汇总（会话与角色
+维度按 LRU 保留最近的若干个），由管理端点导出；配置 LLM_METRICS_TRACE_PATH 时逐条追加到 JSONL。
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 按 LRU 保留的高基数维度
+_BOUNDED_DIMENSIONS = ("session", "character")
+DIMENSIONS = ("call_site", "phase", "call_site_phase", "model") + _BOUNDED_DIMENSIONS
+
+
+@dataclass
+class LLMCallRecord:
+    """一次上游 LLM 调用"""
+    call_site: str
+    model: str
+    stream: bool
+    priority: str
+    session_id: Optional[str] = None
+    phase: Optional[str] = None
+    character: Optional[str] = None
+    started_at: float = 0.0  # 墙钟时间戳
+    status: str = "ok"  # ok / error / cancelled
+    error: Optional[str] = None
+    queue_ms: float = 0.0
+    latency_ms: float = 0.0
+    ttft_ms: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+    attempts: int = 0  # 实际发出的 HTTP 请求数（流式或未经共享连接池时为 0）
+    cost: float = 0.0
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+
+class LLMCallTracker:
+    """进行中的一次调用：由服务在放行、收到首 token、拿到 usage 时回报"""
+
+    def __init__(self, record: LLMCallRecord):
+        self.record = record
+        self._start = time.perf_counter()
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def admitted(self):
+        self.record.queue_ms = self._elapsed_ms()
+
+    def first_token(self):
+        if self.record.ttft_ms is None:
+            self.record.ttft_ms = self._elapsed_ms()
+
+    def settle(self, usage: Optional[Dict[str, Any]]):
+        if not usage:
+            return
+        self.record.prompt_tokens = usage.get("prompt_tokens")
+        self.record.completion_tokens = usage.get("completion_tokens")
+        self.record.total_tokens = usage.get("total_tokens")
+
+    def attempt(self):
+        self.record.attempts += 1
+
+
+# 当前任务中进行中的非流式调用（供连接池请求钩子计数重试）
+_active_call: ContextVar[Optional[LLMCallTracker]] = ContextVar("llm_active_call", default=None)
+
+
+def note_http_attempt():
+    """共享连接池每发出一个 HTTP 请求调用一次"""
+    tracker = _active_call.get()
+    if tracker is not None:
+        tracker.attempt()
+
+
+def _percentile(samples: Deque[float], ratio: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * ratio))], 1)
+
+
+class _Aggregate:
+    """一个维度取值下的汇总"""
+
+    __slots__ = ("calls", "errors", "cancelled", "retries", "prompt_tokens", "completion_tokens",
+                 "cost", "latency_total", "latency_max", "latencies", "queue_total", "ttft_total",
+                 "ttft_count", "ttfts")
+
+    def __init__(self, samples: int):
+        self.calls = self.errors = self.cancelled = self.retries = 0
+        self.prompt_tokens = self.completion_tokens = 0
+        self.cost = self.latency_total = self.latency_max = self.queue_total = self.ttft_total = 0.0
+        self.ttft_count = 0
+        self.latencies: Deque[float] = deque(maxlen=samples)
+        self.ttfts: Deque[float] = deque(maxlen=samples)
+
+    def add(self, record: LLMCallRecord):
+        self.calls += 1
+        self.errors += record.status == "error"
+        self.cancelled += record.status == "cancelled"
+        self.retries += record.retries
+        self.prompt_tokens += record.prompt_tokens or 0
+        self.completion_tokens += record.completion_tokens or 0
+        self.cost += record.cost
+        self.latency_total += record.latency_ms
+        self.latency_max = max(self.latency_max, record.latency_ms)
+        self.latencies.append(record.latency_ms)
+        self.queue_total += record.queue_ms
+        if record.ttft_ms is not None:
+            self.ttft_total += record.ttft_ms
+            self.ttft_count += 1
+            self.ttfts.append(record.ttft_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": round(self.cost, 6),
+            "avg_latency_ms": round(self.latency_total / self.calls, 1) if self.calls else 0.0,
+            "p50_latency_ms": _percentile(self.latencies, 0.5),
+            "p95_latency_ms": _percentile(self.latencies, 0.95),
+            "max_latency_ms": round(self.latency_max, 1),
+            "avg_queue_ms": round(self.queue_total / self.calls, 1) if self.calls else 0.0,
+            "avg_ttft_ms": round(self.ttft_total / self.ttft_count, 1) if self.ttft_count else None,
+            "p95_ttft_ms": _percentile(self.ttfts, 0.95) if self.ttft_count else None,
+        }
+
+
+class LLMMetrics:
+    """LLM 调用指标：内存分维度汇总 + 可选 JSONL 追踪"""
+
+    def __init__(self, enabled: bool = True, trace_path: Optional[str] = None, max_keys: int = 500,
+                 samples: int = 256, prices: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.enabled = enabled
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.max_keys = max(1, max_keys)
+        self.samples = max(1, samples)
+        self.prices = prices or {}  # 模型 -> (提示词, 补全) 每百万 token 单价
+        self._total = _Aggregate(self.samples)
+        self._dimensions: Dict[str, 'OrderedDict[str, _Aggregate]'] = {d: OrderedDict() for d in DIMENSIONS}
+        self._trace = None
+
+    def cost_of(self, record: LLMCallRecord) -> float:
+        prompt_price, completion_price = self.prices.get(record.model, (0.0, 0.0))
+        return ((record.prompt_tokens or 0) * prompt_price
+                + (record.completion_tokens or 0) * completion_price) / 1_000_000
+
+    @asynccontextmanager
+    async def track(self, *, model: str, stream: bool, call_site: Optional[str], priority: str,
+                    session_id: Optional[str] = None, phase: Optional[str] = None,
+                    character: Optional[str] = None, bind: bool = True):
+        """记录一次调用；bind 为 True 时把调用绑定到当前上下文，以便连接池钩子计数 HTTP 重试
+
+        异步生成器（流式）中不要 bind：生成器与调用方共用上下文，跨 yield 设置上下文变量会泄漏。
+        """
+        record = LLMCallRecord(call_site=call_site or "default", model=model, stream=stream,
+                               priority=priority, session_id=session_id, phase=phase,
+                               character=character, started_at=time.time())
+        tracker = LLMCallTracker(record)
+        if not self.enabled:
+            yield tracker
+            return
+        token = _active_call.set(tracker) if bind else None
+        try:
+            yield tracker
+        except BaseException as exc:
+            # 取消（如推测发言被丢弃）单独计数，不算作错误；GeneratorExit 为流式调用方提前停止读取
+            if isinstance(exc, GeneratorExit):
+                pass
+            elif isinstance(exc, asyncio.CancelledError):
+                record.status = "cancelled"
+            else:
+                record.status = "error"
+                record.error = type(exc).__name__
+            raise
+        finally:
+            if token is not None:
+                _active_call.reset(token)
+            record.latency_ms = tracker._elapsed_ms()
+            self.record(record)
+
+    def record(self, record: LLMCallRecord):
+        record.cost = self.cost_of(record)
+        self._total.add(record)
+        keys = {
+            "call_site": record.call_site,
+            "phase": record.phase,
+            "call_site_phase": f"{record.call_site}/{record.phase}" if record.phase else None,
+            "model": record.model,
+            "session": record.session_id,
+            "character": record.character,
+        }
+        for dimension, key in keys.items():
+            if key is None:
+                continue
+            groups = self._dimensions[dimension]
+            aggregate = groups.get(key)
+            if aggregate is None:
+                aggregate = groups[key] = _Aggregate(self.samples)
+            aggregate.add(record)
+            if dimension in _BOUNDED_DIMENSIONS:
+                groups.move_to_end(key)
+                while len(groups) > self.max_keys:
+                    groups.popitem(last=False)
+        if self.trace_path is not None:
+            self._write_trace(record)
+
+    def _write_trace(self, record: LLMCallRecord):
+        try:
+            if self._trace is None:
+                self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+                self._trace = open(self.trace_path, "a", encoding="utf-8", buffering=1)
+            line = asdict(record)
+            line["timestamp"] = datetime.fromtimestamp(record.started_at, timezone.utc).isoformat()
+            line["retries"] = record.retries
+            self._trace.write(json.dumps(line, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"[LLM_METRICS] 写入追踪文件失败，停止追踪: {e}")
+            self.trace_path = None
+
+    def snapshot(self, dimension: Optional[str] = None) -> Dict[str, Any]:
+        """指标快照；dimension 指定时只返回该维度"""
+        dimensions = [dimension] if dimension else list(DIMENSIONS)
+        return {
+            "enabled": self.enabled,
+            "trace_path": str(self.trace_path) if self.trace_path else None,
+            "total": self._total.snapshot(),
+            **{f"by_{name}": {key: agg.snapshot() for key, agg in self._dimensions[name].items()}
+               for name in dimensions},
+        }
+
+    def reset(self):
+        self._total = _Aggregate(self.samples)
+        for groups in self._dimensions.values():
+            groups.clear()
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+
+def _create_llm_metrics() -> LLMMetrics:
+    try:
+        from ..core.config import config
+        cfg = config.llm_metrics_config
+        return LLMMetrics(enabled=cfg.enabled, trace_path=cfg.trace_path, max_keys=cfg.max_keys,
+                          samples=cfg.samples, prices=cfg.prices)
+    except Exception as e:
+        logger.warning(f"[LLM_METRICS] 加载埋点配置失败，使用默认值: {e}")
+        return LLMMetrics()
+
+
+# 全局 LLM 调用指标
+llm_metrics = _create_llm_metrics()
@@ -1,7 +1,35 @@
-"""LLM服务抽象层"""
+"""LLM服务抽象层
+
+进程内所有上游 LLM 请求经 llm_governor 统一调度（见 LLMGovernor）：按上游地址与模型分道，
+每道有 RPM/TPM 令牌桶与并发上限；排队时实时对局优先于交互编辑、交互编辑优先于批量生成，
+同一优先级内按会话轮转。调用方通过 llm_call_context 声明优先级与会话（随 contextvars
+传入其中创建的任务），未声明时按交互编辑处理。
+
+服务实例由 llm_client_registry 按 (provider, base_url, model) 复用，同一上游共享一个
+keep-alive HTTP 连接池，新开局不再重新建立 TLS 连接（见 LLMClientRegistry）。
+
+每次上游调用由 llm_metrics 记录耗时、TTFT、token 与重试，标签（调用点、会话、阶段、角色）
+同样取自 llm_call_context（见 llm_metrics 模块）。
+"""
+import asyncio
+import dataclasses
+import functools
+import json
+import logging
+import math
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, AsyncGenerator, Optional
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import List, Dict, Any, AsyncGenerator, Deque, Iterator, Optional, Tuple
 from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from .llm_metrics import llm_metrics, note_http_attempt
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class LLMMessage:
@@ -16,6 +44,347 @@ class LLMResponse:
     usage: Optional[Dict[str, int]] = None
     model: Optional[str] = None
 
+class LLMPriority(IntEnum):
+    """LLM 调用优先级（数值越小越优先）"""
+    LIVE = 0  # 实时对局：角色发言、选人、GM 规划与公告
+    INTERACTIVE = 1  # 交互编辑：剧本编辑器的指令解析、执行与建议
+    BATCH = 2  # 批量生成：剧本/角色/证据生成、图片提示词优化
+
+
+@dataclass(frozen=True)
+class LLMCallContext:
+    """当前 LLM 调用的调度与埋点上下文"""
+    priority: LLMPriority = LLMPriority.INTERACTIVE
+    session_id: Optional[str] = None
+    call_site: Optional[str] = None  # 提示词构建方，如 character_turn / select_speaker / gm_plan
+    phase: Optional[str] = None
+    character: Optional[str] = None
+
+
+_call_context: ContextVar[LLMCallContext] = ContextVar("llm_call_context", default=LLMCallContext())
+
+
+def current_llm_call_context() -> LLMCallContext:
+    return _call_context.get()
+
+
+@contextmanager
+def llm_call_context(priority: Optional[LLMPriority] = None, session_id: Optional[str] = None, *,
+                     call_site: Optional[str] = None, phase: Optional[str] = None,
+                     character: Optional[str] = None) -> Iterator[LLMCallContext]:
+    """在当前上下文（及其中创建的任务）内设置 LLM 调用的优先级、会话与埋点标签；未给出的字段沿用外层"""
+    outer = _call_context.get()
+    context = dataclasses.replace(
+        outer,
+        priority=outer.priority if priority is None else priority,
+        session_id=outer.session_id if session_id is None else session_id,
+        call_site=outer.call_site if call_site is None else call_site,
+        phase=outer.phase if phase is None else phase,
+        character=outer.character if character is None else character,
+    )
+    token = _call_context.set(context)
+    try:
+        yield context
+    finally:
+        _call_context.reset(token)
+
+
+def llm_priority(priority: LLMPriority, call_site: Optional[str] = None):
+    """装饰协程函数：函数内（及其中创建的任务）发起的 LLM 调用使用指定优先级（及调用点标签）"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with llm_call_context(priority, call_site=call_site):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def estimate_tokens(messages: List['LLMMessage'], max_tokens: Optional[int] = None) -> int:
+    """请求消耗的 token 粗估（提示词按两字符一个 token，加上补全上限），入队时预扣，完成后按实际用量结算"""
+    prompt = sum(len(msg.content or "") for msg in messages) // 2 + 4 * len(messages)
+    return prompt + (max_tokens or 0)
+
+
+def track_llm_call(model: str, stream: bool = False):
+    """按当前 llm_call_context 的标签记录一次上游调用（见 LLMMetrics.track）"""
+    context = _call_context.get()
+    return llm_metrics.track(model=model, stream=stream, call_site=context.call_site,
+                             priority=context.priority.name.lower(), session_id=context.session_id,
+                             phase=context.phase, character=context.character, bind=not stream)
+
+
+def governor_key(base_url: Optional[str], model: str) -> str:
+    """调度分道键：上游主机 + 模型（同一上游账号的同一模型共享限额）"""
+    host = urlparse(base_url).netloc if base_url else ""
+    return f"{host or 'api.openai.com'}/{model}"
+
+
+class TokenBucket:
+    """令牌桶：容量为一分钟的额度（允许突发），按秒匀速补充；按实际用量结算时允许透支"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """距可扣除 amount 还需等待的秒数（超过容量的请求按容量计，避免永远无法放行）"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+
+@dataclass(eq=False)
+class _Waiter:
+    priority: LLMPriority
+    session: str
+    tokens: int
+    future: asyncio.Future
+    enqueued_at: float
+
+
+@dataclass
+class LLMTicket:
+    """一次放行的请求：完成后由服务按实际用量结算"""
+    priority: LLMPriority
+    estimated_tokens: int
+    actual_tokens: Optional[int] = None
+
+    def settle(self, usage: Optional[Dict[str, Any]]):
+        if usage and usage.get("total_tokens") is not None:
+            self.actual_tokens = int(usage["total_tokens"])
+
+
+class _GovernorLane:
+    """单个上游模型的限额、排队与统计"""
+
+    def __init__(self, key: str, rpm: int, tpm: int, max_concurrency: int, batch_share: float):
+        self.key = key
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max_concurrency
+        # 批量请求最多占用的并发数，给实时对局与交互编辑留出余量
+        self.batch_limit = max(1, math.ceil(max_concurrency * batch_share)) if max_concurrency > 0 else 0
+        self.in_flight: Dict[LLMPriority, int] = dict.fromkeys(LLMPriority, 0)
+        self.queues: Dict[LLMPriority, 'OrderedDict[str, Deque[_Waiter]]'] = {p: OrderedDict() for p in LLMPriority}
+        self.blocked_until = 0.0  # 上游返回 429 后暂停放行的截止时刻
+        self.timer: Optional[asyncio.TimerHandle] = None  # 额度恢复后重新放行的定时器
+        self.admitted: Dict[LLMPriority, int] = dict.fromkeys(LLMPriority, 0)
+        self.waits: Dict[LLMPriority, Deque[float]] = {p: deque(maxlen=512) for p in LLMPriority}
+        self.max_wait: Dict[LLMPriority, float] = dict.fromkeys(LLMPriority, 0.0)
+        self.rate_limited = 0
+
+    @property
+    def total_in_flight(self) -> int:
+        return sum(self.in_flight.values())
+
+    def queue_depth(self, priority: LLMPriority) -> int:
+        return sum(len(waiters) for waiters in self.queues[priority].values())
+
+    def enqueue(self, waiter: _Waiter):
+        self.queues[waiter.priority].setdefault(waiter.session, deque()).append(waiter)
+
+    def discard(self, waiter: _Waiter):
+        sessions = self.queues[waiter.priority]
+        waiters = sessions.get(waiter.session)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del sessions[waiter.session]
+
+    def head(self) -> Optional[_Waiter]:
+        """下一个应放行的请求：最高优先级中轮到的会话的最早请求"""
+        for priority in LLMPriority:
+            sessions = self.queues[priority]
+            if not sessions:
+                continue
+            if priority == LLMPriority.BATCH and self.batch_limit and self.in_flight[priority] >= self.batch_limit:
+                return None
+            return next(iter(sessions.values()))[0]
+        return None
+
+    def pop(self, waiter: _Waiter):
+        """取出队首请求，并把该会话移到本优先级的队尾（会话间轮转）"""
+        sessions = self.queues[waiter.priority]
+        waiters = sessions[waiter.session]
+        waiters.popleft()
+        if waiters:
+            sessions.move_to_end(waiter.session)
+        else:
+            del sessions[waiter.session]
+
+    def delay(self, tokens: int, now: float) -> float:
+        delay = self.blocked_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def record_wait(self, priority: LLMPriority, waited: float):
+        self.admitted[priority] += 1
+        self.waits[priority].append(waited)
+        self.max_wait[priority] = max(self.max_wait[priority], waited)
+
+    def stats(self) -> Dict[str, Any]:
+        classes = {}
+        for priority in LLMPriority:
+            waits = sorted(self.waits[priority])
+            classes[priority.name.lower()] = {
+                "queue_depth": self.queue_depth(priority),
+                "sessions_waiting": len(self.queues[priority]),
+                "in_flight": self.in_flight[priority],
+                "admitted": self.admitted[priority],
+                "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p95_wait_ms": round(waits[int(len(waits) * 0.95) if len(waits) > 1 else 0] * 1000, 1) if waits else 0.0,
+                "max_wait_ms": round(self.max_wait[priority] * 1000, 1),
+            }
+        now = time.monotonic()
+        return {
+            "in_flight": self.total_in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": sum(self.queue_depth(p) for p in LLMPriority),
+            "requests_available": round(self.requests.tokens, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.tokens, 1) if self.tokens else None,
+            "rate_limited": self.rate_limited,
+            "blocked_for_s": round(max(0.0, self.blocked_until - now), 2),
+            "classes": classes,
+        }
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """上游限流错误（HTTP 429）建议的等待秒数；不是限流错误时返回 None"""
+    if getattr(exc, "status_code", None) != 429:
+        return None
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+class LLMGovernor:
+    """进程内 LLM 并发调度：按模型限速限并发，按优先级与会话公平排队"""
+
+    def __init__(self, enabled: bool = True, rpm: int = 0, tpm: int = 0, max_concurrency: int = 0,
+                 batch_share: float = 0.5, rate_limit_penalty: float = 5.0,
+                 limits: Optional[Dict[str, Tuple[int, int, int]]] = None):
+        self.enabled = enabled
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.batch_share = batch_share
+        self.rate_limit_penalty = rate_limit_penalty
+        self.limits = limits or {}  # 按分道键或模型名覆盖 (rpm, tpm, max_concurrency)
+        self._lanes: Dict[str, _GovernorLane] = {}
+
+    def _lane(self, key: str) -> _GovernorLane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            model = key.split("/", 1)[-1]
+            rpm, tpm, concurrency = self.limits.get(key) or self.limits.get(model) or (
+                self.rpm, self.tpm, self.max_concurrency)
+            lane = _GovernorLane(key, rpm, tpm, concurrency, self.batch_share)
+            self._lanes[key] = lane
+        return lane
+
+    def _on_timer(self, lane: _GovernorLane):
+        lane.timer = None
+        self._dispatch(lane)
+
+    def _dispatch(self, lane: _GovernorLane):
+        """按优先级与额度放行排队中的请求；额度不足时定时重试"""
+        while True:
+            waiter = lane.head()
+            if waiter is None:
+                return
+            if lane.max_concurrency and lane.total_in_flight >= lane.max_concurrency:
+                return  # 有请求完成时再放行
+            now = time.monotonic()
+            delay = lane.delay(waiter.tokens, now)
+            if delay > 0:
+                loop = asyncio.get_running_loop()
+                if lane.timer is not None and lane.timer.when() > loop.time() + delay:
+                    lane.timer.cancel()
+                    lane.timer = None
+                if lane.timer is None:
+                    lane.timer = loop.call_later(delay, self._on_timer, lane)
+                return
+            lane.pop(waiter)
+            self._admit(lane, waiter.priority, waiter.tokens)
+            lane.record_wait(waiter.priority, now - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _admit(self, lane: _GovernorLane, priority: LLMPriority, tokens: int):
+        if lane.requests is not None:
+            lane.requests.consume(1)
+        if lane.tokens is not None:
+            lane.tokens.consume(tokens)
+        lane.in_flight[priority] += 1
+
+    def _release(self, lane: _GovernorLane, ticket: LLMTicket):
+        lane.in_flight[ticket.priority] -= 1
+        if lane.tokens is not None and ticket.actual_tokens is not None:
+            lane.tokens.consume(ticket.actual_tokens - ticket.estimated_tokens)
+        self._dispatch(lane)
+
+    async def _acquire(self, lane: _GovernorLane, context: LLMCallContext, tokens: int):
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(context.priority, context.session_id or "", tokens, loop.create_future(), time.monotonic())
+        lane.enqueue(waiter)
+        self._dispatch(lane)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已放行但调用方在恢复前被取消：归还并发名额
+                self._release(lane, LLMTicket(waiter.priority, tokens))
+            else:
+                lane.discard(waiter)
+                self._dispatch(lane)
+            raise
+
+    @asynccontextmanager
+    async def admit(self, key: str, estimated_tokens: int = 0):
+        """等待放行一个上游请求；退出时归还并发名额并按 ticket.settle 的实际用量结算"""
+        context = _call_context.get()
+        ticket = LLMTicket(context.priority, estimated_tokens)
+        if not self.enabled:
+            yield ticket
+            return
+        lane = self._lane(key)
+        await self._acquire(lane, context, estimated_tokens)
+        try:
+            yield ticket
+        except Exception as exc:
+            retry_after = _retry_after(exc)
+            if retry_after is not None:
+                pause = retry_after or self.rate_limit_penalty
+                lane.rate_limited += 1
+                lane.blocked_until = max(lane.blocked_until, time.monotonic() + pause)
+                logger.warning(f"[LLM_GOVERNOR] {key} 触发上游限流，暂停放行 {pause:.1f}s")
+            raise
+        finally:
+            self._release(lane, ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "lanes": {key: lane.stats() for key, lane in sorted(self._lanes.items())},
+        }
+
+
 class BaseLLMService(ABC):
     """LLM服务基类"""
     
@@ -32,12 +401,15 @@ class BaseLLMService(ABC):
 class OpenAILLMService(BaseLLMService):
     """OpenAI LLM服务"""
     
-    def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = "gpt-3.5-turbo", **kwargs):
+    def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = "gpt-3.5-turbo",
+                 http_client: Optional[Any] = None, **kwargs):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
         self.extra_params = kwargs
+        self.http_client = http_client  # 共享的 httpx.AsyncClient（为 None 时 SDK 自建连接池）
         self._client = None
+        self.governor_key = governor_key(base_url, model)
     
     def _get_client(self):
         """获取OpenAI客户端"""
@@ -46,7 +418,8 @@ class OpenAILLMService(BaseLLMService):
                 from openai import AsyncOpenAI
                 self._client = AsyncOpenAI(
                     api_key=self.api_key,
-                    base_url=self.base_url
+                    base_url=self.base_url,
+                    http_client=self.http_client
                 )
             except ImportError:
                 raise ImportError("openai package is required for OpenAI LLM service")
@@ -70,11 +443,17 @@ class OpenAILLMService(BaseLLMService):
             **kwargs
         }
         
-        response = await client.chat.completions.create(**params)
+        async with track_llm_call(self.model) as call:
+            async with llm_governor.admit(self.governor_key, estimate_tokens(messages, params.get("max_tokens"))) as ticket:
+                call.admitted()
+                response = await client.chat.completions.create(**params)
+                usage = response.usage.model_dump() if response.usage else None
+                ticket.settle(usage)
+                call.settle(usage)
         
         return LLMResponse(
             content=response.choices[0].message.content,
-            usage=response.usage.model_dump() if response.usage else None,
+            usage=usage,
             model=response.model
         )
     
@@ -93,35 +472,63 @@ class OpenAILLMService(BaseLLMService):
             "model": self.model,
             "messages": openai_messages,
             "stream": True,
+            # 让上游在最后一个分片返回 usage，流式调用同样计入 token 用量与限流结算
+            "stream_options": {"include_usage": True},
             **self.extra_params,
             **kwargs
         }
         
-        stream = await client.chat.completions.create(**params)
-        
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        # 流式请求在整个生成期间占用一个并发名额
+        async with track_llm_call(self.model, stream=True) as call:
+            async with llm_governor.admit(self.governor_key, estimate_tokens(messages, params.get("max_tokens"))) as ticket:
+                call.admitted()
+                stream = await client.chat.completions.create(**params)
+                
+                async for chunk in stream:
+                    # 最后一个分片只带 usage（choices 为空）
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage.model_dump()
+                        ticket.settle(usage)
+                        call.settle(usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        call.first_token()
+                        yield chunk.choices[0].delta.content
+
+def _langchain_usage(message: Any) -> Optional[Dict[str, int]]:
+    """LangChain 消息的 usage_metadata 转为 OpenAI 的 usage 格式"""
+    metadata = getattr(message, "usage_metadata", None)
+    if not metadata:
+        return None
+    return {
+        "prompt_tokens": metadata.get("input_tokens", 0),
+        "completion_tokens": metadata.get("output_tokens", 0),
+        "total_tokens": metadata.get("total_tokens", 0),
+    }
 
 class LangChainLLMService(BaseLLMService):
     """LangChain LLM服务（兼容现有代码）"""
     
-    def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = "gpt-3.5-turbo", **kwargs):
+    def __init__(self, api_key: str, base_url: Optional[str] = None, model: str = "gpt-3.5-turbo",
+                 http_client: Optional[Any] = None, **kwargs):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
         self.extra_params = kwargs
+        self.http_client = http_client
         self._llm = None
+        self.governor_key = governor_key(base_url, model)
     
     def _get_llm(self):
         """获取LangChain LLM实例"""
         if self._llm is None:
             try:
                 from langchain_openai import ChatOpenAI
+                client_params = {"http_async_client": self.http_client} if self.http_client is not None else {}
                 self._llm = ChatOpenAI(
                     api_key=self.api_key,
                     base_url=self.base_url,
                     model=self.model,
+                    **client_params,
                     **self.extra_params
                 )
             except ImportError:
@@ -144,10 +551,18 @@ class LangChainLLMService(BaseLLMService):
             elif msg.role == "assistant":
                 lc_messages.append(AIMessage(content=msg.content))
         
-        response = await llm.ainvoke(lc_messages)
+        max_tokens = kwargs.get("max_tokens", self.extra_params.get("max_tokens"))
+        async with track_llm_call(self.model) as call:
+            async with llm_governor.admit(self.governor_key, estimate_tokens(messages, max_tokens)) as ticket:
+                call.admitted()
+                response = await llm.ainvoke(lc_messages)
+                usage = _langchain_usage(response)
+                ticket.settle(usage)
+                call.settle(usage)
         
         return LLMResponse(
             content=response.content,
+            usage=usage,
             model=self.model
         )
     
@@ -167,9 +582,14 @@ class LangChainLLMService(BaseLLMService):
             elif msg.role == "assistant":
                 lc_messages.append(AIMessage(content=msg.content))
         
-        async for chunk in llm.astream(lc_messages):
-            if chunk.content:
-                yield chunk.content
+        max_tokens = kwargs.get("max_tokens", self.extra_params.get("max_tokens"))
+        async with track_llm_call(self.model, stream=True) as call:
+            async with llm_governor.admit(self.governor_key, estimate_tokens(messages, max_tokens)):
+                call.admitted()
+                async for chunk in llm.astream(lc_messages):
+                    if chunk.content:
+                        call.first_token()
+                        yield chunk.content
 
 class LLMService:
     """LLM服务工厂"""
@@ -201,12 +621,191 @@ class LLMService:
             **(config.extra_params or {})
         )
 
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+@dataclass
+class _ConnectionPool:
+    """一个上游（provider + base_url）的共享 HTTP 连接池"""
+    provider: str
+    base_url: Optional[str]
+    http_client: Any  # httpx.AsyncClient；缺少 httpx 时为 None（由 SDK 各自建池）
+    api_key: str = ""  # 预热使用的凭据（首个注册服务的）
+    requests: int = 0
+    peak_connections: int = 0
+    prewarmed: int = 0
+
+    def connections(self) -> List[Any]:
+        pool = getattr(getattr(self.http_client, "_transport", None), "_pool", None)
+        return list(getattr(pool, "connections", None) or [])
+
+    async def on_request(self, request: Any):
+        """httpx 请求钩子：统计请求数与连接数峰值，并为进行中的调用计数重试"""
+        self.requests += 1
+        note_http_attempt()
+        self.peak_connections = max(self.peak_connections, len(self.connections()))
+
+    def stats(self) -> Dict[str, Any]:
+        connections = self.connections()
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "provider": self.provider,
+            "base_url": self.base_url or DEFAULT_OPENAI_BASE_URL,
+            "pooled": self.http_client is not None,
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "peak_connections": max(self.peak_connections, len(connections)),
+            "requests": self.requests,
+            "prewarmed": self.prewarmed,
+        }
+
+
+class LLMClientRegistry:
+    """进程内 LLM 客户端注册表
+
+    按 (provider, base_url, model) 复用服务实例（凭据或默认参数不同时各建一个实例），
+    同一 (provider, base_url) 的所有实例共享一个 keep-alive 连接池，跨会话复用 TLS 连接。
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 60.0, prewarm_connections: int = 0):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.prewarm_connections = prewarm_connections
+        self._pools: Dict[Tuple[str, Optional[str]], _ConnectionPool] = {}
+        self._services: Dict[Tuple[str, Optional[str], str], Dict[str, BaseLLMService]] = {}
+        self._hits: Dict[Tuple[str, Optional[str], str], int] = {}
+
+    def _create_http_client(self, pool: _ConnectionPool) -> Any:
+        try:
+            import httpx
+            from openai import DefaultAsyncHttpxClient
+        except ImportError:
+            logger.warning("[LLM_POOL] 未安装 httpx/openai，LLM 服务不共享连接池")
+            return None
+        return DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            event_hooks={"request": [pool.on_request]},
+        )
+
+    def _pool(self, provider: str, base_url: Optional[str], api_key: str) -> _ConnectionPool:
+        key = (provider, base_url)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = _ConnectionPool(provider=provider, base_url=base_url, http_client=None, api_key=api_key)
+            pool.http_client = self._create_http_client(pool)
+            self._pools[key] = pool
+            logger.info(f"[LLM_POOL] 创建连接池: {provider} {base_url or DEFAULT_OPENAI_BASE_URL}")
+        return pool
+
+    def get(self, provider: str, api_key: str, base_url: Optional[str] = None,
+            model: str = "gpt-3.5-turbo", **params) -> BaseLLMService:
+        """获取共享的 LLM 服务实例（首次请求时创建）"""
+        provider = (provider or "").lower()
+        key = (provider, base_url, model)
+        fingerprint = json.dumps([api_key, params], sort_keys=True, default=str)
+        services = self._services.setdefault(key, {})
+        service = services.get(fingerprint)
+        if service is not None:
+            self._hits[key] = self._hits.get(key, 0) + 1
+            return service
+        pool = self._pool(provider, base_url, api_key)
+        service = LLMService.create_service(provider, api_key=api_key, base_url=base_url, model=model,
+                                            http_client=pool.http_client, **params)
+        services[fingerprint] = service
+        return service
+
+    def from_config(self, llm_config, api_key: Optional[str] = None) -> BaseLLMService:
+        """按 LLMConfig 获取共享服务；api_key 用于覆盖配置中的凭据"""
+        return self.get(
+            llm_config.provider,
+            api_key=llm_config.api_key if api_key is None else api_key,
+            base_url=llm_config.base_url,
+            model=llm_config.model,
+            max_tokens=llm_config.max_tokens,
+            temperature=llm_config.temperature,
+            **(llm_config.extra_params or {})
+        )
+
+    async def _open_connection(self, pool: _ConnectionPool) -> bool:
+        base_url = (pool.base_url or DEFAULT_OPENAI_BASE_URL).rstrip("/")
+        try:
+            await pool.http_client.get(f"{base_url}/models", headers={"Authorization": f"Bearer {pool.api_key}"})
+            return True
+        except Exception as e:
+            logger.warning(f"[LLM_POOL] 预热连接失败: {base_url}, {e}")
+            return False
+
+    async def prewarm(self, connections: Optional[int] = None) -> int:
+        """为已注册的每个连接池并发建立若干条 keep-alive 连接，返回成功数"""
+        connections = self.prewarm_connections if connections is None else connections
+        pools = [pool for pool in self._pools.values() if pool.http_client is not None]
+        if connections <= 0 or not pools:
+            return 0
+        warmed = 0
+        for pool in pools:
+            results = await asyncio.gather(*(self._open_connection(pool) for _ in range(connections)))
+            pool.prewarmed += sum(results)
+            warmed += sum(results)
+            logger.info(f"[LLM_POOL] 预热 {pool.base_url or DEFAULT_OPENAI_BASE_URL}: "
+                        f"{sum(results)}/{connections}，当前连接 {len(pool.connections())}")
+        return warmed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limits": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry": self.keepalive_expiry,
+            },
+            "clients": [
+                {"provider": provider, "base_url": base_url or DEFAULT_OPENAI_BASE_URL, "model": model,
+                 "services": len(services), "reuses": self._hits.get((provider, base_url, model), 0)}
+                for (provider, base_url, model), services in self._services.items()
+            ],
+            "pools": [pool.stats() for pool in self._pools.values()],
+        }
+
+    async def aclose(self):
+        """关闭全部连接池（应用关闭时调用）"""
+        for pool in self._pools.values():
+            if pool.http_client is not None:
+                await pool.http_client.aclose()
+        self._pools.clear()
+        self._services.clear()
+        self._hits.clear()
+
+
+def _create_llm_client_registry() -> LLMClientRegistry:
+    """按配置创建进程内 LLM 客户端注册表"""
+    try:
+        from ..core.config import config
+        cfg = config.llm_pool_config
+        return LLMClientRegistry(max_connections=cfg.max_connections,
+                                 max_keepalive_connections=cfg.max_keepalive_connections,
+                                 keepalive_expiry=cfg.keepalive_expiry,
+                                 prewarm_connections=cfg.prewarm_connections)
+    except Exception as e:
+        logger.warning(f"[LLM_POOL] 加载连接池配置失败，使用默认值: {e}")
+        return LLMClientRegistry()
+
+
+def get_shared_llm_service() -> BaseLLMService:
+    """获取按 config.llm_config 构建的进程内共享LLM服务（会话/引擎/对话流控制器复用同一连接池）"""
+    from ..core.config import config
+    return llm_client_registry.from_config(config.llm_config)
+
 # 创建全局LLM服务实例
 def _create_llm_service() -> BaseLLMService:
     """创建LLM服务实例"""
     try:
-        from ..core.config import config
-        return LLMService.from_config(config.llm_config)
+        return get_shared_llm_service()
     except Exception as e:
         # 如果配置加载失败，返回一个默认的服务实例
         print(f"Warning: Failed to load LLM config, using default: {e}")
@@ -215,5 +814,23 @@ def _create_llm_service() -> BaseLLMService:
             model="gpt-3.5-turbo"
         )
 
+def _create_llm_governor() -> LLMGovernor:
+    """按配置创建进程内 LLM 调度器"""
+    try:
+        from ..core.config import config
+        cfg = config.llm_governor_config
+        return LLMGovernor(enabled=cfg.enabled, rpm=cfg.rpm, tpm=cfg.tpm, max_concurrency=cfg.max_concurrency,
+                           batch_share=cfg.batch_share, rate_limit_penalty=cfg.rate_limit_penalty,
+                           limits=cfg.limits)
+    except Exception as e:
+        logger.warning(f"[LLM_GOVERNOR] 加载调度配置失败，不限速: {e}")
+        return LLMGovernor(enabled=False)
+
+# 全局LLM调度器（所有上游请求共享）
+llm_governor = _create_llm_governor()
+
+# 全局LLM客户端注册表（共享服务实例与连接池）
+llm_client_registry = _create_llm_client_registry()
+
 # 全局LLM服务实例
 llm_service = _create_llm_service()
\ No newline at end of file
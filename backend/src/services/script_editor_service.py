@@ -9,7 +9,8 @@ import logging
 from typing import Dict, Any, List, Optional, Union, TYPE_CHECKING
 from pydantic import BaseModel
 
-from ..services.llm_service import llm_service, LLMMessage
+from ..services.llm_service import llm_service, LLMMessage, LLMPriority, llm_priority
+from ..services.llm_cache import cached_chat_completion
 from ..schemas.script import Script, ScriptCharacter, ScriptEvidence, ScriptLocation
 from ..schemas.script_evidence import EvidenceType
 
@@ -27,6 +28,14 @@ else:
 logger = logging.getLogger(__name__)
 
 
+def _is_json_object(response) -> bool:
+    """LLM 返回内容能否解析为 JSON 对象（缓存写入前的校验）"""
+    try:
+        return isinstance(json.loads(response.content.strip()), dict)
+    except (json.JSONDecodeError, AttributeError):
+        return False
+
+
 class InstructionCategory(BaseModel):
     """指令分类结果"""
     category: str
@@ -120,7 +129,11 @@ class ScriptEditorService:
         ]
         
         try:
-            response = await llm_service.chat_completion(messages, max_tokens=300, temperature=0.1)
+            # 分类结果对相同指令基本确定，可跨会话复用（只缓存可解析的结果）
+            response = await cached_chat_completion(
+                llm_service, messages, call_site="categorize_instruction",
+                validate=_is_json_object, max_tokens=300, temperature=0.1
+            )
             
             if not response.content:
                 raise ValueError("AI服务返回空内容")
@@ -146,6 +159,7 @@ class ScriptEditorService:
                 reasoning="分类过程出错，使用默认分类"
             )
 
+    @llm_priority(LLMPriority.INTERACTIVE, call_site="edit_parse_instruction")
     async def parse_user_instruction(self, instruction: str, script_id: int) -> List[EditInstruction]:
         """解析用户的自然语言指令为具体的编辑操作"""
         # 重试机制
@@ -1283,6 +1297,7 @@ class ScriptEditorService:
         logger.warning(f"[STORY_EDIT] 不支持的背景故事操作: {instruction.action}")
         return EditResult(success=False, message=f"不支持的背景故事操作: {instruction.action}")
     
+    @llm_priority(LLMPriority.INTERACTIVE, call_site="edit_story_fields")
     async def _generate_missing_story_fields(self, existing_data: Dict[str, Any], script: Script) -> Dict[str, Any]:
         """基于现有数据智能生成缺失的背景故事字段"""
         # 重试机制
@@ -1368,6 +1383,7 @@ class ScriptEditorService:
         logger.error(f"[STORY_EDIT] AI生成背景故事字段失败，已重试{max_retries}次。最后错误: {str(last_error)}")
         return existing_data
     
+    @llm_priority(LLMPriority.INTERACTIVE, call_site="edit_suggestion")
     async def generate_ai_suggestion(self, script_id: int, context: str = "") -> str:
         """生成AI编辑建议"""
         # 重试机制
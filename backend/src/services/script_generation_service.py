@@ -8,7 +8,8 @@ import json
 import logging
 from typing import Any, Dict, List, Optional
 
-from ..services.llm_service import llm_service, LLMMessage
+from ..services.llm_service import llm_service, LLMMessage, LLMPriority, llm_priority
+from ..services.llm_cache import cached_chat_completion
 from ..schemas.script_character import ScriptCharacter
 from ..schemas.script_evidence import ScriptEvidence
 from ..schemas.evidence_type import EvidenceType
@@ -31,6 +32,14 @@ def _strip_json_markdown(content: str) -> str:
     return content.strip()
 
 
+def _parsed_json(response) -> Any:
+    """解析 LLM 返回的 JSON，失败时返回 None（用于缓存写入前的校验）"""
+    try:
+        return json.loads(_strip_json_markdown(response.content))
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
 class ScriptGenerationService:
     """剧本 AI 内容生成服务
 
@@ -52,6 +61,7 @@ class ScriptGenerationService:
     # 公开方法
     # ------------------------------------------------------------------
 
+    @llm_priority(LLMPriority.BATCH)
     async def generate_script_info(
         self,
         theme: str,
@@ -91,8 +101,11 @@ class ScriptGenerationService:
                     LLMMessage(role="system", content=system_prompt),
                     LLMMessage(role="user", content=user_prompt),
                 ]
-                response = await llm_service.chat_completion(
+                response = await cached_chat_completion(
+                    llm_service,
                     messages,
+                    call_site="script_generation",
+                    validate=lambda r: isinstance(_parsed_json(r), dict),
                     max_tokens=800,
                     temperature=base_temperature + attempt * 0.1,
                 )
@@ -125,6 +138,7 @@ class ScriptGenerationService:
             f"生成剧本信息失败，已重试{max_retries}次。最后错误: {last_error}"
         )
 
+    @llm_priority(LLMPriority.BATCH)
     async def generate_characters(
         self,
         theme: str,
@@ -183,8 +197,12 @@ class ScriptGenerationService:
                     LLMMessage(role="system", content=system_prompt),
                     LLMMessage(role="user", content=user_prompt),
                 ]
-                response = await llm_service.chat_completion(
+                response = await cached_chat_completion(
+                    llm_service,
                     messages,
+                    call_site="script_generation",
+                    validate=lambda r: (isinstance(parsed := _parsed_json(r), list)
+                                        and len(parsed) == player_count),
                     max_tokens=3000,
                     temperature=base_temperature + attempt * 0.1,
                 )
@@ -230,6 +248,7 @@ class ScriptGenerationService:
             f"AI生成角色失败，已重试{max_retries}次。最后错误: {last_error}"
         )
 
+    @llm_priority(LLMPriority.BATCH)
     async def generate_evidence(
         self,
         theme: str,
@@ -287,8 +306,11 @@ class ScriptGenerationService:
                     LLMMessage(role="system", content=system_prompt),
                     LLMMessage(role="user", content=user_prompt),
                 ]
-                response = await llm_service.chat_completion(
+                response = await cached_chat_completion(
+                    llm_service,
                     messages,
+                    call_site="script_generation",
+                    validate=lambda r: isinstance(_parsed_json(r), list),
                     max_tokens=2000,
                     temperature=base_temperature + attempt * 0.1,
                 )
@@ -1,7 +1,15 @@
 """测试数据工厂"""
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
 import uuid
 
+from src.core.game_engine import GameEngine
+from src.core.pacing import PacingScheduler, TURBO_PROFILE
+from src.schemas.game_phase import GamePhaseEnum
+from src.services.llm_service import BaseLLMService, LLMResponse
+
+CHARACTER_NAMES = ("张三", "李四", "王五", "赵六")
+
 
 class TestDataFactory:
     """测试数据工厂类"""
@@ -72,4 +80,80 @@ class TestDataFactory:
 
 
 # 全局实例
-test_data_factory = TestDataFactory()
\ No newline at end of file
+test_data_factory = TestDataFactory()
+
+
+def make_game_script(names: Iterable[str] = CHARACTER_NAMES, locations: Iterable[str] = ()) -> Dict[str, Any]:
+    """创建引擎可直接使用的剧本数据：角色均为宾客，每个地点各有一条线索"""
+    locations = list(locations)
+    return {
+        "script_info": {"title": "测试剧本"},
+        "characters": [
+            {"name": name, "background": "宾客", "secret": "", "objective": ""}
+            for name in names
+        ],
+        "evidence": [
+            {"id": i, "name": f"{loc}的线索", "description": "可疑", "location": loc}
+            for i, loc in enumerate(locations, start=1)
+        ],
+        "locations": [{"name": loc} for loc in locations],
+        "background_story": {},
+        "game_phases": [],
+    }
+
+
+def speaker_of(messages) -> str:
+    """角色发言请求的 system 提示词首行以 "：<角色名>" 结尾"""
+    return messages[0].content.split("\n")[0].rsplit("：", 1)[-1]
+
+
+class ScriptedLLM(BaseLLMService):
+    """按发言者依次返回预设台词的 LLM 桩（台词用完后重复最后一句），记录调用次数与并发峰值"""
+
+    def __init__(self, lines: Optional[Dict[str, List[str]]] = None, delay: float = 0.0):
+        self.lines = lines or {}
+        self.delay = delay
+        self.calls = 0
+        self.spoken: Dict[str, int] = {}
+        self.active = 0
+        self.peak = 0
+
+    def reply(self, speaker: str, count: int) -> str:
+        lines = self.lines[speaker]
+        return lines[min(count, len(lines) - 1)]
+
+    async def chat_completion(self, messages, **kwargs):
+        speaker = speaker_of(messages)
+        count = self.spoken.get(speaker, 0)
+        self.spoken[speaker] = count + 1
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return LLMResponse(content=self.reply(speaker, count))
+
+    async def chat_completion_stream(self, messages, **kwargs):
+        yield (await self.chat_completion(messages)).content
+
+
+def make_engine(script_data: Dict[str, Any], phase: GamePhaseEnum, llm: Optional[BaseLLMService] = None,
+                agents_only: bool = False, **attributes) -> GameEngine:
+    """创建已加载剧本并创建角色代理的引擎（TURBO 节奏，阶段间不等待）
+
+    agents_only 为 True 时 llm 只供角色代理使用，对话流控制器仍按规则/默认服务选人；
+    attributes 覆盖引擎属性（如 pipeline_depth、batch_concurrency）。
+    """
+    engine = GameEngine(pacer=PacingScheduler(TURBO_PROFILE), llm=None if agents_only else llm)
+    engine.script_data = script_data
+    engine._init_components()
+    if agents_only:
+        engine.agents._shared_llm = llm
+    engine.agents.create_agents(engine.characters)
+    engine._current_phase = phase
+    for name, value in attributes.items():
+        setattr(engine, name, value)
+    return engine
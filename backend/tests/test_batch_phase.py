@@ -0,0 +1,49 @@
+"""独立阶段批量并发生成测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.game_engine import GameEngine
+from src.schemas.game_phase import GamePhaseEnum
+from tests.factories import ScriptedLLM, make_engine, make_game_script
+
+VOTES = {"张三": ["我投票给李四，他的说法前后矛盾。"], "李四": ["凶手是王五。"],
+         "王五": ["我还是觉得张三最可疑，我投给张三。"], "赵六": ["我再想想……"]}
+
+
+@pytest.mark.unit
+def test_voting_statements_generated_concurrently_and_parsed_into_votes():
+    async def scenario():
+        llm = ScriptedLLM(VOTES, delay=0.02)
+        engine = make_engine(make_game_script(), GamePhaseEnum.VOTING, llm, agents_only=True,
+                             batch_concurrency=3)
+        engine.agents["赵六"].memory.update_suspicion("王五", 0.5)
+
+        released = []
+
+        async def callback(action):
+            released.append(action["character"])
+
+        actions = await engine.run_phase(action_callback=callback)
+        assert llm.peak == 3
+        assert released == [a["character"] for a in actions] and len(actions) == 4
+        assert [a["turn"] for a in actions] == ["1", "2", "3", "4"]
+
+        await engine.process_voting()
+        assert engine.voting_manager.votes == {"张三": "李四", "李四": "王五", "王五": "张三", "赵六": "王五"}
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_parse_vote_prefers_last_explicit_choice():
+    engine = GameEngine()
+    engine.script_data = make_game_script()
+    engine._init_components()
+    vm = engine.voting_manager
+    assert vm.parse_vote("张三", "一开始我怀疑王五，但最后我投票给李四") == "李四"
+    assert vm.parse_vote("张三", "赵六的证词站不住脚") == "赵六"
+    assert vm.parse_vote("张三", "李四和王五都有嫌疑") is None
+    assert vm.parse_vote("张三", "我投给张三") is None
@@ -0,0 +1,62 @@
+"""讨论收敛检测测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import ConvergenceConfig
+from src.core.convergence import ConvergenceDetector
+from src.schemas.game_phase import GamePhaseEnum
+from tests.factories import CHARACTER_NAMES, ScriptedLLM, make_engine, make_game_script
+
+# 每位角色依次给出的发言：第二轮起大家都把矛头指向王五，王五指向张三
+STATEMENTS = {
+    "张三": ["昨晚我一直在书房看书。", "我怀疑王五，他的时间线对不上。"],
+    "李四": ["我在花园散步，没看到别人。", "我觉得王五是凶手，刀上有他的指纹。"],
+    "王五": ["我在厨房准备夜宵。", "张三嫌疑最大，书房离现场最近。"],
+    "赵六": ["我很早就睡了。", "凶手是王五，我投票给王五。"],
+}
+
+
+@pytest.mark.unit
+def test_accusations_extracted_and_repetition_detected():
+    """从发言中解析指认对象；每人发言后，重复的车轱辘话触发收敛"""
+    settings = ConvergenceConfig(consensus_ratio=1.0, repetition_turns=2, repetition_threshold=0.6)
+    detector = ConvergenceDetector(CHARACTER_NAMES[:2], CHARACTER_NAMES, settings=settings)
+    assert detector.extract_accusation("张三", "我觉得王五是凶手") == "王五"
+    assert detector.extract_accusation("张三", "我怀疑李四，不过现在看来赵六最可疑") == "赵六"
+    assert detector.extract_accusation("张三", "我怀疑张三？不可能") is None
+    # 附和他人、否定句不算指认
+    assert detector.extract_accusation("张三", "我觉得李四说得有道理") is None
+    assert detector.extract_accusation("张三", "我认为李四的推理没问题") is None
+    assert detector.extract_accusation("张三", "我怀疑的不是李四，而是王五") is None
+    assert detector.extract_accusation("张三", "我并不怀疑李四") is None
+    assert detector.extract_accusation("张三", "我不认为李四是凶手") is None
+    assert detector.extract_accusation("张三", "我不觉得李四有问题") is None
+    assert detector.extract_accusation("张三", "没有证据说明李四在撒谎") is None
+
+    detector.observe("张三", "我整晚都在书房，没有出去过。")
+    assert not detector.should_stop(1)  # 李四尚未发言
+    detector.observe("李四", "我整晚都在书房，没有出去过啊。")
+    detector.observe("张三", "我整晚都在书房，没有出去过。")
+    assert detector.should_stop(3) and detector.state.reason == "repetition"
+
+
+@pytest.mark.unit
+def test_discussion_ends_early_on_consensus_and_reports_saved_turns():
+    """多数角色稳定指认同一人后讨论提前结束，并累计节省的轮数"""
+    async def scenario():
+        llm = ScriptedLLM(STATEMENTS)
+        engine = make_engine(make_game_script(), GamePhaseEnum.DISCUSSION, llm,
+                             conversation_flow_controller=None,  # 按角色顺序轮流发言
+                             convergence=ConvergenceConfig(consensus_ratio=0.75, stable_turns=2,
+                                                           repetition_threshold=1.1))
+
+        actions = await engine.run_phase(max_turns=20)
+        # 第二轮赵六表态后 3/4 指认王五，下一轮仍保持不变即收敛
+        assert [a["character"] for a in actions] == list(CHARACTER_NAMES) * 2 + ["张三"]
+        assert engine.turns_saved == 20 - len(actions)
+        assert llm.calls == len(actions)  # 收敛后不再发起后续发言
+
+    asyncio.run(scenario())
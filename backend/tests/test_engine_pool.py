@@ -0,0 +1,88 @@
+"""预热引擎池测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import EnginePoolConfig
+from src.core.engine_pool import EnginePool
+from src.core.game_engine import GameEngine
+from src.core.pacing import PacingScheduler, TURBO_PROFILE
+from src.core.script_cache import CompiledScript, compiled_script_cache
+from src.core.simulation import StubLLMService
+
+SCRIPT_ID = 987654
+SCRIPT_DATA = {
+    "script_info": {"title": "测试剧本"},
+    "characters": [
+        {"name": name, "background": "宾客", "secret": "", "objective": ""}
+        for name in ("张三", "李四", "王五")
+    ],
+    "evidence": [],
+    "locations": [],
+    "background_story": {},
+    "game_phases": [],
+}
+
+
+def make_pool(**overrides):
+    built = []
+
+    async def factory(script_id):
+        engine = GameEngine(pacer=PacingScheduler(TURBO_PROFILE), llm=StubLLMService())
+        engine.script_id = script_id
+        engine.script_version = compiled_script_cache.peek_version(script_id)
+        engine.script_data = SCRIPT_DATA
+        engine._init_components()
+        await engine.initialize_agents()
+        built.append(engine)
+        return engine
+
+    pool_config = EnginePoolConfig(enabled=True, rate_window=60, lead_time=60, **overrides)
+    return EnginePool(pool_config, engine_factory=factory), built
+
+
+@pytest.fixture
+def cached_script():
+    compiled_script_cache.put(CompiledScript(SCRIPT_ID, "v1", SCRIPT_DATA))
+    yield
+    compiled_script_cache.invalidate(SCRIPT_ID)
+
+
+@pytest.mark.unit
+def test_pool_size_follows_start_rate_and_serves_warm_engines(cached_script):
+    """开局速率决定池大小；命中时拿到已初始化的引擎，并在后台补充"""
+    async def scenario():
+        pool, built = make_pool(max_per_script=3)
+        assert pool.acquire(SCRIPT_ID, "s1") is None
+        assert pool.acquire(SCRIPT_ID, "s2") is None
+        await pool.wait_refills()
+        assert pool.targets()[SCRIPT_ID] == 2 and len(built) == 2
+
+        engine = pool.acquire(SCRIPT_ID, "s3")
+        assert engine is built[0]
+        assert engine.session_id == "s3" and engine.game_plan and len(engine.agents) == 3
+        await pool.wait_refills()
+        assert pool.stats()["scripts"][0]["ready"] == 3  # 速率上升到 3 局/窗口
+        assert pool.hits == 1 and pool.misses == 2
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_configured_size_prewarms_and_edits_discard_stale_engines(cached_script):
+    """按剧本配置的大小无需开局即预热；剧本编辑后旧的预热引擎被丢弃"""
+    async def scenario():
+        pool, built = make_pool(sizes={SCRIPT_ID: 1})
+        pool.maintain()
+        await pool.wait_refills()
+        assert len(built) == 1
+
+        compiled_script_cache.invalidate(SCRIPT_ID)  # 剧本被编辑
+        assert pool.acquire(SCRIPT_ID, "s1") is None
+        assert pool.discarded == 1
+        await pool.stop()
+
+    asyncio.run(scenario())
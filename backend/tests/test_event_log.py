@@ -0,0 +1,52 @@
+"""环形事件日志测试"""
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.event_log import EventLog
+from src.core.message_codec import encode_frame
+
+
+@pytest.mark.unit
+def test_ring_eviction_keeps_id_index_and_shared_chat_view():
+    log = EventLog(capacity=4)
+    for i in range(10):
+        log.append("张三", f"发言{i}", message_type="chat" if i % 2 else None, timestamp=100.0 + i)
+
+    assert len(log) == 4 and log.first_id == 7 and log.last_id == 10
+    assert [e["id"] for e in log.events] == [7, 8, 9, 10]
+    assert log.get(6) is None and log.get(9).content == "发言8"
+    # 聊天与事件共用记录：聊天视图只包含带 message_type 的记录
+    assert [c["event_id"] for c in log.chat] == [8, 10]
+    assert log.chat[-1] == {"character": "张三", "message": "发言9", "type": "chat",
+                            "timestamp": 109.0, "event_id": 10}
+
+    assert [e["id"] for e in log.events_since(8)] == [9, 10]
+    assert [e["id"] for e in log.events_since(2)] == [7, 8, 9, 10]
+    assert [e["id"] for e in log.events_since_timestamp(107.5)] == [9, 10]
+    assert [c["event_id"] for c in log.chat_since_timestamp(108.0)] == [10]
+    assert [c["event_id"] for c in log.chat_since(8)] == [10]
+    assert [c["event_id"] for c in log.chat_since(0)] == [8, 10]
+    assert [c["event_id"] for c in log.chat_between(7, 9)] == [8]
+
+    # 视图可直接序列化
+    assert json.loads(encode_frame({"events": log.events}))["events"][0]["id"] == 7
+
+
+@pytest.mark.unit
+def test_export_load_and_resize_preserve_ids():
+    log = EventLog(capacity=10)
+    for i in range(6):
+        log.append("李四", f"事件{i}", message_type="chat" if i == 4 else None)
+    restored = EventLog(capacity=10)
+    restored.load(log.export(tail=3))
+    assert restored.first_id == 4 and restored.last_id == 6
+    assert [c["event_id"] for c in restored.chat] == [5]
+
+    events_view = restored.events
+    restored.resize(2)
+    assert restored.events is events_view
+    assert [e["id"] for e in events_view] == [5, 6]
+    assert restored.append("李四", "新事件").id == 7
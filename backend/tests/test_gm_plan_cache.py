@@ -0,0 +1,63 @@
+"""GM 计划缓存测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.gm_agent import GMAgent
+from src.agents.gm_plan_cache import GMPlanStore
+from src.services.llm_service import BaseLLMService, LLMResponse
+
+PLAN_JSON = json.dumps([
+    {"phase_type": phase, "name": name, "description": "", "max_turns": None, "gm_instructions": ""}
+    for phase, name in (("BACKGROUND", "背景"), ("INTRODUCTION", "介绍"), ("DISCUSSION", "讨论"),
+                        ("VOTING", "投票"), ("REVELATION", "揭晓"))
+], ensure_ascii=False)
+
+SCRIPT_DATA = {
+    "script_info": {"title": "测试剧本"},
+    "characters": [
+        {"name": name, "background": "宾客", "secret": "", "objective": ""}
+        for name in ("张三", "李四")
+    ],
+    "evidence": [],
+    "locations": [],
+    "background_story": {},
+    "game_phases": [],
+}
+
+
+class CountingLLM(BaseLLMService):
+    def __init__(self, content=PLAN_JSON):
+        self.content = content
+        self.calls = 0
+
+    async def chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        return LLMResponse(content=self.content)
+
+    async def chat_completion_stream(self, messages, **kwargs):
+        yield (await self.chat_completion(messages)).content
+
+
+@pytest.mark.unit
+def test_plan_cached_per_script_version_across_stores(tmp_path):
+    """同一剧本版本只调用一次 LLM 规划，新进程（新存储实例）从文件命中；版本变化后重新规划"""
+    async def scenario():
+        llm = CountingLLM()
+        agent = GMAgent(llm, plan_store=GMPlanStore(str(tmp_path)))
+        first = await agent.create_game_plan(SCRIPT_DATA, script_id=1, script_version="v1")
+        second = await agent.create_game_plan(SCRIPT_DATA, script_id=1, script_version="v1")
+        assert llm.calls == 1
+        assert [s.name for s in first] == [s.name for s in second] == ["背景", "介绍", "讨论", "投票", "揭晓"]
+
+        restarted = GMAgent(llm, plan_store=GMPlanStore(str(tmp_path)))
+        cached = await restarted.create_game_plan(SCRIPT_DATA, script_id=1, script_version="v1")
+        assert llm.calls == 1 and [s.to_dict() for s in cached] == [s.to_dict() for s in first]
+
+        await restarted.create_game_plan(SCRIPT_DATA, script_id=1, script_version="v2")
+        assert llm.calls == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+"""历史回看游标分页与分块推送测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.game_engine import GameEngine
+from src.core.session_actor import CommandLane
+from src.core.websocket_server import FetchHistoryHandler, GameWebSocketServer
+from tests.test_websocket_broadcast import FakeWebSocket
+
+
+@pytest.mark.unit
+def test_history_page_cursors_and_bounded_chat():
+    engine = GameEngine()
+    for i in range(10):
+        engine.add_event("系统", f"事件{i}")
+        engine.add_public_chat("张三", f"发言{i}")
+
+    latest = engine.get_history_page(limit=4)
+    assert [e["id"] for e in latest["events"]] == [17, 18, 19, 20]
+    assert [c["event_id"] for c in latest["public_chat"]] == [18, 20]
+    assert latest["has_more"] and latest["next_cursor"] == {"before": 17}
+
+    older = engine.get_history_page(before_id=3, limit=4)
+    assert [e["id"] for e in older["events"]] == [1, 2]
+    assert not older["has_more"]
+
+    newer = engine.get_history_page(after_id=15, limit=10)
+    assert [e["id"] for e in newer["events"]] == [16, 17, 18, 19, 20]
+    assert not newer["has_more"] and newer["next_cursor"] == {"after": 20}
+
+    # 旧接口带 limit 时聊天也只返回对应范围
+    assert len(engine.get_history(limit=4)["public_chat"]) == 2
+
+
+@pytest.mark.unit
+def test_fetch_history_streams_bounded_chunks_then_end_marker():
+    async def scenario():
+        server = GameWebSocketServer()
+        handler = server.message_handlers["fetch_history"]
+        assert isinstance(handler, FetchHistoryHandler)
+        handler.chunk_bytes = 1024
+        session = server.get_or_create_session("room-1")
+        for i in range(30):
+            session.game_engine.add_public_chat("张三", "长" * 100 + str(i))
+        ws = FakeWebSocket()
+        await server.attach_client(ws, "room-1")
+        await server.handle_client_message(ws, json.dumps({
+            "type": "fetch_history", "before": 26, "limit": 20, "request_id": "r1"
+        }))
+        await asyncio.sleep(0.05)
+
+        frames = [json.loads(f) for f in ws.frames[1:]]
+        chunks, end = frames[:-1], frames[-1]
+        assert len(chunks) > 1 and all(f["type"] == "history_chunk" for f in chunks)
+        ids = [e["id"] for f in chunks for e in f["data"]["events"]]
+        assert ids == list(range(6, 26))
+        assert end["type"] == "history_end"
+        assert end["data"] == {
+            "request_id": "r1", "chunks": len(chunks), "has_more": True,
+            "next_cursor": {"before": 6}, "newest_event_id": 30, "earliest_event_id": 1,
+        }
+        await session.actor.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_stalled_history_reader_does_not_block_control_commands():
+    """客户端不读取时历史推送暂停，但同一会话的控制命令照常执行"""
+    async def scenario():
+        server = GameWebSocketServer()
+        handler = server.message_handlers["fetch_history"]
+        handler.chunk_bytes = 256
+        handler.high_water = 2
+        session = server.get_or_create_session("room-1")
+        for i in range(30):
+            session.game_engine.add_public_chat("张三", "长" * 100 + str(i))
+        stalled = FakeWebSocket(delay=10)
+        await server.attach_client(stalled, "room-1")
+        await server.handle_client_message(stalled, json.dumps({"type": "fetch_history", "stream": True}))
+        await asyncio.sleep(0.05)
+        assert server.connections[stalled].pending_frames == 2
+
+        done = asyncio.Event()
+
+        async def control():
+            done.set()
+
+        session.actor.submit("next_phase", control, lane=CommandLane.CONTROL)
+        await asyncio.wait_for(done.wait(), 0.2)
+        await session.actor.stop()
+        await server._close_connection(stalled)
+
+    asyncio.run(scenario())
@@ -0,0 +1,87 @@
+"""LLM 响应缓存测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.llm_cache import LLMResponseCache, cached_chat_completion
+from src.services.llm_service import BaseLLMService, LLMMessage, LLMResponse
+
+
+class SlowLLM(BaseLLMService):
+    def __init__(self, replies=None):
+        self.model = "test-model"
+        self.replies = list(replies or [])
+        self.calls = 0
+
+    async def chat_completion(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        content = self.replies.pop(0) if self.replies else f"回答{self.calls}"
+        return LLMResponse(content=content, usage={"total_tokens": 10}, model=self.model)
+
+    async def chat_completion_stream(self, messages, **kwargs):
+        yield (await self.chat_completion(messages)).content
+
+
+MESSAGES = [LLMMessage(role="system", content="分类"), LLMMessage(role="user", content="添加一个角色")]
+
+
+@pytest.mark.unit
+def test_concurrent_identical_requests_share_one_call_and_persist(tmp_path):
+    """相同请求并发只调用一次上游；新实例（新进程）从 SQLite 命中；参数不同则不命中"""
+    async def scenario():
+        llm = SlowLLM()
+        cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+        results = await asyncio.gather(*(
+            cached_chat_completion(llm, MESSAGES, call_site="categorize_instruction",
+                                   cache=cache, temperature=0.1)
+            for _ in range(5)
+        ))
+        assert llm.calls == 1 and {r.content for r in results} == {"回答1"}
+        stats = cache.stats()
+        assert stats["misses"] == 1 and stats["coalesced"] == 4 and stats["stored"] == 1
+
+        await cached_chat_completion(llm, MESSAGES, call_site="categorize_instruction", cache=cache, temperature=0.1)
+        assert cache.stats()["memory_hits"] == 1
+        cache.close()
+
+        restarted = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+        hit = await cached_chat_completion(llm, MESSAGES, call_site="categorize_instruction",
+                                           cache=restarted, temperature=0.1)
+        assert hit.content == "回答1" and hit.usage == {"total_tokens": 10} and llm.calls == 1
+        assert restarted.stats()["call_sites"]["categorize_instruction"]["disk_hits"] == 1
+
+        await cached_chat_completion(llm, MESSAGES, call_site="categorize_instruction",
+                                     cache=restarted, temperature=0.5)
+        assert llm.calls == 2
+        restarted.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_rejected_responses_expiry_and_disabled_call_sites(tmp_path):
+    """校验失败的响应不缓存；过期条目重新调用；TTL 为 0 的调用点直接透传"""
+    async def scenario():
+        llm = SlowLLM(replies=["不是JSON", '{"category": "character"}'])
+        cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), ttls={"image_prompt": 0})
+        is_json = lambda r: r.content.startswith("{")
+
+        first = await cached_chat_completion(llm, MESSAGES, call_site="gm_plan", cache=cache, validate=is_json)
+        second = await cached_chat_completion(llm, MESSAGES, call_site="gm_plan", cache=cache, validate=is_json)
+        assert first.content == "不是JSON" and second.content == '{"category": "character"}' and llm.calls == 2
+        assert cache.stats()["rejected"] == 1
+
+        await cached_chat_completion(llm, MESSAGES, call_site="short", ttl=0.01, cache=cache)
+        await asyncio.sleep(0.02)
+        await cached_chat_completion(llm, MESSAGES, call_site="short", ttl=0.01, cache=cache)
+        assert llm.calls == 4
+
+        for _ in range(2):
+            await cached_chat_completion(llm, MESSAGES, call_site="image_prompt", cache=cache)
+        assert llm.calls == 6 and "image_prompt" not in cache.stats()["call_sites"]
+        cache.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+"""LLM 并发调度测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.llm_service import LLMGovernor, LLMPriority, llm_call_context
+
+KEY = "llm.test/model"
+
+
+@pytest.mark.unit
+def test_priority_classes_and_sessions_share_a_saturated_model():
+    """并发已满时按 实时对局 > 交互编辑 > 批量 放行，同一优先级内各会话轮流"""
+    async def scenario():
+        governor = LLMGovernor(max_concurrency=1)
+        order = []
+        release = asyncio.Event()
+
+        async def call(label, priority, session):
+            with llm_call_context(priority, session_id=session):
+                async with governor.admit(KEY):
+                    order.append(label)
+                    if label == "holder":
+                        await release.wait()
+
+        holder = asyncio.create_task(call("holder", LLMPriority.BATCH, "gen"))
+        await asyncio.sleep(0)
+        queued = [
+            ("batch", LLMPriority.BATCH, "gen"),
+            ("edit", LLMPriority.INTERACTIVE, "editor"),
+            ("a1", LLMPriority.LIVE, "room-a"),
+            ("a2", LLMPriority.LIVE, "room-a"),
+            ("b1", LLMPriority.LIVE, "room-b"),
+        ]
+        tasks = [asyncio.create_task(call(*args)) for args in queued]
+        await asyncio.sleep(0)
+        lane = governor.stats()["lanes"][KEY]
+        assert lane["queue_depth"] == 5 and lane["classes"]["live"]["sessions_waiting"] == 2
+
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        assert order == ["holder", "a1", "b1", "a2", "edit", "batch"]
+        assert governor.stats()["lanes"][KEY]["classes"]["live"]["admitted"] == 3
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_token_bucket_delays_until_refill_and_settles_actual_usage():
+    """TPM 额度用尽后排队等待补充；按实际用量结算后退还多扣的额度"""
+    async def scenario():
+        governor = LLMGovernor(tpm=60000)  # 每秒补充 1000
+        loop = asyncio.get_running_loop()
+        async with governor.admit(KEY, 60000):
+            pass
+        started = loop.time()
+        async with governor.admit(KEY, 50) as ticket:
+            ticket.settle({"total_tokens": 10})
+        assert loop.time() - started >= 0.04
+        async with governor.admit(KEY, 30):
+            pass
+        assert loop.time() - started < 0.1  # 多扣的 40 已退还，无需再等
+        assert governor.stats()["lanes"][KEY]["classes"]["interactive"]["max_wait_ms"] >= 40
+
+    asyncio.run(scenario())
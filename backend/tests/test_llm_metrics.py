@@ -0,0 +1,131 @@
+"""LLM 调用埋点测试"""
+import asyncio
+import json
+import httpx
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import llm_service as llm_service_module
+from src.services.llm_metrics import LLMMetrics, note_http_attempt
+from src.services.llm_service import LLMMessage, LLMPriority, OpenAILLMService, llm_call_context
+
+MESSAGES = [LLMMessage(role="user", content="你好")]
+
+
+def _completion():
+    return {
+        "id": "c1", "object": "chat.completion", "created": 0, "model": "m1",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "好的"}}],
+        "usage": {"prompt_tokens": 1000, "completion_tokens": 500, "total_tokens": 1500},
+    }
+
+
+def _stream_body(pieces, usage=None):
+    lines = []
+    for piece in pieces:
+        chunk = {"id": "c2", "object": "chat.completion.chunk", "created": 0, "model": "m1",
+                 "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+        lines.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+    if usage is not None:
+        chunk = {"id": "c2", "object": "chat.completion.chunk", "created": 0, "model": "m1",
+                 "choices": [], "usage": usage}
+        lines.append(f"data: {json.dumps(chunk)}\n\n")
+    lines.append("data: [DONE]\n\n")
+    return "".join(lines).encode("utf-8")
+
+
+def _service(handler):
+    async def on_request(request):
+        note_http_attempt()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), event_hooks={"request": [on_request]})
+    return OpenAILLMService(api_key="k", base_url="http://llm.test/v1", model="m1", http_client=client)
+
+
+@pytest.mark.unit
+def test_call_records_tokens_retries_cost_and_tags(tmp_path, monkeypatch):
+    """非流式调用记录 usage、SDK 重试次数与费用，按调用点/阶段/会话/角色汇总并写入 JSONL"""
+    metrics = LLMMetrics(trace_path=str(tmp_path / "llm.jsonl"), prices={"m1": (2.0, 8.0)})
+    monkeypatch.setattr(llm_service_module, "llm_metrics", metrics)
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.url.path)
+        if len(attempts) == 1:
+            return httpx.Response(429, headers={"retry-after-ms": "1"}, json={"error": {"message": "slow down"}})
+        return httpx.Response(200, json=_completion())
+
+    async def scenario():
+        service = _service(handler)
+        with llm_call_context(LLMPriority.LIVE, session_id="room-1", phase="discussion"):
+            with llm_call_context(call_site="character_turn", character="张三"):
+                response = await service.chat_completion(MESSAGES)
+        assert response.usage["total_tokens"] == 1500
+        await service.http_client.aclose()
+
+    asyncio.run(scenario())
+    snapshot = metrics.snapshot()
+    site = snapshot["by_call_site"]["character_turn"]
+    assert (site["calls"], site["retries"], site["prompt_tokens"], site["completion_tokens"]) == (1, 1, 1000, 500)
+    assert site["cost"] == pytest.approx(0.006)
+    assert snapshot["by_call_site_phase"]["character_turn/discussion"]["calls"] == 1
+    assert snapshot["by_session"]["room-1"]["calls"] == snapshot["by_character"]["张三"]["calls"] == 1
+
+    metrics.close()
+    trace = [json.loads(line) for line in (tmp_path / "llm.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert len(trace) == 1
+    assert trace[0]["priority"] == "live" and trace[0]["status"] == "ok" and trace[0]["retries"] == 1
+
+
+@pytest.mark.unit
+def test_stream_records_ttft_and_errors_are_counted(monkeypatch):
+    """流式调用记录首 token 耗时；上游错误计入 errors 并保留错误类型"""
+    metrics = LLMMetrics()
+    monkeypatch.setattr(llm_service_module, "llm_metrics", metrics)
+
+    def handler(request):
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                  content=_stream_body(["我", "在书房。"]))
+        return httpx.Response(400, json={"error": {"message": "bad request"}})
+
+    async def scenario():
+        service = _service(handler)
+        with llm_call_context(call_site="select_speaker"):
+            text = "".join([chunk async for chunk in service.chat_completion_stream(MESSAGES)])
+            with pytest.raises(Exception):
+                await service.chat_completion(MESSAGES)
+        await service.http_client.aclose()
+        return text
+
+    assert asyncio.run(scenario()) == "我在书房。"
+    site = metrics.snapshot("call_site")["by_call_site"]["select_speaker"]
+    assert site["calls"] == 2 and site["errors"] == 1
+    assert site["avg_ttft_ms"] is not None and site["avg_ttft_ms"] <= site["max_latency_ms"]
+
+
+@pytest.mark.unit
+def test_stream_requests_and_records_usage(monkeypatch):
+    """流式调用请求 include_usage，并把最后一个分片的 usage 计入指标"""
+    metrics = LLMMetrics()
+    monkeypatch.setattr(llm_service_module, "llm_metrics", metrics)
+
+    def handler(request):
+        body = json.loads(request.content)
+        usage = None
+        if body.get("stream_options", {}).get("include_usage"):
+            usage = {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150}
+        return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                              content=_stream_body(["我", "在书房。"], usage=usage))
+
+    async def scenario():
+        service = _service(handler)
+        with llm_call_context(call_site="character_turn"):
+            text = "".join([chunk async for chunk in service.chat_completion_stream(MESSAGES)])
+        await service.http_client.aclose()
+        return text
+
+    assert asyncio.run(scenario()) == "我在书房。"
+    site = metrics.snapshot("call_site")["by_call_site"]["character_turn"]
+    assert (site["calls"], site["prompt_tokens"], site["completion_tokens"]) == (1, 120, 30)
@@ -0,0 +1,67 @@
+"""LLM 客户端注册表测试"""
+import asyncio
+import httpx
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.llm_service import LLMClientRegistry, LLMMessage
+
+BASE_URL = "http://llm.test/v1"
+
+
+class MockTransportRegistry(LLMClientRegistry):
+    """连接池改用 httpx.MockTransport，记录到达上游的请求"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.seen = []
+
+    def _create_http_client(self, pool):
+        def handler(request):
+            self.seen.append((request.method, request.url.path))
+            if request.url.path.endswith("/chat/completions"):
+                return httpx.Response(200, json={
+                    "id": "c1", "object": "chat.completion", "created": 0, "model": "m1",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "好的"}}],
+                    "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+                })
+            return httpx.Response(200, json={"object": "list", "data": []})
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler),
+                                 event_hooks={"request": [pool.on_request]})
+
+
+@pytest.mark.unit
+def test_registry_reuses_services_and_shares_pool_per_upstream():
+    """相同 (provider, base_url, model) 与参数复用同一实例；同一上游的不同模型/密钥共享连接池"""
+    registry = LLMClientRegistry()
+    first = registry.get("openai", api_key="k", base_url=BASE_URL, model="m1", temperature=0.7)
+    assert registry.get("OpenAI", api_key="k", base_url=BASE_URL, model="m1", temperature=0.7) is first
+    other_model = registry.get("openai", api_key="k", base_url=BASE_URL, model="m2")
+    other_key = registry.get("openai", api_key="k2", base_url=BASE_URL, model="m1", temperature=0.7)
+    assert len({id(first), id(other_model), id(other_key)}) == 3
+    assert first.http_client is not None
+    assert first.http_client is other_model.http_client is other_key.http_client
+
+    stats = registry.stats()
+    assert len(stats["pools"]) == 1
+    assert {(c["model"], c["services"], c["reuses"]) for c in stats["clients"]} == {("m1", 2, 1), ("m2", 1, 0)}
+
+
+@pytest.mark.unit
+def test_prewarm_and_calls_go_through_the_shared_pool():
+    """预热请求与正常调用都经过注册表的共享连接池"""
+    async def scenario():
+        registry = MockTransportRegistry(prewarm_connections=2)
+        service = registry.get("openai", api_key="k", base_url=BASE_URL, model="m1")
+        assert await registry.prewarm() == 2
+        response = await service.chat_completion([LLMMessage(role="user", content="你好")])
+        assert response.content == "好的" and response.usage["total_tokens"] == 5
+        assert registry.seen == [("GET", "/v1/models")] * 2 + [("POST", "/v1/chat/completions")]
+        pool = registry.stats()["pools"][0]
+        assert pool["requests"] == 3 and pool["prewarmed"] == 2
+        await registry.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,43 @@
+"""会话内存核算与共享客户端测试"""
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.character_agent_manager import CharacterAgentManager
+from src.core.conversation_flow_controller import ConversationFlowController
+from src.core.game_tts_manager import get_shared_tts_manager
+from src.core.memory_accounting import server_footprint
+from src.core.storage import storage_manager
+from src.core.websocket_server import GameWebSocketServer
+
+
+@pytest.mark.unit
+def test_sessions_share_process_wide_clients():
+    """各会话的 Agent 管理器、对话流控制器与 TTS 管理器复用进程内共享的客户端"""
+    first, second = CharacterAgentManager(), CharacterAgentManager()
+    assert first._shared_llm is second._shared_llm
+    assert ConversationFlowController().llm_service is first._shared_llm
+
+    tts = get_shared_tts_manager(api_key="key", group_id="group")
+    assert get_shared_tts_manager(api_key="key", group_id="group") is tts
+    assert tts.storage_manager is storage_manager
+
+
+@pytest.mark.unit
+def test_footprint_attributes_bytes_to_components():
+    """空闲会话不预占日志槽位；聊天记录计入 event_log，各组件之和即会话总量"""
+    server = GameWebSocketServer()
+    session = server.get_or_create_session("memory-test")
+    idle = server_footprint(server)["sessions"][0]
+    assert idle["total_bytes"] == sum(idle["components"].values())
+    assert idle["components"]["event_log"] < 4096
+
+    for i in range(200):
+        session.game_engine.add_public_chat("张三", f"第{i}条发言" * 5)
+    busy = server_footprint(server)
+    grown = {name: busy["sessions"][0]["components"][name] - size
+             for name, size in idle["components"].items()}
+    assert grown["event_log"] > 200 * 100
+    assert max(grown, key=grown.get) == "event_log"
+    assert busy["idle_session_count"] == 1 and busy["average_bytes"] == busy["total_bytes"]
@@ -0,0 +1,65 @@
+"""游戏节奏调度测试"""
+import asyncio
+import time
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.pacing import PacingProfile, PacingScheduler, TURBO_PROFILE
+from src.schemas.game_phase import GamePhaseEnum
+
+
+@pytest.mark.unit
+def test_turbo_profile_never_waits():
+    """turbo档位忽略语音时长与阶段最短时长"""
+    async def scenario():
+        pacer = PacingScheduler(TURBO_PROFILE)
+        pacer.expect_playback("u1", 30.0, listeners=2)
+        started = time.monotonic()
+        assert await pacer.wait_turn()
+        assert await pacer.wait_phase_end(GamePhaseEnum.BACKGROUND)
+        assert time.monotonic() - started < 0.05
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_playback_acks_release_wait_early():
+    """所有客户端确认播放完成后立即放行，不必等满音频时长"""
+    async def scenario():
+        pacer = PacingScheduler(PacingProfile(name="test", turn_gap=0.0))
+        listeners = [object(), object()]
+        pacer.expect_playback("u1", 5.0, listeners=len(listeners))
+
+        async def ack_all():
+            await asyncio.sleep(0.02)
+            assert not pacer.notify_playback_finished("u1", listeners[0])
+            assert not pacer.notify_playback_finished("other", listeners[1])
+            assert pacer.notify_playback_finished("u1", listeners[1])
+
+        started = time.monotonic()
+        _, proceeded = await asyncio.gather(ack_all(), pacer.wait_turn())
+        assert proceeded
+        assert time.monotonic() - started < 1.0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_cancel_interrupts_pending_waits():
+    """停止游戏时进行中的等待立即返回 False"""
+    async def scenario():
+        pacer = PacingScheduler(PacingProfile(name="test", turn_gap=10.0))
+        pacer.expect_playback("u1", 10.0, listeners=1)
+        waiter = asyncio.create_task(pacer.wait_turn())
+        await asyncio.sleep(0.02)
+        pacer.cancel()
+        assert await asyncio.wait_for(waiter, timeout=0.5) is False
+        assert await pacer.wait_section() is False
+
+        pacer.resume()
+        pacer.profile = TURBO_PROFILE
+        assert await pacer.wait_turn()
+
+    asyncio.run(scenario())
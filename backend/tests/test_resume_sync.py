@@ -0,0 +1,64 @@
+"""断线重连增量同步测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.game_engine import GameEngine
+from src.core.websocket_server import GameWebSocketServer
+from tests.test_websocket_broadcast import FakeWebSocket
+
+
+@pytest.mark.unit
+def test_resume_delta_returns_only_missing_events():
+    """只补发水位之后的事件与聊天；水位已被裁剪或超出当前序号时返回截断标记"""
+    engine = GameEngine()
+    engine.max_events = 5
+    for i in range(8):
+        engine.add_public_chat("张三", f"第{i}句")
+    chat_watermark = engine.public_chat[2]["event_id"]  # 事件与聊天共用容量，保留ID 4..8
+
+    delta = engine.get_resume_delta(last_event_id=6, last_chat_event_id=chat_watermark)
+    assert [e["id"] for e in delta["events"]] == [7, 8]
+    assert [c["event_id"] for c in delta["public_chat"]] == [7, 8]
+    assert not delta["truncated"] and delta["newest_event_id"] == 8
+    assert [c["event_id"] for c in engine.get_resume_delta(last_event_id=7)["public_chat"]] == [8]
+
+    assert engine.get_resume_delta(last_event_id=8)["events"] == []
+    assert engine.get_resume_delta(last_event_id=2)["truncated"]
+    assert engine.get_resume_delta(last_event_id=20)["truncated"]
+    assert engine.get_resume_delta(last_event_id=3, max_events=2)["truncated"]
+
+
+@pytest.mark.unit
+def test_resume_chat_watermark_keeps_messages_with_same_timestamp():
+    """同一时间戳的多条聊天按事件ID续传，水位之后的不会因时间戳相同而漏发"""
+    engine = GameEngine()
+    for name in ("张三", "李四", "王五"):
+        engine.log.append(name, "我在书房", message_type="chat", timestamp=100.0)
+
+    delta = engine.get_resume_delta(last_event_id=1, last_chat_event_id=1)
+    assert [c["character"] for c in delta["public_chat"]] == ["李四", "王五"]
+
+
+@pytest.mark.unit
+def test_resume_handshake_replies_with_resume_sync():
+    async def scenario():
+        server = GameWebSocketServer()
+        session = server.get_or_create_session("room-1")
+        session.game_engine.add_event("系统", "游戏开始")
+        session.game_engine.add_event("张三", "我先说")
+        ws = FakeWebSocket()
+        await server.attach_client(ws, "room-1")
+        await server.handle_client_message(ws, json.dumps({"type": "resume", "last_event_id": 1}))
+        await asyncio.sleep(0.02)
+
+        connected, resumed = (json.loads(f) for f in ws.frames)
+        assert connected["data"]["newest_event_id"] == 2
+        assert resumed["type"] == "resume_sync"
+        assert [e["content"] for e in resumed["data"]["events"]] == ["我先说"]
+        await session.actor.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+"""剧本编译缓存测试"""
+import asyncio
+import datetime
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import script_cache
+from src.core.game_engine import GameEngine
+from src.core.script_cache import CompiledScriptCache, compile_script
+from src.db.repositories.script_repository import ScriptRepository
+from src.schemas.script import Script
+from src.schemas.script_character import ScriptCharacter
+from src.schemas.script_evidence import ScriptEvidence
+from src.schemas.script_info import ScriptInfo
+
+
+def make_script(script_id: int = 7, updated_at: datetime.datetime = datetime.datetime(2025, 1, 1)) -> Script:
+    return Script(
+        info=ScriptInfo(id=script_id, title="雾港谜案", updated_at=updated_at),
+        characters=[
+            ScriptCharacter(id=1, script_id=script_id, name="张三", background="码头工人"),
+            ScriptCharacter(id=2, script_id=script_id, name="李四", background="船长", is_victim=True),
+        ],
+        evidence=[ScriptEvidence(id=1, script_id=script_id, name="断裂的缆绳", location="码头")],
+    )
+
+
+@pytest.mark.unit
+def test_hot_script_loads_without_database(monkeypatch):
+    """命中缓存时不访问数据库，且每个引擎拿到独立副本"""
+    cache = CompiledScriptCache(max_entries=2, revalidate_after=3600)
+    monkeypatch.setattr("src.core.game_engine.compiled_script_cache", cache)
+    cache.put(compile_script(make_script()))
+
+    def no_db():
+        raise AssertionError("命中缓存时不应访问数据库")
+    monkeypatch.setattr("src.db.session.get_db_session", no_db)
+
+    async def scenario():
+        first, second = GameEngine(), GameEngine()
+        await first.load_script_data(7)
+        await second.load_script_data(7)
+        assert [c.name for c in first.characters] == ["张三"]
+        first.script_data["evidence"][0]["discoverer"] = "张三"
+        assert "discoverer" not in second.script_data["evidence"][0]
+
+    asyncio.run(scenario())
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.mark.unit
+def test_lru_eviction_and_version_revalidation():
+    cache = CompiledScriptCache(max_entries=2, revalidate_after=0)
+    for script_id in (1, 2, 3):
+        cache.put(compile_script(make_script(script_id)))
+    assert 1 not in cache and len(cache) == 2
+
+    version = compile_script(make_script(2)).version
+    assert cache.get(2, version_loader=lambda _: version) is not None
+    assert cache.get(2, version_loader=lambda _: "2025-02-01T00:00:00") is None
+    assert 2 not in cache
+
+
+@pytest.mark.unit
+def test_committed_writes_invalidate_and_bump_version(monkeypatch):
+    """任何剧本子表写入提交后失效缓存，并刷新剧本行的 updated_at"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.db.base import SQLAlchemyBase
+    from src.db.models.script_model import ScriptDBModel
+    from src.db.models.character import CharacterDBModel
+
+    cache = CompiledScriptCache(revalidate_after=3600)
+    monkeypatch.setattr(script_cache, "compiled_script_cache", cache)
+    engine = create_engine("sqlite://")
+    SQLAlchemyBase.metadata.create_all(engine, tables=[ScriptDBModel.__table__, CharacterDBModel.__table__])
+    db = sessionmaker(bind=engine)()
+
+    db.add(ScriptDBModel(title="雾港谜案"))
+    db.commit()
+    repo = ScriptRepository(db)
+    script_id = db.query(ScriptDBModel.id).scalar()
+    db.execute(ScriptDBModel.__table__.update().values(updated_at=datetime.datetime(2020, 1, 1)))
+    db.commit()
+    old_version = repo.get_script_version(script_id)
+    cache.put(compile_script(make_script(script_id)))
+
+    db.add(CharacterDBModel(script_id=script_id, name="王五"))
+    db.flush()
+    assert script_id in cache  # 提交前不失效
+    db.commit()
+    assert script_id not in cache
+    assert repo.get_script_version(script_id) != old_version
+    db.close()
@@ -0,0 +1,63 @@
+"""并发搜证轮测试"""
+import asyncio
+import time
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.schemas.game_phase import GamePhaseEnum
+from tests.factories import ScriptedLLM, make_engine, make_game_script
+
+SCRIPT_DATA = make_game_script(("张三", "李四", "王五"), locations=("书房", "厨房", "花园"))
+
+# 每位角色依次给出的选择：首轮全部撞在书房；重新选择时李四换到厨房，王五仍选书房
+CHOICES = {"张三": ["书房"], "李四": ["书房", "厨房"], "王五": ["书房", "书房"]}
+
+
+def make_search_engine(policy):
+    llm = ScriptedLLM({name: [f"我要搜查{loc}。" for loc in locs] for name, locs in CHOICES.items()},
+                      delay=0.02)
+    engine = make_engine(SCRIPT_DATA, GamePhaseEnum.EVIDENCE_COLLECTION, llm,
+                         batch_concurrency=4, search_collision_policy=policy)
+    return engine, llm
+
+
+@pytest.mark.unit
+def test_collisions_resolved_by_turn_order_with_reprompt_then_redirect():
+    """同时选择→按顺序先到先得→冲突方重新选择一次→仍冲突则改派，结果按顺序公布"""
+    async def scenario():
+        engine, llm = make_search_engine("reprompt")
+        started = time.perf_counter()
+        actions = await engine.run_phase(max_turns=3)
+        elapsed = time.perf_counter() - started
+
+        assert [a["character"] for a in actions] == ["张三", "李四", "王五"]
+        assert engine.evidence_manager.get_location_search_status() == {
+            "书房": "张三", "厨房": "李四", "花园": "王五"
+        }
+        assert llm.spoken == {"张三": 1, "李四": 2, "王五": 2}
+        assert elapsed < 0.02 * 4  # 两次并发往返，而非五次串行
+        messages = [c["message"] for c in engine.public_chat if c["character"] == "系统"]
+        assert messages == [
+            "张三在「书房」发现了证据：《书房的线索》——可疑",
+            "李四在「厨房」发现了证据：《厨房的线索》——可疑",
+            "「书房」已有人搜查，王五改为搜查「花园」。",
+            "王五在「花园」发现了证据：《花园的线索》——可疑",
+        ]
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_redirect_policy_uses_single_llm_round():
+    """redirect 策略：冲突方直接按地点顺序改派，不再调用 LLM"""
+    async def scenario():
+        engine, llm = make_search_engine("redirect")
+        await engine.run_phase(max_turns=3)
+        assert llm.spoken == {"张三": 1, "李四": 1, "王五": 1}
+        assert engine.evidence_manager.get_location_search_status() == {
+            "书房": "张三", "厨房": "李四", "花园": "王五"
+        }
+
+    asyncio.run(scenario())
@@ -0,0 +1,164 @@
+"""会话Actor调度测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.session_actor import CommandLane, SessionActor
+from src.core.websocket_server import GameWebSocketServer, MessageHandler
+from tests.test_websocket_broadcast import FakeWebSocket
+
+
+@pytest.mark.unit
+def test_control_runs_before_reads_and_heavy_does_not_block():
+    """控制命令优先于读取命令；重型命令执行期间其他通道照常处理"""
+    async def scenario():
+        actor = SessionActor("room-1")
+        order = []
+        release = asyncio.Event()
+
+        async def heavy():
+            await release.wait()
+            order.append("heavy")
+
+        def record(name):
+            async def run():
+                order.append(name)
+            return run
+
+        heavy_future = actor.submit("edit_instruction", heavy, lane=CommandLane.HEAVY)
+        actor.submit("get_game_state", record("read-1"))
+        actor.submit("get_game_state", record("read-2"))
+        last = actor.submit("next_phase", record("control"), lane=CommandLane.CONTROL)
+        await asyncio.wait_for(last, timeout=1)
+        await asyncio.sleep(0.01)
+        assert order == ["control", "read-1", "read-2"]
+
+        release.set()
+        await asyncio.wait_for(heavy_future, timeout=1)
+        assert order[-1] == "heavy"
+        await actor.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_timeout_and_cancel():
+    """超时命令以 TimeoutError 结束，取消后 Future 为取消状态"""
+    async def scenario():
+        failures = []
+
+        async def on_failure(command, error):
+            failures.append((command.name, type(error).__name__))
+
+        actor = SessionActor("room-1", lane_timeouts={CommandLane.READ: 0.05}, on_failure=on_failure)
+        slow = actor.submit("fetch_history", lambda: asyncio.sleep(1))
+        with pytest.raises(asyncio.TimeoutError):
+            await slow
+
+        running = actor.submit("generate_ai_suggestion", lambda: asyncio.sleep(10),
+                               lane=CommandLane.HEAVY, request_id="req-1")
+        await asyncio.sleep(0.01)
+        assert actor.cancel(request_id="req-1") == 1
+        await asyncio.sleep(0.01)
+        assert running.cancelled()
+        assert failures == [("fetch_history", "TimeoutError"), ("generate_ai_suggestion", "CancelledError")]
+        await actor.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_receive_loop_does_not_wait_for_heavy_handler():
+    """handle_client_message 投递后立即返回，慢处理器不阻塞后续查询"""
+    class SlowHandler(MessageHandler):
+        lane = CommandLane.HEAVY
+
+        async def handle(self, server, websocket, data):
+            await asyncio.sleep(10)
+
+    async def scenario():
+        server = GameWebSocketServer()
+        server.message_handlers["edit_instruction"] = SlowHandler()
+        session = server.get_or_create_session("room-1")
+        ws = FakeWebSocket()
+        server.client_sessions[ws] = "room-1"
+        session.clients.add(ws)
+        server._open_connection(ws)
+
+        await asyncio.wait_for(server.handle_client_message(ws, json.dumps({"type": "edit_instruction"})), 0.1)
+        await server.handle_client_message(ws, json.dumps({"type": "get_game_state"}))
+        await asyncio.sleep(0.05)
+        assert json.loads(ws.frames[-1])["type"] == "game_state"
+        await session.actor.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_last_client_dropped_inside_command_still_cleans_up_session():
+    """命令内注销最后一个客户端（如发送失败）时，会话仍被完整清理"""
+    class DropClientHandler(MessageHandler):
+        async def handle(self, server, websocket, data):
+            await server.unregister_client(websocket)
+            await asyncio.sleep(10)
+
+    async def scenario():
+        server = GameWebSocketServer()
+        server.message_handlers["get_game_state"] = DropClientHandler()
+        session = server.get_or_create_session("room-1")
+        ws = FakeWebSocket()
+        server.client_sessions[ws] = "room-1"
+        session.clients.add(ws)
+        server._open_connection(ws)
+
+        await server.handle_client_message(ws, json.dumps({"type": "get_game_state"}))
+        await asyncio.sleep(0.1)
+        assert "room-1" not in server.sessions
+        assert session.actor.stopped
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_game_setup_runs_off_main_lane_and_is_cancelled_on_disconnect(monkeypatch):
+    """开始游戏在重型通道执行，不占用主通道；发起方断开后其命令被取消"""
+    from src.core.websocket_server import GameModeHandler
+
+    started = asyncio.Event()
+    cancelled = []
+
+    async def slow_start(server, session_id, script_id=None):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(session_id)
+            raise
+
+    monkeypatch.setattr(GameModeHandler, "start_game", staticmethod(slow_start))
+
+    async def scenario():
+        server = GameWebSocketServer()
+        session = server.get_or_create_session("room-1")
+        owner, other = FakeWebSocket(), FakeWebSocket()
+        for ws in (owner, other):
+            server.client_sessions[ws] = "room-1"
+            session.clients.add(ws)
+            server._open_connection(ws)
+
+        await server.handle_client_message(owner, json.dumps({"type": "start_game"}))
+        await asyncio.wait_for(started.wait(), timeout=1)
+        await server.handle_client_message(other, json.dumps({"type": "get_game_state"}))
+        await asyncio.sleep(0.05)
+        assert json.loads(other.frames[-1])["type"] == "game_state"
+
+        await server.unregister_client(owner)
+        await asyncio.sleep(0.01)
+        assert cancelled == ["room-1"]
+        assert "room-1" in server.sessions
+        await session.actor.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,120 @@
+"""空闲会话休眠与恢复测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import SessionReaperConfig
+from src.core.session_hibernation import HibernationStore, SessionReaper
+from src.core.websocket_server import GameWebSocketServer
+from src.schemas.game_phase import GamePhaseEnum
+from tests.test_websocket_broadcast import FakeWebSocket
+
+
+SCRIPT_DATA = {
+    "script_info": {"id": 1, "title": "测试剧本"},
+    "characters": [
+        {"name": "张三", "background": "管家", "secret": "", "objective": "", "is_murderer": True},
+        {"name": "李四", "background": "医生", "secret": "", "objective": ""},
+    ],
+    "evidence": [{"name": "匕首", "location": "书房"}],
+    "locations": [{"name": "书房"}],
+    "background_story": {},
+    "game_phases": [],
+}
+
+
+def make_server(tmp_path, **overrides):
+    server = GameWebSocketServer()
+    server.hibernation_store = HibernationStore(str(tmp_path))
+    server.reaper = SessionReaper(server, SessionReaperConfig(**overrides))
+    return server
+
+
+def start_background_session(server, session_id="room-1"):
+    session = server.get_or_create_session(session_id)
+    engine = session.game_engine
+    engine.script_data = SCRIPT_DATA
+    engine._init_components()
+    engine.agents.create_agents(engine.characters)
+    engine._current_phase = GamePhaseEnum.INVESTIGATION
+    engine.add_public_chat("张三", "我昨晚一直在书房")
+    engine.agents["李四"].memory.update_suspicion("张三", 0.4)
+    engine.voting_manager.add_vote("李四", "张三")
+    session.game_initialized = True
+    session.background_mode = True
+    return session
+
+
+@pytest.mark.unit
+def test_idle_session_hibernates_and_rehydrates_on_reconnect(tmp_path):
+    """超过TTL的后台会话写入快照并释放，所有者重连时恢复引擎状态与角色记忆"""
+    async def scenario():
+        server = make_server(tmp_path, idle_ttl=0.0, background_ttl=0.0)
+        start_background_session(server)
+
+        assert await server.reaper.sweep() == ["room-1"]
+        assert "room-1" not in server.sessions
+        assert server.hibernation_store.exists("room-1")
+
+        ws = FakeWebSocket()
+        await server.attach_client(ws, "room-1")
+        await asyncio.sleep(0.01)
+        session = server.sessions["room-1"]
+        engine = session.game_engine
+        assert session.game_initialized and not server.hibernation_store.exists("room-1")
+        assert engine.current_phase == GamePhaseEnum.INVESTIGATION
+        assert engine.public_chat[-1]["message"] == "我昨晚一直在书房"
+        assert engine.event_sequence == 1
+        assert engine.voting_manager.votes == {"李四": "张三"}
+        assert engine.agents["李四"].memory.suspicion_map["张三"] == pytest.approx(0.7)
+        assert json.loads(ws.frames[-1])["data"]["background_reconnect"] is True
+
+        await session.actor.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_memory_budget_hibernates_least_recently_active_first(tmp_path):
+    """超出内存预算时即使未到TTL，也按最久未活跃顺序休眠空闲会话，有客户端的会话不受影响"""
+    async def scenario():
+        server = make_server(tmp_path, memory_budget_mb=0.9)
+        older = start_background_session(server, "room-old")
+        start_background_session(server, "room-new")
+        connected = server.get_or_create_session("room-live")
+        connected.clients.add(FakeWebSocket())
+        server.session_last_active["room-old"] -= 100
+
+        assert server.reaper.select() == ["room-old"]
+        assert await server.reaper.sweep() == ["room-old"]
+        assert set(server.sessions) == {"room-new", "room-live"}
+        assert older.actor.stopped
+
+        for session in server.sessions.values():
+            await session.actor.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_memory_budget_skips_running_background_games(tmp_path):
+    """后台运行中的游戏不参与内存预算回收，只在超过 background_ttl 后休眠"""
+    async def scenario():
+        server = make_server(tmp_path, memory_budget_mb=0.0, background_ttl=3600.0)
+        running = start_background_session(server, "room-running")
+        running.is_game_running = True
+        start_background_session(server, "room-idle")
+        server.session_last_active["room-running"] -= 100
+
+        assert server.reaper.select() == ["room-idle"]
+        server.session_last_active["room-running"] -= 3600
+        assert server.reaper.select() == ["room-running", "room-idle"]
+
+        for session in server.sessions.values():
+            session.is_game_running = False
+            await session.actor.stop()
+
+    asyncio.run(scenario())
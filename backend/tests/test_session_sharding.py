@@ -0,0 +1,200 @@
+"""多worker会话分片测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.session_bus import InMemorySessionBus, LocalBrokerSessionBus
+from src.core.websocket_server import GameWebSocketServer
+from tests.test_websocket_broadcast import FakeWebSocket
+
+
+class FakeLeaseStore:
+    """以字典代替 game_sessions 表的租约存储"""
+
+    def __init__(self):
+        self.owners: dict[str, str] = {}
+
+    def manager(self, worker_id: str):
+        store = self
+
+        class Manager:
+            def acquire(self, session_id):
+                if store.owners.get(session_id) in (None, worker_id):
+                    store.owners[session_id] = worker_id
+                    return True
+                return False
+
+            def owner(self, session_id):
+                return store.owners.get(session_id)
+
+            def renew(self, session_ids):
+                return [sid for sid in session_ids if store.owners.get(sid) == worker_id]
+
+            def release(self, session_id):
+                return store.owners.pop(session_id, None) == worker_id
+
+        return Manager()
+
+
+def make_worker(bus, leases, worker_id):
+    server = GameWebSocketServer()
+    server._resolve_session_id = lambda script_id, user_id: "room-1"
+    server.enable_sharding(bus, leases.manager(worker_id), worker_id)
+    return server
+
+
+@pytest.mark.unit
+def test_non_owner_worker_forwards_connection_to_owner():
+    """连接落在非所有者worker时，广播与请求都经总线送达"""
+    async def scenario():
+        bus, leases = InMemorySessionBus(), FakeLeaseStore()
+        owner, other = make_worker(bus, leases, "w1"), make_worker(bus, leases, "w2")
+        await owner.shard_router.start()
+        await other.shard_router.start()
+
+        local_ws, remote_ws = FakeWebSocket(), FakeWebSocket()
+        await owner.register_client(local_ws, script_id=1, user_id=7)
+        await other.register_client(remote_ws, script_id=1, user_id=7)
+        await asyncio.sleep(0.02)
+
+        assert leases.owners["room-1"] == "w1"
+        assert "room-1" not in other.sessions
+        assert len(owner.sessions["room-1"].clients) == 2
+        assert json.loads(remote_ws.frames[-1])["type"] == "session_connected"
+
+        await owner.broadcast({"type": "ai_action", "data": {"action": "你好"}}, "room-1")
+        await asyncio.sleep(0.02)
+        for ws in (local_ws, remote_ws):
+            assert json.loads(ws.frames[-1])["data"]["action"] == "你好"
+
+        await other.handle_client_message(remote_ws, json.dumps({"type": "get_game_state"}))
+        await asyncio.sleep(0.05)
+        assert json.loads(remote_ws.frames[-1])["type"] == "game_state"
+
+        await other.unregister_client(remote_ws)
+        await asyncio.sleep(0.02)
+        assert len(owner.sessions["room-1"].clients) == 1
+
+        await owner.sessions["room-1"].actor.stop()
+        await other.stop_sharding()
+        await owner.stop_sharding()
+        assert "room-1" not in leases.owners
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_spectator_on_non_owner_worker_is_forwarded_to_owner():
+    """观战连接落在非所有者worker时转发到所有者的观战广播，且不获取租约"""
+    async def scenario():
+        bus, leases = InMemorySessionBus(), FakeLeaseStore()
+        owner, other = make_worker(bus, leases, "w1"), make_worker(bus, leases, "w2")
+        await owner.shard_router.start()
+        await other.shard_router.start()
+
+        player, viewer = FakeWebSocket(), FakeWebSocket()
+        await owner.register_client(player, script_id=1, user_id=7)
+        assert await other.register_spectator(viewer, "room-1")
+        await asyncio.sleep(0.02)
+
+        assert "room-1" not in other.sessions and leases.owners["room-1"] == "w1"
+        assert len(owner.spectator_hubs["room-1"]) == 1
+        assert json.loads(viewer.frames[0])["type"] == "spectator_snapshot"
+        await owner.broadcast({"type": "ai_action", "data": {"action": "你好"}}, "room-1")
+        await asyncio.sleep(0.02)
+        assert json.loads(viewer.frames[-1])["data"]["action"] == "你好"
+
+        await other.unregister_spectator(viewer)
+        await asyncio.sleep(0.02)
+        assert "room-1" not in owner.spectator_hubs and "room-1" in owner.sessions
+
+        await owner.sessions["room-1"].actor.stop()
+        await other.stop_sharding()
+        await owner.stop_sharding()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_forwarded_connections_closed_when_owner_lease_lapses():
+    """所有者worker失联（租约过期）后，origin 关闭被转发的玩家与观战连接以便重新路由"""
+    async def scenario():
+        bus, leases = InMemorySessionBus(), FakeLeaseStore()
+        owner, other = make_worker(bus, leases, "w1"), make_worker(bus, leases, "w2")
+        await owner.shard_router.start()
+        await other.shard_router.start()
+
+        local_ws, remote_ws, viewer = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await owner.register_client(local_ws, script_id=1, user_id=7)
+        await other.register_client(remote_ws, script_id=1, user_id=7)
+        assert await other.register_spectator(viewer, "room-1")
+        await asyncio.sleep(0.02)
+
+        await other.shard_router.check_forwarded_owners()
+        assert other.shard_router.is_forwarded(remote_ws) and remote_ws.closed_code is None
+
+        # 所有者崩溃：不再续期，租约过期后查询不到持有者
+        del leases.owners["room-1"]
+        await other.shard_router.check_forwarded_owners()
+        for ws in (remote_ws, viewer):
+            assert ws.closed_code == 1012
+            assert not other.shard_router.is_forwarded(ws)
+
+        await owner.sessions["room-1"].actor.stop()
+        await other.stop_sharding()
+        await owner.stop_sharding()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_local_broker_bus_round_trip():
+    """本机TCP中转：第一个实例监听，其余实例连接后可互相收发"""
+    async def scenario():
+        first = LocalBrokerSessionBus(port=0)
+        await first.start()
+        second = LocalBrokerSessionBus(port=first.port)
+        await second.start()
+        assert first.is_broker and not second.is_broker
+
+        received = []
+
+        async def handler(message):
+            received.append(message)
+
+        await first.subscribe("worker:w1", handler)
+        await asyncio.sleep(0.02)
+        await second.publish("worker:w1", {"kind": "deliver", "frame": "帧"})
+        await asyncio.sleep(0.05)
+        assert received == [{"kind": "deliver", "frame": "帧"}]
+
+        await second.close()
+        await first.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_local_broker_drops_lagging_subscriber():
+    """中转站等待订阅者排空发送缓冲，超时的订阅者被移除并断开"""
+    class StuckWriter:
+        closed = False
+
+        async def drain(self):
+            await asyncio.sleep(10)
+
+        def close(self):
+            self.closed = True
+
+    async def scenario():
+        broker = LocalBrokerSessionBus(port=0)
+        broker.SUBSCRIBER_DRAIN_TIMEOUT = 0.01
+        stuck = StuckWriter()
+        broker._broker_subscribers["worker:w1"] = {stuck}
+        await broker._drain_subscriber(stuck)
+        assert stuck.closed and not broker._broker_subscribers["worker:w1"]
+
+    asyncio.run(scenario())
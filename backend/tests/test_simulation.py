@@ -0,0 +1,42 @@
+"""无头模拟测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.simulation import LatencyModel, StubLLMService, load_fixture, run_simulation
+from src.services.llm_service import LLMMessage
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "scripts", "fixtures", "simulation_script.json")
+
+
+@pytest.mark.unit
+def test_concurrent_games_run_to_end_with_stage_cpu():
+    """多局并发跑到 ENDED，并报告吞吐与分阶段 CPU 时间"""
+    async def scenario():
+        report = await run_simulation(load_fixture(FIXTURE), games=4, concurrency=4,
+                                      latency=LatencyModel.parse("uniform:0,0.002"))
+        assert report.completed == 4 and report.failed == 0
+        assert report.turns > 0 and report.llm_calls >= report.turns
+        assert report.games_per_second > 0 and report.turns_per_second > 0
+        assert {"initialize", "introduction", "voting", "transition"} <= set(report.stage_cpu_seconds)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_stub_llm_is_deterministic():
+    """相同 seed 与输入得到相同回复；回复包含地点与投票目标"""
+    async def scenario():
+        messages = [LLMMessage("system", "你是剧本杀游戏中的角色：甲\n..."), LLMMessage("user", "请发言")]
+        first = StubLLMService(seed=7, characters=["甲", "乙"], locations=["书房"])
+        second = StubLLMService(seed=7, characters=["甲", "乙"], locations=["书房"])
+        reply = (await first.chat_completion(messages)).content
+        assert reply == (await second.chat_completion(messages)).content
+        assert "书房" in reply and "投票给乙" in reply
+
+    asyncio.run(scenario())
+    with pytest.raises(ValueError):
+        LatencyModel.parse("gamma:1,2")
@@ -0,0 +1,103 @@
+"""观战模式测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.spectator_hub import SpectatorHub
+from src.core.utterance_stream import StreamingUtterance
+from src.core.websocket_server import GameWebSocketServer
+from tests.test_websocket_broadcast import FakeWebSocket
+
+
+@pytest.mark.unit
+def test_spectators_get_snapshot_and_never_own_the_session():
+    """观战者先收到快照再收到广播；观战者离开不清理会话，玩家离开时观战者被断开"""
+    async def scenario():
+        server = GameWebSocketServer()
+        session = server.get_or_create_session("room-1")
+        session.game_engine.add_public_chat("张三", "开场白")
+        player, viewer = FakeWebSocket(), FakeWebSocket()
+        await server.attach_client(player, "room-1")
+        assert await server.register_spectator(viewer, "room-1")
+        assert viewer not in session.clients
+
+        await server.broadcast({"type": "ai_action", "data": {"action": "你好"}}, "room-1")
+        await asyncio.sleep(0.02)
+        snapshot, action = (json.loads(f) for f in viewer.frames)
+        assert snapshot["type"] == "spectator_snapshot"
+        assert snapshot["data"]["game_state"]["public_chat"][-1]["message"] == "开场白"
+        assert action["data"]["action"] == "你好"
+
+        await server.unregister_spectator(viewer)
+        assert "room-1" in server.sessions and "room-1" not in server.spectator_hubs
+
+        late_viewer = FakeWebSocket()
+        assert await server.register_spectator(late_viewer, "room-1")
+        await server.unregister_client(player)
+        assert "room-1" not in server.sessions
+        assert late_viewer.closed_code == 1001
+
+        rejected = FakeWebSocket()
+        assert not await server.register_spectator(rejected, "missing")
+        assert rejected.closed_code == 4404
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_lagging_spectator_receives_conflated_updates():
+    """落后的观战者只收到最新的状态更新，逐条消息积压过多时改发快照"""
+    async def scenario():
+        hub = SpectatorHub("room-1", lambda: {"phase": "discussion"}, max_pending=3)
+        slow = FakeWebSocket(delay=0.05)
+        viewer = hub.add(slow)
+        await asyncio.sleep(0.01)  # 快照正在发送
+        for i in range(20):
+            hub.publish({"type": "game_state_update", "data": {"n": i}})
+        hub.publish({"type": "ai_action", "data": {"n": 1}})
+        await asyncio.sleep(0.2)
+        types = [json.loads(f)["type"] for f in slow.frames]
+        assert types == ["spectator_snapshot", "game_state_update", "ai_action"]
+        assert json.loads(slow.frames[1])["data"]["n"] == 19
+        assert viewer.conflated_count == 19
+
+        for i in range(10):
+            hub.publish({"type": "ai_action", "data": {"n": i}})
+        await asyncio.sleep(0.3)
+        assert viewer.resync_count >= 1
+        assert json.loads(slow.frames[-1])["type"] in ("spectator_snapshot", "ai_action")
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_streamed_turn_keeps_spectator_tail_and_queue_intact():
+    """流式发言的增量帧不进入观战尾部与队列，观战者只收到最终的 ai_action"""
+    async def scenario():
+        server = GameWebSocketServer()
+        server.get_or_create_session("room-1")
+        viewer = FakeWebSocket()
+        assert await server.register_spectator(viewer, "room-1")
+        hub = server.spectator_hubs["room-1"]
+
+        async def send_frame(message_type, data):
+            await server.broadcast({"type": message_type, "data": data, "session_id": "room-1"}, "room-1")
+
+        await server.broadcast({"type": "ai_action", "data": {"action": "上一句"}}, "room-1")
+        utterance = StreamingUtterance("张三", send_frame)
+        for i in range(200):
+            await utterance.feed(f"片段{i}。")
+        await utterance.finish(utterance.text)
+        await server.broadcast({"type": "ai_action", "data": {"action": utterance.text}}, "room-1")
+        await asyncio.sleep(0.05)
+
+        assert [m["type"] for m in hub.tail] == ["ai_action", "ai_action"]
+        assert [json.loads(f)["type"] for f in viewer.frames] == ["spectator_snapshot", "ai_action", "ai_action"]
+        assert hub.viewers[viewer].resync_count == 0
+        await server.unregister_spectator(viewer)
+
+    asyncio.run(scenario())
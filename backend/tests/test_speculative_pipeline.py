@@ -0,0 +1,75 @@
+"""发言流水线（推测执行）测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.schemas.game_phase import GamePhaseEnum
+from tests.factories import ScriptedLLM, make_engine, make_game_script
+
+SCRIPT_DATA = make_game_script()
+
+
+class RecordingLLM(ScriptedLLM):
+    """每次调用先记一条 llm_start，回复为 发言<序号>"""
+
+    def __init__(self, log):
+        super().__init__(delay=0.01)
+        self.log = log
+
+    def reply(self, speaker, count):
+        return f"发言{self.calls}"
+
+    async def chat_completion(self, messages, **kwargs):
+        self.log.append("llm_start")
+        return await super().chat_completion(messages, **kwargs)
+
+
+def make_pipeline_engine(log, depth):
+    llm = RecordingLLM(log)
+    # 角色介绍默认走批量执行，这里验证逐个发言的流水线
+    engine = make_engine(SCRIPT_DATA, GamePhaseEnum.INTRODUCTION, llm, agents_only=True,
+                         pipeline_depth=depth, batch_concurrency=0)
+    return engine, llm
+
+
+@pytest.mark.unit
+def test_next_speaker_llm_overlaps_current_turn_callback():
+    """规则选人时，下一位的 LLM 调用在当前发言的回调（TTS/广播）期间已经开始"""
+    async def scenario():
+        log = []
+        engine, llm = make_pipeline_engine(log, depth=1)
+
+        async def callback(action):
+            log.append("callback_start")
+            await asyncio.sleep(0.03)
+            log.append("callback_end")
+
+        actions = await engine.run_phase(action_callback=callback)
+        assert sorted(a["character"] for a in actions) == ["张三", "李四", "王五", "赵六"]
+        # 第一次回调结束前，第二位发言者的 LLM 调用已发起
+        first_end = log.index("callback_end")
+        assert log[:first_end].count("llm_start") == 2
+        assert engine.agents.speculation_hits == 3 and engine.agents.speculation_misses == 0
+        assert llm.calls == 4
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_speculation_discarded_when_transcript_changes():
+    """推测期间对话记录发生变化时丢弃推测结果并重新生成"""
+    async def scenario():
+        engine, llm = make_pipeline_engine([], depth=1)
+
+        async def callback(action):
+            engine.agents.broadcast_system_message(f"系统插话：{action['action']}")
+
+        actions = await engine.run_phase(action_callback=callback)
+        assert len(actions) == 4
+        assert engine.agents.speculation_hits == 0
+        assert engine.agents.speculation_misses == 3
+        assert all(a["action"] != "" for a in actions)
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+"""游戏状态增量同步测试"""
+import asyncio
+import copy
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.state_sync import StateVersionTracker, apply_patch, diff_state
+from src.core.websocket_server import GameWebSocketServer
+from tests.test_websocket_broadcast import FakeWebSocket
+
+
+@pytest.mark.unit
+def test_diff_and_apply_round_trip():
+    """补丁应用到旧状态后与新状态一致，列表追加只产生 add 操作"""
+    old = {"phase": "discussion", "events": [{"id": 1}, {"id": 2}], "votes": {"a": "b"}, "a/b": 1}
+    new = {"phase": "voting", "events": [{"id": 2}, {"id": 3}, {"id": 4}], "votes": {}, "a/b": 2}
+    ops = diff_state(old, new)
+    assert apply_patch(copy.deepcopy(old), ops) == new
+
+    appended = {**old, "events": old["events"] + [{"id": 3}]}
+    assert diff_state(old, appended) == [{"op": "add", "path": "/events/-", "value": {"id": 3}}]
+
+
+@pytest.mark.unit
+def test_tracker_versions_and_gap():
+    """未变化不产生新版本，超出历史的基准版本返回 None"""
+    tracker = StateVersionTracker(history_size=2)
+    assert tracker.commit({"n": 1}) == 1
+    assert tracker.commit({"n": 1}) == 1
+    assert tracker.commit({"n": 2}) == 2
+    assert tracker.delta_since(1) == [{"op": "replace", "path": "/n", "value": 2}]
+    tracker.commit({"n": 3})
+    assert tracker.delta_since(1) is None
+    assert tracker.snapshot() == {"n": 3}
+
+
+@pytest.mark.unit
+def test_broadcast_game_state_mixes_full_and_delta_clients():
+    """旧客户端收到完整状态，增量客户端先收快照，确认后收补丁"""
+    async def scenario():
+        server = GameWebSocketServer()
+        session = server.get_or_create_session("room-1")
+        legacy, delta = FakeWebSocket(), FakeWebSocket()
+        for ws in (legacy, delta):
+            server.client_sessions[ws] = "room-1"
+            session.clients.add(ws)
+        server._open_connection(legacy)
+        server._open_connection(delta).state_protocol = "delta"
+
+        session.game_engine.game_state["round"] = 1
+        await server.broadcast_game_state("room-1", "game_state_update")
+        await asyncio.sleep(0.02)
+        assert json.loads(legacy.frames[-1])["data"]["round"] == 1
+        snapshot = json.loads(delta.frames[-1])
+        assert snapshot["type"] == "game_state_snapshot"
+
+        await server.handle_client_message(delta, json.dumps(
+            {"type": "state_ack", "version": snapshot["data"]["version"]}))
+        session.game_engine.game_state["round"] = 2
+        await server.broadcast_game_state("room-1", "phase_changed")
+        await asyncio.sleep(0.02)
+
+        legacy_msg = json.loads(legacy.frames[-1])
+        assert legacy_msg["type"] == "phase_changed" and legacy_msg["data"]["game_state"]["round"] == 2
+        delta_msg, phase_msg = (json.loads(f) for f in delta.frames[-2:])
+        assert delta_msg["type"] == "game_state_delta"
+        assert delta_msg["data"]["ops"] == [{"op": "replace", "path": "/round", "value": 2}]
+        assert phase_msg["data"] == {"phase": session.game_engine.current_phase.value,
+                                     "state_version": delta_msg["data"]["version"]}
+        assert "game_state" not in phase_msg["data"]
+
+    asyncio.run(scenario())
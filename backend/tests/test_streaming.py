@@ -0,0 +1,78 @@
+"""流式发言测试"""
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.game_tts_manager import CharacterTTSResult
+from src.core.utterance_stream import SentenceSplitter, StreamingUtterance
+from src.schemas.game_phase import GamePhaseEnum
+from src.services.llm_service import BaseLLMService
+from tests.factories import make_engine, make_game_script
+
+CHUNKS = ["昨晚我一直", "在书房看书，", "没有出去过。", "不过我听到", "走廊里有脚步声！", "大概是十点"]
+
+
+class StreamingLLM(BaseLLMService):
+    def __init__(self):
+        self.finished_at = None
+
+    async def chat_completion(self, messages, **kwargs):
+        raise AssertionError("流式发言不应调用 chat_completion")
+
+    async def chat_completion_stream(self, messages, **kwargs):
+        for chunk in CHUNKS:
+            await asyncio.sleep(0.01)
+            yield chunk
+        self.finished_at = asyncio.get_running_loop().time()
+
+
+@pytest.mark.unit
+def test_sentence_splitter_waits_for_closing_quotes_and_merges_short_sentences():
+    """句末标点后的收尾引号归入本句；过短的句子与下一句合并"""
+    splitter = SentenceSplitter(min_chars=4)
+    assert splitter.push("他说：“是我。") == []
+    assert splitter.push("”好。然后呢？我") == ["他说：“是我。”", "好。然后呢？"]
+    assert splitter.flush() == "我"
+
+
+@pytest.mark.unit
+def test_streaming_turn_sends_deltas_and_sentence_audio_before_generation_ends():
+    """增量文本随生成推送；首句在生成结束前已送去合成，最终 ai_action 文本与增量一致"""
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        llm = StreamingLLM()
+        engine = make_engine(make_game_script(("张三",)), GamePhaseEnum.DISCUSSION, llm,
+                             conversation_flow_controller=None, pipeline_depth=0, convergence=None)
+
+        frames, synth_started = [], []
+
+        async def send(message_type, data):
+            frames.append((message_type, data))
+
+        async def synthesize(text):
+            synth_started.append(loop.time())
+            return CharacterTTSResult(url=f"tts://{len(synth_started)}", duration=1.0, voice_id="v")
+
+        utterance = StreamingUtterance("张三", send, synthesize, min_sentence_chars=8)
+        segments = []
+
+        async def delta_callback(character, delta):
+            assert character == "张三"
+            await utterance.feed(delta)
+
+        async def action_callback(action):
+            segments.extend(await utterance.finish(action["action"]))
+
+        actions = await engine.run_phase(max_turns=1, action_callback=action_callback,
+                                         delta_callback=delta_callback)
+        deltas = [data["delta"] for kind, data in frames if kind == "ai_action_delta"]
+        assert "".join(deltas) == actions[0]["action"] == "".join(CHUNKS)
+        assert synth_started[0] < llm.finished_at
+        assert [seg["text"] for seg in segments] == [
+            "昨晚我一直在书房看书，没有出去过。", "不过我听到走廊里有脚步声！", "大概是十点"]
+        audio = [data["index"] for kind, data in frames if kind == "ai_action_audio"]
+        assert audio == [0, 1, 2]
+
+    asyncio.run(scenario())
@@ -0,0 +1,158 @@
+"""WebSocket广播测试"""
+import asyncio
+import json
+import pytest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.websocket_server import GameWebSocketServer
+from src.core.client_connection import ClientConnection
+
+
+class FakeWebSocket:
+    """模拟FastAPI WebSocket，记录收到的文本帧"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.frames: list[str] = []
+        self.closed_code = None
+
+    async def send_text(self, data: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append(data)
+
+    async def send_bytes(self, data: bytes):
+        await self.send_text(data)
+
+    async def close(self, code: int = 1000):
+        self.closed_code = code
+
+
+@pytest.mark.unit
+def test_broadcast_encodes_once_and_fans_out():
+    """广播只序列化一次，并送达所有客户端"""
+    async def scenario():
+        server = GameWebSocketServer()
+        clients = [FakeWebSocket() for _ in range(3)]
+        session = server.get_or_create_session("room-1")
+        session.background_mode = True
+        for ws in clients:
+            server.client_sessions[ws] = "room-1"
+            session.clients.add(ws)
+            server._open_connection(ws)
+
+        calls = []
+        original = server.encode_message
+        server.encode_message = lambda message, *args: calls.append(message) or original(message, *args)
+        await server.broadcast({"type": "ai_action", "data": {"action": "你好"}}, "room-1")
+        await asyncio.sleep(0.05)
+
+        assert len(calls) == 1
+        for ws in clients:
+            assert json.loads(ws.frames[-1])["data"]["action"] == "你好"
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_broadcast_msgpack_clients_receive_binary_frames():
+    """MessagePack客户端收到二进制帧，每种编码只序列化一次"""
+    msgpack = pytest.importorskip("msgpack")
+
+    async def scenario():
+        server = GameWebSocketServer()
+        session = server.get_or_create_session("room-1")
+        json_ws, packed_ws = FakeWebSocket(), FakeWebSocket()
+        for ws in (json_ws, packed_ws):
+            server.client_sessions[ws] = "room-1"
+            session.clients.add(ws)
+        server._open_connection(json_ws)
+        server._open_connection(packed_ws).encoding = "msgpack"
+
+        calls = []
+        original = server.encode_message
+        server.encode_message = lambda message, *args: calls.append(args) or original(message, *args)
+        await server.broadcast({"type": "ai_action", "data": {"action": "你好"}}, "room-1")
+        await asyncio.sleep(0.05)
+
+        assert sorted(calls) == [("json",), ("msgpack",)]
+        assert json.loads(json_ws.frames[-1])["data"]["action"] == "你好"
+        assert isinstance(packed_ws.frames[-1], bytes)
+        assert msgpack.unpackb(packed_ws.frames[-1])["data"]["action"] == "你好"
+
+        # 客户端也可以发送二进制帧
+        await server.handle_client_message(packed_ws, msgpack.packb({"type": "get_game_state"}))
+        await asyncio.sleep(0.05)
+        assert msgpack.unpackb(packed_ws.frames[-1])["type"] == "game_state"
+        await session.actor.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_slow_consumer_does_not_block_and_is_evicted():
+    """慢客户端不阻塞其他客户端，超时后被剔除"""
+    async def scenario():
+        evicted = []
+
+        async def on_evict(ws):
+            evicted.append(ws)
+
+        fast_ws, slow_ws = FakeWebSocket(), FakeWebSocket(delay=10)
+        fast = ClientConnection(fast_ws, on_evict, slow_consumer_timeout=0.1)
+        slow = ClientConnection(slow_ws, on_evict, slow_consumer_timeout=0.1)
+        fast.start()
+        slow.start()
+
+        for conn in (slow, fast):
+            conn.enqueue("frame-1")
+        await asyncio.sleep(0.02)
+        assert fast_ws.frames == ["frame-1"]
+
+        await asyncio.sleep(0.2)
+        assert evicted == [slow_ws]
+        assert not slow.enqueue("frame-2")
+        await fast.close()
+        await slow.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_full_queue_evicts_consumer():
+    """出站队列写满时判定为慢消费者"""
+    async def scenario():
+        evicted = []
+
+        async def on_evict(ws):
+            evicted.append(ws)
+
+        conn = ClientConnection(FakeWebSocket(), on_evict, max_queue_size=2)
+        assert conn.enqueue("a") and conn.enqueue("b")
+        assert not conn.enqueue("c")
+        await asyncio.sleep(0)
+        assert len(evicted) == 1
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.unit
+def test_evict_task_is_kept_and_failures_are_logged(caplog):
+    """剔除通知任务被持有引用，注销回调抛出的异常会记录日志"""
+    async def scenario():
+        async def on_evict(ws):
+            raise RuntimeError("unregister failed")
+
+        conn = ClientConnection(FakeWebSocket(), on_evict, max_queue_size=1)
+        conn.enqueue("frame-1")
+        assert not conn.enqueue("frame-2")
+        task = conn._evict_task
+        assert task is not None
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    with caplog.at_level("ERROR", logger="src.core.client_connection"):
+        asyncio.run(scenario())
+    assert "unregister failed" in caplog.text